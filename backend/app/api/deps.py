@@ -9,8 +9,8 @@ from pydantic import ValidationError
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlmodel import Session
 
-from app import crud
 from app.core import security
+from app.core.auth_cache import get_revocation_cache, get_user_cache
 from app.core.config import settings
 from app.core.db_factory import async_engine, engine
 from app.core.storage import StorageInterface, get_storage
@@ -109,8 +109,8 @@ def get_current_user(session: SessionDep, token: TokenDep) -> User:
             detail="Invalid token payload",
         )
 
-    # Check if token is in blacklist
-    if crud.is_token_blacklisted(session=session, token=token):
+    # Check if token is in blacklist (mirrored in memory, see app/core/auth_cache.py)
+    if get_revocation_cache().is_revoked(session, token):
         import logging
 
         logging.getLogger("app").error("Token found in blacklist")
@@ -119,8 +119,13 @@ def get_current_user(session: SessionDep, token: TokenDep) -> User:
             detail="Token has been revoked",
         )
 
-    logger.info(f"Looking up user with ID: {token_data.sub}")
-    user = session.get(User, token_data.sub)
+    user_cache = get_user_cache()
+    user = user_cache.get(session, token_data.sub)
+    if user is None:
+        logger.info(f"Looking up user with ID: {token_data.sub}")
+        user = session.get(User, token_data.sub)
+        if user:
+            user_cache.put(user)
 
     if not user:
         logger.error(f"User with ID '{token_data.sub}' not found in database")
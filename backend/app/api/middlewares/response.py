@@ -1,86 +1,105 @@
-from collections.abc import Awaitable, Callable
+import json
 from typing import Any
 
-from fastapi import Request, Response
-from fastapi.responses import JSONResponse
-from starlette.middleware.base import BaseHTTPMiddleware
+from starlette.datastructures import MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
 
-from app.utils.response import ApiResponse
+# First keys of a body that is already in ApiResponse format, as rendered by
+# JSONResponse (compact separators). Error handlers dump with exclude_none, so
+# the envelope may start with "meta" or "error" instead of "data".
+ENVELOPE_PREFIXES = (b'{"data":', b'{"meta":', b'{"error":')
 
+SUCCESS_SUFFIX = b',"meta":{},"error":null}'
 
-class ApiResponseMiddleware(BaseHTTPMiddleware):
+
+class ApiResponseMiddleware:
     """
     中间件，用于统一处理API响应格式，确保所有响应都符合 ApiResponse 格式
+
+    Pure ASGI: the payload is never parsed. A successful JSON body is wrapped
+    by writing the envelope around the bytes the endpoint already serialized.
+    Only small, non-enveloped error bodies are decoded to pull out ``detail``.
+    Non-JSON, streaming and SSE responses are forwarded untouched.
     """
 
-    async def dispatch(
-        self, request: Request, call_next: Callable[[Request], Awaitable[Response]]
-    ) -> Response:
-        response = await call_next(request)
+    def __init__(self, app: ASGIApp, path_prefix: str = "/api") -> None:
+        self.app = app
+        self.path_prefix = path_prefix
 
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
         # 仅处理API路径的响应
-        if not request.url.path.startswith("/api"):
-            return response
-
-        # 如果不是JSON响应，直接返回
-        if not isinstance(response, JSONResponse):
-            return response
-
-        # 获取原始响应内容
-        response_body = response.body
-
-        # 如果是字节串或memoryview，则解码
-        if isinstance(response_body, bytes):
-            try:
-                content = response_body.decode()
-                import json
-
-                content = json.loads(content)
-            except Exception:
-                return response
-        elif isinstance(response_body, memoryview):
-            try:
-                content = bytes(response_body).decode()
-                import json
-
-                content = json.loads(content)
-            except Exception:
-                return response
-        else:
-            # 不是可解码类型
-            return response
-
-        # 检查内容是否已经符合 ApiResponse 格式
-        if isinstance(content, dict) and set(content.keys()) & {
-            "data",
-            "meta",
-            "error",
-        }:
-            return response
-
-        # 根据状态码，重新格式化响应
-        status_code = response.status_code
-        formatted_response: dict[str, Any] = {}
-
-        if 200 <= status_code < 400:
-            # 成功响应
-            success_response: ApiResponse[Any] = ApiResponse[Any](
-                data=content, meta={}, error=None
-            )
-            formatted_response = success_response.model_dump()
-        else:
-            # 错误响应
-            if isinstance(content, dict) and "detail" in content:
-                error_msg = content.get("detail", str(content))
-            else:
-                error_msg = str(content)
-            error_response: ApiResponse[Any] = ApiResponse[Any](
-                data=None, meta={}, error=error_msg
-            )
-            formatted_response = error_response.model_dump()
-
-        return JSONResponse(
-            content=formatted_response,
-            status_code=status_code,
-            headers=dict(response.headers),
-        )
+        if scope["type"] != "http" or not scope["path"].startswith(self.path_prefix):
+            await self.app(scope, receive, send)
+            return
+
+        start_message: Message | None = None
+        passthrough = False
+
+        async def send_wrapper(message: Message) -> None:
+            nonlocal start_message, passthrough
+
+            if passthrough:
+                await send(message)
+                return
+
+            if message["type"] == "http.response.start":
+                content_type = MutableHeaders(raw=message["headers"]).get(
+                    "content-type", ""
+                )
+                # 如果不是JSON响应，直接返回
+                if not content_type.startswith("application/json"):
+                    passthrough = True
+                    await send(message)
+                    return
+                start_message = message
+                return
+
+            if message["type"] != "http.response.body" or start_message is None:
+                await send(message)
+                return
+
+            # Bodies sent in several parts are streams; forward them as they are
+            body = message.get("body", b"")
+            if message.get("more_body", False):
+                passthrough = True
+                await send(start_message)
+                await send(message)
+                return
+
+            wrapped = _wrap_body(body, start_message["status"])
+            if wrapped is not None:
+                headers = MutableHeaders(raw=start_message["headers"])
+                headers["content-length"] = str(len(wrapped))
+                message = {**message, "body": wrapped}
+            await send(start_message)
+            await send(message)
+
+        await self.app(scope, receive, send_wrapper)
+
+
+def _wrap_body(body: bytes, status_code: int) -> bytes | None:
+    """Return ``body`` wrapped in the ApiResponse envelope, or None to keep it."""
+    # 检查内容是否已经符合 ApiResponse 格式
+    if not body or body.lstrip().startswith(ENVELOPE_PREFIXES):
+        return None
+
+    if 200 <= status_code < 400:
+        # 成功响应: the serialized payload is reused as is
+        return b'{"data":' + body + SUCCESS_SUFFIX
+
+    # 错误响应
+    try:
+        content: Any = json.loads(body)
+    except ValueError:
+        return None
+    if isinstance(content, dict) and "detail" in content:
+        error_msg = content["detail"]
+    else:
+        error_msg = content
+    if not isinstance(error_msg, str):
+        error_msg = str(error_msg)
+    return json.dumps(
+        {"data": None, "meta": {}, "error": error_msg},
+        ensure_ascii=False,
+        separators=(",", ":"),
+    ).encode("utf-8")
@@ -1,33 +1,43 @@
+import hashlib
 import json
 import uuid
-from collections.abc import AsyncGenerator
+from collections.abc import AsyncGenerator, AsyncIterator
 from datetime import datetime, timezone
-from typing import Any  # Added Optional
+from functools import partial
+from typing import Any, Literal  # Added Optional
 
 from fastapi import (
     APIRouter,
-    BackgroundTasks,
     Body,
     Depends,
     HTTPException,
     Path,  # Added Path
     Query,
+    Response,
     status,
 )
 from fastapi.responses import StreamingResponse
 from sqlmodel import Session
+from starlette.concurrency import run_in_threadpool
 
 from app.api.deps import CurrentUser, SessionDep, get_current_user, get_db
+from app.api.routes.llm_service import get_embedding_batcher
 from app.base import User
-from app.core import security  # For password verification
 from app.core.config import settings
+from app.core.password_hasher import get_password_hasher
 from app.crud import crud_content as crud  # Alias for clarity
 from app.crud.crud_content import (
-    create_content_item_sync as crud_create_content_item,
-)
-from app.crud.crud_content import (
+    count_content_items,
+    encode_content_item_cursor,
+    enqueue_processing_job,
     get_content_chunks,
     get_content_chunks_summary,
+    get_user_chunks_by_ids,
+    search_content_chunks,
+    set_chunk_token_counts,
+)
+from app.crud.crud_content import (
+    create_content_item_sync as crud_create_content_item,
 )
 from app.crud.crud_content import (
     get_content_item_sync as crud_get_content_item,
@@ -45,10 +55,46 @@ from app.schemas.content import (  # Re-using ContentItemBaseSchema if public is
     ContentSharePublic,
 )
 from app.schemas.llm import CompletionRequest, LLMMessage
+from app.utils.chunk_analysis import MAP_INSTRUCTIONS, MapReduceAnalysis
 from app.utils.content_processors import ContentProcessorFactory
+from app.utils.llm_cache import (
+    StreamRecorder,
+    build_cache_key,
+    get_llm_cache,
+    iter_sse_replay,
+    should_cache,
+)
+from app.utils.llm_client import get_llm_client
+from app.utils.llm_router import get_model_router
+from app.utils.llm_scheduler import (
+    QueueFullError,
+    get_llm_scheduler,
+    sse_error_event,
+    sse_queue_event,
+)
+from app.utils.stream_coalescer import get_stream_coalescer
+from app.utils.token_budget import (
+    chars_per_token,
+    count_message_tokens,
+    count_tokens,
+    prompt_budget,
+    trim_to_tokens,
+)
+from app.utils.vector_index import get_user_vector_index, rebuild_user_vector_index
 
 router = APIRouter()
 
+# 降低超时时间以便快速失败: applies to connecting and to each read of the stream
+ANALYSIS_TIMEOUT = 10.0
+# Map calls of a map-reduce analysis are not streamed, so allow the whole answer
+ANALYSIS_MAP_TIMEOUT = 60.0
+ANALYSIS_MODEL = "github-llama-3-2-11b-vision"  # 暂时使用一个健康的模型进行测试
+ANALYSIS_MAX_TOKENS = 2000
+
+_SYSTEM_PROMPT_TOO_LONG = (
+    f"System prompt does not fit the context window of {ANALYSIS_MODEL}"
+)
+
 
 @router.post(
     "/create",
@@ -99,17 +145,16 @@ def create_content_item_endpoint(
     "/process/{id}",
     response_model=ContentItemPublic,
     summary="Process Content Item",
-    description="Process a content item to convert it to Markdown format using appropriate processor.",
+    description="Queue a content item for conversion to Markdown. The work is done by the processing worker (python -m app.worker).",
 )
 def process_content_item_endpoint(
     *,
     session: SessionDep,
     current_user: CurrentUser,
     id: uuid.UUID,
-    background_tasks: BackgroundTasks,
 ) -> ContentItemPublic:
     """
-    Process content item to convert to Markdown format.
+    Queue content item for conversion to Markdown format.
     """
     # Get the content item
     item = crud_get_content_item(session=session, id=id)
@@ -142,14 +187,14 @@ def process_content_item_endpoint(
         )
         return public_item
 
-    # Get appropriate processor
+    # Make sure a processor exists for this type before queueing
     try:
-        processor = ContentProcessorFactory.get_processor(item.type)
+        ContentProcessorFactory.get_processor(item.type)
     except ValueError as e:
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
 
-    # Process in background
-    background_tasks.add_task(process_content_background, processor, item, session)
+    # Hand off to the processing worker via the durable job queue
+    enqueue_processing_job(session, item.id)
 
     # Update status to processing
     item.processing_status = "processing"
@@ -174,23 +219,6 @@ def process_content_item_endpoint(
     return public_item
 
 
-def process_content_background(processor, content_item: ContentItem, session):
-    """Background task to process content."""
-    try:
-        result = processor.process_content(content_item, session)
-        if result.success:
-            # Store the processed markdown content
-            content_item.content_text = result.markdown_content
-            if result.metadata:
-                content_item.meta_info = result.metadata
-        session.commit()
-    except Exception as e:
-        content_item.processing_status = "failed"
-        content_item.error_message = str(e)
-        session.add(content_item)
-        session.commit()
-
-
 @router.get(
     "/",
     response_model=list[ContentItemPublic],
@@ -201,18 +229,43 @@ def list_content_items_endpoint(
     *,
     session: SessionDep,
     current_user: CurrentUser,
+    response: Response,
     skip: int = Query(0, ge=0, description="Number of items to skip for pagination."),
     limit: int = Query(
         100, ge=1, le=200, description="Maximum number of items to return."
     ),
+    cursor: str | None = Query(
+        None,
+        description="Keyset cursor from the X-Next-Cursor header of the previous page. Overrides skip.",
+    ),
+    include_total: bool = Query(
+        False, description="Return the total number of items in X-Total-Count."
+    ),
 ) -> list[ContentItemPublic]:
     """
-    Retrieve content items for the current user.
+    Retrieve content items for the current user, newest first.
+
+    When a full page is returned, the X-Next-Cursor response header holds the
+    cursor for the next page.
     """
     # Filter by current user's ID for security
-    items = crud_get_content_items(
-        session=session, skip=skip, limit=limit, user_id=current_user.id
-    )
+    try:
+        items = crud_get_content_items(
+            session=session,
+            skip=skip,
+            limit=limit,
+            user_id=current_user.id,
+            cursor=cursor,
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+
+    if len(items) == limit:
+        response.headers["X-Next-Cursor"] = encode_content_item_cursor(items[-1])
+    if include_total:
+        response.headers["X-Total-Count"] = str(
+            count_content_items(session, user_id=current_user.id)
+        )
 
     # Convert ContentItem objects to ContentItemPublic objects
     public_items = []
@@ -234,6 +287,106 @@ def list_content_items_endpoint(
     return public_items
 
 
+@router.get(
+    "/similar",
+    summary="Find Similar Content Chunks",
+    description="Semantic search over the authenticated user's content chunks, ranked by embedding similarity.",
+)
+async def search_similar_chunks_endpoint(
+    *,
+    session: SessionDep,
+    current_user: CurrentUser,
+    q: str = Query(
+        ..., min_length=1, max_length=2000, description="Text to search for"
+    ),
+    limit: int = Query(
+        default=10, ge=1, le=50, description="Number of chunks to return"
+    ),
+) -> dict[str, Any]:
+    """
+    Return the user's chunks closest in meaning to ``q``.
+
+    The query is embedded through LiteLLM and matched against the user's
+    in-process vector index (see app/utils/vector_index.py).
+    """
+    model = settings.CHUNK_EMBEDDING_MODEL
+    if not model:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Chunk embeddings are not enabled",
+        )
+
+    embedded = await get_embedding_batcher().embed(
+        model, [q], api_key=settings.LITELLM_MASTER_KEY
+    )
+    query_vector = embedded.embeddings[0]
+
+    index = get_user_vector_index(current_user.id)
+    if not index.matches(model, len(query_vector)):
+        # Not built on this host yet, or built with another model
+        await run_in_threadpool(
+            rebuild_user_vector_index, session, current_user.id, model
+        )
+
+    # Over-fetch a little: entries of deleted items are dropped below
+    hits = index.search(query_vector, k=limit * 2)
+    chunks = await run_in_threadpool(
+        get_user_chunks_by_ids, session, current_user.id, [h.chunk_id for h in hits]
+    )
+
+    results = []
+    for hit in hits:
+        if hit.chunk_id not in chunks:
+            continue
+        chunk, item = chunks[hit.chunk_id]
+        results.append(
+            {
+                "chunk_id": str(chunk.id),
+                "content_item_id": str(item.id),
+                "content_title": item.title,
+                "chunk_index": chunk.chunk_index,
+                "chunk_type": chunk.chunk_type,
+                "chunk_content": chunk.chunk_content,
+                "score": hit.score,
+            }
+        )
+        if len(results) == limit:
+            break
+
+    return {"query": q, "results": results}
+
+
+@router.get(
+    "/search",
+    summary="Search Content Chunks",
+    description="Full-text search over the authenticated user's content chunks, ranked by relevance, with highlighted snippets.",
+)
+def search_content_chunks_endpoint(
+    *,
+    session: SessionDep,
+    current_user: CurrentUser,
+    q: str = Query(
+        ...,
+        min_length=1,
+        max_length=500,
+        description='Words to search for; supports "quoted phrases", or, and -word',
+    ),
+    skip: int = Query(0, ge=0, description="Number of hits to skip."),
+    limit: int = Query(
+        default=20, ge=1, le=50, description="Number of chunks to return"
+    ),
+) -> dict[str, Any]:
+    """
+    Return the user's chunks matching ``q``, best matches first.
+
+    Terms in Chinese, Japanese or Korean match anywhere in the text. Each hit
+    carries a snippet of the chunk with the matched words wrapped in
+    ``<mark>``; the rest of the snippet is HTML-escaped.
+    """
+    results = search_content_chunks(session, current_user.id, q, skip=skip, limit=limit)
+    return {"query": q, "results": results}
+
+
 @router.get(
     "/{id}",
     response_model=ContentItemPublic,
@@ -420,9 +573,21 @@ def get_content_chunks_endpoint(
     id: uuid.UUID,
     page: int = Query(default=1, ge=1, description="Page number (1-based)"),
     size: int = Query(default=10, ge=1, le=50, description="Number of chunks per page"),
+    after: int | None = Query(
+        default=None,
+        ge=-1,
+        description="Cursor: return chunks after this chunk index (overrides page)",
+    ),
+    include_total: bool = Query(
+        default=True, description="Include the total chunk count and page count"
+    ),
 ) -> dict[str, Any]:
     """
     Get content chunks with pagination.
+
+    Pages are fetched by chunk index range, so deep pages cost the same as the
+    first one. Use ``next_cursor`` from the response as ``after`` to page
+    forward without a page number.
     """
     item = crud_get_content_item(session=session, id=id)
     if not item:
@@ -444,16 +609,27 @@ def get_content_chunks_endpoint(
             detail=f"Content is not ready. Status: {item.processing_status}. Please wait for processing to complete.",
         )
 
-    # Get chunks and total count
-    chunks, total_count = get_content_chunks(session, id, page, size)
+    # Get chunks; the total comes from the aggregates cached on the item
+    chunks, _ = get_content_chunks(
+        session, id, page, size, after=after, include_total=False
+    )
+    total_count = item.chunk_count if include_total else None
 
     # Get summary information
-    summary = get_content_chunks_summary(session, id)
+    summary = get_content_chunks_summary(item)
 
     # Calculate pagination info
-    total_pages = (total_count + size - 1) // size  # Ceiling division
-    has_next = page < total_pages
-    has_prev = page > 1
+    first_index = after + 1 if after is not None else (page - 1) * size
+    if after is not None:
+        page = first_index // size + 1
+    if total_count is not None:
+        total_pages: int | None = (total_count + size - 1) // size  # Ceiling division
+        has_next = first_index + len(chunks) < total_count
+    else:
+        total_pages = None
+        has_next = len(chunks) == size
+    has_prev = first_index > 0
+    next_cursor = chunks[-1].chunk_index if has_next and chunks else None
 
     return {
         "content_id": str(id),
@@ -465,6 +641,7 @@ def get_content_chunks_endpoint(
                 "type": chunk.chunk_type,
                 "word_count": chunk.word_count,
                 "char_count": chunk.char_count,
+                "summary": chunk.summary,
                 "meta_info": chunk.meta_info,
                 "created_at": chunk.created_at.isoformat(),
             }
@@ -477,6 +654,7 @@ def get_content_chunks_endpoint(
             "total_pages": total_pages,
             "has_next": has_next,
             "has_prev": has_prev,
+            "next_cursor": next_cursor,
         },
         "summary": summary,
         "content_info": {
@@ -515,7 +693,7 @@ def get_content_chunks_summary_endpoint(
             detail="You don't have permission to access this content item",
         )
 
-    summary = get_content_chunks_summary(session, id)
+    summary = get_content_chunks_summary(item)
 
     return {
         "content_id": str(id),
@@ -529,11 +707,109 @@ def get_content_chunks_summary_endpoint(
     }
 
 
+async def _complete_analysis_part(
+    url: str, headers: dict[str, str], payload: dict[str, Any]
+) -> str:
+    """Run one (non-streamed) map call of a map-reduce analysis."""
+    cache = get_llm_cache()
+    cache_key = build_cache_key(payload) if should_cache(payload) else None
+    response_json = await cache.get(cache_key) if cache_key else None
+    if response_json is None:
+        response = await get_llm_client().post(
+            url, json=payload, headers=headers, timeout=ANALYSIS_MAP_TIMEOUT
+        )
+        response.raise_for_status()
+        response_json = response.json()
+        if cache_key:
+            await cache.set(cache_key, response_json)
+    return response_json["choices"][0]["message"]["content"] or ""
+
+
+def _budget_map_reduce(
+    db: Session, item: ContentItem, system_prompt: str
+) -> tuple[list[str], int]:
+    """
+    Load an item's chunks and fit them to the model's context window.
+
+    Returns the chunk texts (any chunk too large for one call is trimmed) and
+    the group size in characters, derived from the document's own
+    characters-per-token ratio. Token counts missing from chunks written
+    before counting existed are computed and stored.
+
+    This reads every chunk and may tokenize and commit, so the analyze
+    endpoint runs it in the threadpool.
+    """
+    chunks, _ = get_content_chunks(
+        db, item.id, size=item.chunk_count, include_total=False
+    )
+    texts = [chunk.chunk_content for chunk in chunks]
+    token_counts = [chunk.token_count for chunk in chunks]
+    missing = {
+        chunk.id: count_tokens(chunk.chunk_content)
+        for chunk in chunks
+        if chunk.token_count is None
+    }
+    if missing:
+        token_counts = [
+            missing.get(chunk.id, chunk.token_count or 0) for chunk in chunks
+        ]
+        set_chunk_token_counts(db, item.id, missing, total=sum(token_counts))
+        db.commit()
+
+    group_chars = settings.ANALYSIS_MAP_GROUP_CHARS
+    budget = prompt_budget(
+        ANALYSIS_MODEL, max(ANALYSIS_MAX_TOKENS, settings.ANALYSIS_MAP_MAX_TOKENS)
+    )
+    if budget is None:
+        return texts, group_chars
+
+    # Room left for the document text next to the map instructions
+    room = budget - count_message_tokens(
+        [
+            {"role": "system", "content": MAP_INSTRUCTIONS + system_prompt},
+            {"role": "user", "content": ""},
+        ]
+    )
+    if room <= 0:
+        raise HTTPException(status_code=400, detail=_SYSTEM_PROMPT_TOO_LONG)
+    ratio = chars_per_token(sum(len(text) for text in texts), token_counts)
+    texts = [
+        trim_to_tokens(text, room) if (count or 0) > room else text
+        for text, count in zip(texts, token_counts, strict=True)
+    ]
+    return texts, max(1, min(group_chars, int(room * ratio)))
+
+
+def _analysis_slots(analysis: MapReduceAnalysis | None) -> int:
+    """Scheduler slots for the upstream calls an analysis keeps in flight."""
+    # The final stream may be hedged with a second request
+    slots = 2 if get_model_router().hedge_enabled else 1
+    if analysis is not None:
+        slots = max(slots, min(analysis.concurrency, len(analysis.groups)))
+    return slots
+
+
+def _analysis_models(messages: list[dict[str, Any]]) -> list[str]:
+    """ANALYSIS_MODEL, then the fallback models whose context window fits."""
+    prompt_tokens = count_message_tokens(messages)
+    models = [ANALYSIS_MODEL]
+    for model in settings.ANALYSIS_FALLBACK_MODELS:
+        budget = prompt_budget(model, ANALYSIS_MAX_TOKENS)
+        if budget is None or prompt_tokens <= budget:
+            models.append(model)
+    return models
+
+
 @router.post("/{content_id}/analyze")
 async def analyze_content_stream(
     content_id: str,
     system_prompt: str = Body(..., description="System prompt for analysis"),
     user_prompt: str = Body(..., description="User prompt (content text)"),
+    mode: Literal["auto", "full", "map_reduce"] = Body(
+        "auto",
+        description="'full' sends user_prompt in one call; 'map_reduce' analyses "
+        "the stored chunks in parts; 'auto' uses map_reduce for long content",
+    ),
     current_user: User = Depends(get_current_user),
     db: Session = Depends(get_db),
 ):
@@ -544,6 +820,7 @@ async def analyze_content_stream(
         content_id: ID of the content to analyze
         system_prompt: System prompt (e.g., prompt template)
         user_prompt: User prompt (the actual content text)
+        mode: How the content is sent to the model (see app/utils/chunk_analysis.py)
         current_user: Current authenticated user
         db: Database session
 
@@ -554,24 +831,89 @@ async def analyze_content_stream(
     content_item = crud_get_content_item(session=db, id=uuid.UUID(content_id))
     if not content_item or content_item.user_id != current_user.id:
         raise HTTPException(status_code=404, detail="Content not found")
+    # Read now: ORM objects expire if the session commits below
+    user_id = str(current_user.id)
+    item_id = str(content_item.id)
+
+    if mode == "map_reduce" and not content_item.chunk_count:
+        raise HTTPException(
+            status_code=400, detail="Content has not been split into chunks yet"
+        )
+
+    # Budget the request against the model's context window before sending it
+    prompt_tokens = count_message_tokens(
+        [
+            {"role": "system", "content": system_prompt},
+            {"role": "user", "content": user_prompt},
+        ]
+    )
+    budget = prompt_budget(ANALYSIS_MODEL, ANALYSIS_MAX_TOKENS)
+    fits = budget is None or prompt_tokens <= budget
+    use_map_reduce = mode == "map_reduce" or (
+        mode == "auto"
+        and content_item.chunk_count > 0
+        and (
+            content_item.chunk_char_count >= settings.ANALYSIS_MAP_REDUCE_MIN_CHARS
+            or not fits
+        )
+    )
+    if budget is not None and not fits and not use_map_reduce:
+        # Keep the start of the content that fits next to the system prompt
+        room = budget - (prompt_tokens - count_tokens(user_prompt))
+        if room <= 0:
+            raise HTTPException(status_code=400, detail=_SYSTEM_PROMPT_TOO_LONG)
+        user_prompt = trim_to_tokens(user_prompt, room)
 
     # Prepare LiteLLM request
     completion_request = CompletionRequest(
-        model="github-llama-3-2-11b-vision",  # 暂时使用一个健康的模型进行测试
+        model=ANALYSIS_MODEL,
         messages=[
             LLMMessage(role="system", content=system_prompt),
             LLMMessage(role="user", content=user_prompt),
         ],
         stream=True,
         temperature=0.7,
-        max_tokens=2000,
+        max_tokens=ANALYSIS_MAX_TOKENS,
+        # The same prompt on the same content is worth replaying, even at 0.7
+        cache=True,
     )
+    payload = completion_request.model_dump(exclude_none=True, exclude={"cache"})
+
+    analysis: MapReduceAnalysis | None = None
+    # Identifies the requested analysis (not the upstream call) for caching and
+    # coalescing, so map-reduce and full answers are kept apart
+    request_key = build_cache_key(payload)
+    if use_map_reduce:
+        # Load the chunks now: the session is closed once streaming starts
+        chunk_texts, group_chars = await run_in_threadpool(
+            _budget_map_reduce, db, content_item, system_prompt
+        )
+        analysis = MapReduceAnalysis(
+            model=ANALYSIS_MODEL,
+            system_prompt=system_prompt,
+            chunk_texts=chunk_texts,
+            group_chars=group_chars,
+            concurrency=settings.ANALYSIS_MAP_CONCURRENCY,
+            map_max_tokens=settings.ANALYSIS_MAP_MAX_TOKENS,
+        )
+        # The reduce call replaces user_prompt with notes on the item's chunks,
+        # so the key must identify the item and the text that was analysed
+        chunks_digest = hashlib.sha256(
+            "\x00".join(chunk_texts).encode("utf-8")
+        ).hexdigest()
+        request_key = build_cache_key(
+            {
+                **payload,
+                "analysis_mode": "map_reduce",
+                "content_item_id": item_id,
+                "chunks_digest": chunks_digest,
+            }
+        )
+    cache_key = request_key if should_cache(payload, completion_request.cache) else None
 
     async def stream_analysis() -> AsyncGenerator[str, None]:
         """Generate analysis stream from LiteLLM"""
         try:
-            import aiohttp
-
             # Forward to LiteLLM proxy
             litellm_url = f"{settings.LITELLM_PROXY_URL}/v1/chat/completions"
             headers = {"Content-Type": "application/json"}
@@ -580,28 +922,76 @@ async def analyze_content_stream(
             if settings.LITELLM_MASTER_KEY:
                 headers["Authorization"] = f"Bearer {settings.LITELLM_MASTER_KEY}"
 
-            payload = completion_request.model_dump(exclude_none=True)
-
-            # Make streaming request to LiteLLM using aiohttp
-            timeout = aiohttp.ClientTimeout(total=10.0)  # 降低超时时间以便快速失败
-            async with aiohttp.ClientSession(timeout=timeout) as session:
-                async with session.post(
-                    litellm_url, json=payload, headers=headers
-                ) as response:
-                    if response.status != 200:
-                        # 如果LiteLLM不可用，提供模拟响应
-                        async for chunk in _send_mock_analysis_response(system_prompt):
-                            yield chunk
-                        return
-
-                    # Stream the response
-                    async for chunk_bytes in response.content.iter_chunked(1024):
-                        if chunk_bytes:
-                            # Forward the chunk as-is (LiteLLM sends SSE format)
-                            chunk_str: str = chunk_bytes.decode(
-                                "utf-8", errors="ignore"
-                            )
-                            yield chunk_str
+            cache = get_llm_cache()
+            if cache_key is not None:
+                cached = await cache.get(cache_key)
+                if cached is not None:
+                    for event in iter_sse_replay(cached):
+                        yield event
+                    return
+
+            # Wait for a fair share of the LLM capacity; a map-reduce run
+            # costs as much as the calls it makes, and reserves a slot for
+            # each call it keeps in flight
+            try:
+                ticket = get_llm_scheduler().submit(
+                    user_id,
+                    cost=len(analysis.groups) + 1 if analysis is not None else 1,
+                    slots=_analysis_slots(analysis),
+                )
+            except QueueFullError as e:
+                yield sse_error_event(429, str(e))
+                return
+            try:
+                try:
+                    async for position in ticket.positions():
+                        yield sse_queue_event(position)
+                except TimeoutError as e:
+                    yield sse_error_event(503, str(e))
+                    return
+
+                upstream_payload = payload
+                if analysis is not None:
+                    # The scheduler may have granted fewer slots than asked for
+                    analysis.concurrency = ticket.slots
+                    async for done, total in analysis.run(
+                        partial(_complete_analysis_part, litellm_url, headers)
+                    ):
+                        # SSE comment: ignored by clients, keeps the connection alive
+                        yield f": map {done}/{total}\n\n"
+                    upstream_payload = analysis.reduce_payload(payload)
+
+                recorder = StreamRecorder()
+
+                async def open_stream(model: str) -> AsyncGenerator[str, None]:
+                    # Stream from LiteLLM over the shared, pooled client
+                    async with get_llm_client().stream(
+                        "POST",
+                        litellm_url,
+                        json={**upstream_payload, "model": model},
+                        headers=headers,
+                        timeout=ANALYSIS_TIMEOUT,
+                    ) as response:
+                        response.raise_for_status()
+                        async for chunk_str in response.aiter_text():
+                            if chunk_str:
+                                yield chunk_str
+
+                # Forward the chunks as-is (LiteLLM sends SSE format) from the
+                # first model to answer; the mock below is the last resort
+                async for chunk_str in get_model_router().stream(
+                    _analysis_models(upstream_payload["messages"]),
+                    open_stream,
+                    hedge=ticket.slots > 1,
+                ):
+                    recorder.feed(chunk_str)
+                    yield chunk_str
+            finally:
+                ticket.release()
+
+            recorded = recorder.response()
+            if cache_key is not None and recorded is not None:
+                await cache.set(cache_key, recorded)
 
         except Exception:
             # 当LiteLLM服务不可用时，发送模拟分析响应
@@ -640,8 +1030,15 @@ async def analyze_content_stream(
         # 发送结束标志
         yield "data: [DONE]\n\n"
 
+    # Identical concurrent analyses share one upstream stream
+    analysis_stream: AsyncIterator[str] = (
+        get_stream_coalescer().subscribe(request_key, stream_analysis)
+        if settings.LLM_STREAM_COALESCING_ENABLED
+        else stream_analysis()
+    )
+
     return StreamingResponse(
-        stream_analysis(),
+        analysis_stream,
         media_type="text/event-stream",
         headers={
             "Cache-Control": "no-cache",
@@ -702,7 +1099,7 @@ def create_share_link_endpoint(
     summary="Access Shared Content",
     description="Retrieves a content item using a share token. May require a password.",
 )
-def get_shared_content_endpoint(
+async def get_shared_content_endpoint(
     *,
     session: SessionDep,
     token: str = Path(..., description="The unique share token"),
@@ -711,7 +1108,11 @@ def get_shared_content_endpoint(
     """
     Access shared content item using a token.
     """
-    share_record = crud.get_content_share_by_token(db=session, token=token)
+    # Database calls run in the threadpool and bcrypt on the password hasher's
+    # threads, so password-protected links do not block the event loop
+    share_record = await run_in_threadpool(
+        crud.get_content_share_by_token, db=session, token=token
+    )
 
     if not share_record or not share_record.is_active:
         raise HTTPException(
@@ -728,7 +1129,9 @@ def get_shared_content_endpoint(
             expires_at = expires_at.replace(tzinfo=timezone.utc)
 
         if expires_at < current_time:
-            crud.deactivate_content_share(db=session, content_share=share_record)
+            await run_in_threadpool(
+                crud.deactivate_content_share, db=session, content_share=share_record
+            )
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND, detail="Share link has expired"
             )
@@ -738,7 +1141,7 @@ def get_shared_content_endpoint(
             raise HTTPException(
                 status_code=status.HTTP_401_UNAUTHORIZED, detail="Password required"
             )
-        if not security.verify_password(password, share_record.password_hash):
+        if not await get_password_hasher().verify(password, share_record.password_hash):
             raise HTTPException(
                 status_code=status.HTTP_403_FORBIDDEN, detail="Incorrect password"
             )
@@ -750,18 +1153,23 @@ def get_shared_content_endpoint(
     ):
         # Deactivate if it wasn't already (e.g. if increment happened elsewhere or exact match)
         if share_record.is_active:
-            crud.deactivate_content_share(db=session, content_share=share_record)
+            await run_in_threadpool(
+                crud.deactivate_content_share, db=session, content_share=share_record
+            )
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Share link access limit reached",
         )
 
     # Increment access count - this might deactivate the share if limit is reached
-    crud.increment_access_count(db=session, content_share=share_record)
+    content_item_id = share_record.content_item_id
+    await run_in_threadpool(
+        crud.increment_access_count, db=session, content_share=share_record
+    )
 
     # Get content item before final checks
-    content_item = crud.get_content_item_sync(
-        session=session, id=share_record.content_item_id
+    content_item = await run_in_threadpool(
+        crud.get_content_item_sync, session=session, id=content_item_id
     )
     if not content_item:
         raise HTTPException(
@@ -1,21 +1,42 @@
 # sse_starlette.sse.EventSourceResponse is not available, will use StreamingResponse
 
+import hashlib
 import json
-from collections.abc import AsyncGenerator
+from collections.abc import AsyncGenerator, Awaitable, Callable
+from functools import partial
 from typing import Any
 
 import httpx
-from fastapi import APIRouter, Body, HTTPException
+from fastapi import APIRouter, Body, HTTPException, Request
 from fastapi.responses import StreamingResponse
 
 from app.core.config import settings
 from app.schemas.llm import (
     CompletionRequest,
     CompletionResponse,
+    EmbeddingData,
     EmbeddingRequest,
     EmbeddingResponse,
+    EmbeddingUsage,
     # StreamingCompletionResponse, # This will be manually constructed for streaming
 )
+from app.utils.embedding_batcher import BatchKey, EmbeddingBatcher, EmbeddingCache
+from app.utils.llm_cache import (
+    StreamRecorder,
+    build_cache_key,
+    get_llm_cache,
+    iter_sse_replay,
+    should_cache,
+)
+from app.utils.llm_client import get_llm_client
+from app.utils.llm_scheduler import (
+    QueueFullError,
+    Ticket,
+    get_llm_scheduler,
+    sse_error_event,
+    sse_queue_event,
+)
+from app.utils.token_budget import ContextBudgetError, check_context_budget
 
 router = APIRouter()
 
@@ -40,6 +61,7 @@ async def _forward_request_to_litellm(
     data: dict[str, Any] | None = None,
     headers: dict[str, str] | None = None,
     stream: bool = False,
+    timeout: float | None = None,
 ):
     """Asynchronously forwards a request to the LiteLLM proxy.
 
@@ -56,6 +78,7 @@ async def _forward_request_to_litellm(
         data (dict[str, Any] | None?): JSON data to be sent in the request body. Defaults to None.
         headers (dict[str, str] | None?): Headers to include with the request. Defaults to None.
         stream (bool?): If True, the response will be streamed. Defaults to False.
+        timeout (float | None?): Overrides the client's timeout for this request. Defaults to None.
     """
     try:
         # Ensure proper URL joining without double slashes
@@ -63,13 +86,23 @@ async def _forward_request_to_litellm(
         endpoint_path = endpoint_path.lstrip("/")
         url = f"{base_url}/{endpoint_path}"
 
+        request_kwargs: dict[str, Any] = {"json": data, "headers": headers}
+        if timeout is not None:
+            request_kwargs["timeout"] = timeout
+
         if stream:
-            req = client.build_request(method, url, json=data, headers=headers)
+            req = client.build_request(method, url, **request_kwargs)
             response_stream = await client.send(req, stream=True)
-            response_stream.raise_for_status()  # Raise HTTPStatusError for bad responses (4xx or 5xx)
+            try:
+                response_stream.raise_for_status()  # Raise HTTPStatusError for bad responses (4xx or 5xx)
+            except httpx.HTTPStatusError:
+                # Load the error body for the handler below, then free the connection
+                await response_stream.aread()
+                await response_stream.aclose()
+                raise
             return response_stream
         else:
-            response = await client.request(method, url, json=data, headers=headers)
+            response = await client.request(method, url, **request_kwargs)
             response.raise_for_status()
             return response.json()
 
@@ -99,110 +132,184 @@ async def _forward_request_to_litellm(
         )
 
 
+# Embeddings return quickly; don't hold a pooled connection for the full LLM timeout
+EMBEDDING_TIMEOUT = 60.0
+
+
+async def _send_embedding_batch(key: BatchKey, texts: list[str]) -> dict[str, Any]:
+    model, api_key, user = key
+    payload: dict[str, Any] = {"model": model, "input": texts}
+    if user is not None:
+        payload["user"] = user
+    return await _forward_request_to_litellm(
+        get_llm_client(),
+        "POST",
+        "/embeddings",
+        data=payload,
+        headers=_get_litellm_headers(api_key),
+        stream=False,
+        timeout=EMBEDDING_TIMEOUT,
+    )
+
+
+_embedding_batcher: EmbeddingBatcher | None = None
+
+
+def get_embedding_batcher() -> EmbeddingBatcher:
+    """Return the process-wide embeddings batcher (and its vector cache)."""
+    global _embedding_batcher
+    if _embedding_batcher is None:
+        _embedding_batcher = EmbeddingBatcher(
+            _send_embedding_batch,
+            EmbeddingCache(settings.EMBEDDING_CACHE_MAX_ENTRIES),
+            window_seconds=settings.EMBEDDING_BATCH_WINDOW_MS / 1000,
+            max_inputs=settings.EMBEDDING_BATCH_MAX_INPUTS,
+        )
+    return _embedding_batcher
+
+
+def _scheduler_tenant(request_data: CompletionRequest, request: Request) -> str:
+    """
+    Whom a completion is scheduled for: its API key, else the client address.
+
+    ``user`` is chosen by the caller, so it only narrows the tenant under an
+    API key; without one, a fresh ``user`` per request would escape the caps.
+    """
+    if request_data.api_key:
+        digest = hashlib.sha256(request_data.api_key.encode()).hexdigest()
+        tenant = f"key:{digest[:16]}"
+        if request_data.user:
+            tenant += f":user:{request_data.user}"
+        return tenant
+    return f"ip:{request.client.host if request.client else 'unknown'}"
+
+
+async def _relay_stream(
+    response_stream: httpx.Response,
+    ticket: Ticket,
+    cache_key: str | None,
+) -> AsyncGenerator[str, None]:
+    """Pass an upstream SSE stream through, then free its slot and cache it."""
+    recorder = StreamRecorder() if cache_key is not None else None
+    try:
+        async for chunk in response_stream.aiter_bytes():
+            if chunk:
+                # LiteLLM's /chat/completions with stream=True sends valid
+                # SSE ("data: {...}\n\n"), so chunks are passed through.
+                text = chunk.decode()
+                if recorder is not None:
+                    recorder.feed(text)
+                yield text
+    finally:
+        # Hand the connection back to the shared pool
+        await response_stream.aclose()
+        ticket.release()
+
+    recorded = recorder.response() if recorder is not None else None
+    if cache_key is not None and recorded is not None:
+        await get_llm_cache().set(cache_key, recorded)
+
+
+async def _queued_stream(
+    ticket: Ticket,
+    open_stream: Callable[[], Awaitable[httpx.Response]],
+    cache_key: str | None,
+) -> AsyncGenerator[str, None]:
+    """Report the queue position until a slot is free, then relay the stream."""
+    try:
+        async for position in ticket.positions():
+            yield sse_queue_event(position)
+        response_stream = await open_stream()
+    except HTTPException as e:
+        ticket.release()
+        yield sse_error_event(e.status_code, str(e.detail))
+        return
+    except TimeoutError as e:
+        yield sse_error_event(503, str(e))
+        return
+    except BaseException:
+        ticket.release()
+        raise
+
+    async for text in _relay_stream(response_stream, ticket, cache_key):
+        yield text
+
+
 @router.post(
     "/completions", response_model=None
 )  # response_model is tricky for streaming
 async def create_completion(
+    request: Request,
     request_data: CompletionRequest = Body(...),
 ):
-    """Handles creation of completions based on request data."""
-    async with httpx.AsyncClient(timeout=300.0) as client:  # Increased timeout for LLMs
-        litellm_endpoint = (
-            "/v1/chat/completions"  # Common LiteLLM endpoint for chat models
-        )
+    """Handles creation of completions based on request data.
 
-        payload = request_data.model_dump(exclude_none=True)
+    Calls go through the fair scheduler (see app/utils/llm_scheduler.py);
+    queued streaming requests receive their queue position as SSE comments.
+    """
+    client = get_llm_client()
+    litellm_endpoint = "/v1/chat/completions"  # Common LiteLLM endpoint for chat models
 
-        headers = _get_litellm_headers(request_data.api_key)
+    payload = request_data.model_dump(exclude_none=True, exclude={"cache"})
 
-        if request_data.stream:
-            response_stream = None  # Initialize to ensure it's defined in finally
-            try:
-                response_stream = await _forward_request_to_litellm(
-                    client,
-                    "POST",
-                    litellm_endpoint,
-                    data=payload,
-                    headers=headers,
-                    stream=True,
-                )
+    headers = _get_litellm_headers(request_data.api_key)
 
-                async def stream_event_generator() -> AsyncGenerator[str, None]:
-                    """Generates decoded chunks from a response stream."""
-                    async for chunk in response_stream.aiter_bytes():
-                        if chunk:
-                            # LiteLLM streaming chunks are typically SSE formatted like:
-                            # "data: {...}\n\n"
-                            # Or sometimes just the JSON data for each chunk.
-                            # We will assume LiteLLM sends data that needs to be wrapped in "data: ...\n\n"
-                            # if it's not already in that format.
-                            # For maximum compatibility, we'll decode and re-encode if necessary.
-                            # However, LiteLLM's /chat/completions with stream=True usually sends valid SSE.
-                            # So, we can often pass it through.
-                            # Let's yield the chunk as is, assuming LiteLLM provides valid SSE chunks.
-                            # If LiteLLM sends raw JSON objects per line, they must be formatted.
-                            # The provided code had `yield chunk.decode()` which is correct if LiteLLM sends SSE.
-                            # If LiteLLM sends line-delimited JSON:
-                            #   lines = chunk.decode().strip().splitlines()
-                            #   for line in lines:
-                            #       if line.startswith("data:"): # Already SSE
-                            #            yield f"{line}\n\n"
-                            #       else: # Assume it's a JSON object
-                            #           try:
-                            #               json.loads(line) # Validate it's JSON
-                            #               yield f"data: {line}\n\n"
-                            #           except json.JSONDecodeError:
-                            #               # Not JSON, maybe some other control message or malformed
-                            #               # For simplicity, we pass it through; robust handling might differ
-                            #               yield f"{line}\n\n"
-                            # else: # Pass through as is
-                            yield chunk.decode()
-
-                # Using StreamingResponse for SSE handling as sse_starlette is not available
+    cache = get_llm_cache()
+    cache_key = (
+        build_cache_key(payload) if should_cache(payload, request_data.cache) else None
+    )
+    if cache_key is not None:
+        cached = await cache.get(cache_key)
+        if cached is not None:
+            if request_data.stream:
                 return StreamingResponse(
-                    stream_event_generator(), media_type="text/event-stream"
+                    iter_sse_replay(cached), media_type="text/event-stream"
                 )
-            except HTTPException as e:
-                raise e  # Re-raise if already an HTTPException
-            except Exception as e:
-                # Ensure the stream is closed on unexpected errors
-                if response_stream is not None:
-                    await response_stream.aclose()
-                raise HTTPException(
-                    status_code=500, detail=f"Streaming error: {str(e)}"
-                )
-            finally:
-                # Ensure the stream is closed if it was opened
-                if (
-                    response_stream is not None
-                    and hasattr(response_stream, "aclose")
-                    and not response_stream.is_closed
-                ):
-                    await response_stream.aclose()
-        else:
-            response_json = await _forward_request_to_litellm(
-                client,
-                "POST",
-                litellm_endpoint,
-                data=payload,
-                headers=headers,
-                stream=False,
-            )
-            return CompletionResponse(**response_json)
+            return CompletionResponse(**cached)
 
+    # Reject what cannot fit the model's context window without a round trip
+    try:
+        check_context_budget(
+            request_data.model, payload["messages"], request_data.max_tokens
+        )
+    except ContextBudgetError as e:
+        raise HTTPException(status_code=400, detail=str(e))
 
-@router.post("/embeddings", response_model=EmbeddingResponse)
-async def create_embedding(
-    request_data: EmbeddingRequest = Body(...),
-):
-    """Handles the creation of embeddings by forwarding a request to LiteLLM."""
-    async with httpx.AsyncClient(
-        timeout=60.0
-    ) as client:  # Standard timeout for embeddings
-        litellm_endpoint = "/embeddings"  # Common LiteLLM endpoint
-        payload = request_data.model_dump(exclude_none=True)
-        headers = _get_litellm_headers(request_data.api_key)
+    try:
+        ticket = get_llm_scheduler().submit(_scheduler_tenant(request_data, request))
+    except QueueFullError as e:
+        raise HTTPException(status_code=429, detail=str(e))
+
+    if request_data.stream:
+        open_stream = partial(
+            _forward_request_to_litellm,
+            client,
+            "POST",
+            litellm_endpoint,
+            data=payload,
+            headers=headers,
+            stream=True,
+        )
+        if not ticket.granted:
+            # Upstream errors can only be reported inside the stream from here on
+            return StreamingResponse(
+                _queued_stream(ticket, open_stream, cache_key),
+                media_type="text/event-stream",
+            )
+        try:
+            response_stream = await open_stream()
+        except BaseException:
+            ticket.release()
+            raise
 
+        # Using StreamingResponse for SSE handling as sse_starlette is not available
+        return StreamingResponse(
+            _relay_stream(response_stream, ticket, cache_key),
+            media_type="text/event-stream",
+        )
+
+    try:
+        await ticket.wait()
         response_json = await _forward_request_to_litellm(
             client,
             "POST",
@@ -211,7 +318,47 @@ async def create_embedding(
             headers=headers,
             stream=False,
         )
-        return EmbeddingResponse(**response_json)
+    except TimeoutError as e:
+        raise HTTPException(status_code=503, detail=str(e))
+    finally:
+        ticket.release()
+    completion = CompletionResponse(**response_json)
+    if cache_key is not None:
+        await cache.set(cache_key, response_json)
+    return completion
+
+
+@router.post("/embeddings", response_model=EmbeddingResponse)
+async def create_embedding(
+    request_data: EmbeddingRequest = Body(...),
+):
+    """Handles the creation of embeddings by forwarding a request to LiteLLM.
+
+    Concurrent requests for the same model are merged into one upstream call,
+    and texts that were embedded before are served from the vector cache.
+    """
+    texts = (
+        [request_data.input]
+        if isinstance(request_data.input, str)
+        else request_data.input
+    )
+    result = await get_embedding_batcher().embed(
+        request_data.model,
+        texts,
+        api_key=request_data.api_key,
+        user=request_data.user,
+    )
+    return EmbeddingResponse(
+        object="list",
+        data=[
+            EmbeddingData(object="embedding", embedding=embedding, index=i)
+            for i, embedding in enumerate(result.embeddings)
+        ],
+        model=request_data.model,
+        usage=EmbeddingUsage(
+            prompt_tokens=result.prompt_tokens, total_tokens=result.prompt_tokens
+        ),
+    )
 
 
 async def event_generator(
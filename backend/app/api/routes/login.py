@@ -5,11 +5,14 @@ import jwt
 from fastapi import APIRouter, Depends, HTTPException
 from fastapi.responses import HTMLResponse
 from fastapi.security import OAuth2PasswordRequestForm
+from starlette.concurrency import run_in_threadpool
 
 from app import crud
 from app.api.deps import CurrentUser, SessionDep, TokenDep, get_current_active_superuser
 from app.core import security
+from app.core.auth_cache import get_revocation_cache
 from app.core.config import settings
+from app.core.password_hasher import get_password_hasher
 from app.core.security import get_password_hash
 from app.models import Message, NewPassword, Token, UserPublic
 from app.utils import (
@@ -23,23 +26,38 @@ router = APIRouter(tags=["login"])
 
 
 @router.post("/login/access-token")
-def login_access_token(
+async def login_access_token(
     session: SessionDep, form_data: Annotated[OAuth2PasswordRequestForm, Depends()]
 ) -> Token:
     """
     OAuth2 compatible token login, get an access token for future requests
     """
-    user = crud.authenticate(
-        session=session, email=form_data.username, password=form_data.password
+    user = await run_in_threadpool(
+        crud.get_user_by_email, session=session, email=form_data.username
     )
-    if not user:
+    valid, new_hash = False, None
+    if user and user.hashed_password:
+        # bcrypt runs on the password hasher's own threads
+        valid, new_hash = await get_password_hasher().verify_and_update(
+            form_data.password, user.hashed_password
+        )
+    if not user or not valid:
         raise HTTPException(status_code=400, detail="Incorrect email or password")
     elif not user.is_active:
         raise HTTPException(status_code=400, detail="Inactive user")
+    user_id = user.id  # the commit below expires the user
+    if new_hash:
+        # Hashed with other cost parameters: upgrade it now that we know the password
+        await run_in_threadpool(
+            crud.update_password_hash,
+            session=session,
+            user=user,
+            hashed_password=new_hash,
+        )
     access_token_expires = timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES)
     return Token(
         access_token=security.create_access_token(
-            user.id, expires_delta=access_token_expires
+            user_id, expires_delta=access_token_expires
         )
     )
 
@@ -80,9 +98,9 @@ def logout(current_user: CurrentUser, token: TokenDep, session: SessionDep) -> M
         crud.add_token_to_blacklist(
             session=session, token=token, user_id=current_user.id, expires_at=expires_at
         )
-
-        # Optionally, clean up expired tokens from the blacklist
-        crud.clean_expired_tokens(session=session)
+        # Reject the token in this process right away; others pick it up on
+        # their next blacklist sync
+        get_revocation_cache().revoke(token, expires_at)
 
         return Message(message="Successfully logged out")
     except Exception as e:
@@ -3,8 +3,9 @@ from datetime import datetime
 from typing import Any
 from uuid import UUID
 
-from fastapi import APIRouter, Depends, HTTPException, Query, status
-from sqlalchemy import desc
+from fastapi import APIRouter, Depends, HTTPException, Query, Response, status
+from sqlalchemy import desc, false
+from sqlalchemy.orm import selectinload
 from sqlmodel import Session, func, or_, select
 
 from app.api.deps import get_current_user, get_db
@@ -20,6 +21,12 @@ from app.models.prompt import (
     TagCreate,
     TagUpdate,
 )
+from app.models.text_search import (
+    prefix_search_query,
+    search_vector,
+    split_terms,
+    substring_match,
+)
 
 # 避免导入User类以避免循环导入
 # from app.models import User
@@ -219,39 +226,47 @@ def read_prompts(
     *,
     db: Session = Depends(get_db),
     _current_user: Any = Depends(get_current_user),
-    skip: int = 0,
-    limit: int = 100,
+    response: Response,
+    skip: int = Query(0, ge=0),
+    limit: int = Query(100, ge=1, le=200),
     tag_ids: list[UUID] | None = Query(None),
     search: str | None = None,
     sort: str | None = None,
     order: str = "desc",
+    include_total: bool = Query(
+        False, description="Return the total number of matches in X-Total-Count."
+    ),
 ) -> list[Prompt]:
     """Read and return a list of prompts based on specified filters and sorting.
 
     The function constructs a query to retrieve prompts from the database, applying
     optional filters for tag IDs, search terms, and sorting by creation or update
-    time. It also handles pagination through skip and limit parameters. Tags are
-    manually loaded for each prompt after querying.
+    time. Pagination is done in SQL with skip and limit, and the tags of the page
+    are loaded in one batch, so the cost does not grow with the catalogue size.
 
     Args:
         db (Session): Database session.
         _current_user (Any): Current user information (dependency).
+        response (Response): Response whose headers receive the total count.
         skip (int?): Number of records to skip. Defaults to 0.
-        limit (int?): Maximum number of records to return. Defaults to 100.
+        limit (int?): Maximum number of records to return. Defaults to 100, at most 200.
         tag_ids (list[UUID] | None?): List of UUIDs for tags to filter prompts by.
-        search (str | None?): Search term to filter prompts by name, description, or content.
-        sort (str | None?): Field to sort the results by ('created_at' or 'updated_at'). Defaults to None.
+        search (str | None?): Words to search for in name, description, or content;
+            each word matches as a prefix, words in CJK scripts as substrings.
+        sort (str | None?): Field to sort the results by ('created_at' or 'updated_at').
+            Defaults to None: by relevance when searching, else by update time.
         order (str?): Order of sorting ('asc' or 'desc'). Defaults to "desc".
+        include_total (bool?): Count all matches into X-Total-Count. Defaults to False.
 
     Returns:
-        list[Prompt]: List of prompts matching the filters and sorted as specified.
+        list[Prompt]: Prompts matching the filters, with their tags loaded.
 
     Raises:
         HTTPException: If an error occurs during database query execution.
     """
     try:
-        # 构建基础查询
-        query = select(Prompt)
+        # 构建过滤条件
+        conditions = []
 
         # 如果有标签过滤
         if tag_ids:
@@ -263,22 +278,40 @@ def read_prompts(
                 .group_by(PromptTagLink.prompt_id)  # type: ignore
                 .having(func.count(PromptTagLink.tag_id) >= tag_count)  # type: ignore
             )
-            query = query.where(Prompt.id.in_(tag_subquery))  # type: ignore
+            conditions.append(Prompt.id.in_(tag_subquery))  # type: ignore
 
-        # 搜索过滤
+        # 搜索过滤: prefix match of every word on the indexed search_vector;
+        # 中文等 CJK 词无法分词, 按子串匹配 (trigram indexes)
+        search_query = None
         if search:
-            query = query.where(
-                or_(
-                    Prompt.name.contains(search),  # type: ignore
-                    Prompt.content.contains(search),  # type: ignore
-                    # 可以添加更多搜索字段
-                    Prompt.description.contains(search)  # type: ignore
-                    if hasattr(Prompt, "description")
-                    else False,
+            required, excluded, other = split_terms(search)
+            search_query = prefix_search_query(other)
+            for term in required:
+                conditions.append(
+                    or_(
+                        substring_match(Prompt.name, term),
+                        substring_match(Prompt.description, term),
+                        substring_match(Prompt.content, term),
+                    )
                 )
-            )
+            for term in excluded:
+                conditions.append(
+                    ~or_(
+                        substring_match(Prompt.name, term),
+                        substring_match(func.coalesce(Prompt.description, ""), term),
+                        substring_match(Prompt.content, term),
+                    )
+                )
+            if search_query is not None:
+                conditions.append(search_vector(Prompt).op("@@")(search_query))
+            elif not required and not excluded:
+                conditions.append(false())  # no words to match
 
-        # 排序
+        query = select(Prompt)
+        for condition in conditions:
+            query = query.where(condition)
+
+        # 排序; id breaks ties so pages do not overlap or skip rows
         if sort == "created_at":
             query = query.order_by(  # type: ignore
                 desc(Prompt.created_at) if order == "desc" else Prompt.created_at  # type: ignore
@@ -287,17 +320,30 @@ def read_prompts(
             query = query.order_by(  # type: ignore
                 desc(Prompt.updated_at) if order == "desc" else Prompt.updated_at  # type: ignore
             )
+        elif search_query is not None:
+            # 搜索时默认按相关度排序
+            query = query.order_by(
+                desc(func.ts_rank(search_vector(Prompt), search_query))
+            )
         else:
             # 默认按更新时间倒序
             query = query.order_by(desc(Prompt.updated_at))  # type: ignore
-
-        # 执行查询
-        prompts = db.exec(query).all()
-        # 手动加载标签
-        for prompt in prompts:
-            db.refresh(prompt, ["tags"])
-        # 在 Python 中进行分页
-        return list(prompts[skip : skip + limit])
+        query = query.order_by(Prompt.id)  # type: ignore
+
+        # 在数据库中分页, 并用一次查询加载整页的标签
+        prompts = db.exec(
+            query.options(selectinload(Prompt.tags))  # type: ignore
+            .offset(skip)
+            .limit(limit)
+        ).all()
+
+        if include_total:
+            count_query = select(func.count()).select_from(Prompt)
+            for condition in conditions:
+                count_query = count_query.where(condition)
+            response.headers["X-Total-Count"] = str(db.exec(count_query).one())
+
+        return list(prompts)
     except Exception as e:
         logger.error(f"Error reading prompts: {e}")
         raise HTTPException(status_code=500, detail=str(e))
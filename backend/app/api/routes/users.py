@@ -3,6 +3,7 @@ from typing import Any
 
 from fastapi import APIRouter, Depends, HTTPException
 from sqlmodel import col, delete, func, select
+from starlette.concurrency import run_in_threadpool
 
 from app import crud
 from app.api.deps import (
@@ -11,7 +12,8 @@ from app.api.deps import (
     get_current_active_superuser,
 )
 from app.core.config import settings
-from app.core.security import decrypt_password, get_password_hash, verify_password
+from app.core.password_hasher import get_password_hasher
+from app.core.security import decrypt_password
 from app.models import (
     Item,
     Message,
@@ -98,7 +100,7 @@ def update_user_me(
 
 
 @router.patch("/me/password", response_model=Message)
-def update_password_me(
+async def update_password_me(
     *, session: SessionDep, body: UpdatePassword, current_user: CurrentUser
 ) -> Any:
     """
@@ -107,8 +109,12 @@ def update_password_me(
     if not current_user.hashed_password:
         raise HTTPException(status_code=400, detail="User has no password set")
 
+    # bcrypt runs on the password hasher's own threads
+    hasher = get_password_hasher()
     decrypted_current_password = decrypt_password(body.current_password)
-    if not verify_password(decrypted_current_password, current_user.hashed_password):
+    if not await hasher.verify(
+        decrypted_current_password, current_user.hashed_password
+    ):
         raise HTTPException(status_code=400, detail="Incorrect password")
 
     decrypted_new_password = decrypt_password(body.new_password)
@@ -116,10 +122,13 @@ def update_password_me(
         raise HTTPException(
             status_code=400, detail="New password cannot be the same as the current one"
         )
-    hashed_password = get_password_hash(decrypted_new_password)
-    current_user.hashed_password = hashed_password
-    session.add(current_user)
-    session.commit()
+    hashed_password = await hasher.hash(decrypted_new_password)
+    await run_in_threadpool(
+        crud.update_password_hash,
+        session=session,
+        user=current_user,
+        hashed_password=hashed_password,
+    )
     return Message(message="Password updated successfully")
 
 
@@ -1,7 +1,10 @@
+from typing import Any
+
 from fastapi import APIRouter, Depends
 from pydantic.networks import EmailStr
 
 from app.api.deps import get_current_active_superuser
+from app.core.password_hasher import get_password_hasher
 from app.models import Message
 from app.utils import generate_test_email, send_email
 
@@ -29,3 +32,14 @@ def test_email(email_to: EmailStr) -> Message:
 @router.get("/health-check/")
 async def health_check() -> bool:
     return True
+
+
+@router.get(
+    "/password-hasher-stats/",
+    dependencies=[Depends(get_current_active_superuser)],
+)
+def password_hasher_stats() -> dict[str, Any]:
+    """
+    Queue depth and timings of the password hashing threads of this process.
+    """
+    return get_password_hasher().stats()
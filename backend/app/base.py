@@ -91,9 +91,10 @@ class UsersPublic(SQLModel):
 # Token Blacklist model for storing invalidated tokens
 class TokenBlacklist(SQLModel, table=True):
     id: uuid.UUID = Field(default_factory=uuid.uuid4, primary_key=True)
-    token: str = Field(index=True)
+    # SHA-256 hex digest of the token (see security.token_digest)
+    token_hash: str = Field(max_length=64, index=True)
     user_id: uuid.UUID = Field(index=True)
-    expires_at: datetime
+    expires_at: datetime = Field(index=True)
     created_at: datetime = Field(default_factory=datetime.utcnow)
 
 
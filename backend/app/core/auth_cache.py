@@ -0,0 +1,169 @@
+"""
+In-process caches that keep ``get_current_user`` off the database.
+
+Every authenticated request used to run two queries: a lookup of the token in
+``TokenBlacklist`` and ``session.get(User, ...)``. Both are now answered from
+memory on the hot path:
+
+* ``RevocationCache`` mirrors the unexpired blacklist as the set of token
+  digests stored in ``TokenBlacklist.token_hash``. It is loaded once, then
+  refreshed incrementally (entries created since the last sync) at most
+  every ``TOKEN_REVOCATION_REFRESH_SECONDS``. ``/logout`` adds the token directly,
+  so it is rejected by this process at once and by other API processes
+  after their next refresh.
+* ``UserCache`` keeps the column values of recently seen users for
+  ``AUTH_USER_CACHE_TTL_SECONDS`` and attaches them to the request's session
+  with ``merge(load=False)``, which emits no SQL; endpoints can still modify
+  and commit the user as before. Updates and deletes of a User flushed by this
+  process drop its entry; changes made by other processes show up once the
+  entry expires.
+"""
+
+import logging
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime, timedelta, timezone
+from typing import Any
+
+from sqlalchemy import event
+from sqlalchemy.orm import make_transient_to_detached
+from sqlmodel import Session
+
+from app import crud
+from app.core.config import settings
+from app.core.security import token_digest
+from app.models import User
+
+logger = logging.getLogger(__name__)
+
+# Blacklist rows are stamped by each API process's clock; re-read a margin
+# before the last sync so clock skew and late commits are not missed
+SYNC_OVERLAP = timedelta(seconds=60)
+
+
+def _epoch(value: datetime) -> float:
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return value.timestamp()
+
+
+class RevocationCache:
+    """The unexpired token blacklist, mirrored in memory."""
+
+    def __init__(self, refresh_interval: float) -> None:
+        self.refresh_interval = refresh_interval
+        self._revoked: dict[str, float] = {}  # digest -> expiry (epoch seconds)
+        self._synced_through: datetime | None = None
+        self._next_refresh = 0.0
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._revoked)
+
+    def revoke(self, token: str, expires_at: datetime) -> None:
+        """Record a revocation made by this process (e.g. ``/logout``)."""
+        self._revoked[token_digest(token)] = _epoch(expires_at)
+
+    def is_revoked(self, session: Session, token: str) -> bool:
+        if time.monotonic() >= self._next_refresh:
+            self.refresh(session)
+        expiry = self._revoked.get(token_digest(token))
+        return expiry is not None and expiry > time.time()
+
+    def refresh(self, session: Session) -> None:
+        """Fetch the blacklist entries added since the last sync."""
+        with self._lock:
+            if time.monotonic() < self._next_refresh:
+                return  # another thread refreshed while we waited
+            since = (
+                self._synced_through - SYNC_OVERLAP
+                if self._synced_through is not None
+                else None
+            )
+            rows = crud.get_blacklisted_tokens_since(session=session, since=since)
+            for token_hash, expires_at, created_at in rows:
+                self._revoked[token_hash] = _epoch(expires_at)
+                if self._synced_through is None or created_at > self._synced_through:
+                    self._synced_through = created_at
+            if self._synced_through is None:
+                self._synced_through = datetime.utcnow()
+
+            now = time.time()
+            for digest in [d for d, expiry in self._revoked.items() if expiry <= now]:
+                del self._revoked[digest]
+            self._next_refresh = time.monotonic() + self.refresh_interval
+
+
+class UserCache:
+    """Short-lived copies of User rows, keyed by user id."""
+
+    def __init__(self, ttl: float, max_entries: int) -> None:
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._entries: OrderedDict[str, tuple[float, dict[str, Any]]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, session: Session, user_id: str) -> User | None:
+        """The cached user attached to ``session``, or None on a miss."""
+        with self._lock:
+            entry = self._entries.get(user_id)
+            if entry is None:
+                return None
+            if entry[0] <= time.monotonic():
+                del self._entries[user_id]
+                return None
+            self._entries.move_to_end(user_id)
+            values = entry[1]
+
+        user = User(**values)
+        make_transient_to_detached(user)
+        return session.merge(user, load=False)
+
+    def put(self, user: User) -> None:
+        if self.ttl <= 0 or self.max_entries <= 0 or not isinstance(user, User):
+            return
+        values = {
+            column.key: getattr(user, column.key)
+            for column in User.__table__.columns  # type: ignore[attr-defined]
+        }
+        with self._lock:
+            self._entries[str(user.id)] = (time.monotonic() + self.ttl, values)
+            self._entries.move_to_end(str(user.id))
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, user_id: Any) -> None:
+        with self._lock:
+            self._entries.pop(str(user_id), None)
+
+
+_revocation_cache: RevocationCache | None = None
+_user_cache: UserCache | None = None
+
+
+def get_revocation_cache() -> RevocationCache:
+    """Return the process-wide revocation cache."""
+    global _revocation_cache
+    if _revocation_cache is None:
+        _revocation_cache = RevocationCache(
+            refresh_interval=settings.TOKEN_REVOCATION_REFRESH_SECONDS
+        )
+    return _revocation_cache
+
+
+def get_user_cache() -> UserCache:
+    """Return the process-wide user cache."""
+    global _user_cache
+    if _user_cache is None:
+        _user_cache = UserCache(
+            ttl=settings.AUTH_USER_CACHE_TTL_SECONDS,
+            max_entries=settings.AUTH_USER_CACHE_MAX_ENTRIES,
+        )
+    return _user_cache
+
+
+@event.listens_for(User, "after_update")
+@event.listens_for(User, "after_delete")
+def _invalidate_user(_mapper: Any, _connection: Any, target: User) -> None:
+    get_user_cache().invalidate(target.id)
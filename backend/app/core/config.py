@@ -47,6 +47,20 @@ class Settings(BaseSettings):
     SECRET_KEY: str = secrets.token_urlsafe(32)
     # 60 minutes * 24 hours * 8 days = 8 days
     ACCESS_TOKEN_EXPIRE_MINUTES: int = 60 * 24 * 8
+    # In-memory auth caches (see app/core/auth_cache.py): how often the token
+    # blacklist is re-synced, i.e. how long a logout in another API process
+    # takes to apply here, and how long user rows are reused between requests
+    TOKEN_REVOCATION_REFRESH_SECONDS: float = 5.0
+    AUTH_USER_CACHE_TTL_SECONDS: float = 30.0
+    AUTH_USER_CACHE_MAX_ENTRIES: int = 10_000
+    # Expired blacklist entries are deleted by the worker (app/worker.py) this often
+    TOKEN_BLACKLIST_PURGE_INTERVAL_SECONDS: float = 60 * 60
+    # Password hashing (see app/core/password_hasher.py): bcrypt cost factor
+    # (older hashes are upgraded at login), threads dedicated to bcrypt and
+    # calls allowed to wait for them before logins are refused with a 503
+    PASSWORD_BCRYPT_ROUNDS: int = 12
+    PASSWORD_HASH_WORKERS: int = 4
+    PASSWORD_HASH_MAX_QUEUED: int = 64
     FRONTEND_HOST: str = "http://localhost:5173"
     ENVIRONMENT: Literal["local", "staging", "production"] = "local"
 
@@ -264,6 +278,10 @@ class Settings(BaseSettings):
     FIRST_SUPERUSER_PASSWORD: str = "telepace"
     FIRST_SUPERUSER_ID: str | None = None  # 可选的管理员用户ID，如果不设置则自动生成
 
+    # Wrap /api JSON responses in the ApiResponse envelope
+    # (see app/api/middlewares/response.py). Clients currently read bare payloads.
+    API_RESPONSE_ENVELOPE_ENABLED: bool = False
+
     # PostHog Configuration
     POSTHOG_API_KEY: str | None = None
     POSTHOG_HOST: str = "https://app.posthog.com"
@@ -303,6 +321,111 @@ class Settings(BaseSettings):
     # Jina AI Configuration
     JINA_API_KEY: str | None = None
 
+    # Outbound HTTP client pool for content fetching (see app/utils/http_client.py)
+    HTTP_MAX_CONNECTIONS: int = 100
+    HTTP_MAX_KEEPALIVE_CONNECTIONS: int = 20
+    HTTP_KEEPALIVE_EXPIRY: float = 30.0  # seconds an idle connection is kept
+    HTTP_MAX_CONNECTIONS_PER_HOST: int = 8
+
+    # Shared client for the LiteLLM proxy (see app/utils/llm_client.py)
+    LLM_HTTP_MAX_CONNECTIONS: int = 200
+    LLM_HTTP_MAX_KEEPALIVE_CONNECTIONS: int = 50
+    LLM_HTTP_KEEPALIVE_EXPIRY: float = 60.0  # seconds an idle connection is kept
+    LLM_HTTP_CONNECT_TIMEOUT: float = 10.0
+    LLM_HTTP_TIMEOUT: float = 300.0  # read/write/pool timeout; completions are slow
+    # Exact-match completion cache (see app/utils/llm_cache.py)
+    LLM_CACHE_ENABLED: bool = True
+    LLM_CACHE_MAX_ENTRIES: int = 1024
+    LLM_CACHE_TTL_SECONDS: int = 60 * 60 * 24
+    # Optional on-disk tier shared by the processes of one host
+    LLM_CACHE_DIR: str | None = None
+    # Identical concurrent /content/{id}/analyze calls share one upstream stream
+    LLM_STREAM_COALESCING_ENABLED: bool = True
+    # Fair scheduling of /llm/completions and analyze calls (see
+    # app/utils/llm_scheduler.py); the limits apply per API process
+    LLM_MAX_CONCURRENT_REQUESTS: int = 32
+    LLM_MAX_CONCURRENT_REQUESTS_PER_USER: int = 4
+    LLM_MAX_QUEUED_REQUESTS_PER_USER: int = 16
+    LLM_QUEUE_TIMEOUT_SECONDS: float = 60.0
+    # Context budgeting (see app/utils/token_budget.py): tiktoken encoding used
+    # to count tokens, context windows by LiteLLM model name, the window
+    # assumed for unlisted models (unset = not checked) and tokens kept free.
+    # tiktoken downloads the encoding on first use; offline hosts need it in
+    # TIKTOKEN_CACHE_DIR beforehand (the backend image bakes it in), or token
+    # counts fall back to an estimate
+    LLM_TOKENIZER_ENCODING: str = "cl100k_base"
+    LLM_CONTEXT_WINDOWS: dict[str, int] = {
+        "deepseek-v3-ensemble": 65536,
+        "or-llama-3-1-8b-instruct": 131072,
+        "or-llama-3-3-70b-instruct": 131072,
+        "or-mistral-7b-instruct": 32768,
+        "or-qwen-2-5-7b-instruct": 32768,
+        "github-llama-3-2-11b-vision": 8192,
+        "volcengine-doubao-pro-32k": 32768,
+    }
+    LLM_DEFAULT_CONTEXT_WINDOW: int | None = None
+    LLM_CONTEXT_SAFETY_MARGIN: int = 256
+    # Hedged, latency-aware routing of analyze streams (see app/utils/llm_router.py):
+    # LiteLLM model groups tried after the analysis model, the TTFT quantile after
+    # which a duplicate is sent to another model, the delay used until a model
+    # has samples, and how long a failed model is skipped. Names the proxy does
+    # not serve are logged at startup
+    ANALYSIS_FALLBACK_MODELS: list[str] = [
+        "or-llama-3-3-70b-instruct",
+        "deepseek-v3-ensemble",
+    ]
+    LLM_HEDGE_ENABLED: bool = True
+    LLM_HEDGE_QUANTILE: float = 0.9
+    LLM_HEDGE_DELAY_MS: float = 2000.0
+    LLM_HEDGE_MIN_DELAY_MS: float = 250.0
+    LLM_MODEL_COOLDOWN_SECONDS: float = 30.0
+    # /llm/embeddings micro-batching and vector cache (see app/utils/embedding_batcher.py)
+    EMBEDDING_BATCH_WINDOW_MS: float = 10.0
+    EMBEDDING_BATCH_MAX_INPUTS: int = 256
+    # float32 vectors: ~6 KB each at 1536 dimensions, so ~60 MB when full
+    EMBEDDING_CACHE_MAX_ENTRIES: int = 10_000
+    # Map-reduce analysis of long content (see app/utils/chunk_analysis.py)
+    ANALYSIS_MAP_REDUCE_MIN_CHARS: int = 24_000  # "auto" mode threshold
+    ANALYSIS_MAP_GROUP_CHARS: int = 12_000  # text sent per map call
+    ANALYSIS_MAP_CONCURRENCY: int = 4
+    ANALYSIS_MAP_MAX_TOKENS: int = 600  # notes per part
+
+    # Content processing worker configuration (see app/worker.py)
+    PROCESSING_WORKER_CONCURRENCY: int = 4
+    PROCESSING_WORKER_POLL_INTERVAL: float = 2.0  # seconds between empty polls
+    # Running jobs renew their lease this often; in-progress jobs without a
+    # heartbeat for PROCESSING_JOB_STALE_SECONDS are considered abandoned
+    PROCESSING_JOB_HEARTBEAT_SECONDS: float = 30.0
+    PROCESSING_JOB_STALE_SECONDS: int = 60 * 5
+    # Reuse processed output of items with the same canonical URL / raw content hash
+    CONTENT_DEDUP_ENABLED: bool = True
+    # URL matches are only reused if fetched within this many seconds; older
+    # pages are fetched again (content hash matches never expire)
+    CONTENT_DEDUP_MAX_AGE: int = 60 * 60 * 24 * 7
+    # Content chunks are flushed to the database in batches of this many rows
+    CONTENT_CHUNK_BATCH_SIZE: int = 500
+    # LiteLLM model used to embed chunks after processing (unset = no embeddings)
+    CHUNK_EMBEDDING_MODEL: str | None = None
+    # Per-user memory-mapped vector indexes (see app/utils/vector_index.py);
+    # must be shared by the API and worker processes
+    VECTOR_INDEX_DIR: str = "data/vector-index"
+    # LiteLLM model that precomputes item and chunk summaries in a low-priority
+    # worker job after processing (unset = no summaries)
+    CONTENT_SUMMARY_MODEL: str | None = None
+    # Chunks shorter than this are used as-is instead of being summarised
+    CONTENT_SUMMARY_MIN_CHUNK_CHARS: int = 800
+    # Chunk summaries requested in parallel per summarizer job
+    CONTENT_SUMMARY_CONCURRENCY: int = 2
+    # Worker threads that may run summarizer jobs at once; the others stay
+    # free for processing jobs
+    CONTENT_SUMMARY_WORKER_SLOTS: int = 1
+
+    # MarkItDown process pool (see app/utils/markitdown_pool.py)
+    MARKITDOWN_POOL_ENABLED: bool = False
+    MARKITDOWN_POOL_SIZE: int = Field(default_factory=lambda: os.cpu_count() or 2)
+    MARKITDOWN_TASK_TIMEOUT: float = 300.0  # seconds per conversion
+    MARKITDOWN_WORKER_MEMORY_MB: int | None = 2048  # address-space cap per worker
+
     @property
     def google_oauth_redirect_uri(self) -> str:
         """Generate Google OAuth redirect URI pointing to backend API."""
@@ -0,0 +1,142 @@
+"""
+Password hashing off the request threadpool.
+
+bcrypt is deliberately slow (~250 ms per call at the default cost). Run
+inside sync endpoints, a burst of logins holds every thread of the
+threadpool that all sync endpoints and dependencies share, and unrelated
+requests queue behind them. ``PasswordHasher`` runs hashing on its own
+``PASSWORD_HASH_WORKERS`` threads instead and is awaited from async endpoints:
+
+* at most ``PASSWORD_HASH_MAX_QUEUED`` calls wait for a hashing thread;
+  beyond that ``PasswordHasherBusyError`` (503) sheds load instead of letting
+  the queue, and the response time of every login, grow without bound;
+* ``verify_and_update`` also returns a new hash when the stored one was made
+  with other cost parameters (``PASSWORD_BCRYPT_ROUNDS``) or a deprecated
+  scheme, so hashes are upgraded transparently at the next login;
+* ``stats()`` reports the queue depth, throughput and mean wait and run times.
+"""
+
+import asyncio
+import threading
+import time
+from collections.abc import Callable
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, TypeVar
+
+from fastapi import status
+
+from app.core.config import settings
+from app.core.security import pwd_context
+from app.utils.error import AppError
+
+T = TypeVar("T")
+
+
+class PasswordHasherBusyError(AppError):
+    """Too many password hashing calls are already waiting."""
+
+    status_code = status.HTTP_503_SERVICE_UNAVAILABLE
+    error_code = "PASSWORD_HASHER_BUSY"
+    message = "Too many sign-in attempts in progress, please retry shortly"
+
+
+class PasswordHasher:
+    """A bounded executor for bcrypt calls, with an async API."""
+
+    def __init__(self, max_workers: int, max_queued: int) -> None:
+        self.max_workers = max(1, max_workers)
+        self.max_queued = max(0, max_queued)
+        self._executor = ThreadPoolExecutor(
+            max_workers=self.max_workers, thread_name_prefix="password-hash"
+        )
+        self._lock = threading.Lock()
+        self._pending = 0  # submitted and not finished
+        self._active = 0
+        self._completed = 0
+        self._rejected = 0
+        self._wait_seconds = 0.0
+        self._run_seconds = 0.0
+
+    async def _run(self, fn: Callable[..., T], *args: Any) -> T:
+        with self._lock:
+            if self._pending >= self.max_workers + self.max_queued:
+                self._rejected += 1
+                raise PasswordHasherBusyError()
+            self._pending += 1
+        submitted = time.perf_counter()
+
+        def call() -> T:
+            started = time.perf_counter()
+            with self._lock:
+                self._active += 1
+                self._wait_seconds += started - submitted
+            try:
+                return fn(*args)
+            finally:
+                with self._lock:
+                    self._active -= 1
+                    self._completed += 1
+                    self._run_seconds += time.perf_counter() - started
+
+        def finished(_future: Future) -> None:
+            # Also runs if the call was cancelled before it started
+            with self._lock:
+                self._pending -= 1
+
+        future = self._executor.submit(call)
+        future.add_done_callback(finished)
+        return await asyncio.wrap_future(future)
+
+    async def hash(self, password: str) -> str:
+        return str(await self._run(pwd_context.hash, password))
+
+    async def verify(self, password: str, hashed_password: str) -> bool:
+        return bool(await self._run(pwd_context.verify, password, hashed_password))
+
+    async def verify_and_update(
+        self, password: str, hashed_password: str
+    ) -> tuple[bool, str | None]:
+        """
+        Check a password against its stored hash.
+
+        Returns ``(valid, new_hash)``; ``new_hash`` is set when the password is
+        valid but the hash should be replaced (changed cost parameters).
+        """
+        valid, new_hash = await self._run(
+            pwd_context.verify_and_update, password, hashed_password
+        )
+        return bool(valid), new_hash
+
+    def stats(self) -> dict[str, Any]:
+        with self._lock:
+            completed = self._completed
+            return {
+                "workers": self.max_workers,
+                "max_queued": self.max_queued,
+                "active": self._active,
+                "queued": self._pending - self._active,
+                "completed": completed,
+                "rejected": self._rejected,
+                "mean_wait_ms": (
+                    round(self._wait_seconds / completed * 1000, 1)
+                    if completed
+                    else 0.0
+                ),
+                "mean_run_ms": (
+                    round(self._run_seconds / completed * 1000, 1) if completed else 0.0
+                ),
+            }
+
+
+_hasher: PasswordHasher | None = None
+
+
+def get_password_hasher() -> PasswordHasher:
+    """Return the process-wide password hasher."""
+    global _hasher
+    if _hasher is None:
+        _hasher = PasswordHasher(
+            max_workers=settings.PASSWORD_HASH_WORKERS,
+            max_queued=settings.PASSWORD_HASH_MAX_QUEUED,
+        )
+    return _hasher
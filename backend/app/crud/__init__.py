@@ -9,10 +9,11 @@ from collections.abc import Sequence
 from datetime import datetime
 from typing import Any, Protocol, TypeVar
 
+from sqlalchemy import delete as sa_delete
 from sqlalchemy.exc import IntegrityError
 from sqlmodel import Session, select
 
-from app.core.security import get_password_hash, verify_password
+from app.core.security import get_password_hash, token_digest, verify_password
 from app.models import Item, TokenBlacklist, User
 
 # Import from crud_image.py
@@ -226,6 +227,14 @@ def update_user(
     return db_user
 
 
+def update_password_hash(*, session: Session, user: Any, hashed_password: str) -> Any:
+    """Store a new password hash (computed by the caller) for a user."""
+    user.hashed_password = hashed_password
+    session.add(user)
+    session.commit()
+    return user
+
+
 def create_item(*, session: Session, item_in: Any, owner_id: uuid.UUID) -> Any:
     """创建项目"""
     # 动态导入Item
@@ -272,11 +281,10 @@ def create_token_blacklist(
     # 动态导入TokenBlacklist
 
     token_blacklist = TokenBlacklist(
-        token=token,
+        token_hash=token_digest(token),
         user_id=user_id,
         expires_at=expires_at,
         created_at=datetime.utcnow(),
-        blacklisted_at=datetime.utcnow(),
     )
     session.add(token_blacklist)
     session.commit()
@@ -288,7 +296,9 @@ def check_token_in_blacklist(session: Session, token: str) -> bool:
     """检查令牌是否在黑名单中"""
     # 动态导入TokenBlacklist
 
-    statement = select(TokenBlacklist).where(TokenBlacklist.token == token)
+    statement = select(TokenBlacklist).where(
+        TokenBlacklist.token_hash == token_digest(token)
+    )
     results = session.exec(statement)
     return results.first() is not None
 
@@ -298,14 +308,15 @@ def add_token_to_blacklist(
 ) -> Any:
     """
     Add a token to the blacklist.
+
+    Only the token's digest is stored.
     """
     # 动态导入TokenBlacklist
 
     token_blacklist = TokenBlacklist(
-        token=token,
+        token_hash=token_digest(token),
         user_id=user_id,
         expires_at=expires_at,
-        blacklisted_at=datetime.utcnow(),
     )
     session.add(token_blacklist)
     session.commit()
@@ -317,11 +328,30 @@ def is_token_blacklisted(*, session: Session, token: str) -> bool:
     # 动态导入TokenBlacklist
     """Check if a token is in the blacklist."""
 
-    statement = select(TokenBlacklist).where(TokenBlacklist.token == token)
+    statement = select(TokenBlacklist).where(
+        TokenBlacklist.token_hash == token_digest(token)
+    )
     blacklisted = session.exec(statement).first()
     return blacklisted is not None
 
 
+def get_blacklisted_tokens_since(
+    *, session: Session, since: datetime | None = None
+) -> list[tuple[str, datetime, datetime]]:
+    """
+    Unexpired blacklist entries added at or after ``since`` (all if None).
+
+    Returns ``(token_hash, expires_at, created_at)`` tuples; used to keep the
+    in-memory revocation cache in sync.
+    """
+    statement = select(
+        TokenBlacklist.token_hash, TokenBlacklist.expires_at, TokenBlacklist.created_at
+    ).where(TokenBlacklist.expires_at > datetime.utcnow())
+    if since is not None:
+        statement = statement.where(TokenBlacklist.created_at >= since)
+    return [tuple(row) for row in session.exec(statement).all()]
+
+
 def clean_expired_tokens(*, session: Session) -> int:
     # 动态导入TokenBlacklist
     """Remove expired tokens from the blacklist and return the count of removed
@@ -329,13 +359,12 @@ def clean_expired_tokens(*, session: Session) -> int:
 
     now = datetime.utcnow()
     try:
-        statement = select(TokenBlacklist).where(TokenBlacklist.expires_at < now)
-        expired_tokens = session.exec(statement).all()
-        count = len(expired_tokens)
-        for token in expired_tokens:
-            session.delete(token)
+        # One set-based DELETE over the expires_at index
+        result = session.exec(
+            sa_delete(TokenBlacklist).where(TokenBlacklist.expires_at < now)
+        )
         session.commit()
-        return count
+        return result.rowcount
     except Exception as e:
         session.rollback()
         raise e
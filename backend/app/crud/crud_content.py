@@ -1,21 +1,50 @@
+import base64
+import html
+import json
 import re  # For Markdown image processing
 import secrets  # For generating unique tokens
 import uuid
 from collections.abc import Sequence
+from datetime import datetime, timedelta
 from typing import (
     Any,  # For optional fields
 )
 
-from sqlalchemy import func  # For count
+from sqlalchemy import (  # For count
+    DateTime,
+    Uuid,
+    case,
+    func,
+    insert,
+    literal,
+    or_,
+    tuple_,
+    update,
+)
 from sqlalchemy.ext.asyncio import AsyncSession  # Changed from sqlmodel.Session
 from sqlalchemy.future import select  # For async select
+from sqlalchemy.orm import aliased
 from sqlmodel import Session  # Add this for sync operations and specific select
 from sqlmodel import select as sqlmodel_select
 
 from app.core import security  # For password hashing
 from app.core.storage import StorageInterface
 from app.crud import crud_image  # crud_image module itself
-from app.models.content import ContentAsset, ContentChunk, ContentItem, ContentShare
+from app.models.content import (
+    ContentAsset,
+    ContentChunk,
+    ContentChunkEmbedding,
+    ContentItem,
+    ContentShare,
+    ProcessingJob,
+)
+from app.models.text_search import (
+    TEXT_SEARCH_CONFIG,
+    search_vector,
+    split_terms,
+    substring_match,
+    web_search_query,
+)
 
 # Schema imports - assuming these exist
 from app.schemas.content import ContentItemCreate, ContentItemUpdate, ContentShareCreate
@@ -137,16 +166,62 @@ def get_content_item_sync(session: Session, id: uuid.UUID) -> ContentItem | None
 
 
 def get_content_items_sync(
-    session: Session, skip: int = 0, limit: int = 100, user_id: uuid.UUID | None = None
+    session: Session,
+    skip: int = 0,
+    limit: int = 100,
+    user_id: uuid.UUID | None = None,
+    cursor: str | None = None,
 ) -> Sequence[ContentItem]:
+    """
+    List content items, newest first.
+
+    Pass the ``cursor`` of the last item of the previous page (see
+    ``encode_content_item_cursor``) to seek directly to the next page using the
+    ``(user_id, created_at, id)`` index; ``skip`` is ignored in that case.
+    Raises ValueError for a malformed cursor.
+    """
     statement = sqlmodel_select(ContentItem)
     if user_id:
         statement = statement.where(ContentItem.user_id == user_id)
-    statement = statement.offset(skip).limit(limit)
+    if cursor:
+        created_at, item_id = decode_content_item_cursor(cursor)
+        statement = statement.where(
+            tuple_(ContentItem.created_at, ContentItem.id) < (created_at, item_id)
+        )
+    else:
+        statement = statement.offset(skip)
+    statement = statement.order_by(
+        ContentItem.created_at.desc(),  # type: ignore[attr-defined]
+        ContentItem.id.desc(),  # type: ignore[attr-defined]
+    ).limit(limit)
     result = session.exec(statement)
     return result.all()
 
 
+def count_content_items(session: Session, user_id: uuid.UUID | None = None) -> int:
+    statement = sqlmodel_select(func.count()).select_from(ContentItem)
+    if user_id:
+        statement = statement.where(ContentItem.user_id == user_id)
+    return int(session.exec(statement).one() or 0)
+
+
+def encode_content_item_cursor(item: ContentItem) -> str:
+    """Opaque keyset cursor pointing just after ``item`` in list order."""
+    raw = f"{item.created_at.isoformat()}|{item.id}"
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_content_item_cursor(cursor: str) -> tuple[datetime, uuid.UUID]:
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        created_at, item_id = (
+            base64.urlsafe_b64decode(padded.encode()).decode().split("|", 1)
+        )
+        return datetime.fromisoformat(created_at), uuid.UUID(item_id)
+    except (ValueError, UnicodeDecodeError) as e:
+        raise ValueError(f"Invalid cursor: {cursor}") from e
+
+
 def create_content_item_sync(
     session: Session,
     *,
@@ -297,84 +372,767 @@ def delete_content_asset(session: Session, id: uuid.UUID) -> ContentAsset | None
     return None
 
 
+# Processing queue (ProcessingJob rows double as a durable work queue)
+
+PIPELINE_JOB_NAME = "processing_pipeline"
+# Precomputes summaries after processing; only claimed when no pipeline job waits
+SUMMARY_JOB_NAME = "summarizer"
+
+
+def enqueue_processing_job(
+    session: Session,
+    content_item_id: uuid.UUID,
+    processor_name: str = PIPELINE_JOB_NAME,
+) -> ProcessingJob:
+    """
+    Queue a content item for processing by the worker (see app/worker.py).
+
+    If the item already has a pending or in-progress job of the same kind,
+    that job is returned instead of queueing a duplicate.
+    """
+    existing = session.exec(
+        sqlmodel_select(ProcessingJob).where(
+            ProcessingJob.content_item_id == content_item_id,
+            ProcessingJob.processor_name == processor_name,
+            ProcessingJob.status.in_(["pending", "in_progress"]),  # type: ignore[attr-defined]
+        )
+    ).first()
+    if existing:
+        return existing
+
+    job = ProcessingJob(
+        content_item_id=content_item_id,
+        processor_name=processor_name,
+        status="pending",
+    )
+    session.add(job)
+    session.commit()
+    session.refresh(job)
+    return job
+
+
+def claim_next_processing_job(
+    session: Session,
+    stale_after: timedelta | None = None,
+    job_names: Sequence[str] = (PIPELINE_JOB_NAME,),
+) -> ProcessingJob | None:
+    """
+    Atomically claim the next queued job of one of ``job_names``.
+
+    ``job_names`` is in priority order: a job of a later kind is only claimed
+    when none of an earlier kind is waiting; within a kind the oldest job wins.
+    Uses ``SELECT ... FOR UPDATE SKIP LOCKED`` so any number of workers can poll
+    the same table without handing out a job twice. In-progress jobs whose last
+    heartbeat (or ``started_at``) is older than ``stale_after`` are treated as
+    abandoned (the worker that owned them died) and become claimable again.
+    """
+    claimable = ProcessingJob.status == "pending"
+    if stale_after is not None:
+        # Running jobs are kept alive by renew_processing_job_lease
+        last_seen = func.coalesce(ProcessingJob.heartbeat_at, ProcessingJob.started_at)
+        claimable = or_(
+            claimable,
+            (ProcessingJob.status == "in_progress")
+            & (last_seen < datetime.utcnow() - stale_after),
+        )
+
+    statement = (
+        sqlmodel_select(ProcessingJob)
+        .where(
+            ProcessingJob.processor_name.in_(job_names),  # type: ignore[attr-defined]
+            claimable,
+        )
+        .order_by(
+            case(
+                {name: priority for priority, name in enumerate(job_names)},
+                value=ProcessingJob.processor_name,
+            ),
+            ProcessingJob.created_at,  # type: ignore[arg-type]
+        )
+        .limit(1)
+        .with_for_update(skip_locked=True)
+    )
+    job = session.exec(statement).first()
+    if not job:
+        # Release the (empty) transaction so the connection goes back idle
+        session.rollback()
+        return None
+
+    job.status = "in_progress"
+    job.started_at = job.heartbeat_at = datetime.utcnow()
+    job.completed_at = None
+    job.error_message = None
+    session.add(job)
+    session.commit()
+    session.refresh(job)
+    return job
+
+
+def renew_processing_job_lease(
+    session: Session, job_id: uuid.UUID, started_at: datetime | None
+) -> bool:
+    """
+    Record that the worker running a job is still alive.
+
+    ``started_at`` identifies the claim: returns False, without touching the
+    row, when the job has since been claimed again by another worker.
+    """
+    result = session.exec(
+        update(ProcessingJob)
+        .where(
+            ProcessingJob.id == job_id,
+            ProcessingJob.started_at == started_at,
+        )
+        .values(heartbeat_at=datetime.utcnow())
+    )
+    session.commit()
+    return result.rowcount == 1
+
+
+# Content deduplication (keys are assigned by DeduplicationStep)
+
+REUSABLE_ASSET_TYPES = ("processed_text", "metadata_json")
+
+
+def find_processed_duplicate(
+    session: Session,
+    content_item: ContentItem,
+    url_max_age: timedelta | None = None,
+) -> ContentItem | None:
+    """
+    Find a completed item whose canonical URL or raw content hash matches.
+
+    Only items that still have a processed markdown asset are returned, so the
+    caller can reuse it as-is. Pages behind a URL change over time, so a URL
+    match also needs that markdown to have been fetched within ``url_max_age``;
+    a raw content hash identifies the bytes themselves and never expires.
+    """
+    is_markdown = (ContentAsset.content_item_id == ContentItem.id) & (
+        ContentAsset.type == "processed_text"
+    )
+    keys = []
+    if content_item.canonical_url:
+        url_match = ContentItem.canonical_url == content_item.canonical_url
+        if url_max_age is not None:
+            fetched_recently = (
+                sqlmodel_select(ContentAsset.id)
+                .where(
+                    is_markdown,
+                    ContentAsset.created_at >= datetime.utcnow() - url_max_age,
+                )
+                .exists()
+            )
+            url_match = url_match & fetched_recently
+        keys.append(url_match)
+    if content_item.content_hash:
+        keys.append(ContentItem.content_hash == content_item.content_hash)
+    if not keys:
+        return None
+
+    has_markdown = sqlmodel_select(ContentAsset.id).where(is_markdown).exists()
+    statement = (
+        sqlmodel_select(ContentItem)
+        .where(
+            or_(*keys),
+            ContentItem.id != content_item.id,
+            ContentItem.type == content_item.type,
+            ContentItem.processing_status == "completed",
+            has_markdown,
+        )
+        .order_by(ContentItem.updated_at.desc())  # type: ignore[attr-defined]
+        .limit(1)
+    )
+    return session.exec(statement).first()
+
+
+def copy_processed_content(
+    session: Session, *, source: ContentItem, target: ContentItem
+) -> list[str]:
+    """
+    Give ``target`` the processed output of ``source`` without reprocessing.
+
+    Markdown and metadata assets are shared by reference (new ContentAsset rows
+    pointing at the same storage keys, keeping the original ``created_at`` so
+    the age of the fetched content is not reset). Chunks are copied inside the database
+    with a single INSERT ... SELECT and the source's chunk aggregates are
+    carried over. Nothing is committed here.
+
+    Returns the storage paths of the reused assets.
+    """
+    source_assets = session.exec(
+        sqlmodel_select(ContentAsset).where(
+            ContentAsset.content_item_id == source.id,
+            ContentAsset.type.in_(REUSABLE_ASSET_TYPES),  # type: ignore[attr-defined]
+        )
+    ).all()
+
+    paths = []
+    for asset in source_assets:
+        meta = asset.meta_info
+        if isinstance(meta, str):
+            meta = json.loads(meta)
+        meta = dict(meta or {})
+        meta["deduplicated_from"] = str(source.id)
+
+        session.add(
+            ContentAsset(
+                content_item_id=target.id,
+                type=asset.type,
+                file_path=asset.file_path,
+                s3_bucket=asset.s3_bucket,
+                s3_key=asset.s3_key,
+                mime_type=asset.mime_type,
+                size_bytes=asset.size_bytes,
+                meta_info=json.dumps(meta),
+                created_at=asset.created_at,
+            )
+        )
+        if asset.file_path:
+            paths.append(asset.file_path)
+
+    now = datetime.utcnow()
+    chunk_rows = sqlmodel_select(
+        func.gen_random_uuid(),
+        literal(target.id, type_=Uuid()),
+        ContentChunk.chunk_index,
+        ContentChunk.chunk_content,
+        ContentChunk.chunk_type,
+        ContentChunk.word_count,
+        ContentChunk.char_count,
+        ContentChunk.token_count,
+        ContentChunk.summary,
+        ContentChunk.meta_info,
+        literal(now, type_=DateTime()),
+    ).where(ContentChunk.content_item_id == source.id)
+    session.exec(
+        insert(ContentChunk).from_select(  # type: ignore[arg-type]
+            [
+                "id",
+                "content_item_id",
+                "chunk_index",
+                "chunk_content",
+                "chunk_type",
+                "word_count",
+                "char_count",
+                "token_count",
+                "summary",
+                "meta_info",
+                "created_at",
+            ],
+            chunk_rows,
+        )
+    )
+
+    # Carry the embeddings over to the new chunk ids, matched on chunk_index
+    source_chunk = aliased(ContentChunk)
+    target_chunk = aliased(ContentChunk)
+    embedding_rows = (
+        sqlmodel_select(
+            target_chunk.id,
+            literal(target.id, type_=Uuid()),
+            ContentChunkEmbedding.model,
+            ContentChunkEmbedding.dimensions,
+            ContentChunkEmbedding.vector,
+            literal(now, type_=DateTime()),
+        )
+        .join(source_chunk, source_chunk.id == ContentChunkEmbedding.chunk_id)
+        .join(
+            target_chunk,
+            (target_chunk.content_item_id == target.id)
+            & (target_chunk.chunk_index == source_chunk.chunk_index),
+        )
+        .where(ContentChunkEmbedding.content_item_id == source.id)
+    )
+    session.exec(
+        insert(ContentChunkEmbedding).from_select(  # type: ignore[arg-type]
+            [
+                "chunk_id",
+                "content_item_id",
+                "model",
+                "dimensions",
+                "vector",
+                "created_at",
+            ],
+            embedding_rows,
+        )
+    )
+
+    target.chunk_count = source.chunk_count
+    target.chunk_word_count = source.chunk_word_count
+    target.chunk_char_count = source.chunk_char_count
+    target.chunk_token_count = source.chunk_token_count
+    target.content_text = source.content_text
+    if not target.summary:
+        target.summary = source.summary
+    if not target.title:
+        target.title = source.title
+    session.add(target)
+    return paths
+
+
+# Bulk ContentChunk persistence
+
+CONTENT_CHUNK_COLUMNS = (
+    "id",
+    "content_item_id",
+    "chunk_index",
+    "chunk_content",
+    "chunk_type",
+    "word_count",
+    "char_count",
+    "meta_info",
+    "created_at",
+    "token_count",
+)
+
+
+def bulk_create_content_chunks(session: Session, chunks: Sequence[ContentChunk]) -> int:
+    """
+    Insert content chunks without per-object ORM bookkeeping.
+
+    On PostgreSQL with psycopg 3 the rows are streamed with ``COPY ... FROM
+    STDIN``; on other backends they go out as a multi-row INSERT. The rows are
+    written on the session's connection, inside its transaction, and are not
+    added to the session. Nothing is committed here.
+
+    Returns the number of rows written.
+    """
+    if not chunks:
+        return 0
+
+    connection = session.connection()
+    if (
+        connection.dialect.name == "postgresql"
+        and connection.dialect.driver == "psycopg"
+    ):
+        _copy_content_chunks(connection, chunks)
+    else:
+        rows = [
+            {column: getattr(chunk, column) for column in CONTENT_CHUNK_COLUMNS}
+            for chunk in chunks
+        ]
+        connection.execute(insert(ContentChunk.__table__), rows)  # type: ignore[attr-defined]
+    return len(chunks)
+
+
+def _copy_content_chunks(connection: Any, chunks: Sequence[ContentChunk]) -> None:
+    """Write chunks with COPY through the underlying psycopg connection."""
+    statement = (
+        f"COPY {ContentChunk.__tablename__} "
+        f"({', '.join(CONTENT_CHUNK_COLUMNS)}) FROM STDIN"
+    )
+    driver_connection = connection.connection.driver_connection
+    with driver_connection.cursor() as cursor, cursor.copy(statement) as copy:
+        for chunk in chunks:
+            meta_info = chunk.meta_info
+            if meta_info is not None and not isinstance(meta_info, str):
+                meta_info = json.dumps(meta_info)
+            copy.write_row(
+                (
+                    chunk.id,
+                    chunk.content_item_id,
+                    chunk.chunk_index,
+                    chunk.chunk_content,
+                    chunk.chunk_type,
+                    chunk.word_count,
+                    chunk.char_count,
+                    meta_info,
+                    chunk.created_at,
+                    chunk.token_count,
+                )
+            )
+
+
+def set_content_chunk_stats(
+    session: Session,
+    content_item_id: uuid.UUID,
+    *,
+    chunk_count: int,
+    word_count: int,
+    char_count: int,
+    token_count: int,
+) -> None:
+    """
+    Store the chunk aggregates of a content item with a single UPDATE.
+
+    Writers accumulate the totals while inserting chunks, so readers get them
+    from the item row without aggregating ContentChunk. Nothing is committed
+    here.
+    """
+    session.exec(
+        update(ContentItem)
+        .where(ContentItem.id == content_item_id)
+        .values(
+            chunk_count=chunk_count,
+            chunk_word_count=word_count,
+            chunk_char_count=char_count,
+            chunk_token_count=token_count,
+        )
+    )
+
+
+def set_chunk_token_counts(
+    session: Session,
+    content_item_id: uuid.UUID,
+    token_counts: dict[uuid.UUID, int],
+    *,
+    total: int,
+) -> None:
+    """
+    Store token counts of chunks written before they were counted.
+
+    The chunk rows are updated with one executemany UPDATE by primary key and
+    ``total`` becomes the item's ``chunk_token_count``. Nothing is committed
+    here.
+    """
+    if token_counts:
+        session.execute(
+            update(ContentChunk),
+            [
+                {"id": chunk_id, "token_count": token_count}
+                for chunk_id, token_count in token_counts.items()
+            ],
+        )
+    session.exec(
+        update(ContentItem)
+        .where(ContentItem.id == content_item_id)
+        .values(chunk_token_count=total)
+    )
+
+
+# Chunk embeddings (written by ChunkEmbeddingStep)
+
+
+def get_chunks_without_embedding(
+    session: Session, content_item_id: uuid.UUID, model: str
+) -> list[tuple[uuid.UUID, str]]:
+    """Return ``(chunk_id, chunk_content)`` of chunks not yet embedded with ``model``."""
+    embedded = (
+        sqlmodel_select(ContentChunkEmbedding.chunk_id)
+        .where(
+            ContentChunkEmbedding.chunk_id == ContentChunk.id,
+            ContentChunkEmbedding.model == model,
+        )
+        .exists()
+    )
+    statement = (
+        sqlmodel_select(ContentChunk.id, ContentChunk.chunk_content)
+        .where(ContentChunk.content_item_id == content_item_id, ~embedded)
+        .order_by(ContentChunk.chunk_index)  # type: ignore[arg-type]
+    )
+    return [(row[0], row[1]) for row in session.exec(statement).all()]
+
+
+def create_chunk_embeddings(
+    session: Session, embeddings: Sequence[ContentChunkEmbedding]
+) -> int:
+    """Insert chunk embeddings with one multi-row INSERT. Nothing is committed here."""
+    if not embeddings:
+        return 0
+    rows = [
+        {
+            "chunk_id": embedding.chunk_id,
+            "content_item_id": embedding.content_item_id,
+            "model": embedding.model,
+            "dimensions": embedding.dimensions,
+            "vector": embedding.vector,
+            "created_at": embedding.created_at,
+        }
+        for embedding in embeddings
+    ]
+    session.connection().execute(insert(ContentChunkEmbedding.__table__), rows)  # type: ignore[attr-defined]
+    return len(rows)
+
+
+def get_chunk_embeddings(
+    session: Session,
+    model: str,
+    *,
+    content_item_id: uuid.UUID | None = None,
+    user_id: uuid.UUID | None = None,
+) -> list[tuple[uuid.UUID, bytes]]:
+    """
+    Return ``(chunk_id, vector)`` pairs for one item or for a user's whole library.
+
+    Only embeddings made with ``model`` are returned.
+    """
+    statement = sqlmodel_select(
+        ContentChunkEmbedding.chunk_id, ContentChunkEmbedding.vector
+    ).where(ContentChunkEmbedding.model == model)
+    if content_item_id is not None:
+        statement = statement.where(
+            ContentChunkEmbedding.content_item_id == content_item_id
+        )
+    if user_id is not None:
+        statement = statement.join(
+            ContentItem, ContentItem.id == ContentChunkEmbedding.content_item_id
+        ).where(ContentItem.user_id == user_id)
+    return [(row[0], row[1]) for row in session.exec(statement).all()]
+
+
+def get_user_chunks_by_ids(
+    session: Session, user_id: uuid.UUID, chunk_ids: Sequence[uuid.UUID]
+) -> dict[uuid.UUID, tuple[ContentChunk, ContentItem]]:
+    """
+    Load chunks (and their items) by id, keeping only those the user owns.
+
+    Chunks of deleted items are left out, so stale vector index entries are
+    filtered here.
+    """
+    if not chunk_ids:
+        return {}
+    statement = (
+        sqlmodel_select(ContentChunk, ContentItem)
+        .join(ContentItem, ContentItem.id == ContentChunk.content_item_id)
+        .where(
+            ContentChunk.id.in_(chunk_ids),  # type: ignore[attr-defined]
+            ContentItem.user_id == user_id,
+        )
+    )
+    return {chunk.id: (chunk, item) for chunk, item in session.exec(statement).all()}
+
+
+# Keyword search over chunks (see app/models/text_search.py)
+
+# ts_headline marks matches with these control characters; the rest of the
+# snippet is HTML-escaped and the marks become <mark> tags
+_HIGHLIGHT_START = "\x02"
+_HIGHLIGHT_STOP = "\x03"
+SNIPPET_OPTIONS = (
+    f"StartSel={_HIGHLIGHT_START}, StopSel={_HIGHLIGHT_STOP}, "
+    'MaxWords=35, MinWords=15, MaxFragments=2, FragmentDelimiter=" … "'
+)
+# Characters kept before the first match in snippets cut in Python
+SNIPPET_CONTEXT_CHARS = 40
+
+
+def _highlight_snippet(snippet: str) -> str:
+    return (
+        html.escape(snippet)
+        .replace(_HIGHLIGHT_START, "<mark>")
+        .replace(_HIGHLIGHT_STOP, "</mark>")
+    )
+
+
+def _substring_snippet(content: str, terms: Sequence[str]) -> str:
+    """An excerpt of ``content`` around the first of ``terms``, with all of them marked."""
+    pattern = re.compile(
+        "|".join(re.escape(term) for term in sorted(terms, key=len, reverse=True)),
+        re.IGNORECASE,
+    )
+    match = pattern.search(content)
+    start = max(0, match.start() - SNIPPET_CONTEXT_CHARS) if match else 0
+    end = min(len(content), start + 3 * SNIPPET_CONTEXT_CHARS)
+    excerpt = pattern.sub(
+        lambda m: f"{_HIGHLIGHT_START}{m.group(0)}{_HIGHLIGHT_STOP}",
+        content[start:end],
+    )
+    return ("… " if start else "") + excerpt + (" …" if end < len(content) else "")
+
+
+def search_content_chunks(
+    session: Session,
+    user_id: uuid.UUID,
+    text: str,
+    *,
+    skip: int = 0,
+    limit: int = 20,
+) -> list[dict[str, Any]]:
+    """
+    Full-text search over the user's chunks, best matches first.
+
+    ``text`` uses web search syntax (quoted phrases, ``or``, ``-word``). Matches
+    are found through the GIN index on ``contentchunk.search_vector`` and
+    ranked with ``ts_rank``; snippets are only built for the returned page,
+    as ``ts_headline`` re-parses the chunk text.
+
+    Terms in CJK scripts, which the text search parser cannot split into
+    words, must appear as substrings (found through the trigram index, or
+    excluded with ``-term``); such queries are ranked by ``word_similarity``
+    and their snippets are cut around the first matched term.
+    """
+    required, excluded, other = split_terms(text)
+    vector = search_vector(ContentChunk)
+    conditions = [ContentItem.user_id == user_id]
+    conditions += [
+        substring_match(ContentChunk.chunk_content, term) for term in required
+    ]
+    conditions += [
+        ~substring_match(ContentChunk.chunk_content, term) for term in excluded
+    ]
+    query = web_search_query(other) if re.search(r"\w", other) else None
+    if query is not None:
+        conditions.append(vector.op("@@")(query))
+    elif not required:
+        return []  # nothing to look for
+
+    if required:
+        rank = func.word_similarity(" ".join(required), ContentChunk.chunk_content)
+    else:
+        rank = func.ts_rank(vector, query)
+    rank = rank.label("rank")
+    page = (
+        sqlmodel_select(
+            ContentChunk.id,
+            ContentChunk.content_item_id,
+            ContentChunk.chunk_index,
+            ContentChunk.chunk_type,
+            ContentChunk.chunk_content,
+            ContentItem.title,
+            rank,
+        )
+        .join(ContentItem, ContentItem.id == ContentChunk.content_item_id)
+        .where(*conditions)
+        .order_by(rank.desc(), ContentChunk.id)
+        .offset(skip)
+        .limit(limit)
+        .subquery()
+    )
+    snippet = (
+        page.c.chunk_content
+        if required
+        else func.ts_headline(
+            TEXT_SEARCH_CONFIG, page.c.chunk_content, query, SNIPPET_OPTIONS
+        )
+    )
+    statement = sqlmodel_select(
+        page.c.id,
+        page.c.content_item_id,
+        page.c.chunk_index,
+        page.c.chunk_type,
+        page.c.title,
+        page.c.rank,
+        snippet,
+    ).order_by(page.c.rank.desc(), page.c.id)
+    return [
+        {
+            "chunk_id": str(row[0]),
+            "content_item_id": str(row[1]),
+            "content_title": row[4],
+            "chunk_index": row[2],
+            "chunk_type": row[3],
+            "snippet": _highlight_snippet(
+                _substring_snippet(row[6], required) if required else row[6]
+            ),
+            "rank": float(row[5]),
+        }
+        for row in session.exec(statement).all()
+    ]
+
+
+# Precomputed summaries (written by the summarizer job, see app/utils/content_summarizer.py)
+
+
+def get_chunks_for_summary(
+    session: Session, content_item_id: uuid.UUID
+) -> list[tuple[uuid.UUID, str, str | None]]:
+    """Return ``(chunk_id, chunk_content, summary)`` of an item's chunks in order."""
+    statement = (
+        sqlmodel_select(
+            ContentChunk.id, ContentChunk.chunk_content, ContentChunk.summary
+        )
+        .where(ContentChunk.content_item_id == content_item_id)
+        .order_by(ContentChunk.chunk_index)  # type: ignore[arg-type]
+    )
+    return [(row[0], row[1], row[2]) for row in session.exec(statement).all()]
+
+
+def set_content_summaries(
+    session: Session,
+    content_item_id: uuid.UUID,
+    *,
+    summary: str,
+    chunk_summaries: dict[uuid.UUID, str],
+) -> None:
+    """
+    Store an item's summary and its chunks' summaries.
+
+    The chunk rows are updated with one executemany UPDATE by primary key.
+    Nothing is committed here.
+    """
+    if chunk_summaries:
+        session.execute(
+            update(ContentChunk),
+            [
+                {"id": chunk_id, "summary": chunk_summary}
+                for chunk_id, chunk_summary in chunk_summaries.items()
+            ],
+        )
+    session.exec(
+        update(ContentItem)
+        .where(ContentItem.id == content_item_id)
+        .values(summary=summary)
+    )
+
+
 # ContentChunk functions are more complex and might require separate async conversion
 # For now, keeping them as synchronous, assuming they are called in a context
 # that can bridge sync/async if needed, or they are not directly affected by this change.
 
 
 def get_content_chunks(
-    session: Session, content_item_id: uuid.UUID, page: int = 1, size: int = 10
-) -> tuple[list[ContentChunk], int]:
-    """
-    Get content chunks with pagination, using correct SQLModel syntax.
+    session: Session,
+    content_item_id: uuid.UUID,
+    page: int = 1,
+    size: int = 10,
+    *,
+    after: int | None = None,
+    include_total: bool = True,
+) -> tuple[list[ContentChunk], int | None]:
     """
-    # Get total count first
-    total_count_statement = sqlmodel_select(func.count(ContentChunk.id)).where(
-        ContentChunk.content_item_id == content_item_id
-    )
-    total_count = session.exec(total_count_statement).one() or 0
+    Get a page of content chunks ordered by ``chunk_index``.
+
+    Pages are fetched with an index range seek on ``(content_item_id,
+    chunk_index)`` rather than OFFSET, so every page costs the same. Pass
+    ``after`` (the last ``chunk_index`` already seen) for cursor paging;
+    otherwise ``page`` is mapped onto the index range directly, since chunk
+    indexes are assigned densely from 0 by the chunker.
 
-    # Calculate offset for pagination
-    offset = (page - 1) * size
+    The total count is only queried when ``include_total`` is set; the second
+    element of the returned tuple is None otherwise.
+    """
+    first_index = after + 1 if after is not None else (page - 1) * size
 
-    # Get chunks with pagination using the same pattern as get_content_items_sync
     chunks_statement = (
         sqlmodel_select(ContentChunk)
-        .where(ContentChunk.content_item_id == content_item_id)
-        .order_by(ContentChunk.chunk_index)
-        .offset(offset)
+        .where(
+            ContentChunk.content_item_id == content_item_id,
+            ContentChunk.chunk_index >= first_index,
+        )
+        .order_by(ContentChunk.chunk_index)  # type: ignore[arg-type]
         .limit(size)
     )
-    chunks_result = session.exec(chunks_statement)
-    chunks = chunks_result.all()
+    chunks = session.exec(chunks_statement).all()
+
+    total_count = None
+    if include_total:
+        total_count_statement = sqlmodel_select(func.count(ContentChunk.id)).where(
+            ContentChunk.content_item_id == content_item_id
+        )
+        total_count = int(session.exec(total_count_statement).one() or 0)
 
-    return list(chunks), int(total_count)
+    return list(chunks), total_count
 
 
 # Get content chunks summary
-def get_content_chunks_summary(
-    session: Session, content_item_id: uuid.UUID
-) -> dict[str, Any]:
+def get_content_chunks_summary(content_item: ContentItem) -> dict[str, Any]:
     """
     Get a summary of content chunks for a content item, including total count and metadata.
 
+    The aggregates are kept on the item when its chunks are written (see
+    ``set_content_chunk_stats``), so no query is issued here.
+
     Args:
-        session: Database session
-        content_item_id: ID of the content item
+        content_item: The content item
 
     Returns:
         Dictionary with summary information
     """
-    # Get total count of chunks using SQLModel syntax
-    total_chunks = (
-        session.exec(
-            select(func.count(ContentChunk.id)).where(
-                ContentChunk.content_item_id == content_item_id
-            )
-        ).scalar()
-        or 0
-    )
-
-    # Calculate total word count and character count
-    word_count_result = session.exec(
-        select(func.sum(ContentChunk.word_count)).where(
-            ContentChunk.content_item_id == content_item_id
-        )
-    ).scalar()
-    total_word_count = word_count_result or 0
-
-    char_count_result = session.exec(
-        select(func.sum(ContentChunk.char_count)).where(
-            ContentChunk.content_item_id == content_item_id
-        )
-    ).scalar()
-    total_char_count = char_count_result or 0
-
     return {
-        "total_chunks": total_chunks,
-        "total_word_count": total_word_count,
-        "total_char_count": total_char_count,
-        "content_item_id": str(content_item_id),
+        "total_chunks": content_item.chunk_count,
+        "total_word_count": content_item.chunk_word_count,
+        "total_char_count": content_item.chunk_char_count,
+        "content_item_id": str(content_item.id),
     }
 
 
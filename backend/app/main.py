@@ -16,8 +16,11 @@ except ImportError:
     print("Warning: sentry_sdk not found, Sentry integration will be disabled")
     SENTRY_AVAILABLE = False
 
+import asyncio
 import logging
 import traceback
+from collections.abc import AsyncIterator
+from contextlib import asynccontextmanager
 
 from fastapi import FastAPI, Request
 from fastapi.exceptions import RequestValidationError
@@ -30,8 +33,11 @@ from starlette.middleware.sessions import SessionMiddleware
 from app.api.main import api_router
 from app.api.middlewares.posthog import PostHogMiddleware
 from app.api.middlewares.response import ApiResponseMiddleware
+from app.api.routes.content import ANALYSIS_MODEL
 from app.core.config import settings
 from app.utils.error import AppError, create_error_response
+from app.utils.llm_client import close_llm_client, get_llm_client
+from app.utils.llm_router import log_missing_models
 
 # 设置日志
 logging.basicConfig(level=logging.INFO)
@@ -54,10 +60,25 @@ if POSTHOG_AVAILABLE and settings.posthog_enabled:
     posthog.api_key = settings.POSTHOG_API_KEY
     posthog.host = settings.POSTHOG_HOST
 
+
+@asynccontextmanager
+async def lifespan(_app: FastAPI) -> AsyncIterator[None]:
+    # One pooled LiteLLM proxy client for the whole application
+    client = get_llm_client()
+    # Check the analysis models against the proxy without delaying startup
+    check = asyncio.create_task(
+        log_missing_models(client, [ANALYSIS_MODEL, *settings.ANALYSIS_FALLBACK_MODELS])
+    )
+    yield
+    check.cancel()
+    await close_llm_client()
+
+
 app = FastAPI(
     title=settings.PROJECT_NAME,
     openapi_url=f"{settings.API_V1_STR}/openapi.json",
     generate_unique_id_function=custom_generate_unique_id,
+    lifespan=lifespan,
 )
 
 # 添加 SessionMiddleware，secret_key 建议用 settings.SECRET_KEY
@@ -78,6 +99,8 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    # Keyset pagination metadata for GET /api/v1/content/
+    expose_headers=["X-Next-Cursor", "X-Total-Count"],
 )
 
 # Add PostHog middleware
@@ -85,7 +108,8 @@ if POSTHOG_AVAILABLE and settings.posthog_enabled:
     app.add_middleware(PostHogMiddleware)
 
 # 添加API响应格式中间件
-app.add_middleware(ApiResponseMiddleware)
+if settings.API_RESPONSE_ENVELOPE_ENABLED:
+    app.add_middleware(ApiResponseMiddleware)
 
 app.include_router(api_router, prefix=settings.API_V1_STR)
 
@@ -1,10 +1,16 @@
 import uuid
 from datetime import datetime
 
-from sqlalchemy import CheckConstraint
+from sqlalchemy import CheckConstraint, Index, LargeBinary
 from sqlalchemy.dialects.postgresql import JSONB
 from sqlmodel import JSON, Column, Field, Relationship, SQLModel
 
+from app.models.text_search import (
+    TEXT_SEARCH_CONFIG,
+    add_search_vector,
+    add_trigram_index,
+)
+
 
 class ContentItemBase(SQLModel):
     """Base model for content items, containing common fields."""
@@ -18,6 +24,9 @@ class ContentItemBase(SQLModel):
         index=True,
     )
     source_uri: str | None = Field(default=None, max_length=2048)
+    # Deduplication keys (see app/utils/content_dedup.py)
+    canonical_url: str | None = Field(default=None, max_length=2048, index=True)
+    content_hash: str | None = Field(default=None, max_length=64, index=True)
     title: str | None = Field(default=None, max_length=255)
     summary: str | None = Field(default=None)
     content_text: str | None = Field(default=None)
@@ -34,6 +43,12 @@ class ContentItemBase(SQLModel):
         index=True,
     )
     error_message: str | None = Field(default=None)
+    # Chunk aggregates, maintained when chunks are written
+    chunk_count: int = Field(default=0, sa_column_kwargs={"server_default": "0"})
+    chunk_word_count: int = Field(default=0, sa_column_kwargs={"server_default": "0"})
+    chunk_char_count: int = Field(default=0, sa_column_kwargs={"server_default": "0"})
+    # 0 with chunks present: written before token counting, filled on first use
+    chunk_token_count: int = Field(default=0, sa_column_kwargs={"server_default": "0"})
     created_at: datetime = Field(default_factory=datetime.utcnow, nullable=False)
     updated_at: datetime = Field(
         default_factory=datetime.utcnow,
@@ -45,6 +60,11 @@ class ContentItemBase(SQLModel):
 class ContentItem(ContentItemBase, table=True):
     """Represents a piece of content ingested into the system, linking to its assets and processing state."""
 
+    # Keyset pagination of a user's library, newest first
+    __table_args__ = (
+        Index("ix_contentitem_user_created_id", "user_id", "created_at", "id"),
+    )
+
     id: uuid.UUID = Field(default_factory=uuid.uuid4, primary_key=True, index=True)
 
     assets: list["ContentAsset"] = Relationship(
@@ -141,6 +161,8 @@ class ProcessingJobBase(SQLModel):
     result: str | None = Field(default=None, sa_column=Column(JSON))
     error_message: str | None = Field(default=None)
     started_at: datetime | None = Field(default=None)
+    # Renewed by the worker while the job runs (see app/worker.py)
+    heartbeat_at: datetime | None = Field(default=None)
     completed_at: datetime | None = Field(default=None)
     created_at: datetime = Field(default_factory=datetime.utcnow, nullable=False)
     updated_at: datetime = Field(
@@ -216,6 +238,8 @@ class ContentChunkBase(SQLModel):
     )
     word_count: int = Field(default=0)  # Number of words in this chunk
     char_count: int = Field(default=0)  # Number of characters in this chunk
+    token_count: int | None = Field(default=None)  # See app/utils/token_budget.py
+    summary: str | None = Field(default=None)  # Filled in by the summarizer job
     meta_info: str | None = Field(
         default=None, sa_column=Column(JSON)
     )  # Additional metadata
@@ -225,6 +249,11 @@ class ContentChunkBase(SQLModel):
 class ContentChunk(ContentChunkBase, table=True):
     """Represents a segment of content for efficient loading and rendering."""
 
+    # Range scans of an item's chunks in reading order
+    __table_args__ = (
+        Index("ix_contentchunk_item_chunk_index", "content_item_id", "chunk_index"),
+    )
+
     id: uuid.UUID = Field(default_factory=uuid.uuid4, primary_key=True, index=True)
 
     content_item: ContentItem | None = Relationship(
@@ -235,6 +264,28 @@ class ContentChunk(ContentChunkBase, table=True):
     )
 
 
+# Keyword search over chunks (see /content/search); CJK terms use the trigram index
+add_search_vector(
+    ContentChunk.__table__,  # type: ignore[attr-defined]
+    f"to_tsvector('{TEXT_SEARCH_CONFIG}', chunk_content)",
+)
+add_trigram_index(ContentChunk.__table__, "chunk_content")  # type: ignore[attr-defined]
+
+
+class ContentChunkEmbedding(SQLModel, table=True):
+    """Embedding vector of a ContentChunk for one model, packed as little-endian float32."""
+
+    # Keyed by model too, so a chunk can be re-embedded after the model changes
+    chunk_id: uuid.UUID = Field(
+        foreign_key="contentchunk.id", ondelete="CASCADE", primary_key=True
+    )
+    model: str = Field(max_length=255, primary_key=True)
+    content_item_id: uuid.UUID = Field(index=True)
+    dimensions: int
+    vector: bytes = Field(sa_column=Column(LargeBinary, nullable=False))
+    created_at: datetime = Field(default_factory=datetime.utcnow, nullable=False)
+
+
 class ContentShareBase(SQLModel):
     """Base model for content shares."""
 
@@ -8,6 +8,12 @@ from sqlalchemy import Column
 from sqlalchemy.types import JSON, String
 from sqlmodel import Field, Relationship, SQLModel
 
+from app.models.text_search import (
+    TEXT_SEARCH_CONFIG,
+    add_search_vector,
+    add_trigram_index,
+)
+
 
 # 输入变量模型
 class InputVariable(BaseModel):
@@ -169,6 +175,19 @@ class Prompt(PromptBase, table=True):
         }
 
 
+# 全文搜索: name weighs more than description, description more than content
+add_search_vector(
+    Prompt.__table__,  # type: ignore[attr-defined]
+    f"setweight(to_tsvector('{TEXT_SEARCH_CONFIG}', coalesce(name, '')), 'A')"
+    f" || setweight(to_tsvector('{TEXT_SEARCH_CONFIG}', coalesce(description, '')), 'B')"
+    f" || setweight(to_tsvector('{TEXT_SEARCH_CONFIG}', coalesce(content, '')), 'C')",
+)
+# 中文等 CJK 搜索词按子串匹配
+add_trigram_index(Prompt.__table__, "name")  # type: ignore[attr-defined]
+add_trigram_index(Prompt.__table__, "description")  # type: ignore[attr-defined]
+add_trigram_index(Prompt.__table__, "content")  # type: ignore[attr-defined]
+
+
 # 提示词响应模型 - 明确包含标签
 class PromptReadWithTags(PromptBase):
     id: uuid.UUID
@@ -0,0 +1,138 @@
+"""
+Full-text search columns.
+
+``add_search_vector`` gives a table a ``search_vector`` tsvector column that
+PostgreSQL computes on every INSERT and UPDATE (``GENERATED ALWAYS ... STORED``),
+plus a GIN index over it. The column is deliberately not mapped on the model:
+the ORM never loads or writes it, and queries reference it through
+``Model.__table__.c.search_vector`` (see ``search_vector`` below).
+
+PostgreSQL's parser does not split Chinese or Japanese text into words: a run
+of CJK characters becomes a single token, so a word inside a sentence never
+matches. Terms containing CJK characters are matched as substrings instead
+(``substring_match``), served by pg_trgm GIN indexes (``add_trigram_index``).
+"""
+
+import re
+from typing import Any
+
+from sqlalchemy import (
+    DDL,
+    Column,
+    ColumnElement,
+    Computed,
+    Index,
+    Table,
+    event,
+    func,
+)
+from sqlalchemy.dialects.postgresql import TSVECTOR
+from sqlmodel import SQLModel
+
+# 'simple' does not stem or drop stop words, so saved content in any
+# language is indexed the same way; queries must use the same configuration
+TEXT_SEARCH_CONFIG = "simple"
+
+SEARCH_VECTOR_COLUMN = "search_vector"
+
+# Han, kana and hangul: scripts written without spaces between words
+CJK_PATTERN = re.compile(
+    "[\u3040-\u30ff\u3400-\u4dbf\u4e00-\u9fff\uac00-\ud7af\uf900-\ufaff]"
+)
+
+# The trigram indexes need pg_trgm (also created by the migration)
+event.listen(
+    SQLModel.metadata,
+    "before_create",
+    DDL("CREATE EXTENSION IF NOT EXISTS pg_trgm").execute_if(dialect="postgresql"),
+)
+
+
+def add_search_vector(table: Table, expression: str) -> None:
+    """Add the generated ``search_vector`` column and its GIN index to ``table``."""
+    column = Column(
+        SEARCH_VECTOR_COLUMN,
+        TSVECTOR,
+        Computed(expression, persisted=True),
+        nullable=True,
+    )
+    table.append_column(column)
+    Index(
+        f"ix_{table.name}_{SEARCH_VECTOR_COLUMN}",
+        column,
+        postgresql_using="gin",
+    )
+
+
+def add_trigram_index(table: Table, column_name: str) -> None:
+    """Index ``column_name`` with pg_trgm, for ``ILIKE '%...%'`` lookups."""
+    Index(
+        f"ix_{table.name}_{column_name}_trgm",
+        table.c[column_name],
+        postgresql_using="gin",
+        postgresql_ops={column_name: "gin_trgm_ops"},
+    )
+
+
+def search_vector(model: Any) -> Column:
+    """The ``search_vector`` column of a model's table."""
+    return model.__table__.c[SEARCH_VECTOR_COLUMN]
+
+
+def web_search_query(text: str) -> ColumnElement:
+    """A tsquery in web search syntax: quoted phrases, ``or`` and ``-word``."""
+    return func.websearch_to_tsquery(TEXT_SEARCH_CONFIG, text)
+
+
+def prefix_search_query(text: str) -> ColumnElement | None:
+    """
+    A tsquery matching every word of ``text`` as a prefix, for search-as-you-type.
+
+    A term written ``-term`` excludes the prefixes instead, as in
+    ``web_search_query``. Returns None when ``text`` contains no words.
+    """
+    parts: list[str] = []
+    for term in text.split():
+        words = re.findall(r"\w+", term)
+        if not words:
+            continue
+        prefixes = " & ".join(f"{w}:*" for w in words)
+        if term.startswith("-"):
+            parts.append(f"!{prefixes}" if len(words) == 1 else f"!({prefixes})")
+        else:
+            parts.append(prefixes)
+    if not parts:
+        return None
+    return func.to_tsquery(TEXT_SEARCH_CONFIG, " & ".join(parts))
+
+
+def contains_cjk(text: str) -> bool:
+    return CJK_PATTERN.search(text) is not None
+
+
+def split_terms(text: str) -> tuple[list[str], list[str], str]:
+    """
+    Split search text into CJK terms and the rest.
+
+    Returns the whitespace-separated terms containing CJK characters that must
+    appear, those that must not (written ``-term``), both without quotes, and
+    the remaining text, to be searched through ``search_vector``.
+    """
+    required: list[str] = []
+    excluded: list[str] = []
+    other: list[str] = []
+    for term in text.split():
+        if not contains_cjk(term):
+            other.append(term)
+            continue
+        negated = term.startswith("-")
+        term = term.lstrip("-").strip("\"'")
+        if term:
+            (excluded if negated else required).append(term)
+    return required, excluded, " ".join(other)
+
+
+def substring_match(column: Any, term: str) -> ColumnElement:
+    """Case-insensitive substring match of ``term``, served by the trigram index."""
+    escaped = term.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+    return column.ilike(f"%{escaped}%", escape="\\")
@@ -20,6 +20,8 @@ class CompletionRequest(BaseModel):
     user: str | None = None
     metadata: dict[str, str] | None = None
     api_key: str | None = None
+    # Response cache: None caches deterministic (temperature 0) calls only
+    cache: bool | None = None
 
 
 class CompletionChoiceDelta(BaseModel):
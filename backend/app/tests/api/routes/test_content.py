@@ -1,13 +1,22 @@
+import asyncio
+import contextlib
 import uuid
 from datetime import datetime, timezone
+from unittest.mock import MagicMock, patch
 
+import pytest
 from fastapi.testclient import TestClient
 from sqlmodel import Session
 
 from app import crud
+from app.api.routes.content import analyze_content_stream
 from app.core.config import settings
+from app.models.content import ContentChunk, ContentItem
 from app.schemas.content import ContentItemCreate, ContentItemPublic
 from app.tests.utils.utils import get_error_detail
+from app.utils.llm_cache import LLMResponseCache
+from app.utils.llm_router import ModelRouter
+from app.utils.llm_scheduler import FairScheduler
 
 # Assuming 'client' and 'normal_user_token_headers' are fixtures provided by conftest.py or similar
 # If not, client would be TestClient(app) from app.main
@@ -117,6 +126,156 @@ def test_get_content_items_api_with_data(
     assert response_data[1]["title"] == "Item 2"
 
 
+def test_get_content_items_api_next_cursor(
+    client: TestClient, mocker, normal_user_token_headers
+):
+    user_id_for_test = uuid.uuid4()
+    mock_items_list = [
+        create_mock_content_item_public(uuid.uuid4(), user_id_for_test, f"Item {i}")
+        for i in range(2)
+    ]
+    mock_get_items = mocker.patch(
+        "app.api.routes.content.crud_get_content_items", return_value=mock_items_list
+    )
+    mocker.patch("app.api.routes.content.count_content_items", return_value=7)
+
+    response = client.get(
+        "/api/v1/content",
+        headers=normal_user_token_headers,
+        params={"limit": 2, "cursor": "abc", "include_total": True},
+    )
+
+    assert response.status_code == 200
+    assert len(response.json()) == 2
+    assert response.headers["X-Total-Count"] == "7"
+    assert crud.crud_content.decode_content_item_cursor(
+        response.headers["X-Next-Cursor"]
+    ) == (mock_items_list[-1].created_at, mock_items_list[-1].id)
+    assert mock_get_items.call_args.kwargs["cursor"] == "abc"
+
+
+def test_get_content_items_api_invalid_cursor(
+    client: TestClient, mocker, normal_user_token_headers
+):
+    mocker.patch(
+        "app.api.routes.content.crud_get_content_items",
+        side_effect=ValueError("Invalid cursor: abc"),
+    )
+
+    response = client.get(
+        "/api/v1/content", headers=normal_user_token_headers, params={"cursor": "abc"}
+    )
+
+    assert response.status_code == 400
+
+
+def test_get_content_chunks_api_cursor(
+    client: TestClient, db: Session, mocker, normal_user_token_headers
+):
+    test_user = crud.get_user_by_email(session=db, email=settings.EMAIL_TEST_USER)
+    item_id = uuid.uuid4()
+    mock_item = create_mock_content_item_public(item_id, test_user.id, "Chunked")
+    mocker.patch("app.api.routes.content.crud_get_content_item", return_value=mock_item)
+    chunks = [
+        ContentChunk(
+            content_item_id=item_id,
+            chunk_index=i,
+            chunk_content=f"Chunk {i}",
+            word_count=2,
+            char_count=7,
+        )
+        for i in range(10, 15)
+    ]
+    mock_get_chunks = mocker.patch(
+        "app.api.routes.content.get_content_chunks", return_value=(chunks, None)
+    )
+    mocker.patch("app.api.routes.content.get_content_chunks_summary", return_value={})
+
+    response = client.get(
+        f"/api/v1/content/{item_id}/chunks",
+        headers=normal_user_token_headers,
+        params={"after": 9, "size": 5, "include_total": False},
+    )
+
+    assert response.status_code == 200
+    pagination = response.json()["pagination"]
+    assert pagination["page"] == 3
+    assert pagination["total_chunks"] is None
+    assert pagination["has_next"] is True
+    assert pagination["has_prev"] is True
+    assert pagination["next_cursor"] == 14
+    assert mock_get_chunks.call_args.kwargs == {"after": 9, "include_total": False}
+
+
+def test_search_similar_chunks_api(
+    client: TestClient, db: Session, mocker, normal_user_token_headers
+):
+    test_user = crud.get_user_by_email(session=db, email=settings.EMAIL_TEST_USER)
+    item = create_mock_content_item_public(uuid.uuid4(), test_user.id, "Vectors")
+    kept = ContentChunk(
+        content_item_id=item.id, chunk_index=3, chunk_content="Relevant"
+    )
+    deleted_id = uuid.uuid4()
+    mocker.patch.object(settings, "CHUNK_EMBEDDING_MODEL", "embed-model")
+    batcher = mocker.patch("app.api.routes.content.get_embedding_batcher").return_value
+    batcher.embed = mocker.AsyncMock(
+        return_value=mocker.Mock(embeddings=[[0.1, 0.2]], prompt_tokens=2)
+    )
+    index = mocker.patch("app.api.routes.content.get_user_vector_index").return_value
+    index.matches.return_value = True
+    index.search.return_value = [
+        mocker.Mock(chunk_id=deleted_id, score=0.95),
+        mocker.Mock(chunk_id=kept.id, score=0.9),
+    ]
+    mocker.patch(
+        "app.api.routes.content.get_user_chunks_by_ids",
+        return_value={kept.id: (kept, item)},
+    )
+
+    response = client.get(
+        "/api/v1/content/similar",
+        headers=normal_user_token_headers,
+        params={"q": "relevant things", "limit": 5},
+    )
+
+    assert response.status_code == 200
+    results = response.json()["results"]
+    assert [r["chunk_id"] for r in results] == [str(kept.id)]
+    assert results[0]["content_title"] == "Vectors"
+    assert results[0]["score"] == 0.9
+    index.search.assert_called_once_with([0.1, 0.2], k=10)
+
+
+def test_search_content_chunks_api(
+    client: TestClient, db: Session, mocker, normal_user_token_headers
+):
+    test_user = crud.get_user_by_email(session=db, email=settings.EMAIL_TEST_USER)
+    hit = {
+        "chunk_id": str(uuid.uuid4()),
+        "content_item_id": str(uuid.uuid4()),
+        "content_title": "Articles",
+        "chunk_index": 0,
+        "chunk_type": "paragraph",
+        "snippet": "full <mark>text</mark> search",
+        "rank": 0.6,
+    }
+    mock_search = mocker.patch(
+        "app.api.routes.content.search_content_chunks", return_value=[hit]
+    )
+
+    response = client.get(
+        "/api/v1/content/search",
+        headers=normal_user_token_headers,
+        params={"q": '"full text" -vector', "limit": 5, "skip": 10},
+    )
+
+    assert response.status_code == 200
+    assert response.json() == {"query": '"full text" -vector', "results": [hit]}
+    args, kwargs = mock_search.call_args
+    assert args[1:] == (test_user.id, '"full text" -vector')
+    assert kwargs == {"skip": 10, "limit": 5}
+
+
 # Test for GET /api/v1/content/{id} (found)
 def test_get_single_content_item_api(
     client: TestClient, db: Session, mocker, normal_user_token_headers
@@ -319,3 +478,96 @@ def test_get_content_markdown_api_unauthorized(
 print(
     "API tests for ContentItem created in backend/app/tests/api/routes/test_content.py"
 )
+
+
+class _CountingLLMClient:
+    """Fake LiteLLM client that records how many calls are in flight at once."""
+
+    def __init__(self) -> None:
+        self.in_flight = 0
+        self.max_in_flight = 0
+
+    @contextlib.asynccontextmanager
+    async def _call(self):
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            await asyncio.sleep(0.01)
+            yield
+        finally:
+            self.in_flight -= 1
+
+    async def post(self, url, **kwargs):
+        async with self._call():
+            response = MagicMock()
+            response.json.return_value = {
+                "choices": [{"message": {"content": "notes"}}]
+            }
+            return response
+
+    @contextlib.asynccontextmanager
+    async def stream(self, method, url, **kwargs):
+        async with self._call():
+            model = kwargs["json"]["model"]
+
+            async def aiter_text():
+                yield f"data: {model}\n\n"
+
+            yield MagicMock(aiter_text=aiter_text)
+
+
+@pytest.mark.asyncio
+async def test_map_reduce_analysis_stays_within_scheduler_cap():
+    user = MagicMock(id=uuid.uuid4())
+    item = ContentItem(id=uuid.uuid4(), user_id=user.id, type="pdf", chunk_count=6)
+    # Two slots in total, one of them held by another user's call
+    scheduler = FairScheduler(
+        max_concurrency=2,
+        per_user_concurrency=2,
+        max_queued_per_user=4,
+        queue_timeout=5,
+    )
+    other = scheduler.submit("other")
+    llm_client = _CountingLLMClient()
+
+    with (
+        patch("app.api.routes.content.crud_get_content_item", return_value=item),
+        patch(
+            "app.api.routes.content._budget_map_reduce",
+            return_value=([f"part {i}" for i in range(6)], 1),
+        ),
+        patch("app.api.routes.content.get_llm_client", return_value=llm_client),
+        patch("app.api.routes.content.get_llm_scheduler", return_value=scheduler),
+        patch(
+            "app.api.routes.content.get_llm_cache",
+            return_value=LLMResponseCache(max_entries=100, ttl_seconds=60),
+        ),
+        patch(
+            "app.api.routes.content.get_model_router",
+            return_value=ModelRouter(default_hedge_delay=0, min_hedge_delay=0),
+        ),
+        patch.object(settings, "ANALYSIS_MAP_CONCURRENCY", 4),
+        patch.object(settings, "ANALYSIS_FALLBACK_MODELS", ["backup-model"]),
+        patch.object(settings, "LLM_STREAM_COALESCING_ENABLED", False),
+    ):
+        response = await analyze_content_stream(
+            content_id=str(item.id),
+            system_prompt="Summarize",
+            user_prompt="",
+            mode="map_reduce",
+            current_user=user,
+            db=MagicMock(),
+        )
+        stream = response.body_iterator
+        # The analysis needs both slots, so it waits for the other call
+        assert await anext(stream) == ": queued 1\n\n"
+        assert llm_client.max_in_flight == 0
+        other.release()
+        events = [event async for event in stream]
+
+    assert ": map 6/6\n\n" in events
+    assert any(event.startswith("data: ") for event in events)
+    # Four map calls were allowed, but the user only holds two slots; the
+    # hedge of the final stream fits in them too
+    assert llm_client.max_in_flight == 2
+    assert scheduler.active == 0
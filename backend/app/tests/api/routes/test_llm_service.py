@@ -6,12 +6,15 @@ import pytest
 from fastapi import FastAPI
 from fastapi.testclient import TestClient
 
+from app.api.routes.llm_service import get_embedding_batcher
 from app.api.routes.llm_service import router as llm_router
 
 # Schemas are not strictly needed for requests if using dicts, but good for reference
 # from app.schemas.llm import CompletionRequest, LLMMessage, EmbeddingRequest
 from app.core.config import settings
 from app.tests.utils.utils import get_error_detail
+from app.utils.llm_cache import get_llm_cache
+from app.utils.llm_scheduler import QueueFullError, get_llm_scheduler
 
 # Override LITELLM_PROXY_URL for tests if necessary, though patching client is primary
 # For example: settings.LITELLM_PROXY_URL = "http://mock-litellm:4000"
@@ -22,6 +25,16 @@ app.include_router(llm_router, prefix="/llm")
 
 client = TestClient(app)
 
+
+@pytest.fixture(autouse=True)
+def clear_llm_cache():
+    get_llm_cache().clear()
+    get_embedding_batcher().cache.clear()
+    yield
+    get_llm_cache().clear()
+    get_embedding_batcher().cache.clear()
+
+
 # --- Test /completions (non-streaming) ---
 
 
@@ -41,10 +54,8 @@ def test_create_completion_successful():
         "usage": {"prompt_tokens": 9, "completion_tokens": 12, "total_tokens": 21},
     }
 
-    with patch("app.api.routes.llm_service.httpx.AsyncClient") as mock_async_client:
-        mock_async_client_instance = (
-            mock_async_client.return_value.__aenter__.return_value
-        )
+    with patch("app.api.routes.llm_service.get_llm_client") as mock_get_client:
+        mock_async_client_instance = mock_get_client.return_value
         mock_response = MagicMock(spec=httpx.Response)
         mock_response.status_code = 200
         mock_response.json = MagicMock(return_value=mock_response_data)
@@ -92,8 +103,8 @@ def test_create_completion_different_model():
         ],
         "usage": {"prompt_tokens": 10, "completion_tokens": 10, "total_tokens": 20},
     }
-    with patch("app.api.routes.llm_service.httpx.AsyncClient") as mock_async_client:
-        mock_client_instance = mock_async_client.return_value.__aenter__.return_value
+    with patch("app.api.routes.llm_service.get_llm_client") as mock_get_client:
+        mock_client_instance = mock_get_client.return_value
         mock_response = MagicMock(
             status_code=200,
             json=lambda: mock_response_data,
@@ -116,8 +127,8 @@ def test_create_completion_different_model():
 
 
 def test_create_completion_with_api_key():
-    with patch("app.api.routes.llm_service.httpx.AsyncClient") as mock_async_client:
-        mock_client_instance = mock_async_client.return_value.__aenter__.return_value
+    with patch("app.api.routes.llm_service.get_llm_client") as mock_get_client:
+        mock_client_instance = mock_get_client.return_value
         # Provide complete response data for validation
         complete_response_data = {
             "id": "res1",
@@ -166,10 +177,8 @@ def test_create_completion_litellm_http_error():
     mock_error_response.text = json.dumps({"error": {"message": error_detail}})
     mock_error_response.request = MagicMock()  # Needed for HTTPStatusError
 
-    with patch("app.api.routes.llm_service.httpx.AsyncClient") as mock_async_client:
-        mock_async_client_instance = (
-            mock_async_client.return_value.__aenter__.return_value
-        )
+    with patch("app.api.routes.llm_service.get_llm_client") as mock_get_client:
+        mock_async_client_instance = mock_get_client.return_value
         mock_async_client_instance.request = AsyncMock(
             side_effect=httpx.HTTPStatusError(
                 message="Client Error",
@@ -190,10 +199,8 @@ def test_create_completion_litellm_http_error():
 
 
 def test_create_completion_network_error():
-    with patch("app.api.routes.llm_service.httpx.AsyncClient") as mock_async_client:
-        mock_async_client_instance = (
-            mock_async_client.return_value.__aenter__.return_value
-        )
+    with patch("app.api.routes.llm_service.get_llm_client") as mock_get_client:
+        mock_async_client_instance = mock_get_client.return_value
         mock_async_client_instance.request = AsyncMock(
             side_effect=httpx.RequestError("Network issue", request=MagicMock())
         )
@@ -262,10 +269,8 @@ async def test_create_completion_streaming_successful():
 
     mock_stream_response.aiter_bytes = lambda chunk_size=None: async_bytes_generator()
 
-    with patch("app.api.routes.llm_service.httpx.AsyncClient") as mock_async_client:
-        mock_async_client_instance = (
-            mock_async_client.return_value.__aenter__.return_value
-        )
+    with patch("app.api.routes.llm_service.get_llm_client") as mock_get_client:
+        mock_async_client_instance = mock_get_client.return_value
         mock_async_client_instance.build_request = MagicMock()
         mock_async_client_instance.send = AsyncMock(return_value=mock_stream_response)
 
@@ -275,7 +280,6 @@ async def test_create_completion_streaming_successful():
             "stream": True,
         }
 
-        # Use the test client instead of real httpx.AsyncClient to avoid mock conflicts
         response = client.post("/llm/completions", json=request_payload)
 
         assert response.status_code == 200
@@ -303,6 +307,8 @@ async def test_create_completion_streaming_successful():
         full_response_content = "".join(content_parts)
         assert full_response_content == "Hello there!"
         mock_async_client_instance.send.assert_called_once()
+        # The upstream stream is released to the shared pool once forwarded
+        mock_stream_response.aclose.assert_awaited_once()
 
 
 @pytest.mark.asyncio
@@ -327,10 +333,8 @@ async def test_create_completion_streaming_litellm_error_before_stream():
     )
     mock_error_response.aclose = AsyncMock()  # Ensure aclose is available
 
-    with patch("app.api.routes.llm_service.httpx.AsyncClient") as mock_async_client:
-        mock_async_client_instance = (
-            mock_async_client.return_value.__aenter__.return_value
-        )
+    with patch("app.api.routes.llm_service.get_llm_client") as mock_get_client:
+        mock_async_client_instance = mock_get_client.return_value
         mock_async_client_instance.build_request = MagicMock()
         # .send() is called for streaming, it returns the response object that then has raise_for_status() called on it
         mock_async_client_instance.send = AsyncMock(return_value=mock_error_response)
@@ -341,21 +345,19 @@ async def test_create_completion_streaming_litellm_error_before_stream():
             "stream": True,
         }
 
-        # Use the test client instead of real httpx.AsyncClient
         response = client.post("/llm/completions", json=request_payload)
 
         assert response.status_code == error_status_code
         response_json = response.json()
         error_detail_response = get_error_detail(response_json)
         assert error_detail in error_detail_response
+        mock_error_response.aclose.assert_awaited_once()
 
 
 @pytest.mark.asyncio
 async def test_create_completion_streaming_network_error_before_stream():
-    with patch("app.api.routes.llm_service.httpx.AsyncClient") as mock_async_client:
-        mock_async_client_instance = (
-            mock_async_client.return_value.__aenter__.return_value
-        )
+    with patch("app.api.routes.llm_service.get_llm_client") as mock_get_client:
+        mock_async_client_instance = mock_get_client.return_value
         mock_async_client_instance.build_request = MagicMock()
         mock_async_client_instance.send = AsyncMock(
             side_effect=httpx.RequestError(
@@ -369,7 +371,6 @@ async def test_create_completion_streaming_network_error_before_stream():
             "stream": True,
         }
 
-        # Use the test client instead of real httpx.AsyncClient
         response = client.post("/llm/completions", json=request_payload)
 
         assert response.status_code == 503
@@ -401,10 +402,8 @@ def test_create_embedding_successful():
         "usage": {"prompt_tokens": 8, "total_tokens": 8},
     }
 
-    with patch("app.api.routes.llm_service.httpx.AsyncClient") as mock_async_client:
-        mock_async_client_instance = (
-            mock_async_client.return_value.__aenter__.return_value
-        )
+    with patch("app.api.routes.llm_service.get_llm_client") as mock_get_client:
+        mock_async_client_instance = mock_get_client.return_value
         mock_response = MagicMock(spec=httpx.Response)
         mock_response.status_code = 200
         mock_response.json = MagicMock(return_value=mock_response_data)
@@ -425,11 +424,12 @@ def test_create_embedding_successful():
         assert called_args[0] == "POST"  # method
         expected_url = f"{str(settings.LITELLM_PROXY_URL).rstrip('/')}/embeddings"
         assert called_args[1] == expected_url  # url
+        assert called_kwargs["timeout"] == 60.0
 
 
 def test_create_embedding_with_api_key():
-    with patch("app.api.routes.llm_service.httpx.AsyncClient") as mock_async_client:
-        mock_client_instance = mock_async_client.return_value.__aenter__.return_value
+    with patch("app.api.routes.llm_service.get_llm_client") as mock_get_client:
+        mock_client_instance = mock_get_client.return_value
         # Provide complete response data for validation
         complete_response_data = {
             "object": "list",
@@ -470,10 +470,8 @@ def test_create_embedding_litellm_http_error():
     mock_error_response.text = json.dumps({"error": {"message": error_detail}})
     mock_error_response.request = MagicMock()
 
-    with patch("app.api.routes.llm_service.httpx.AsyncClient") as mock_async_client:
-        mock_async_client_instance = (
-            mock_async_client.return_value.__aenter__.return_value
-        )
+    with patch("app.api.routes.llm_service.get_llm_client") as mock_get_client:
+        mock_async_client_instance = mock_get_client.return_value
         mock_async_client_instance.request = AsyncMock(
             side_effect=httpx.HTTPStatusError(
                 message="Client Error",
@@ -491,10 +489,8 @@ def test_create_embedding_litellm_http_error():
 
 
 def test_create_embedding_network_error():
-    with patch("app.api.routes.llm_service.httpx.AsyncClient") as mock_async_client:
-        mock_async_client_instance = (
-            mock_async_client.return_value.__aenter__.return_value
-        )
+    with patch("app.api.routes.llm_service.get_llm_client") as mock_get_client:
+        mock_async_client_instance = mock_get_client.return_value
         mock_async_client_instance.request = AsyncMock(
             side_effect=httpx.RequestError(
                 "Embedding network issue", request=MagicMock()
@@ -512,6 +508,70 @@ def test_create_embedding_network_error():
         )
 
 
+def test_create_embedding_served_from_cache():
+    upstream = {
+        "object": "list",
+        "data": [
+            {"object": "embedding", "embedding": [0.5, 0.25], "index": 0},
+            {"object": "embedding", "embedding": [0.75, 1.0], "index": 1},
+        ],
+        "model": "text-embedding-ada-002",
+        "usage": {"prompt_tokens": 6, "total_tokens": 6},
+    }
+
+    with patch("app.api.routes.llm_service.get_llm_client") as mock_get_client:
+        mock_async_client_instance = mock_get_client.return_value
+        mock_response = MagicMock(spec=httpx.Response)
+        mock_response.json = MagicMock(return_value=upstream)
+        mock_response.raise_for_status = MagicMock()
+        mock_async_client_instance.request = AsyncMock(return_value=mock_response)
+
+        request_payload = {"input": ["one", "two"], "model": "text-embedding-ada-002"}
+        first = client.post("/llm/embeddings", json=request_payload)
+        second = client.post(
+            "/llm/embeddings",
+            json={"input": ["two", "one"], "model": "text-embedding-ada-002"},
+        )
+
+        assert first.status_code == 200
+        assert second.status_code == 200
+        mock_async_client_instance.request.assert_called_once()
+        _, called_kwargs = mock_async_client_instance.request.call_args
+        assert called_kwargs["json"]["input"] == ["one", "two"]
+        assert [d["embedding"] for d in first.json()["data"]] == [
+            [0.5, 0.25],
+            [0.75, 1.0],
+        ]
+        assert [d["embedding"] for d in second.json()["data"]] == [
+            [0.75, 1.0],
+            [0.5, 0.25],
+        ]
+        assert second.json()["usage"]["prompt_tokens"] == 0
+
+
+def test_create_embedding_cache_hit_requires_same_api_key():
+    upstream = {
+        "object": "list",
+        "data": [{"object": "embedding", "embedding": [0.5, 0.25], "index": 0}],
+        "model": "text-embedding-ada-002",
+        "usage": {"prompt_tokens": 3, "total_tokens": 3},
+    }
+
+    with patch("app.api.routes.llm_service.get_llm_client") as mock_get_client:
+        mock_async_client_instance = mock_get_client.return_value
+        mock_response = MagicMock(spec=httpx.Response)
+        mock_response.json = MagicMock(return_value=upstream)
+        mock_response.raise_for_status = MagicMock()
+        mock_async_client_instance.request = AsyncMock(return_value=mock_response)
+
+        request_payload = {"input": ["one"], "model": "text-embedding-ada-002"}
+        client.post("/llm/embeddings", json={**request_payload, "api_key": "sk-paid"})
+        client.post("/llm/embeddings", json={**request_payload, "api_key": "sk-other"})
+        client.post("/llm/embeddings", json=request_payload)
+
+        assert mock_async_client_instance.request.call_count == 3
+
+
 # Ensure settings.LITELLM_PROXY_URL is used if not None
 def test_litellm_proxy_url_is_used():
     # This test implicitly checks that settings.LITELLM_PROXY_URL (which has a default) is used.
@@ -541,10 +601,8 @@ def test_create_completion_litellm_error_non_openai_format():
     mock_error_response.text = json.dumps({"message": error_detail_text})
     mock_error_response.request = MagicMock()
 
-    with patch("app.api.routes.llm_service.httpx.AsyncClient") as mock_async_client:
-        mock_async_client_instance = (
-            mock_async_client.return_value.__aenter__.return_value
-        )
+    with patch("app.api.routes.llm_service.get_llm_client") as mock_get_client:
+        mock_async_client_instance = mock_get_client.return_value
         mock_async_client_instance.request = AsyncMock(
             side_effect=httpx.HTTPStatusError(
                 message="Unprocessable Entity",
@@ -577,10 +635,8 @@ def test_create_completion_litellm_error_with_fastapi_like_detail():
     mock_error_response.text = json.dumps({"detail": error_detail_text})
     mock_error_response.request = MagicMock()
 
-    with patch("app.api.routes.llm_service.httpx.AsyncClient") as mock_async_client:
-        mock_async_client_instance = (
-            mock_async_client.return_value.__aenter__.return_value
-        )
+    with patch("app.api.routes.llm_service.get_llm_client") as mock_get_client:
+        mock_async_client_instance = mock_get_client.return_value
         mock_async_client_instance.request = AsyncMock(
             side_effect=httpx.HTTPStatusError(
                 message="Bad Request",
@@ -598,3 +654,243 @@ def test_create_completion_litellm_error_with_fastapi_like_detail():
         assert response.status_code == error_status_code
         error_detail_response = get_error_detail(response.json())
         assert error_detail_text in error_detail_response
+
+
+# --- Response cache ---
+
+CACHED_COMPLETION = {
+    "id": "chatcmpl-cache",
+    "object": "chat.completion",
+    "created": 1677652288,
+    "model": "gpt-3.5-turbo",
+    "choices": [
+        {
+            "index": 0,
+            "message": {"role": "assistant", "content": "Deterministic answer"},
+            "finish_reason": "stop",
+        }
+    ],
+    "usage": {"prompt_tokens": 9, "completion_tokens": 3, "total_tokens": 12},
+}
+
+
+def test_create_completion_temperature_zero_is_cached():
+    with patch("app.api.routes.llm_service.get_llm_client") as mock_get_client:
+        mock_client_instance = mock_get_client.return_value
+        mock_response = MagicMock(status_code=200, json=lambda: CACHED_COMPLETION)
+        mock_response.raise_for_status = MagicMock()
+        mock_client_instance.request = AsyncMock(return_value=mock_response)
+
+        request_payload = {
+            "model": "gpt-3.5-turbo",
+            "messages": [{"role": "user", "content": "Same question"}],
+            "temperature": 0,
+        }
+        first = client.post("/llm/completions", json=request_payload)
+        second = client.post("/llm/completions", json=request_payload)
+
+        assert first.status_code == second.status_code == 200
+        assert second.json() == first.json()
+        mock_client_instance.request.assert_called_once()
+        assert "cache" not in mock_client_instance.request.call_args.kwargs["json"]
+
+
+def test_create_completion_cache_hit_requires_same_api_key():
+    with patch("app.api.routes.llm_service.get_llm_client") as mock_get_client:
+        mock_client_instance = mock_get_client.return_value
+        mock_response = MagicMock(status_code=200, json=lambda: CACHED_COMPLETION)
+        mock_response.raise_for_status = MagicMock()
+        mock_client_instance.request = AsyncMock(return_value=mock_response)
+
+        request_payload = {
+            "model": "gpt-3.5-turbo",
+            "messages": [{"role": "user", "content": "Same question"}],
+            "temperature": 0,
+            "api_key": "sk-paying",
+        }
+        client.post("/llm/completions", json=request_payload)
+        client.post("/llm/completions", json={**request_payload, "api_key": "sk-other"})
+        client.post("/llm/completions", json={**request_payload, "api_key": None})
+        assert mock_client_instance.request.call_count == 3
+
+        client.post("/llm/completions", json=request_payload)
+        assert mock_client_instance.request.call_count == 3
+
+
+def test_create_completion_cache_opt_out():
+    with patch("app.api.routes.llm_service.get_llm_client") as mock_get_client:
+        mock_client_instance = mock_get_client.return_value
+        mock_response = MagicMock(status_code=200, json=lambda: CACHED_COMPLETION)
+        mock_response.raise_for_status = MagicMock()
+        mock_client_instance.request = AsyncMock(return_value=mock_response)
+
+        request_payload = {
+            "model": "gpt-3.5-turbo",
+            "messages": [{"role": "user", "content": "Same question"}],
+            "temperature": 0,
+            "cache": False,
+        }
+        client.post("/llm/completions", json=request_payload)
+        client.post("/llm/completions", json=request_payload)
+
+        assert mock_client_instance.request.call_count == 2
+
+
+def test_create_completion_streaming_cache_hit_replays_sse():
+    with patch("app.api.routes.llm_service.get_llm_client") as mock_get_client:
+        mock_client_instance = mock_get_client.return_value
+        mock_response = MagicMock(status_code=200, json=lambda: CACHED_COMPLETION)
+        mock_response.raise_for_status = MagicMock()
+        mock_client_instance.request = AsyncMock(return_value=mock_response)
+
+        request_payload = {
+            "model": "gpt-3.5-turbo",
+            "messages": [{"role": "user", "content": "Same question"}],
+            "temperature": 0,
+        }
+        client.post("/llm/completions", json=request_payload)
+        response = client.post(
+            "/llm/completions", json={**request_payload, "stream": True}
+        )
+
+        assert response.headers["content-type"].startswith("text/event-stream")
+        data_lines = [
+            line[len("data: ") :]
+            for line in response.iter_lines()
+            if line.startswith("data: ")
+        ]
+        assert data_lines[-1] == "[DONE]"
+        content = "".join(
+            json.loads(line)["choices"][0]["delta"].get("content", "")
+            for line in data_lines[:-1]
+        )
+        assert content == "Deterministic answer"
+        mock_client_instance.send.assert_not_called()
+
+
+def test_create_completion_streamed_response_is_recorded():
+    stream_chunks = [
+        f"data: {json.dumps(chunk)}\n\n".encode()
+        for chunk in [
+            {
+                "id": "chatcmpl-stream",
+                "created": 1677652288,
+                "model": "gpt-3.5-turbo",
+                "choices": [{"index": 0, "delta": {"content": part}}],
+            }
+            for part in ["Streamed ", "answer"]
+        ]
+    ] + [b"data: [DONE]\n\n"]
+
+    async def aiter_bytes():
+        for chunk in stream_chunks:
+            yield chunk
+
+    mock_stream_response = MagicMock(spec=httpx.Response)
+    mock_stream_response.raise_for_status = MagicMock()
+    mock_stream_response.aiter_bytes = lambda: aiter_bytes()
+
+    with patch("app.api.routes.llm_service.get_llm_client") as mock_get_client:
+        mock_client_instance = mock_get_client.return_value
+        mock_client_instance.build_request = MagicMock()
+        mock_client_instance.send = AsyncMock(return_value=mock_stream_response)
+        mock_client_instance.request = AsyncMock()
+
+        request_payload = {
+            "model": "gpt-3.5-turbo",
+            "messages": [{"role": "user", "content": "Stream me"}],
+            "temperature": 0,
+        }
+        streamed = client.post(
+            "/llm/completions", json={**request_payload, "stream": True}
+        )
+        assert streamed.status_code == 200
+        response = client.post("/llm/completions", json=request_payload)
+
+        assert response.status_code == 200
+        assert response.json()["id"] == "chatcmpl-stream"
+        assert response.json()["choices"][0]["message"]["content"] == "Streamed answer"
+        mock_client_instance.request.assert_not_called()
+
+
+def test_create_completion_queue_full_returns_429():
+    with (
+        patch("app.api.routes.llm_service.get_llm_client") as mock_get_client,
+        patch("app.api.routes.llm_service.get_llm_scheduler") as mock_get_scheduler,
+    ):
+        mock_get_scheduler.return_value.submit.side_effect = QueueFullError(
+            "Too many queued LLM requests for ip:testclient"
+        )
+        response = client.post(
+            "/llm/completions",
+            json={
+                "messages": [{"role": "user", "content": "Hello"}],
+                "user": "heavy",
+            },
+        )
+
+        assert response.status_code == 429
+        # Without an API key the caller-chosen user does not pick the tenant
+        assert mock_get_scheduler.return_value.submit.call_args.args == (
+            "ip:testclient",
+        )
+        mock_get_client.return_value.request.assert_not_called()
+
+
+def test_create_completion_scheduled_under_api_key():
+    with (
+        patch("app.api.routes.llm_service.get_llm_client") as mock_get_client,
+        patch("app.api.routes.llm_service.get_llm_scheduler") as mock_get_scheduler,
+    ):
+        mock_get_scheduler.return_value.submit.side_effect = QueueFullError("full")
+        tenants = []
+        for user in ("alice", None):
+            body = {
+                "messages": [{"role": "user", "content": "Hello"}],
+                "api_key": "sk-team",
+            }
+            if user:
+                body["user"] = user
+            client.post("/llm/completions", json=body)
+            tenants.append(mock_get_scheduler.return_value.submit.call_args.args[0])
+
+        key_tenant = tenants[1]
+        assert key_tenant.startswith("key:")
+        assert "sk-team" not in key_tenant
+        assert tenants[0] == f"{key_tenant}:user:alice"
+        mock_get_client.return_value.request.assert_not_called()
+
+
+def test_create_completion_releases_scheduler_slot():
+    scheduler = get_llm_scheduler()
+    with patch("app.api.routes.llm_service.get_llm_client") as mock_get_client:
+        mock_response = MagicMock(status_code=200, json=lambda: CACHED_COMPLETION)
+        mock_response.raise_for_status = MagicMock()
+        mock_get_client.return_value.request = AsyncMock(return_value=mock_response)
+
+        response = client.post(
+            "/llm/completions",
+            json={"messages": [{"role": "user", "content": "Hello"}]},
+        )
+
+        assert response.status_code == 200
+        assert scheduler.active == 0
+        assert scheduler.queued == 0
+
+
+def test_create_completion_over_context_window_rejected_locally():
+    with (
+        patch("app.api.routes.llm_service.get_llm_client") as mock_get_client,
+        patch.dict(settings.LLM_CONTEXT_WINDOWS, {"tiny-model": 64}),
+    ):
+        response = client.post(
+            "/llm/completions",
+            json={
+                "model": "tiny-model",
+                "messages": [{"role": "user", "content": "word " * 500}],
+            },
+        )
+
+        assert response.status_code == 400
+        assert "context window" in get_error_detail(response.json())
+        mock_get_client.return_value.request.assert_not_called()
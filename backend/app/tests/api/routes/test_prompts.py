@@ -5,6 +5,7 @@ from unittest.mock import MagicMock, patch
 import pytest
 from fastapi import FastAPI
 from fastapi.testclient import TestClient
+from sqlalchemy.dialects import postgresql
 from sqlalchemy.exc import SQLAlchemyError
 from sqlmodel import Session
 
@@ -359,6 +360,119 @@ def test_read_prompts_with_tag_filter(
     assert len(response.json()) == 1
 
 
+@patch("app.api.routes.prompts.select")
+def test_read_prompts_paginates_in_sql(
+    mock_sqlmodel_select: MagicMock,
+    client: TestClient,
+    mock_db_session_fixture: MagicMock,
+):
+    mock_query = MagicMock()
+    mock_sqlmodel_select.return_value = mock_query
+    mock_query.order_by.return_value = mock_query
+    mock_query.options.return_value = mock_query
+    mock_query.offset.return_value = mock_query
+    mock_query.limit.return_value = mock_query
+    mock_query.select_from.return_value = mock_query
+    mock_db_session_fixture.exec.return_value.all.return_value = [
+        Prompt(id=uuid.uuid4(), name="Page item", tags=[])
+    ]
+    mock_db_session_fixture.exec.return_value.one.return_value = 42
+
+    response = client.get(
+        f"{app_settings.API_V1_STR}/?skip=20&limit=10&include_total=true"
+    )
+    assert response.status_code == 200
+    assert len(response.json()) == 1
+    assert response.headers["X-Total-Count"] == "42"
+    mock_query.offset.assert_called_once_with(20)
+    mock_query.limit.assert_called_once_with(10)
+    mock_query.options.assert_called_once()
+    # Tags come from the eager load, not a refresh per prompt
+    mock_db_session_fixture.refresh.assert_not_called()
+
+
+def test_read_prompts_rejects_oversized_page(
+    client: TestClient, mock_db_session_fixture: MagicMock
+):
+    response = client.get(f"{app_settings.API_V1_STR}/?limit=201")
+    assert response.status_code == 422
+    mock_db_session_fixture.exec.assert_not_called()
+
+
+@patch("app.api.routes.prompts.select")
+def test_read_prompts_search_uses_text_index(
+    mock_sqlmodel_select: MagicMock,
+    client: TestClient,
+    mock_db_session_fixture: MagicMock,
+):
+    mock_query = MagicMock()
+    mock_sqlmodel_select.return_value = mock_query
+    mock_query.where.return_value = mock_query
+    mock_query.order_by.return_value = mock_query
+    mock_db_session_fixture.exec.return_value.all.return_value = []
+
+    response = client.get(f"{app_settings.API_V1_STR}/?search=summar tran")
+    assert response.status_code == 200
+
+    condition = mock_query.where.call_args.args[0]
+    assert "prompts.search_vector @@ to_tsquery" in str(condition)
+    assert "summar:* & tran:*" in condition.compile().params.values()
+    # Without an explicit sort, matches are ordered by relevance
+    assert "ts_rank" in str(mock_query.order_by.call_args_list[0].args[0])
+
+
+@patch("app.api.routes.prompts.select")
+def test_read_prompts_search_excludes_negated_words(
+    mock_sqlmodel_select: MagicMock,
+    client: TestClient,
+    mock_db_session_fixture: MagicMock,
+):
+    mock_query = MagicMock()
+    mock_sqlmodel_select.return_value = mock_query
+    mock_query.where.return_value = mock_query
+    mock_query.order_by.return_value = mock_query
+    mock_db_session_fixture.exec.return_value.all.return_value = []
+
+    response = client.get(f"{app_settings.API_V1_STR}/?search=summar -draft -e-mail")
+    assert response.status_code == 200
+
+    condition = mock_query.where.call_args.args[0]
+    # -word excludes the prefix rather than requiring it
+    assert "summar:* & !draft:* & !(e:* & mail:*)" in (
+        condition.compile().params.values()
+    )
+
+
+@patch("app.api.routes.prompts.select")
+def test_read_prompts_search_matches_chinese_inside_text(
+    mock_sqlmodel_select: MagicMock,
+    client: TestClient,
+    mock_db_session_fixture: MagicMock,
+):
+    mock_query = MagicMock()
+    mock_sqlmodel_select.return_value = mock_query
+    mock_query.where.return_value = mock_query
+    mock_query.order_by.return_value = mock_query
+    mock_db_session_fixture.exec.return_value.all.return_value = [
+        Prompt(id=uuid.uuid4(), name="中文文章翻译助手", tags=[])
+    ]
+
+    response = client.get(f"{app_settings.API_V1_STR}/?search=翻译")
+    assert response.status_code == 200
+    assert len(response.json()) == 1
+
+    # "翻译" sits inside a longer run of Chinese text, which the text search
+    # parser keeps as one token, so it is matched as a substring instead
+    (condition,) = [call.args[0] for call in mock_query.where.call_args_list]
+    compiled = condition.compile(dialect=postgresql.dialect())
+    assert "prompts.name ILIKE" in str(compiled)
+    assert "prompts.description ILIKE" in str(compiled)
+    assert "search_vector" not in str(compiled)
+    assert "%翻译%" in compiled.params.values()
+    # No tsquery to rank by: newest first
+    assert "updated_at" in str(mock_query.order_by.call_args_list[0].args[0])
+
+
 @patch("app.api.routes.prompts.select")
 def test_read_prompts_db_error_main_query(
     mock_sqlmodel_select: MagicMock,
@@ -81,7 +81,7 @@ class TestContentProcessingAPI:
         processed_item = process_response.json()
         assert extract_data(processed_item, "processing_status") == "processing"
 
-    @patch("app.utils.content_processors.requests.get")
+    @patch("app.utils.content_processors.fetch")
     def test_process_content_item_url(
         self, mock_get, client: TestClient, db: Session, normal_user_token_headers
     ):
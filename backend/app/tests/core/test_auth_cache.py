@@ -0,0 +1,103 @@
+"""
+Tests for the in-memory revocation and user caches used by get_current_user.
+"""
+
+import uuid
+from datetime import datetime, timedelta, timezone
+from unittest.mock import MagicMock, patch
+
+from sqlmodel import Session
+
+from app.core.auth_cache import RevocationCache, UserCache, _invalidate_user
+from app.core.security import token_digest
+from app.models import User
+
+
+def _user(**kwargs) -> User:
+    values = {
+        "id": uuid.uuid4(),
+        "email": "cached@example.com",
+        "hashed_password": "hash",
+        "is_active": True,
+    }
+    values.update(kwargs)
+    return User(**values)
+
+
+@patch("app.core.auth_cache.crud.get_blacklisted_tokens_since")
+def test_revocation_cache_syncs_incrementally(mock_since: MagicMock):
+    now = datetime.utcnow()
+    expires = now + timedelta(hours=1)
+    mock_since.return_value = [(token_digest("revoked-token"), expires, now)]
+    cache = RevocationCache(refresh_interval=0)
+    session = MagicMock()
+
+    assert cache.is_revoked(session, "revoked-token")
+    assert not cache.is_revoked(session, "other-token")
+
+    # Later syncs only ask for rows added since the last one (minus overlap)
+    since = mock_since.call_args_list[-1].kwargs["since"]
+    assert mock_since.call_args_list[0].kwargs["since"] is None
+    assert since is not None and since < now
+
+
+@patch("app.core.auth_cache.crud.get_blacklisted_tokens_since", return_value=[])
+def test_revocation_cache_refreshes_at_most_once_per_interval(mock_since: MagicMock):
+    cache = RevocationCache(refresh_interval=60)
+    session = MagicMock()
+
+    for _ in range(5):
+        assert not cache.is_revoked(session, "token")
+    assert mock_since.call_count == 1
+
+    cache.revoke("token", datetime.now(timezone.utc) + timedelta(hours=1))
+    assert cache.is_revoked(session, "token")
+    assert mock_since.call_count == 1
+
+
+@patch("app.core.auth_cache.crud.get_blacklisted_tokens_since")
+def test_revocation_cache_forgets_expired_tokens(mock_since: MagicMock):
+    now = datetime.utcnow()
+    mock_since.return_value = [
+        (token_digest("old-token"), now - timedelta(seconds=1), now)
+    ]
+    cache = RevocationCache(refresh_interval=0)
+
+    assert not cache.is_revoked(MagicMock(), "old-token")
+    assert len(cache) == 0
+
+
+def test_user_cache_attaches_without_querying():
+    cache = UserCache(ttl=60, max_entries=10)
+    user = _user()
+    cache.put(user)
+
+    session = Session()
+    with patch.object(session, "execute") as mock_execute:
+        cached = cache.get(session, str(user.id))
+    mock_execute.assert_not_called()
+
+    assert cached is not None and cached is not user
+    assert cached in session
+    assert cached.email == "cached@example.com"
+    assert not session.dirty
+
+
+def test_user_cache_expiry_eviction_and_invalidation():
+    session = Session()
+
+    expired = UserCache(ttl=0.0, max_entries=10)
+    user = _user()
+    expired.put(user)
+    assert expired.get(session, str(user.id)) is None
+
+    cache = UserCache(ttl=60, max_entries=1)
+    first, second = _user(), _user(email="second@example.com")
+    cache.put(first)
+    cache.put(second)
+    assert cache.get(session, str(first.id)) is None
+    assert cache.get(session, str(second.id)) is not None
+
+    with patch("app.core.auth_cache.get_user_cache", return_value=cache):
+        _invalidate_user(None, None, second)
+    assert cache.get(Session(), str(second.id)) is None
@@ -0,0 +1,65 @@
+"""
+Tests for the bounded password hashing executor.
+"""
+
+import asyncio
+import threading
+
+import pytest
+from passlib.context import CryptContext
+
+from app.core.password_hasher import PasswordHasher, PasswordHasherBusyError
+from app.core.security import pwd_context
+
+
+@pytest.mark.asyncio
+async def test_hash_and_verify_off_the_event_loop():
+    hasher = PasswordHasher(max_workers=2, max_queued=2)
+    hashed = await hasher.hash("secret")
+
+    assert pwd_context.verify("secret", hashed)
+    assert await hasher.verify("secret", hashed)
+    assert not await hasher.verify("wrong", hashed)
+
+    stats = hasher.stats()
+    assert stats["completed"] == 3
+    assert stats["active"] == 0 and stats["queued"] == 0
+    assert stats["mean_run_ms"] > 0
+
+
+@pytest.mark.asyncio
+async def test_verify_and_update_rehashes_outdated_cost():
+    hasher = PasswordHasher(max_workers=1, max_queued=0)
+    cheap = CryptContext(schemes=["bcrypt"], bcrypt__rounds=4).hash("secret")
+
+    valid, new_hash = await hasher.verify_and_update("secret", cheap)
+    assert valid and new_hash is not None
+    assert pwd_context.verify("secret", new_hash)
+    assert not pwd_context.needs_update(new_hash)
+
+    assert await hasher.verify_and_update("secret", new_hash) == (True, None)
+    assert await hasher.verify_and_update("wrong", cheap) == (False, None)
+
+
+@pytest.mark.asyncio
+async def test_rejects_calls_beyond_the_queue_bound(monkeypatch):
+    hasher = PasswordHasher(max_workers=1, max_queued=1)
+    release = threading.Event()
+    monkeypatch.setattr(
+        "app.core.password_hasher.pwd_context.verify",
+        lambda *_args: release.wait(5),
+    )
+
+    running = asyncio.create_task(hasher.verify("a", "h"))
+    queued = asyncio.create_task(hasher.verify("b", "h"))
+    await asyncio.sleep(0.05)
+    assert hasher.stats()["active"] == 1
+    assert hasher.stats()["queued"] == 1
+
+    with pytest.raises(PasswordHasherBusyError):
+        await hasher.verify("c", "h")
+    assert hasher.stats()["rejected"] == 1
+
+    release.set()
+    assert await running and await queued
+    assert hasher.stats()["queued"] == 0
@@ -1,10 +1,25 @@
+import json
 import uuid
-from datetime import datetime, timezone
+from datetime import datetime, timedelta, timezone
 from unittest.mock import MagicMock
 
 import pytest
+from sqlalchemy.dialects import postgresql
 from sqlmodel import Session
 
+from app.crud.crud_content import (
+    bulk_create_content_chunks,
+    claim_next_processing_job,
+    copy_processed_content,
+    decode_content_item_cursor,
+    encode_content_item_cursor,
+    find_processed_duplicate,
+    get_content_chunks,
+    get_content_chunks_summary,
+    renew_processing_job_lease,
+    search_content_chunks,
+    set_content_chunk_stats,
+)
 from app.crud.crud_content import (
     create_content_item_sync as create_content_item,
 )
@@ -20,7 +35,12 @@ from app.crud.crud_content import (
 from app.crud.crud_content import (
     update_content_item_sync as update_content_item,
 )
-from app.models.content import ContentItem
+from app.models.content import (
+    ContentAsset,
+    ContentChunk,
+    ContentChunkEmbedding,
+    ContentItem,
+)
 
 
 # Helper to create a mock ContentItem for testing
@@ -177,3 +197,322 @@ def test_delete_content_item_not_found(db_session_mock: MagicMock):
 print(
     "CRUD tests for ContentItem created in backend/app/tests/crud/test_crud_content.py"
 )
+
+
+def test_find_processed_duplicate_without_keys(db_session_mock: MagicMock):
+    item = create_mock_content_item()
+
+    assert find_processed_duplicate(db_session_mock, item) is None
+    db_session_mock.exec.assert_not_called()
+
+
+def test_find_processed_duplicate_limits_url_matches_by_age(
+    db_session_mock: MagicMock,
+):
+    item = create_mock_content_item()
+    item.canonical_url = "https://example.com/post"
+    item.content_hash = "ab" * 32
+
+    find_processed_duplicate(db_session_mock, item, url_max_age=timedelta(days=7))
+
+    compiled = db_session_mock.exec.call_args.args[0].compile(
+        dialect=postgresql.dialect()
+    )
+    sql = str(compiled)
+    # The age limit is tied to the URL match; the hash match stays unbounded
+    assert "canonical_url_1)s::VARCHAR AND (EXISTS" in sql
+    assert "contentasset.created_at >=" in sql
+    cutoffs = [v for v in compiled.params.values() if isinstance(v, datetime)]
+    assert len(cutoffs) == 1
+    assert abs(cutoffs[0] - (datetime.utcnow() - timedelta(days=7))) < timedelta(
+        minutes=1
+    )
+
+    find_processed_duplicate(db_session_mock, item)
+
+    sql = str(db_session_mock.exec.call_args.args[0].compile())
+    assert "contentasset.created_at" not in sql
+
+
+def test_copy_processed_content(db_session_mock: MagicMock):
+    source = create_mock_content_item()
+    source.chunk_count = 12
+    source.chunk_word_count = 340
+    source.chunk_char_count = 2100
+    target = create_mock_content_item()
+    target.title = None
+    target.content_text = None
+    markdown_asset = ContentAsset(
+        content_item_id=source.id,
+        type="processed_text",
+        file_path=f"processed/markdown/{source.id}.md",
+        meta_info='{"asset_type": "markdown", "processor": "jina"}',
+        created_at=datetime(2024, 1, 1),
+    )
+    db_session_mock.exec.return_value.all.return_value = [markdown_asset]
+
+    paths = copy_processed_content(db_session_mock, source=source, target=target)
+
+    assert paths == [markdown_asset.file_path]
+    shared_asset = db_session_mock.add.call_args_list[0].args[0]
+    assert isinstance(shared_asset, ContentAsset)
+    assert shared_asset.content_item_id == target.id
+    assert shared_asset.file_path == markdown_asset.file_path
+    # Reuse does not make the fetched content look fresh
+    assert shared_asset.created_at == markdown_asset.created_at
+    assert json.loads(shared_asset.meta_info)["deduplicated_from"] == str(source.id)
+
+    # Chunks are copied with one INSERT ... SELECT
+    insert_statement = db_session_mock.exec.call_args_list[1].args[0]
+    assert "INSERT INTO contentchunk" in str(insert_statement)
+    assert target.content_text == source.content_text
+    assert target.title == source.title
+    assert (
+        target.chunk_count,
+        target.chunk_word_count,
+        target.chunk_char_count,
+    ) == (12, 340, 2100)
+    db_session_mock.commit.assert_not_called()
+
+
+def _make_chunks(count: int) -> list[ContentChunk]:
+    item_id = uuid.uuid4()
+    return [
+        ContentChunk(
+            content_item_id=item_id,
+            chunk_index=i,
+            chunk_content=f"Chunk {i}\twith\nspecial characters",
+            chunk_type="paragraph",
+            word_count=4,
+            char_count=30,
+            meta_info={"has_code": False},
+        )
+        for i in range(count)
+    ]
+
+
+def test_bulk_create_content_chunks_multi_row_insert(db_session_mock: MagicMock):
+    connection = db_session_mock.connection.return_value
+    connection.dialect.name = "sqlite"
+    chunks = _make_chunks(3)
+
+    assert bulk_create_content_chunks(db_session_mock, chunks) == 3
+
+    statement, rows = connection.execute.call_args.args
+    assert statement.table.name == "contentchunk"
+    assert [row["chunk_index"] for row in rows] == [0, 1, 2]
+    assert rows[0]["id"] == chunks[0].id
+    db_session_mock.add.assert_not_called()
+    db_session_mock.commit.assert_not_called()
+
+
+def test_bulk_create_content_chunks_copy_on_psycopg(db_session_mock: MagicMock):
+    connection = db_session_mock.connection.return_value
+    connection.dialect.name = "postgresql"
+    connection.dialect.driver = "psycopg"
+    cursor = connection.connection.driver_connection.cursor.return_value.__enter__()
+    copy = cursor.copy.return_value.__enter__()
+    chunks = _make_chunks(2)
+
+    assert bulk_create_content_chunks(db_session_mock, chunks) == 2
+
+    assert cursor.copy.call_args.args[0].startswith("COPY contentchunk (id, ")
+    written = [call.args[0] for call in copy.write_row.call_args_list]
+    assert [row[2] for row in written] == [0, 1]
+    assert written[0][7] == '{"has_code": false}'
+    connection.execute.assert_not_called()
+
+
+def test_bulk_create_content_chunks_empty(db_session_mock: MagicMock):
+    assert bulk_create_content_chunks(db_session_mock, []) == 0
+    db_session_mock.connection.assert_not_called()
+
+
+def test_content_item_cursor_round_trip():
+    item = create_mock_content_item()
+
+    cursor = encode_content_item_cursor(item)
+
+    assert "=" not in cursor
+    assert decode_content_item_cursor(cursor) == (item.created_at, item.id)
+
+
+@pytest.mark.parametrize("cursor", ["not-a-cursor", "", "bWlzc2luZy1zZXBhcmF0b3I"])
+def test_decode_content_item_cursor_invalid(cursor: str):
+    with pytest.raises(ValueError):
+        decode_content_item_cursor(cursor)
+
+
+def test_get_content_items_with_cursor(db_session_mock: MagicMock):
+    db_session_mock.exec.return_value.all.return_value = []
+    item = create_mock_content_item()
+
+    get_content_items(
+        session=db_session_mock,
+        skip=50,
+        limit=10,
+        user_id=item.user_id,
+        cursor=encode_content_item_cursor(item),
+    )
+
+    sql = str(db_session_mock.exec.call_args.args[0])
+    assert "(contentitem.created_at, contentitem.id) <" in sql
+    assert "ORDER BY contentitem.created_at DESC, contentitem.id DESC" in sql
+    assert "OFFSET" not in sql
+
+
+def test_get_content_chunks_seeks_by_index(db_session_mock: MagicMock):
+    db_session_mock.exec.return_value.all.return_value = []
+    item_id = uuid.uuid4()
+
+    chunks, total = get_content_chunks(
+        db_session_mock, item_id, page=7, size=20, include_total=False
+    )
+
+    assert chunks == []
+    assert total is None
+    statement = db_session_mock.exec.call_args.args[0]
+    assert "contentchunk.chunk_index >=" in str(statement)
+    assert "OFFSET" not in str(statement)
+    assert statement.compile().params["chunk_index_1"] == 120
+    db_session_mock.exec.assert_called_once()
+
+    get_content_chunks(db_session_mock, item_id, size=20, after=41)
+    assert db_session_mock.exec.call_count == 3  # page query + count query
+
+
+def test_set_content_chunk_stats(db_session_mock: MagicMock):
+    item_id = uuid.uuid4()
+
+    set_content_chunk_stats(
+        db_session_mock,
+        item_id,
+        chunk_count=3,
+        word_count=42,
+        char_count=250,
+        token_count=60,
+    )
+
+    statement = db_session_mock.exec.call_args.args[0]
+    assert str(statement).startswith("UPDATE contentitem SET chunk_count=")
+    params = statement.compile().params
+    assert params["chunk_count"] == 3
+    assert params["chunk_word_count"] == 42
+    assert params["chunk_char_count"] == 250
+    assert params["chunk_token_count"] == 60
+    assert params["id_1"] == item_id
+    db_session_mock.exec.assert_called_once()
+    db_session_mock.commit.assert_not_called()
+
+
+def test_get_content_chunks_summary_reads_item():
+    item = create_mock_content_item()
+    item.chunk_count = 5
+    item.chunk_word_count = 120
+    item.chunk_char_count = 800
+
+    assert get_content_chunks_summary(item) == {
+        "total_chunks": 5,
+        "total_word_count": 120,
+        "total_char_count": 800,
+        "content_item_id": str(item.id),
+    }
+
+
+def test_search_content_chunks_ranks_and_escapes_snippets(db_session_mock: MagicMock):
+    chunk_id, item_id, user_id = uuid.uuid4(), uuid.uuid4(), uuid.uuid4()
+    db_session_mock.exec.return_value.all.return_value = [
+        (chunk_id, item_id, 2, "code_block", "Notes", 0.25, "if a < b: \x02match\x03")
+    ]
+
+    hits = search_content_chunks(db_session_mock, user_id, "match", limit=5)
+
+    assert hits == [
+        {
+            "chunk_id": str(chunk_id),
+            "content_item_id": str(item_id),
+            "content_title": "Notes",
+            "chunk_index": 2,
+            "chunk_type": "code_block",
+            "snippet": "if a &lt; b: <mark>match</mark>",
+            "rank": 0.25,
+        }
+    ]
+    sql = str(db_session_mock.exec.call_args.args[0])
+    assert "contentchunk.search_vector @@ websearch_to_tsquery" in sql
+    assert "ts_headline" in sql
+
+
+def test_search_content_chunks_matches_chinese_as_substrings(
+    db_session_mock: MagicMock,
+):
+    content = (
+        "这是一段很长的介绍文字，" * 5
+        + "本文讨论全文搜索的实现<细节>。"
+        + "结尾。" * 30
+    )
+    db_session_mock.exec.return_value.all.return_value = [
+        (uuid.uuid4(), uuid.uuid4(), 0, "paragraph", "笔记", 0.4, content)
+    ]
+
+    hits = search_content_chunks(db_session_mock, uuid.uuid4(), "搜索 -草稿 postgres")
+
+    snippet = hits[0]["snippet"]
+    assert snippet.startswith("… ") and snippet.endswith(" …")
+    assert "全文<mark>搜索</mark>的实现&lt;细节&gt;" in snippet
+    compiled = db_session_mock.exec.call_args.args[0].compile(
+        dialect=postgresql.dialect()
+    )
+    sql = str(compiled)
+    # The CJK word cannot be tokenized, so it is matched inside the text
+    assert "contentchunk.chunk_content ILIKE" in sql
+    assert "contentchunk.chunk_content NOT ILIKE" in sql
+    assert "search_vector @@ websearch_to_tsquery" in sql
+    assert "word_similarity" in sql and "ts_headline" not in sql
+    assert {"%搜索%", "%草稿%", "postgres"} <= set(compiled.params.values())
+
+
+def test_search_content_chunks_without_terms_skips_query(db_session_mock: MagicMock):
+    assert search_content_chunks(db_session_mock, uuid.uuid4(), "-草稿 !!") == []
+    db_session_mock.exec.assert_not_called()
+
+
+def test_chunk_embeddings_are_keyed_by_model_and_follow_chunks():
+    table = ContentChunkEmbedding.__table__
+
+    # One row per chunk and model, so re-embedding with a new model inserts
+    assert [c.name for c in table.primary_key.columns] == ["chunk_id", "model"]
+    (foreign_key,) = table.c.chunk_id.foreign_keys
+    assert foreign_key.target_fullname == "contentchunk.id"
+    assert foreign_key.ondelete == "CASCADE"
+
+
+def test_claim_treats_jobs_without_recent_heartbeat_as_stale(
+    db_session_mock: MagicMock,
+):
+    db_session_mock.exec.return_value.first.return_value = None
+
+    assert (
+        claim_next_processing_job(db_session_mock, stale_after=timedelta(minutes=5))
+        is None
+    )
+
+    sql = str(db_session_mock.exec.call_args.args[0])
+    assert "coalesce(processingjob.heartbeat_at, processingjob.started_at) <" in sql
+
+
+def test_renew_processing_job_lease_is_fenced_by_claim(db_session_mock: MagicMock):
+    job_id, started_at = uuid.uuid4(), datetime(2026, 1, 1, 12, 0)
+    db_session_mock.exec.return_value.rowcount = 1
+
+    assert renew_processing_job_lease(db_session_mock, job_id, started_at)
+    statement = db_session_mock.exec.call_args.args[0]
+    assert str(statement).startswith("UPDATE processingjob SET heartbeat_at=")
+    params = statement.compile().params
+    assert params["id_1"] == job_id
+    assert params["started_at_1"] == started_at
+    db_session_mock.commit.assert_called_once()
+
+    # Claimed again by another worker: the row no longer matches
+    db_session_mock.exec.return_value.rowcount = 0
+    assert not renew_processing_job_lease(db_session_mock, job_id, started_at)
@@ -0,0 +1,54 @@
+from sqlmodel import Session
+
+from app.crud import crud_content
+from app.tests.utils.content import create_random_content_item
+from app.tests.utils.user import create_random_user
+from app.utils.content_chunker import chunk_content_for_item
+from app.utils.content_processors import store_content_chunks
+
+# Fixtures from conftest.py will be automatically available (e.g., `db`)
+
+
+def test_bulk_create_content_chunks_round_trip(db: Session) -> None:
+    """
+    Bulk-inserted chunks read back exactly as written.
+    """
+    user = create_random_user(db)
+    content_item = create_random_content_item(db, user_id=user.id)
+    markdown = "\n\n".join(
+        f"# Section {i}\n\nBody with a tab\there and a | pipe | table."
+        for i in range(1200)
+    )
+    chunks = chunk_content_for_item(content_item.id, markdown)
+
+    written = crud_content.bulk_create_content_chunks(db, chunks)
+    db.commit()
+
+    stored, total = crud_content.get_content_chunks(
+        db, content_item.id, page=1, size=len(chunks)
+    )
+    assert written == len(chunks) == total == 1200
+    assert [chunk.chunk_index for chunk in stored] == list(range(1200))
+    assert stored[0].chunk_content == chunks[0].chunk_content
+    assert stored[0].meta_info == chunks[0].meta_info
+
+
+def test_store_content_chunks_caches_summary(db: Session) -> None:
+    """
+    Storing chunks keeps the item's summary aggregates in step with the rows.
+    """
+    user = create_random_user(db)
+    content_item = create_random_content_item(db, user_id=user.id)
+    markdown = "\n\n".join(f"# Section {i}\n\nSome body text {i}." for i in range(50))
+
+    written = store_content_chunks(db, content_item.id, [markdown])
+    db.commit()
+    db.refresh(content_item)
+
+    stored, _ = crud_content.get_content_chunks(
+        db, content_item.id, page=1, size=written, include_total=False
+    )
+    summary = crud_content.get_content_chunks_summary(content_item)
+    assert summary["total_chunks"] == written == len(stored)
+    assert summary["total_word_count"] == sum(chunk.word_count for chunk in stored)
+    assert summary["total_char_count"] == sum(chunk.char_count for chunk in stored)
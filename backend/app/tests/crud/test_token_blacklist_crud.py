@@ -7,6 +7,7 @@ import pytest
 from sqlmodel import Session
 
 from app import crud
+from app.core.security import token_digest
 
 # from app.models import TokenBlacklist # Will be patched in app.crud's scope or app.models' scope
 
@@ -55,11 +56,10 @@ def test_create_token_blacklist(
         )
 
     MockAppModelsTokenBlacklist.assert_called_once_with(
-        token=sample_token_data["token"],
+        token_hash=token_digest(sample_token_data["token"]),
         user_id=sample_token_data["user_id"],
         expires_at=sample_token_data["expires_at"],
         created_at=datetime(2023, 1, 1, 12, 0, 0),
-        blacklisted_at=datetime(2023, 1, 1, 12, 0, 0),
     )
     mock_db_session.add.assert_called_once_with(mock_token_blacklist_instance)
     mock_db_session.commit.assert_called_once()
@@ -86,10 +86,9 @@ def test_add_token_to_blacklist(
         )
 
     MockAppModelsTokenBlacklist.assert_called_once_with(
-        token=sample_token_data["token"],
+        token_hash=token_digest(sample_token_data["token"]),
         user_id=sample_token_data["user_id"],
         expires_at=sample_token_data["expires_at"],
-        blacklisted_at=datetime(2023, 1, 1, 13, 0, 0),
     )
     mock_db_session.add.assert_called_once_with(mock_token_blacklist_instance)
     mock_db_session.commit.assert_called_once()
@@ -172,14 +171,12 @@ def test_is_token_blacklisted_not_found(
     assert is_blacklisted is False
 
 
-@patch("app.crud.select")
+@patch("app.crud.sa_delete")
 @patch("app.crud.TokenBlacklist")
 def test_clean_expired_tokens_none_expired(
-    MockAppModelsTB: MagicMock, mock_select_crud: MagicMock, mock_db_session: MagicMock
+    MockAppModelsTB: MagicMock, mock_delete: MagicMock, mock_db_session: MagicMock
 ):
-    mock_query_obj = MagicMock()
-    mock_select_crud.return_value = mock_query_obj
-    mock_db_session.exec.return_value.all.return_value = []
+    mock_db_session.exec.return_value.rowcount = 0
 
     # Mock the expires_at attribute to support comparison
     MockAppModelsTB.expires_at = MagicMock()
@@ -192,22 +189,15 @@ def test_clean_expired_tokens_none_expired(
     assert count == 0
     mock_db_session.delete.assert_not_called()
     mock_db_session.commit.assert_called_once()
-    mock_select_crud.assert_called_once_with(MockAppModelsTB)
+    mock_delete.assert_called_once_with(MockAppModelsTB)
 
 
-@patch("app.crud.select")
+@patch("app.crud.sa_delete")
 @patch("app.crud.TokenBlacklist")
 def test_clean_expired_tokens_some_expired(
-    MockAppModelsTB: MagicMock, mock_select_crud: MagicMock, mock_db_session: MagicMock
+    MockAppModelsTB: MagicMock, mock_delete: MagicMock, mock_db_session: MagicMock
 ):
-    mock_query_obj = MagicMock()
-    mock_select_crud.return_value = mock_query_obj
-    mock_expired_token1 = MagicMock()
-    mock_expired_token2 = MagicMock()
-    mock_db_session.exec.return_value.all.return_value = [
-        mock_expired_token1,
-        mock_expired_token2,
-    ]
+    mock_db_session.exec.return_value.rowcount = 2
 
     # Mock the expires_at attribute to support comparison
     MockAppModelsTB.expires_at = MagicMock()
@@ -217,9 +207,12 @@ def test_clean_expired_tokens_some_expired(
         mock_datetime.utcnow.return_value = datetime(2023, 1, 1, 12, 0, 0)
         count = crud.clean_expired_tokens(session=mock_db_session)
 
+    # One set-based DELETE instead of loading and deleting rows one by one
     assert count == 2
-    mock_db_session.delete.assert_any_call(mock_expired_token1)
-    mock_db_session.delete.assert_any_call(mock_expired_token2)
-    assert mock_db_session.delete.call_count == 2
+    mock_delete.assert_called_once_with(MockAppModelsTB)
+    mock_delete.return_value.where.assert_called_once()
+    mock_db_session.exec.assert_called_once_with(
+        mock_delete.return_value.where.return_value
+    )
+    mock_db_session.delete.assert_not_called()
     mock_db_session.commit.assert_called_once()
-    mock_select_crud.assert_called_once_with(MockAppModelsTB)
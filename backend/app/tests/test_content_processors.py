@@ -3,14 +3,19 @@ Tests for content processors that convert various input types to Markdown format
 """
 
 import uuid
-from unittest.mock import Mock, patch
+from datetime import timedelta
+from unittest.mock import AsyncMock, Mock, patch
 
-import requests
+import httpx
+import pytest
 from sqlmodel import Session
 
+from app.core.config import settings
 from app.models.content import ContentItem
 from app.utils.content_processors import (
+    ChunkEmbeddingStep,
     ContentProcessorFactory,
+    DeduplicationStep,
     JinaProcessor,
     MarkItDownProcessor,
     ModernProcessor,
@@ -19,7 +24,10 @@ from app.utils.content_processors import (
     ProcessingResult,
     ProcessingStep,
     ProcessorBase,
+    SummaryStep,
+    store_content_chunks,
 )
+from app.utils.vector_index import pack_vector, unpack_vectors
 
 
 class TestProcessorBase:
@@ -178,6 +186,320 @@ class TestProcessingPipeline:
         mock_session.add.assert_called()
         mock_session.commit.assert_called()
 
+    @patch("app.utils.content_processors.get_storage_service")
+    def test_post_steps_run_after_success(self, mock_storage_service):
+        """Post steps see the extracted result; their failures are not fatal."""
+        pipeline = ProcessingPipeline()
+        pipeline.steps = [Mock(spec=ProcessingStep)]
+        pipeline.steps[0].can_handle.return_value = True
+        pipeline.steps[0].process.return_value = ProcessingResult(
+            success=True, markdown_content="# Done"
+        )
+        failing = Mock(spec=ProcessingStep)
+        failing.can_handle.return_value = True
+        failing.process.side_effect = RuntimeError("embedding service down")
+        following = Mock(spec=ProcessingStep)
+        following.can_handle.return_value = True
+        following.process.side_effect = lambda _context, result: result
+        pipeline.post_steps = []
+        pipeline.add_post_step(failing)
+        pipeline.add_post_step(following)
+        session = Mock(spec=Session)
+        content_item = ContentItem(id=uuid.uuid4(), user_id=uuid.uuid4(), type="text")
+
+        result = pipeline.process(content_item, session)
+
+        assert result.success is True
+        assert content_item.processing_status == "completed"
+        following.process.assert_called_once()
+        session.rollback.assert_called_once()
+
+    @pytest.mark.asyncio
+    @patch("app.utils.content_processors.get_storage_service")
+    async def test_pipeline_aprocess_awaits_steps(self, mock_storage_service):
+        """The async pipeline awaits each step's aprocess() and records the result."""
+        pipeline = ProcessingPipeline()
+        step = Mock(spec=ProcessingStep)
+        step.can_handle.return_value = True
+        step.aprocess = AsyncMock(
+            return_value=ProcessingResult(success=True, markdown_content="# Done")
+        )
+        pipeline.steps = [step]
+        pipeline.post_steps = []
+        session = Mock(spec=Session)
+        content_item = ContentItem(id=uuid.uuid4(), user_id=uuid.uuid4(), type="url")
+
+        result = await pipeline.aprocess(content_item, session)
+
+        assert result.success is True
+        step.aprocess.assert_awaited_once()
+        step.process.assert_not_called()
+        assert content_item.processing_status == "completed"
+        assert content_item.content_text == "# Done"
+
+    @patch("app.utils.content_processors.get_storage_service")
+    def test_post_steps_skipped_on_failure(self, mock_storage_service):
+        pipeline = ProcessingPipeline()
+        pipeline.steps = []
+        post_step = Mock(spec=ProcessingStep)
+        pipeline.post_steps = [post_step]
+        content_item = ContentItem(id=uuid.uuid4(), user_id=uuid.uuid4(), type="text")
+
+        result = pipeline.process(content_item, Mock(spec=Session))
+
+        assert result.success is False
+        post_step.process.assert_not_called()
+
+
+class TestChunkEmbeddingStep:
+    """Test embedding of stored chunks."""
+
+    def _context(self):
+        content_item = ContentItem(id=uuid.uuid4(), user_id=uuid.uuid4(), type="url")
+        return ProcessingContext(
+            content_item=content_item,
+            session=Mock(spec=Session),
+            user_id=content_item.user_id,
+            storage_service=Mock(),
+        )
+
+    @patch("app.utils.content_processors.get_user_vector_index")
+    @patch("app.utils.content_processors.get_chunk_embeddings")
+    @patch("app.utils.content_processors.create_chunk_embeddings")
+    @patch("app.utils.content_processors.get_chunks_without_embedding")
+    @patch("app.utils.content_processors.fetch")
+    @patch("app.utils.content_processors.settings")
+    def test_embeds_missing_chunks_in_batches(
+        self,
+        mock_settings,
+        mock_fetch,
+        mock_missing,
+        mock_create,
+        mock_get_embeddings,
+        mock_get_index,
+    ):
+        mock_settings.EMBEDDING_BATCH_MAX_INPUTS = 2
+        mock_settings.LITELLM_PROXY_URL = "http://litellm:4000"
+        mock_settings.LITELLM_MASTER_KEY = None
+        chunk_ids = [uuid.uuid4() for _ in range(3)]
+        mock_missing.return_value = [
+            (chunk_id, f"chunk {i}") for i, chunk_id in enumerate(chunk_ids)
+        ]
+
+        def fake_fetch(_method, _url, json, **_kwargs):
+            response = Mock()
+            response.json.return_value = {
+                "data": [
+                    {"index": i, "embedding": [float(len(text)), 1.0]}
+                    for i, text in enumerate(json["input"])
+                ]
+            }
+            return response
+
+        mock_fetch.side_effect = fake_fetch
+        mock_get_embeddings.return_value = [
+            (chunk_id, pack_vector([7.0, 1.0])) for chunk_id in chunk_ids
+        ]
+        index = mock_get_index.return_value
+        index.matches.return_value = True
+        context = self._context()
+
+        result = ChunkEmbeddingStep(model="embed-model").process(
+            context, ProcessingResult(success=True)
+        )
+
+        assert result.success is True
+        assert [call.kwargs["json"]["input"] for call in mock_fetch.call_args_list] == [
+            ["chunk 0", "chunk 1"],
+            ["chunk 2"],
+        ]
+        assert mock_fetch.call_args.args[1] == "http://litellm:4000/embeddings"
+        stored = mock_create.call_args.args[1]
+        assert [embedding.chunk_id for embedding in stored] == chunk_ids
+        assert stored[0].dimensions == 2
+        assert unpack_vectors([stored[0].vector]).tolist() == [[7.0, 1.0]]
+        context.session.commit.assert_called_once()
+        index.append.assert_called_once()
+        assert index.append.call_args.args[1] == chunk_ids
+
+    @patch("app.utils.content_processors.rebuild_user_vector_index")
+    @patch("app.utils.content_processors.get_user_vector_index")
+    @patch("app.utils.content_processors.get_chunk_embeddings")
+    @patch("app.utils.content_processors.create_chunk_embeddings")
+    @patch("app.utils.content_processors.get_chunks_without_embedding", return_value=[])
+    @patch("app.utils.content_processors.fetch")
+    def test_reuses_existing_embeddings(
+        self,
+        mock_fetch,
+        mock_missing,
+        mock_create,
+        mock_get_embeddings,
+        mock_get_index,
+        mock_rebuild,
+    ):
+        """Copied embeddings are not re-sent; an unbuilt index is rebuilt."""
+        mock_get_embeddings.return_value = [(uuid.uuid4(), pack_vector([1.0, 0.0]))]
+        mock_get_index.return_value.matches.return_value = False
+        context = self._context()
+
+        ChunkEmbeddingStep(model="embed-model").process(
+            context, ProcessingResult(success=True)
+        )
+
+        mock_fetch.assert_not_called()
+        mock_create.assert_not_called()
+        mock_rebuild.assert_called_once_with(
+            context.session, context.user_id, "embed-model"
+        )
+
+
+class TestSummaryStep:
+    """Test queueing of the low-priority summarizer job."""
+
+    def _context(self, summary=None):
+        content_item = ContentItem(
+            id=uuid.uuid4(), user_id=uuid.uuid4(), type="url", summary=summary
+        )
+        return ProcessingContext(
+            content_item=content_item,
+            session=Mock(spec=Session),
+            user_id=content_item.user_id,
+            storage_service=Mock(),
+        )
+
+    @patch("app.utils.content_processors.enqueue_processing_job")
+    def test_enqueues_summarizer_job(self, mock_enqueue):
+        context = self._context()
+
+        result = SummaryStep().process(context, ProcessingResult(success=True))
+
+        assert result.success is True
+        mock_enqueue.assert_called_once_with(
+            context.session, context.content_item.id, "summarizer"
+        )
+
+    @patch("app.utils.content_processors.enqueue_processing_job")
+    def test_skips_items_with_summary(self, mock_enqueue):
+        """A summary copied from a duplicate is not generated again."""
+        context = self._context(summary="Already summarised")
+
+        SummaryStep().process(context, ProcessingResult(success=True))
+
+        mock_enqueue.assert_not_called()
+
+
+class TestDeduplicationStep:
+    """Test reuse of already-processed content."""
+
+    def _context(self, content_item):
+        return ProcessingContext(
+            content_item=content_item,
+            session=Mock(spec=Session),
+            user_id=content_item.user_id,
+            storage_service=Mock(),
+        )
+
+    @patch("app.utils.content_processors.copy_processed_content")
+    @patch("app.utils.content_processors.find_processed_duplicate")
+    def test_reuses_completed_duplicate(self, mock_find, mock_copy):
+        """A URL already processed elsewhere is reused instead of fetched."""
+        source = ContentItem(
+            id=uuid.uuid4(),
+            user_id=uuid.uuid4(),
+            type="url",
+            source_uri="https://example.com/post",
+            content_text="# Post",
+            meta_info='{"processor": "jina"}',
+            processing_status="completed",
+        )
+        mock_find.return_value = source
+        mock_copy.return_value = [f"processed/markdown/{source.id}.md"]
+
+        content_item = ContentItem(
+            id=uuid.uuid4(),
+            user_id=uuid.uuid4(),
+            type="url",
+            source_uri="https://www.example.com/post/?utm_source=feed",
+        )
+        context = self._context(content_item)
+
+        result = DeduplicationStep().process(context, ProcessingResult(success=False))
+
+        assert content_item.canonical_url == "https://example.com/post"
+        assert result.success is True
+        assert result.markdown_content == "# Post"
+        assert result.metadata == {
+            "processor": "jina",
+            "deduplicated_from": str(source.id),
+        }
+        mock_copy.assert_called_once_with(
+            context.session, source=source, target=content_item
+        )
+        assert mock_find.call_args.kwargs["url_max_age"] == timedelta(
+            seconds=settings.CONTENT_DEDUP_MAX_AGE
+        )
+
+    @patch("app.utils.content_processors.copy_processed_content")
+    @patch("app.utils.content_processors.find_processed_duplicate", return_value=None)
+    def test_no_duplicate_falls_through(self, mock_find, mock_copy):
+        """Without a match the result is left for the next step."""
+        content_item = ContentItem(
+            id=uuid.uuid4(),
+            user_id=uuid.uuid4(),
+            type="pdf",
+        )
+        context = self._context(content_item)
+        context.session.exec.return_value.first.return_value = Mock(
+            file_path="raw/report.pdf"
+        )
+        context.storage_service.download_file.return_value = b"%PDF-1.7"
+
+        result = DeduplicationStep().process(context, ProcessingResult(success=False))
+
+        assert result.success is False
+        assert content_item.content_hash is not None
+        context.storage_service.download_file.assert_called_once_with("raw/report.pdf")
+        mock_copy.assert_not_called()
+
+
+class TestStoreContentChunks:
+    """Test batched persistence of content chunks."""
+
+    @patch("app.utils.content_processors.set_content_chunk_stats")
+    @patch("app.utils.content_processors.bulk_create_content_chunks")
+    @patch("app.utils.content_processors.settings")
+    def test_writes_in_batches(self, mock_settings, mock_bulk_create, mock_set_stats):
+        """Chunks are bulk-inserted in batches of the configured size."""
+        mock_settings.CONTENT_CHUNK_BATCH_SIZE = 2
+        mock_bulk_create.side_effect = lambda _session, batch: len(batch)
+        session = Mock(spec=Session)
+        markdown = "\n\n".join(f"# Heading {i}\n\nBody {i}." for i in range(5))
+
+        count = store_content_chunks(session, uuid.uuid4(), [markdown])
+
+        assert count == 5
+        batches = [call.args[1] for call in mock_bulk_create.call_args_list]
+        assert [len(batch) for batch in batches] == [2, 2, 1]
+        assert [chunk.chunk_index for batch in batches for chunk in batch] == [
+            0,
+            1,
+            2,
+            3,
+            4,
+        ]
+        chunks = [chunk for batch in batches for chunk in batch]
+        mock_set_stats.assert_called_once_with(
+            session,
+            chunks[0].content_item_id,
+            chunk_count=5,
+            word_count=sum(chunk.word_count for chunk in chunks),
+            char_count=sum(chunk.char_count for chunk in chunks),
+            token_count=sum(chunk.token_count for chunk in chunks),
+        )
+        assert all(chunk.token_count > 0 for chunk in chunks)
+        session.add.assert_not_called()
+        session.commit.assert_not_called()
+
 
 class TestContentProcessorFactory:
     """Test the processor factory functionality."""
@@ -356,10 +678,10 @@ class TestJinaProcessor:
             assert not processor.can_handle("url")
             assert not processor.can_handle("text")
 
-    @patch("app.utils.content_processors.requests.post")
+    @patch("app.utils.content_processors.fetch")
     @patch("app.utils.content_processors.get_storage_service")
     def test_jina_processor_url_processing_success(
-        self, mock_storage_service, mock_requests_post
+        self, mock_storage_service, mock_fetch
     ):
         """Test JinaProcessor successfully processes URL content."""
         # Mock settings
@@ -378,7 +700,7 @@ class TestJinaProcessor:
                 "# Test Article\n\nThis is a test article from Jina AI."
             )
             mock_response.raise_for_status.return_value = None
-            mock_requests_post.return_value = mock_response
+            mock_fetch.return_value = mock_response
 
             processor = JinaProcessor()
             mock_session = Mock(spec=Session)
@@ -411,13 +733,14 @@ class TestJinaProcessor:
             assert result.metadata["content_type"] == "url"
 
             # Verify Jina API was called correctly
-            mock_requests_post.assert_called_once()
-            call_args = mock_requests_post.call_args
+            mock_fetch.assert_called_once()
+            call_args = mock_fetch.call_args
+            assert call_args[0] == ("POST", "https://r.jina.ai/")
             assert call_args[1]["json"]["url"] == "https://example.com"
             assert "Bearer test_api_key" in call_args[1]["headers"]["Authorization"]
 
-    @patch("app.utils.content_processors.requests.post")
-    def test_jina_processor_api_failure(self, mock_requests_post):
+    @patch("app.utils.content_processors.fetch")
+    def test_jina_processor_api_failure(self, mock_fetch):
         """Test JinaProcessor handles API failures gracefully."""
         # Mock settings
         with patch("app.utils.content_processors.settings") as mock_settings:
@@ -426,10 +749,10 @@ class TestJinaProcessor:
             # Mock failed Jina API response
             mock_response = Mock()
             mock_response.status_code = 401
-            mock_response.raise_for_status.side_effect = requests.exceptions.HTTPError(
-                "401 Unauthorized"
+            mock_response.raise_for_status.side_effect = httpx.HTTPStatusError(
+                "401 Unauthorized", request=Mock(), response=Mock()
             )
-            mock_requests_post.return_value = mock_response
+            mock_fetch.return_value = mock_response
 
             processor = JinaProcessor()
             mock_session = Mock(spec=Session)
@@ -490,3 +813,39 @@ class TestJinaProcessor:
             assert result.success is False
             assert result.error_message is not None
             assert "Jina API key not configured" in result.error_message
+
+    @pytest.mark.asyncio
+    @patch("app.utils.content_processors.fetch_async", new_callable=AsyncMock)
+    async def test_jina_processor_aprocess_success(self, mock_fetch_async):
+        """Test JinaProcessor.aprocess fetches through the async client."""
+        with patch("app.utils.content_processors.settings") as mock_settings:
+            mock_settings.JINA_API_KEY = "test_api_key"
+            mock_settings.R2_BUCKET = "test-bucket"
+
+            mock_response = Mock()
+            mock_response.text = "# Async Article\n\nFetched without blocking."
+            mock_response.raise_for_status.return_value = None
+            mock_fetch_async.return_value = mock_response
+
+            processor = JinaProcessor()
+            content_item = ContentItem(
+                id=uuid.uuid4(),
+                user_id=uuid.uuid4(),
+                type="url",
+                source_uri="https://example.com",
+                processing_status="pending",
+            )
+            context = ProcessingContext(
+                content_item=content_item,
+                session=Mock(spec=Session),
+                user_id=content_item.user_id,
+                storage_service=Mock(),
+            )
+
+            result = await processor.aprocess(context, ProcessingResult(success=False))
+
+            assert result.success is True
+            assert result.markdown_content.startswith("# Async Article")
+            assert content_item.title == "Async Article"
+            mock_fetch_async.assert_awaited_once()
+            assert mock_fetch_async.call_args[0] == ("POST", "https://r.jina.ai/")
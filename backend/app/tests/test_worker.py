@@ -0,0 +1,241 @@
+"""
+Tests for the content processing worker.
+"""
+
+import asyncio
+import time
+import uuid
+from datetime import datetime
+from unittest.mock import AsyncMock, MagicMock, patch
+
+from app.models.content import ContentItem, ProcessingJob
+from app.utils.content_processors import ProcessingResult
+from app.worker import JobHeartbeat, ProcessingWorker
+
+
+def _make_job(
+    content_item_id: uuid.UUID, processor_name: str = "processing_pipeline"
+) -> ProcessingJob:
+    return ProcessingJob(
+        id=uuid.uuid4(),
+        content_item_id=content_item_id,
+        processor_name=processor_name,
+        status="in_progress",
+        started_at=datetime(2026, 1, 1, 12, 0),
+    )
+
+
+class TestProcessingWorker:
+    """Test job claiming and dispatch in ProcessingWorker."""
+
+    @patch("app.worker.Session")
+    @patch("app.worker.claim_next_processing_job", return_value=None)
+    def test_run_once_empty_queue(self, mock_claim, mock_session_cls):
+        """An empty queue returns False without touching the pipeline."""
+        worker = ProcessingWorker(db_engine=MagicMock(), concurrency=1)
+        pipeline = MagicMock()
+
+        assert asyncio.run(worker.run_once(pipeline)) is False
+        mock_claim.assert_called_once()
+        pipeline.aprocess.assert_not_called()
+
+    @patch("app.worker.Session")
+    @patch("app.worker.claim_next_processing_job")
+    def test_run_once_processes_claimed_job(self, mock_claim, mock_session_cls):
+        """A claimed job is run through the pipeline with the job passed along."""
+        content_item = ContentItem(
+            id=uuid.uuid4(), user_id=uuid.uuid4(), type="text", title="Queued"
+        )
+        job = _make_job(content_item.id)
+        mock_claim.return_value = job
+        session = mock_session_cls.return_value.__enter__.return_value
+        session.get.return_value = content_item
+
+        pipeline = MagicMock()
+        pipeline.aprocess = AsyncMock(return_value=ProcessingResult(success=True))
+
+        worker = ProcessingWorker(db_engine=MagicMock(), concurrency=1)
+        assert asyncio.run(worker.run_once(pipeline)) is True
+        pipeline.aprocess.assert_called_once_with(content_item, session, job=job)
+
+    @patch("app.worker.Session")
+    @patch("app.worker.claim_next_processing_job")
+    def test_run_once_missing_content_item_fails_job(
+        self, mock_claim, mock_session_cls
+    ):
+        """Jobs pointing at a deleted item are marked failed."""
+        job = _make_job(uuid.uuid4())
+        mock_claim.return_value = job
+        session = mock_session_cls.return_value.__enter__.return_value
+        session.get.return_value = None
+
+        pipeline = MagicMock()
+        worker = ProcessingWorker(db_engine=MagicMock(), concurrency=1)
+
+        assert asyncio.run(worker.run_once(pipeline)) is True
+        pipeline.aprocess.assert_not_called()
+        assert job.status == "failed"
+        assert job.completed_at is not None
+        session.commit.assert_called()
+
+    @patch("app.worker.ContentSummarizer")
+    @patch("app.worker.Session")
+    @patch("app.worker.claim_next_processing_job")
+    def test_run_once_summarizer_job(
+        self, mock_claim, mock_session_cls, mock_summarizer_cls
+    ):
+        """Summarizer jobs bypass the pipeline and are completed on success."""
+        content_item = ContentItem(
+            id=uuid.uuid4(), user_id=uuid.uuid4(), type="text", title="Queued"
+        )
+        job = _make_job(content_item.id, processor_name="summarizer")
+        mock_claim.return_value = job
+        session = mock_session_cls.return_value.__enter__.return_value
+        session.get.return_value = content_item
+        mock_summarizer_cls.return_value.summarize.return_value = 3
+
+        pipeline = MagicMock()
+        worker = ProcessingWorker(db_engine=MagicMock(), concurrency=1)
+
+        assert asyncio.run(worker.run_once(pipeline)) is True
+        pipeline.aprocess.assert_not_called()
+        mock_summarizer_cls.return_value.summarize.assert_called_once_with(
+            session, content_item
+        )
+        assert job.status == "completed"
+        assert job.completed_at is not None
+
+    @patch("app.worker.ContentSummarizer")
+    @patch("app.worker.Session")
+    @patch("app.worker.claim_next_processing_job")
+    def test_run_once_summarizer_job_failure(
+        self, mock_claim, mock_session_cls, mock_summarizer_cls
+    ):
+        content_item = ContentItem(id=uuid.uuid4(), user_id=uuid.uuid4(), type="text")
+        job = _make_job(content_item.id, processor_name="summarizer")
+        mock_claim.return_value = job
+        session = mock_session_cls.return_value.__enter__.return_value
+        session.get.return_value = content_item
+        mock_summarizer_cls.return_value.summarize.side_effect = RuntimeError("boom")
+
+        worker = ProcessingWorker(db_engine=MagicMock(), concurrency=1)
+
+        assert asyncio.run(worker.run_once(MagicMock())) is True
+        session.rollback.assert_called_once()
+        assert job.status == "failed"
+        assert job.error_message == "boom"
+
+    @patch("app.worker.Session")
+    @patch("app.worker.claim_next_processing_job", return_value=None)
+    def test_summary_slots_limit_summarizer_claims(self, mock_claim, _mock_session):
+        """Threads beyond the summary slots only ask for processing jobs."""
+        worker = ProcessingWorker(db_engine=MagicMock(), concurrency=2)
+        assert worker._summary_slots.acquire(blocking=False)
+
+        asyncio.run(worker.run_once(MagicMock()))
+        assert mock_claim.call_args.kwargs["job_names"] == ("processing_pipeline",)
+
+        worker._summary_slots.release()
+        asyncio.run(worker.run_once(MagicMock()))
+        assert mock_claim.call_args.kwargs["job_names"] == (
+            "processing_pipeline",
+            "summarizer",
+        )
+
+    @patch("app.worker.renew_processing_job_lease", return_value=True)
+    @patch("app.worker.Session")
+    @patch("app.worker.claim_next_processing_job")
+    def test_running_job_lease_is_renewed(
+        self, mock_claim, mock_session_cls, mock_renew
+    ):
+        """A long job keeps heartbeating so it is not re-claimed as stale."""
+        content_item = ContentItem(id=uuid.uuid4(), user_id=uuid.uuid4(), type="text")
+        job = _make_job(content_item.id)
+        mock_claim.return_value = job
+        session = mock_session_cls.return_value.__enter__.return_value
+        session.get.return_value = content_item
+
+        async def slow_job(*_args, **_kwargs):
+            await asyncio.sleep(0.2)
+
+        pipeline = MagicMock()
+        pipeline.aprocess = AsyncMock(side_effect=slow_job)
+        worker = ProcessingWorker(
+            db_engine=MagicMock(), concurrency=1, heartbeat_interval=0.02
+        )
+
+        assert asyncio.run(worker.run_once(pipeline)) is True
+        assert mock_renew.call_count >= 2
+        assert mock_renew.call_args.args[1:] == (job.id, job.started_at)
+
+        # Nothing renews the lease once the job has finished
+        calls = mock_renew.call_count
+        time.sleep(0.1)
+        assert mock_renew.call_count == calls
+
+    @patch("app.worker.Session")
+    @patch("app.worker.claim_next_processing_job")
+    def test_job_slots_share_one_event_loop(self, mock_claim, mock_session_cls):
+        """Jobs waiting on I/O do not hold a thread, so they overlap."""
+        content_item = ContentItem(id=uuid.uuid4(), user_id=uuid.uuid4(), type="url")
+        jobs = [_make_job(content_item.id) for _ in range(4)]
+        mock_claim.side_effect = [*jobs, None, None, None, None]
+        session = mock_session_cls.return_value.__enter__.return_value
+        session.get.return_value = content_item
+        running = 0
+        peak = 0
+
+        async def fetching_job(*_args, **_kwargs):
+            nonlocal running, peak
+            running += 1
+            peak = max(peak, running)
+            await asyncio.sleep(0.05)
+            running -= 1
+            return ProcessingResult(success=True)
+
+        worker = ProcessingWorker(
+            db_engine=MagicMock(), concurrency=4, poll_interval=0.01
+        )
+
+        async def run_until_drained():
+            task = asyncio.create_task(worker.run_jobs())
+            while mock_claim.call_count < 8:
+                await asyncio.sleep(0.01)
+            worker.stop_event.set()
+            await asyncio.wait_for(task, timeout=1)
+
+        with patch(
+            "app.worker.ProcessingPipeline",
+            return_value=MagicMock(aprocess=AsyncMock(side_effect=fetching_job)),
+        ):
+            asyncio.run(run_until_drained())
+
+        assert peak == 4
+
+    @patch("app.worker.renew_processing_job_lease", return_value=False)
+    @patch("app.worker.Session")
+    def test_heartbeat_stops_when_job_was_reclaimed(self, _mock_session, mock_renew):
+        job = _make_job(uuid.uuid4())
+
+        with JobHeartbeat(MagicMock(), job, interval=0.01):
+            time.sleep(0.1)
+        mock_renew.assert_called_once()
+
+    def test_concurrency_is_at_least_one(self):
+        """A non-positive concurrency still runs one job slot."""
+        worker = ProcessingWorker(db_engine=MagicMock(), concurrency=-3)
+        assert worker.concurrency == 1
+
+    @patch("app.worker.Session")
+    @patch("app.worker.clean_expired_tokens", return_value=3)
+    def test_maintenance_purges_expired_tokens(self, mock_clean, mock_session_cls):
+        """The maintenance thread purges the token blacklist until stopped."""
+        worker = ProcessingWorker(db_engine=MagicMock(), concurrency=1)
+        session = mock_session_cls.return_value.__enter__.return_value
+
+        assert worker.purge_expired_tokens() == 3
+        mock_clean.assert_called_once_with(session=session)
+
+        worker.stop_event.set()
+        worker._maintenance_loop()  # returns at once once stopped
+        assert mock_clean.call_count == 1
@@ -0,0 +1,120 @@
+"""
+Tests for map-reduce analysis over content chunks.
+"""
+
+import asyncio
+
+import pytest
+
+from app.utils.chunk_analysis import MapReduceAnalysis, group_texts
+
+
+def _analysis(texts, group_chars=10, concurrency=2):
+    return MapReduceAnalysis(
+        model="m",
+        system_prompt="Summarise",
+        chunk_texts=texts,
+        group_chars=group_chars,
+        concurrency=concurrency,
+        map_max_tokens=100,
+    )
+
+
+def test_group_texts_respects_budget():
+    assert group_texts(["aaa", "bbb", "cccc", "d"], 8) == ["aaa\n\nbbb", "cccc\n\nd"]
+    assert group_texts(["x" * 20, "y"], 8) == ["x" * 20, "y"]
+    assert group_texts([], 8) == []
+
+
+def test_map_payloads_are_deterministic():
+    analysis = _analysis(["aaaa", "bbbb", "cccc"], group_chars=10)
+
+    payloads = analysis.map_payloads()
+
+    assert len(payloads) == 2
+    assert all(p["temperature"] == 0 and p["max_tokens"] == 100 for p in payloads)
+    assert "part 1 of 2" in payloads[0]["messages"][0]["content"]
+    assert "Summarise" in payloads[0]["messages"][0]["content"]
+    assert payloads[1]["messages"][1]["content"] == "cccc"
+
+
+@pytest.mark.asyncio
+async def test_run_bounds_concurrency_and_keeps_order():
+    analysis = _analysis([f"part{i}" for i in range(6)], group_chars=5, concurrency=2)
+    running = 0
+    peak = 0
+
+    async def complete(payload):
+        nonlocal running, peak
+        running += 1
+        peak = max(peak, running)
+        text = payload["messages"][1]["content"]
+        await asyncio.sleep(0.01 if text.endswith("0") else 0)
+        running -= 1
+        return f"n{text[-1]}"
+
+    progress = [p async for p in analysis.run(complete)]
+
+    assert peak == 2
+    assert progress == [(i, 6) for i in range(1, 7)]
+    assert analysis.notes == [f"n{i}" for i in range(6)]
+
+
+@pytest.mark.asyncio
+async def test_long_notes_are_collapsed():
+    analysis = _analysis(["a" * 10] * 4, group_chars=10, concurrency=4)
+    calls = []
+
+    async def complete(payload):
+        calls.append(payload["messages"][0]["content"])
+        return "n" * 4
+
+    progress = [p async for p in analysis.run(complete)]
+
+    # 4 map calls, then the notes (4 x 4 chars) are merged in 2 calls
+    assert [total for _, total in progress] == [4] * 4 + [2] * 2
+    assert "Merge them" in calls[-1]
+    assert len(analysis.notes) == 2
+
+
+@pytest.mark.asyncio
+async def test_failure_cancels_remaining_parts():
+    analysis = _analysis(["a" * 10] * 3, group_chars=10, concurrency=3)
+    cancelled = []
+
+    async def complete(payload):
+        if payload["messages"][0]["content"].startswith("You are reading part 1"):
+            raise RuntimeError("upstream error")
+        try:
+            await asyncio.sleep(10)
+        except asyncio.CancelledError:
+            cancelled.append(True)
+            raise
+        return ""
+
+    with pytest.raises(RuntimeError):
+        async for _ in analysis.run(complete):
+            pass
+    await asyncio.sleep(0)
+
+    assert len(cancelled) == 2
+
+
+def test_reduce_payload_replaces_document_with_notes():
+    analysis = _analysis(["a"])
+    analysis.notes = ["first", "second"]
+    base = {
+        "model": "m",
+        "messages": [
+            {"role": "system", "content": "Summarise"},
+            {"role": "user", "content": "the whole document"},
+        ],
+        "stream": True,
+    }
+
+    payload = analysis.reduce_payload(base)
+
+    assert payload["stream"] is True
+    assert payload["messages"][0] == base["messages"][0]
+    assert "the whole document" not in payload["messages"][1]["content"]
+    assert "[Part 2]\nsecond" in payload["messages"][1]["content"]
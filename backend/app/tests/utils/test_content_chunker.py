@@ -0,0 +1,476 @@
+"""
+Tests for the single-pass ContentChunker.
+
+The reference implementation below is the original multi-pass chunker. The
+rewrite must produce exactly the same chunks, so it is kept here as an oracle.
+"""
+
+import random
+import re
+import time
+import tracemalloc
+import uuid
+from collections.abc import Iterator
+
+import pytest
+
+from app.utils.content_chunker import (
+    ChunkInfo,
+    ContentChunker,
+    chunk_content_for_item,
+    iter_content_chunks_for_item,
+)
+
+
+class ReferenceChunker:
+    """The original multi-pass chunker."""
+
+    def __init__(self, max_chunk_size: int = 3000, min_chunk_size: int = 100):
+        """
+        Initialize the content chunker.
+
+        Args:
+            max_chunk_size: Maximum characters per chunk
+            min_chunk_size: Minimum characters per chunk
+        """
+        self.max_chunk_size = max_chunk_size
+        self.min_chunk_size = min_chunk_size
+
+    def chunk_markdown_content(self, content: str) -> list[ChunkInfo]:
+        """
+        Split markdown content into chunks based on structure and size.
+
+        Args:
+            content: The markdown content to chunk
+
+        Returns:
+            List of ChunkInfo objects
+        """
+        if not content or not content.strip():
+            return []
+
+        chunks = []
+        current_index = 0
+
+        # First, try to split by headings
+        heading_chunks = self._split_by_headings(content)
+
+        for heading_chunk in heading_chunks:
+            # If a heading chunk is too large, split it further
+            if len(heading_chunk) > self.max_chunk_size:
+                sub_chunks = self._split_large_chunk(heading_chunk)
+                for sub_chunk in sub_chunks:
+                    chunk_info = self._create_chunk_info(
+                        sub_chunk, current_index, self._detect_chunk_type(sub_chunk)
+                    )
+                    chunks.append(chunk_info)
+                    current_index += 1
+            else:
+                chunk_info = self._create_chunk_info(
+                    heading_chunk, current_index, self._detect_chunk_type(heading_chunk)
+                )
+                chunks.append(chunk_info)
+                current_index += 1
+
+        return chunks
+
+    def _split_by_headings(self, content: str) -> list[str]:
+        """Split content by markdown headings while preserving structure."""
+        lines = content.split("\n")
+        chunks = []
+        current_chunk: list[str] = []
+        in_code_block = False
+        in_table = False
+        code_block_delimiter = None
+
+        for i, line in enumerate(lines):
+            # Track code block state
+            if line.strip().startswith("```"):
+                if not in_code_block:
+                    in_code_block = True
+                    code_block_delimiter = line.strip()
+                elif line.strip() == code_block_delimiter or line.strip() == "```":
+                    in_code_block = False
+                    code_block_delimiter = None
+
+            # Track table state (simple heuristic)
+            if "|" in line and not in_code_block:
+                in_table = True
+            elif in_table and line.strip() == "":
+                # Empty line might end table
+                next_line_has_table = False
+                if i + 1 < len(lines) and "|" in lines[i + 1]:
+                    next_line_has_table = True
+                if not next_line_has_table:
+                    in_table = False
+
+            # Check for heading
+            is_heading = re.match(r"^#{1,6}\s+", line) and not in_code_block
+
+            # Start new chunk on heading, but only if we're not in a special block
+            if is_heading and current_chunk and not in_code_block and not in_table:
+                chunk_content = "\n".join(current_chunk).strip()
+                if chunk_content:
+                    chunks.append(chunk_content)
+                current_chunk = [line]
+            else:
+                current_chunk.append(line)
+
+        # Add the last chunk
+        if current_chunk:
+            chunk_content = "\n".join(current_chunk).strip()
+            if chunk_content:
+                chunks.append(chunk_content)
+
+        return chunks
+
+    def _split_large_chunk(self, content: str) -> list[str]:
+        """Split a large chunk into smaller pieces while preserving markdown structure."""
+        # Don't split if it's a code block or table
+        if self._is_special_block(content):
+            return [content]
+
+        # First try to split by sub-headings within the chunk
+        sub_chunks = self._split_by_subheadings(content)
+        if len(sub_chunks) > 1:
+            final_chunks = []
+            for sub_chunk in sub_chunks:
+                if len(sub_chunk) > self.max_chunk_size:
+                    final_chunks.extend(self._split_by_paragraphs_safe(sub_chunk))
+                else:
+                    final_chunks.append(sub_chunk)
+            return final_chunks
+
+        # If no sub-headings, split by paragraphs safely
+        return self._split_by_paragraphs_safe(content)
+
+    def _is_special_block(self, content: str) -> bool:
+        """Check if content is a special block that shouldn't be split."""
+        content_stripped = content.strip()
+
+        # Code block
+        if content_stripped.startswith("```") and content_stripped.endswith("```"):
+            return True
+
+        # Table (simple check)
+        lines = content_stripped.split("\n")
+        table_lines = [line for line in lines if "|" in line]
+        if len(table_lines) > len(lines) * 0.5:  # More than half lines are table
+            return True
+
+        return False
+
+    def _split_by_subheadings(self, content: str) -> list[str]:
+        """Split content by sub-headings (lower level headings)."""
+        lines = content.split("\n")
+        chunks = []
+        current_chunk: list[str] = []
+        first_heading_level = None
+
+        for line in lines:
+            heading_match = re.match(r"^(#{1,6})\s+", line)
+
+            if heading_match:
+                heading_level = len(heading_match.group(1))
+
+                if first_heading_level is None:
+                    first_heading_level = heading_level
+                    current_chunk.append(line)
+                elif heading_level <= first_heading_level and current_chunk:
+                    # Same or higher level heading, start new chunk
+                    chunks.append("\n".join(current_chunk).strip())
+                    current_chunk = [line]
+                else:
+                    # Lower level heading, continue current chunk
+                    current_chunk.append(line)
+            else:
+                current_chunk.append(line)
+
+        # Add the last chunk
+        if current_chunk:
+            chunks.append("\n".join(current_chunk).strip())
+
+        # If we only got one chunk, return empty list to indicate no splitting
+        return chunks if len(chunks) > 1 else []
+
+    def _split_by_paragraphs_safe(self, content: str) -> list[str]:
+        """Split content by paragraphs while avoiding breaking special structures."""
+        paragraphs = content.split("\n\n")
+        chunks = []
+        current_chunk: list[str] = []
+        current_size = 0
+        in_special_block = False
+
+        for paragraph in paragraphs:
+            # Check if this paragraph starts or ends a special block
+            if "```" in paragraph:
+                in_special_block = not in_special_block
+
+            paragraph_size = len(paragraph)
+
+            # If we're in a special block, don't split
+            if in_special_block:
+                current_chunk.append(paragraph)
+                current_size += paragraph_size + 2
+            elif current_size + paragraph_size > self.max_chunk_size and current_chunk:
+                # Save current chunk and start new one
+                chunks.append("\n\n".join(current_chunk))
+                current_chunk = [paragraph]
+                current_size = paragraph_size
+            else:
+                current_chunk.append(paragraph)
+                current_size += paragraph_size + 2  # +2 for the \n\n
+
+        # Add the last chunk
+        if current_chunk:
+            chunks.append("\n\n".join(current_chunk))
+
+        return chunks
+
+    def _detect_chunk_type(self, content: str) -> str:
+        """Detect the type of content chunk."""
+        content_stripped = content.strip()
+
+        # Check for headings
+        if re.match(r"^#{1,6}\s+", content_stripped):
+            return "heading"
+
+        # Check for code blocks
+        if content_stripped.startswith("```") or "```" in content_stripped:
+            return "code_block"
+
+        # Check for tables
+        if "|" in content_stripped and re.search(r"\|.*\|", content_stripped):
+            return "table"
+
+        # Check for lists
+        if re.match(r"^[\s]*[-*+]\s+", content_stripped, re.MULTILINE) or re.match(
+            r"^[\s]*\d+\.\s+", content_stripped, re.MULTILINE
+        ):
+            return "list"
+
+        # Default to paragraph
+        return "paragraph"
+
+    def _create_chunk_info(
+        self, content: str, index: int, chunk_type: str
+    ) -> ChunkInfo:
+        """Create a ChunkInfo object from content."""
+        word_count = len(content.split())
+        char_count = len(content)
+
+        meta_info = {
+            "has_code": "```" in content,
+            "has_links": "[" in content and "](" in content,
+            "has_images": "![" in content,
+            "has_tables": "|" in content and re.search(r"\|.*\|", content) is not None,
+        }
+
+        return ChunkInfo(
+            content=content,
+            chunk_type=chunk_type,
+            index=index,
+            word_count=word_count,
+            char_count=char_count,
+            meta_info=meta_info,
+        )
+
+
+SAMPLE = """# Test Document
+
+This is a test document with multiple sections.
+
+## Section 1
+
+This is the first section with some content. It contains [a link](https://example.com).
+
+![image](https://example.com/a.png)
+
+## Section 2
+
+### Subsection 2.1
+
+```python
+# not a heading
+def example_code():
+    return True
+```
+
+## Section 3
+
+| Column 1 | Column 2 |
+|----------|----------|
+| Data 1   | Data 2   |
+
+- List item 1
+- List item 2
+
+1. First
+2. Second
+"""
+
+FRAGMENTS = [
+    "# Title",
+    "## Section",
+    "### Sub",
+    "#### Deep",
+    "####### Not a heading",
+    "#",
+    "#\t",
+    "   # Indented",
+    "",
+    "",
+    "",
+    "   ",
+    "\t",
+    "Plain paragraph text with several words in it.",
+    "Another line of prose, a bit longer than the first one to add some bulk.",
+    "A [link](https://example.com) and ![image](x.png).",
+    "[bracket only",
+    "```",
+    "```python",
+    "```js",
+    "code = 1  # inside code",
+    "| a | b |",
+    "|---|---|",
+    "lonely | pipe",
+    "- item",
+    "* item",
+    "+ item",
+    "1. numbered",
+    "-not a list",
+    "word " * 40,
+    "x" * 120,
+]
+
+
+def _random_document(rng: random.Random, lines: int) -> str:
+    doc = "\n".join(rng.choice(FRAGMENTS) for _ in range(lines))
+    if rng.random() < 0.3:
+        doc = rng.choice(["\n", "  \n", "\n\n"]) + doc
+    if rng.random() < 0.3:
+        doc += rng.choice(["\n", "  ", "\n\n\n"])
+    return doc
+
+
+def _as_tuples(chunks: list[ChunkInfo]) -> list[tuple]:
+    return [
+        (c.content, c.chunk_type, c.index, c.word_count, c.char_count, c.meta_info)
+        for c in chunks
+    ]
+
+
+class TestContentChunker:
+    """Test the single-pass chunker against the original implementation."""
+
+    @pytest.mark.parametrize("max_chunk_size", [40, 120, 300, 3000])
+    def test_sample_matches_reference(self, max_chunk_size):
+        """The sample document chunks identically at several sizes."""
+        new = ContentChunker(max_chunk_size=max_chunk_size)
+        old = ReferenceChunker(max_chunk_size=max_chunk_size)
+        assert _as_tuples(new.chunk_markdown_content(SAMPLE)) == _as_tuples(
+            old.chunk_markdown_content(SAMPLE)
+        )
+
+    @pytest.mark.parametrize("seed", range(40))
+    def test_random_documents_match_reference(self, seed):
+        """Randomised documents exercising fences, tables and blank runs match."""
+        rng = random.Random(seed)
+        max_chunk_size = rng.choice([30, 80, 200, 600])
+        new = ContentChunker(max_chunk_size=max_chunk_size)
+        old = ReferenceChunker(max_chunk_size=max_chunk_size)
+        for _ in range(25):
+            doc = _random_document(rng, rng.randint(1, 120))
+            assert _as_tuples(new.chunk_markdown_content(doc)) == _as_tuples(
+                old.chunk_markdown_content(doc)
+            ), doc
+
+    @pytest.mark.parametrize("content", ["", "   ", "\n\n\t\n"])
+    def test_empty_content(self, content):
+        """Empty or whitespace-only content yields no chunks."""
+        assert ContentChunker().chunk_markdown_content(content) == []
+
+    def test_chunk_types_and_meta(self):
+        """Chunk types and metadata flags are detected per chunk."""
+        chunks = ContentChunker(max_chunk_size=3000).chunk_markdown_content(SAMPLE)
+        types = [chunk.chunk_type for chunk in chunks]
+        assert types[0] == "heading"
+        assert "code_block" not in types  # Every section starts with a heading
+        section_1 = chunks[1]
+        assert section_1.meta_info == {
+            "has_code": False,
+            "has_links": True,
+            "has_images": True,
+            "has_tables": False,
+        }
+
+    def test_chunk_content_for_item(self):
+        """ContentChunk rows carry the chunk info and item id."""
+        item_id = uuid.uuid4()
+        rows = chunk_content_for_item(item_id, SAMPLE, max_chunk_size=120)
+        assert [row.chunk_index for row in rows] == list(range(len(rows)))
+        assert all(row.content_item_id == item_id for row in rows)
+
+    @pytest.mark.parametrize("seed", range(10))
+    def test_iter_chunks_matches_whole_document(self, seed):
+        """Streaming arbitrary block splits yields the same chunks."""
+        rng = random.Random(seed)
+        chunker = ContentChunker(max_chunk_size=rng.choice([30, 200, 600]))
+        doc = _random_document(rng, 200)
+        cuts = sorted(rng.sample(range(len(doc)), k=min(len(doc), 25)))
+        blocks = [doc[a:b] for a, b in zip([0, *cuts], [*cuts, len(doc)], strict=True)]
+
+        assert _as_tuples(list(chunker.iter_chunks(blocks))) == _as_tuples(
+            chunker.chunk_markdown_content(doc)
+        )
+
+    def test_iter_content_chunks_for_item(self):
+        """The streaming item helper yields the same rows as the list helper."""
+        item_id = uuid.uuid4()
+        streamed = iter_content_chunks_for_item(item_id, iter(SAMPLE), 120)
+        listed = chunk_content_for_item(item_id, SAMPLE, max_chunk_size=120)
+        assert isinstance(streamed, Iterator)
+        assert [row.chunk_content for row in streamed] == [
+            row.chunk_content for row in listed
+        ]
+
+    @pytest.mark.slow
+    def test_streaming_memory_is_bounded(self):
+        """Peak memory while streaming does not grow with document size."""
+        section = SAMPLE.replace("# Test Document", "## More")
+
+        def blocks(count: int) -> Iterator[str]:
+            for _ in range(count):
+                yield section
+
+        chunker = ContentChunker()
+        peaks = []
+        for count in (500, 2_000):  # roughly 0.25 MB and 1 MB of markdown
+            tracemalloc.start()
+            for _ in chunker.iter_chunks(blocks(count)):
+                pass
+            peaks.append(tracemalloc.get_traced_memory()[1])
+            tracemalloc.stop()
+
+        assert peaks[1] < peaks[0] * 1.5
+        assert peaks[1] < 256 * 1024
+
+    @pytest.mark.slow
+    def test_scales_linearly(self):
+        """Chunking time grows linearly with document size."""
+        rng = random.Random(0)
+        base = _random_document(rng, 20_000)  # ~1 MB
+        chunker = ContentChunker()
+
+        def best_of(doc: str) -> float:
+            timings = []
+            for _ in range(3):
+                started = time.perf_counter()
+                chunker.chunk_markdown_content(doc)
+                timings.append(time.perf_counter() - started)
+            return min(timings)
+
+        small = best_of(base)
+        large = best_of(base * 4)
+        # 4x the input should take about 4x the time; allow generous noise
+        assert large < small * 8
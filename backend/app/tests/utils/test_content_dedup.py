@@ -0,0 +1,30 @@
+from app.utils.content_dedup import canonicalize_url, compute_content_hash
+
+
+def test_canonicalize_url_equivalent_links() -> None:
+    variants = [
+        "https://Example.com/Article/?utm_source=x&b=2&a=1#comments",
+        "https://www.example.com:443/Article?a=1&b=2&fbclid=abc",
+        "HTTPS://example.com/Article?b=2&a=1",
+    ]
+    canonical = {canonicalize_url(url) for url in variants}
+    assert canonical == {"https://example.com/Article?a=1&b=2"}
+
+
+def test_canonicalize_url_keeps_meaningful_differences() -> None:
+    assert canonicalize_url("http://example.com/a") != canonicalize_url(
+        "https://example.com/a"
+    )
+    assert canonicalize_url("https://example.com:8443/a") == (
+        "https://example.com:8443/a"
+    )
+    assert canonicalize_url("https://example.com/a?id=1") != canonicalize_url(
+        "https://example.com/a?id=2"
+    )
+    assert canonicalize_url("https://example.com") == "https://example.com/"
+
+
+def test_compute_content_hash() -> None:
+    assert compute_content_hash("abc") == compute_content_hash(b"abc")
+    assert len(compute_content_hash(b"abc")) == 64
+    assert compute_content_hash(b"abc") != compute_content_hash(b"abd")
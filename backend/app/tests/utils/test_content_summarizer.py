@@ -0,0 +1,101 @@
+"""
+Tests for precomputed content summaries.
+"""
+
+import uuid
+from unittest.mock import Mock, patch
+
+import pytest
+
+from app.models.content import ContentItem
+from app.utils.content_summarizer import (
+    CHUNK_INSTRUCTIONS,
+    COLLAPSE_INSTRUCTIONS,
+    ITEM_INSTRUCTIONS,
+    ContentSummarizer,
+)
+
+
+def _fake_fetch(calls):
+    def fetch(_method, _url, json, **_kwargs):
+        instructions, text = (message["content"] for message in json["messages"])
+        calls.append((instructions, text))
+        response = Mock()
+        response.json.return_value = {
+            "choices": [{"message": {"content": f" sum({len(text)}) "}}]
+        }
+        return response
+
+    return fetch
+
+
+@patch("app.utils.content_summarizer.set_content_summaries")
+@patch("app.utils.content_summarizer.get_chunks_for_summary")
+@patch("app.utils.content_summarizer.fetch")
+def test_summarizes_long_chunks_and_item(mock_fetch, mock_chunks, mock_store):
+    calls: list[tuple[str, str]] = []
+    mock_fetch.side_effect = _fake_fetch(calls)
+    long_id, short_id, done_id = uuid.uuid4(), uuid.uuid4(), uuid.uuid4()
+    mock_chunks.return_value = [
+        (long_id, "x" * 50, None),
+        (short_id, "short", None),
+        (done_id, "y" * 50, "copied"),
+    ]
+    item = ContentItem(id=uuid.uuid4(), user_id=uuid.uuid4(), type="text")
+    session = Mock()
+
+    generated = ContentSummarizer(
+        model="m", min_chunk_chars=20, concurrency=2, group_chars=1000
+    ).summarize(session, item)
+
+    assert generated == 1
+    # Only the long chunk without a summary is sent; the rest stand as they are
+    assert calls[0] == (CHUNK_INSTRUCTIONS, "x" * 50)
+    assert calls[1] == (ITEM_INSTRUCTIONS, "sum(50)\n\nshort\n\ncopied")
+    assert len(calls) == 2
+    mock_store.assert_called_once_with(
+        session,
+        item.id,
+        summary=f"sum({len(calls[1][1])})",
+        chunk_summaries={long_id: "sum(50)"},
+    )
+    session.commit.assert_called_once()
+
+
+@patch("app.utils.content_summarizer.set_content_summaries")
+@patch("app.utils.content_summarizer.get_chunks_for_summary")
+@patch("app.utils.content_summarizer.fetch")
+def test_collapses_parts_that_do_not_fit(mock_fetch, mock_chunks, _mock_store):
+    calls: list[tuple[str, str]] = []
+    mock_fetch.side_effect = _fake_fetch(calls)
+    mock_chunks.return_value = [(uuid.uuid4(), "a" * 10, None) for _ in range(4)]
+    item = ContentItem(id=uuid.uuid4(), user_id=uuid.uuid4(), type="text")
+
+    ContentSummarizer(
+        model="m", min_chunk_chars=100, concurrency=1, group_chars=25
+    ).summarize(Mock(), item)
+
+    instructions = [call[0] for call in calls]
+    assert instructions == [
+        COLLAPSE_INSTRUCTIONS,
+        COLLAPSE_INSTRUCTIONS,
+        ITEM_INSTRUCTIONS,
+    ]
+
+
+@patch("app.utils.content_summarizer.set_content_summaries")
+@patch("app.utils.content_summarizer.get_chunks_for_summary", return_value=[])
+@patch("app.utils.content_summarizer.fetch")
+def test_nothing_to_summarize(mock_fetch, _mock_chunks, mock_store):
+    item = ContentItem(id=uuid.uuid4(), user_id=uuid.uuid4(), type="text")
+
+    assert ContentSummarizer(model="m").summarize(Mock(), item) == 0
+    mock_fetch.assert_not_called()
+    mock_store.assert_not_called()
+
+
+@patch("app.utils.content_summarizer.settings")
+def test_requires_a_model(mock_settings):
+    mock_settings.CONTENT_SUMMARY_MODEL = None
+    with pytest.raises(ValueError):
+        ContentSummarizer()
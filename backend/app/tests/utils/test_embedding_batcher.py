@@ -0,0 +1,167 @@
+"""
+Tests for the embeddings micro-batcher and its float32 vector cache.
+"""
+
+import asyncio
+from array import array
+
+import pytest
+
+from app.utils.embedding_batcher import EmbeddingBatcher, EmbeddingCache
+
+
+def _fake_send(calls: list[list[str]]):
+    async def send(_key, texts):
+        calls.append(list(texts))
+        await asyncio.sleep(0)
+        return {
+            "data": [
+                {"object": "embedding", "embedding": [float(len(t)), 0.5], "index": i}
+                for i, t in reversed(list(enumerate(texts)))
+            ],
+            "usage": {"prompt_tokens": sum(len(t) for t in texts)},
+        }
+
+    return send
+
+
+def _batcher(send, max_inputs: int = 100) -> EmbeddingBatcher:
+    return EmbeddingBatcher(
+        send, EmbeddingCache(100), window_seconds=0.01, max_inputs=max_inputs
+    )
+
+
+def test_cache_stores_float32():
+    cache = EmbeddingCache(2)
+    cache.set("m", "a", [0.1, 0.2])
+
+    stored = next(iter(cache._entries.values()))
+    assert isinstance(stored, array)
+    assert stored.typecode == "f"
+    assert cache.get("m", "a") == pytest.approx([0.1, 0.2])
+    assert cache.get("other-model", "a") is None
+
+
+def test_cache_is_scoped_to_the_api_key():
+    cache = EmbeddingCache(10)
+    cache.set("m", "a", [1.0], api_key="sk-paid")
+
+    assert cache.get("m", "a", api_key="sk-paid") == [1.0]
+    assert cache.get("m", "a", api_key="sk-other") is None
+    assert cache.get("m", "a") is None
+
+
+def test_cache_evicts_least_recently_used():
+    cache = EmbeddingCache(2)
+    cache.set("m", "a", [1.0])
+    cache.set("m", "b", [2.0])
+    cache.get("m", "a")
+    cache.set("m", "c", [3.0])
+
+    assert cache.get("m", "b") is None
+    assert cache.get("m", "a") == [1.0]
+    assert len(cache) == 2
+
+
+@pytest.mark.asyncio
+async def test_concurrent_requests_share_one_call():
+    calls: list[list[str]] = []
+    batcher = _batcher(_fake_send(calls))
+
+    first, second = await asyncio.gather(
+        batcher.embed("m", ["aa", "b"]),
+        batcher.embed("m", ["b", "cccc"]),
+    )
+
+    assert calls == [["aa", "b", "cccc"]]
+    assert first.embeddings == [[2.0, 0.5], [1.0, 0.5]]
+    assert second.embeddings == [[1.0, 0.5], [4.0, 0.5]]
+    assert first.prompt_tokens == 3
+    assert second.prompt_tokens == 5
+
+
+@pytest.mark.asyncio
+async def test_different_models_are_not_merged():
+    calls: list[list[str]] = []
+    batcher = _batcher(_fake_send(calls))
+
+    await asyncio.gather(batcher.embed("m1", ["a"]), batcher.embed("m2", ["a"]))
+
+    assert len(calls) == 2
+
+
+@pytest.mark.asyncio
+async def test_cached_texts_are_not_resent():
+    calls: list[list[str]] = []
+    batcher = _batcher(_fake_send(calls))
+
+    await batcher.embed("m", ["a", "bb"])
+    result = await batcher.embed("m", ["bb", "ccc", "a"])
+
+    assert calls == [["a", "bb"], ["ccc"]]
+    assert result.embeddings == [[2.0, 0.5], [3.0, 0.5], [1.0, 0.5]]
+    assert result.prompt_tokens == 3
+
+
+@pytest.mark.asyncio
+async def test_cached_texts_of_another_api_key_are_resent():
+    calls: list[list[str]] = []
+    batcher = _batcher(_fake_send(calls))
+
+    await batcher.embed("m", ["a"], api_key="sk-paid")
+    await batcher.embed("m", ["a"], api_key="sk-other")
+    await batcher.embed("m", ["a"])
+
+    assert calls == [["a"], ["a"], ["a"]]
+
+
+@pytest.mark.asyncio
+async def test_full_batch_is_sent_without_waiting():
+    calls: list[list[str]] = []
+    batcher = EmbeddingBatcher(
+        _fake_send(calls), EmbeddingCache(100), window_seconds=60, max_inputs=2
+    )
+
+    result = await asyncio.wait_for(batcher.embed("m", ["a", "b"]), timeout=1)
+
+    assert calls == [["a", "b"]]
+    assert len(result.embeddings) == 2
+
+
+@pytest.mark.asyncio
+async def test_upstream_error_reaches_every_caller():
+    async def send(_key, _texts):
+        raise RuntimeError("upstream down")
+
+    batcher = _batcher(send)
+
+    results = await asyncio.gather(
+        batcher.embed("m", ["a"]),
+        batcher.embed("m", ["b"]),
+        return_exceptions=True,
+    )
+
+    assert all(isinstance(r, RuntimeError) for r in results)
+    assert len(batcher.cache) == 0
+
+
+@pytest.mark.asyncio
+async def test_cancelled_send_cancels_every_caller():
+    started = asyncio.Event()
+
+    async def send(_key, _texts):
+        started.set()
+        await asyncio.sleep(60)
+
+    batcher = _batcher(send)
+    callers = asyncio.gather(
+        batcher.embed("m", ["a"]),
+        batcher.embed("m", ["b"]),
+        return_exceptions=True,
+    )
+    await asyncio.wait_for(started.wait(), timeout=1)
+    for task in batcher._sending:
+        task.cancel()
+
+    results = await asyncio.wait_for(callers, timeout=1)
+    assert all(isinstance(r, asyncio.CancelledError) for r in results)
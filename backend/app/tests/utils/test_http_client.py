@@ -0,0 +1,87 @@
+"""
+Tests for the shared outbound HTTP client layer.
+"""
+
+import asyncio
+
+import httpx
+import pytest
+
+from app.utils import http_client
+
+
+def test_sync_client_is_shared():
+    """Repeated calls reuse one pooled client until it is closed."""
+    client = http_client.get_http_client()
+    try:
+        assert http_client.get_http_client() is client
+    finally:
+        http_client.close_http_client()
+    assert http_client.get_http_client() is not client
+    http_client.close_http_client()
+
+
+def test_async_client_is_per_event_loop():
+    """Each event loop gets its own AsyncClient; calls within a loop share it."""
+
+    async def get_clients() -> tuple[httpx.AsyncClient, httpx.AsyncClient]:
+        first = http_client.get_async_http_client()
+        second = http_client.get_async_http_client()
+        await http_client.close_async_http_client()
+        return first, second
+
+    a1, a2 = asyncio.run(get_clients())
+    b1, _ = asyncio.run(get_clients())
+    assert a1 is a2
+    assert a1 is not b1
+
+
+@pytest.mark.asyncio
+async def test_fetch_async_bounds_concurrency_per_host(monkeypatch):
+    """No more than HTTP_MAX_CONNECTIONS_PER_HOST requests hit one host at once."""
+    monkeypatch.setattr(http_client.settings, "HTTP_MAX_CONNECTIONS_PER_HOST", 2)
+    in_flight: dict[str, int] = {}
+    peak: dict[str, int] = {}
+
+    async def handler(request: httpx.Request) -> httpx.Response:
+        host = request.url.host
+        in_flight[host] = in_flight.get(host, 0) + 1
+        peak[host] = max(peak.get(host, 0), in_flight[host])
+        await asyncio.sleep(0.01)
+        in_flight[host] -= 1
+        return httpx.Response(200, text=str(request.url))
+
+    state = http_client._get_loop_state()
+    await state.client.aclose()
+    state.client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+    state.host_slots.clear()
+    try:
+        responses = await asyncio.gather(
+            *[
+                http_client.fetch_async("GET", f"https://example.com/{i}")
+                for i in range(6)
+            ],
+            http_client.fetch_async("GET", "https://other.example.org/"),
+        )
+    finally:
+        await http_client.close_async_http_client()
+
+    assert all(r.status_code == 200 for r in responses)
+    assert peak == {"example.com": 2, "other.example.org": 1}
+    # Idle hosts do not keep a semaphore
+    assert state.host_slots == {}
+
+
+def test_fetch_forgets_idle_hosts(monkeypatch):
+    """The sync per-host semaphores are dropped once their requests finish."""
+    client = httpx.Client(transport=httpx.MockTransport(lambda _r: httpx.Response(200)))
+    monkeypatch.setattr(http_client, "get_http_client", lambda: client)
+
+    for i in range(5):
+        assert http_client.fetch("GET", f"https://host-{i}.example.com/").is_success
+        assert http_client._sync_host_slots == {}
+
+    with http_client._sync_host_slot("https://example.com/a"):
+        with http_client._sync_host_slot("https://example.com/b"):
+            assert http_client._sync_host_slots["https://example.com"].users == 2
+    assert http_client._sync_host_slots == {}
@@ -0,0 +1,142 @@
+"""
+Tests for the exact-match LLM completion cache.
+"""
+
+import json
+
+import pytest
+
+from app.utils import llm_cache
+from app.utils.llm_cache import (
+    LLMResponseCache,
+    StreamRecorder,
+    build_cache_key,
+    iter_sse_replay,
+    should_cache,
+)
+
+COMPLETION = {
+    "id": "chatcmpl-1",
+    "object": "chat.completion",
+    "created": 1700000000,
+    "model": "gpt-4o-mini",
+    "system_fingerprint": None,
+    "choices": [
+        {
+            "index": 0,
+            "message": {"role": "assistant", "content": "缓存 " + "x" * 150},
+            "finish_reason": "stop",
+        }
+    ],
+    "usage": {"prompt_tokens": 0, "completion_tokens": 0, "total_tokens": 0},
+}
+
+
+def _payload(**overrides):
+    payload = {
+        "model": "gpt-4o-mini",
+        "messages": [{"role": "user", "content": "Summarise"}],
+        "temperature": 0,
+    }
+    payload.update(overrides)
+    return payload
+
+
+def test_cache_key_ignores_transport_fields_and_key_order():
+    """Streaming, end user and key order do not change the key."""
+    base = build_cache_key(_payload())
+    reordered = dict(reversed(list(_payload().items())))
+
+    assert build_cache_key(reordered) == base
+    assert build_cache_key(_payload(stream=True, user="u")) == base
+    assert build_cache_key(_payload(temperature=0.5)) != base
+    assert (
+        build_cache_key(_payload(messages=[{"role": "user", "content": "x"}])) != base
+    )
+
+
+def test_cache_key_is_scoped_to_the_api_key():
+    """Responses paid for with one key are not served to other callers."""
+    keyed = build_cache_key(_payload(api_key="sk-1"))
+
+    assert keyed == build_cache_key(_payload(api_key="sk-1", stream=True))
+    assert keyed != build_cache_key(_payload(api_key="sk-2"))
+    assert keyed != build_cache_key(_payload())
+    assert build_cache_key(_payload(api_key=None)) == build_cache_key(_payload())
+
+
+def test_should_cache(monkeypatch):
+    """Only temperature 0 is cached unless the caller opts in or out."""
+    monkeypatch.setattr(llm_cache.settings, "LLM_CACHE_ENABLED", True)
+
+    assert should_cache(_payload())
+    assert not should_cache(_payload(temperature=0.7))
+    assert should_cache(_payload(temperature=0.7), cache=True)
+    assert not should_cache(_payload(), cache=False)
+
+    monkeypatch.setattr(llm_cache.settings, "LLM_CACHE_ENABLED", False)
+    assert not should_cache(_payload(), cache=True)
+
+
+@pytest.mark.asyncio
+async def test_memory_cache_evicts_least_recently_used():
+    cache = LLMResponseCache(max_entries=2, ttl_seconds=60)
+    await cache.set("a", {"n": 1})
+    await cache.set("b", {"n": 2})
+    assert await cache.get("a") == {"n": 1}  # "b" is now least recently used
+
+    await cache.set("c", {"n": 3})
+
+    assert await cache.get("b") is None
+    assert await cache.get("a") == {"n": 1}
+    assert await cache.get("c") == {"n": 3}
+
+
+@pytest.mark.asyncio
+async def test_memory_cache_expires_entries(monkeypatch):
+    cache = LLMResponseCache(max_entries=10, ttl_seconds=60)
+    now = 1_000_000.0
+    monkeypatch.setattr(llm_cache.time, "time", lambda: now)
+    await cache.set("a", {"n": 1})
+
+    now += 61
+
+    assert await cache.get("a") is None
+
+
+@pytest.mark.asyncio
+async def test_disk_tier_survives_memory_loss(tmp_path):
+    cache = LLMResponseCache(max_entries=10, ttl_seconds=60, directory=str(tmp_path))
+    key = build_cache_key(_payload())
+    await cache.set(key, COMPLETION)
+
+    cache.clear()
+
+    assert await cache.get(key) == COMPLETION
+    assert (tmp_path / key[:2] / f"{key}.json").exists()
+
+
+def test_recorded_stream_replays_as_sse():
+    """A replayed response records back to the same completion."""
+    events = list(iter_sse_replay(COMPLETION))
+    assert events[-1] == "data: [DONE]\n\n"
+    assert len(events) == 1 + 3 + 1 + 1  # role, three content deltas, finish, done
+
+    recorder = StreamRecorder()
+    # Feed across arbitrary boundaries, as network chunks arrive
+    stream = "".join(events)
+    for start in range(0, len(stream), 37):
+        recorder.feed(stream[start : start + 37])
+
+    assert recorder.response() == COMPLETION
+
+
+def test_recorder_rejects_incomplete_or_failed_streams():
+    unfinished = StreamRecorder()
+    unfinished.feed(next(iter_sse_replay(COMPLETION)))
+    assert unfinished.response() is None
+
+    failed = StreamRecorder()
+    failed.feed(f"data: {json.dumps({'error': {'message': 'boom'}})}\n\n")
+    failed.feed("data: [DONE]\n\n")
+    assert failed.response() is None
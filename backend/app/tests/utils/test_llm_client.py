@@ -0,0 +1,41 @@
+"""
+Tests for the shared LiteLLM proxy client.
+"""
+
+import asyncio
+
+import httpx
+
+from app.utils import llm_client
+
+
+def test_llm_client_is_shared_within_event_loop():
+    """Calls within a loop share one client; closing it starts a fresh one."""
+
+    async def get_clients() -> tuple[httpx.AsyncClient, httpx.AsyncClient, bool]:
+        first = llm_client.get_llm_client()
+        second = llm_client.get_llm_client()
+        await llm_client.close_llm_client()
+        return first, second, first.is_closed
+
+    a1, a2, closed = asyncio.run(get_clients())
+    b1, _, _ = asyncio.run(get_clients())
+    assert a1 is a2
+    assert closed
+    assert a1 is not b1
+
+
+def test_llm_client_uses_configured_pool(monkeypatch):
+    """Pool limits and timeouts come from settings."""
+    monkeypatch.setattr(llm_client.settings, "LLM_HTTP_MAX_CONNECTIONS", 7)
+    monkeypatch.setattr(llm_client.settings, "LLM_HTTP_CONNECT_TIMEOUT", 3.0)
+
+    async def get_client() -> httpx.AsyncClient:
+        client = llm_client.get_llm_client()
+        await llm_client.close_llm_client()
+        return client
+
+    client = asyncio.run(get_client())
+    pool = client._transport._pool  # type: ignore[attr-defined]
+    assert pool._max_connections == 7
+    assert client.timeout.connect == 3.0
@@ -0,0 +1,178 @@
+"""
+Tests for latency-aware routing and hedging of streamed completions.
+"""
+
+import asyncio
+import logging
+
+import httpx
+import pytest
+
+from app.utils.llm_router import ModelRouter, log_missing_models
+
+
+def _router(**kwargs) -> ModelRouter:
+    options = {"default_hedge_delay": 0.05, "min_hedge_delay": 0.01}
+    options.update(kwargs)
+    return ModelRouter(**options)
+
+
+class FakeModels:
+    """Streams ``chunks`` after a per-model delay; records opens and closes."""
+
+    def __init__(self, delays: dict[str, float], fail: set[str] = frozenset()):
+        self.delays = delays
+        self.fail = fail
+        self.opened: list[str] = []
+        self.closed: list[str] = []
+
+    async def open_stream(self, model: str):
+        self.opened.append(model)
+        try:
+            await asyncio.sleep(self.delays[model])
+            if model in self.fail:
+                raise RuntimeError(f"{model} is down")
+            for chunk in ("a", "b"):
+                yield f"{model}:{chunk}"
+        finally:
+            self.closed.append(model)
+
+
+async def _collect(router: ModelRouter, models: list[str], fake: FakeModels):
+    return [chunk async for chunk in router.stream(models, fake.open_stream)]
+
+
+@pytest.mark.asyncio
+async def test_fast_primary_is_not_hedged():
+    router = _router()
+    fake = FakeModels({"primary": 0.0, "backup": 0.0})
+
+    assert await _collect(router, ["primary", "backup"], fake) == [
+        "primary:a",
+        "primary:b",
+    ]
+    assert fake.opened == ["primary"]
+    assert router.ttft_quantile("primary", 0.5) is not None
+
+
+@pytest.mark.asyncio
+async def test_late_first_token_is_hedged_and_loser_cancelled():
+    router = _router()
+    fake = FakeModels({"slow": 1.0, "fast": 0.0})
+
+    chunks = await _collect(router, ["slow", "fast"], fake)
+
+    assert chunks == ["fast:a", "fast:b"]
+    assert fake.opened == ["slow", "fast"]
+    assert "slow" in fake.closed  # the losing request was cancelled
+    assert router.ttft_quantile("slow", 0.5) is None
+
+
+@pytest.mark.asyncio
+async def test_failure_falls_back_and_cools_down():
+    router = _router(failure_cooldown=60.0)
+    fake = FakeModels({"primary": 0.0, "backup": 0.0}, fail={"primary"})
+
+    assert await _collect(router, ["primary", "backup"], fake) == [
+        "backup:a",
+        "backup:b",
+    ]
+    assert router.cooling_down("primary")
+    assert router.order(["primary", "backup"]) == ["backup", "primary"]
+
+
+@pytest.mark.asyncio
+async def test_raises_when_every_model_fails():
+    router = _router()
+    fake = FakeModels({"a": 0.0, "b": 0.0}, fail={"a", "b"})
+
+    with pytest.raises(RuntimeError, match="b is down"):
+        await _collect(router, ["a", "b"], fake)
+
+
+@pytest.mark.asyncio
+async def test_hedge_delay_follows_observed_ttft():
+    router = _router(hedge_quantile=0.9, default_hedge_delay=2.0)
+    assert router.hedge_delay("m") == 2.0
+
+    for seconds in (0.1, 0.2, 0.3, 0.4, 1.0):
+        router.record_first_token("m", seconds)
+    assert router.hedge_delay("m") == 1.0
+    assert router.ttft_quantile("m", 0.5) == 0.3
+
+
+@pytest.mark.asyncio
+async def test_order_keeps_primary_and_prefers_faster_fallbacks():
+    router = _router()
+    router.record_first_token("primary", 5.0)
+    router.record_first_token("quick", 0.2)
+    router.record_first_token("slow", 1.0)
+
+    assert router.order(["primary", "unknown", "slow", "quick"]) == [
+        "primary",
+        "quick",
+        "slow",
+        "unknown",
+    ]
+
+
+@pytest.mark.asyncio
+async def test_hedging_can_be_disabled():
+    router = _router(hedge_enabled=False)
+    fake = FakeModels({"slow": 0.1, "fast": 0.0})
+
+    assert await _collect(router, ["slow", "fast"], fake) == ["slow:a", "slow:b"]
+    assert fake.opened == ["slow"]
+
+
+@pytest.mark.asyncio
+async def test_hedging_can_be_disabled_per_stream():
+    router = _router()
+    fake = FakeModels({"slow": 0.1, "fast": 0.0})
+
+    chunks = [
+        chunk
+        async for chunk in router.stream(
+            ["slow", "fast"], fake.open_stream, hedge=False
+        )
+    ]
+
+    assert chunks == ["slow:a", "slow:b"]
+    assert fake.opened == ["slow"]
+
+
+def _proxy_client(handler) -> httpx.AsyncClient:
+    return httpx.AsyncClient(transport=httpx.MockTransport(handler))
+
+
+def test_missing_models_are_logged(caplog):
+    """Configured names the proxy does not serve are reported once each."""
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        assert request.url.path == "/v1/models"
+        return httpx.Response(200, json={"data": [{"id": "main"}, {"id": "b"}]})
+
+    async def run() -> None:
+        async with _proxy_client(handler) as client:
+            await log_missing_models(client, ["main", "a", "b", "a"])
+
+    with caplog.at_level(logging.WARNING, logger="app.utils.llm_router"):
+        asyncio.run(run())
+
+    assert [r.getMessage() for r in caplog.records] == [
+        "Analysis models not served by the LiteLLM proxy: a"
+    ]
+
+
+def test_missing_models_check_survives_unreachable_proxy(caplog):
+    def handler(request: httpx.Request) -> httpx.Response:
+        raise httpx.ConnectError("connection refused", request=request)
+
+    async def run() -> None:
+        async with _proxy_client(handler) as client:
+            await log_missing_models(client, ["main"])
+
+    with caplog.at_level(logging.WARNING, logger="app.utils.llm_router"):
+        asyncio.run(run())
+
+    assert "Could not list LiteLLM proxy models" in caplog.text
@@ -0,0 +1,169 @@
+"""
+Tests for fair scheduling of LLM calls.
+"""
+
+import asyncio
+
+import pytest
+
+from app.utils.llm_scheduler import FairScheduler, QueueFullError
+
+
+def _scheduler(
+    max_concurrency=1, per_user=1, max_queued=10, queue_timeout=5.0
+) -> FairScheduler:
+    return FairScheduler(
+        max_concurrency=max_concurrency,
+        per_user_concurrency=per_user,
+        max_queued_per_user=max_queued,
+        queue_timeout=queue_timeout,
+    )
+
+
+@pytest.mark.asyncio
+async def test_grants_immediately_below_the_caps():
+    scheduler = _scheduler(max_concurrency=2, per_user=2)
+    first, second = scheduler.submit("a"), scheduler.submit("a")
+
+    assert first.granted and second.granted
+    assert scheduler.active == 2
+    first.release()
+    first.release()  # idempotent
+    assert scheduler.active == 1
+
+
+@pytest.mark.asyncio
+async def test_per_user_cap_leaves_room_for_others():
+    scheduler = _scheduler(max_concurrency=3, per_user=1)
+    heavy = scheduler.submit("heavy")
+    heavy_queued = scheduler.submit("heavy")
+    light = scheduler.submit("light")
+
+    assert heavy.granted
+    assert not heavy_queued.granted
+    assert light.granted
+
+    heavy.release()
+    assert heavy_queued.granted
+
+
+@pytest.mark.asyncio
+async def test_new_user_overtakes_a_long_queue():
+    scheduler = _scheduler(max_concurrency=1, per_user=1)
+    running = scheduler.submit("heavy")
+    backlog = [scheduler.submit("heavy") for _ in range(5)]
+    newcomer = scheduler.submit("light")
+
+    assert newcomer.position() == 2  # behind heavy's first queued request only
+    running.release()
+    assert backlog[0].granted
+    backlog[0].release()
+    assert newcomer.granted
+    assert [ticket.position() for ticket in backlog[1:]] == [1, 2, 3, 4]
+
+
+@pytest.mark.asyncio
+async def test_cost_weights_requests():
+    scheduler = _scheduler(max_concurrency=1, per_user=1)
+    running = scheduler.submit("x")
+    expensive = scheduler.submit("a", cost=5)
+    cheap = scheduler.submit("b")
+
+    assert cheap.position() < expensive.position()
+    running.release()
+    assert cheap.granted
+
+
+@pytest.mark.asyncio
+async def test_multi_slot_request_reserves_its_slots():
+    scheduler = _scheduler(max_concurrency=3, per_user=2)
+    scheduler.submit("x")
+    wide = scheduler.submit("a", slots=5)
+    narrow = scheduler.submit("b")
+
+    assert wide.slots == 2  # capped at the per-user limit
+    assert wide.granted
+    assert scheduler.active == 3
+    assert not narrow.granted
+
+    wide.release()
+    assert narrow.granted
+    assert scheduler.active == 2
+
+
+@pytest.mark.asyncio
+async def test_multi_slot_request_is_not_overtaken():
+    scheduler = _scheduler(max_concurrency=2, per_user=2)
+    running = scheduler.submit("x")
+    wide = scheduler.submit("a", slots=2)
+    narrow = scheduler.submit("b")
+
+    # One slot is free, but it is kept for the request queued first
+    assert not wide.granted and not narrow.granted
+    running.release()
+    assert wide.granted
+    wide.release()
+    assert narrow.granted
+
+
+@pytest.mark.asyncio
+async def test_queue_limit_per_user():
+    scheduler = _scheduler(max_concurrency=1, per_user=1, max_queued=1)
+    scheduler.submit("a")
+    scheduler.submit("a")
+
+    with pytest.raises(QueueFullError):
+        scheduler.submit("a")
+    assert scheduler.queued == 1
+    assert not scheduler.submit("b").granted  # other users may still queue
+
+
+@pytest.mark.asyncio
+async def test_positions_until_granted():
+    scheduler = _scheduler(max_concurrency=1, per_user=1)
+    first = scheduler.submit("a")
+    second = scheduler.submit("b")
+    third = scheduler.submit("c")
+
+    async def wait(ticket):
+        return [position async for position in ticket.positions()]
+
+    task = asyncio.create_task(wait(third))
+    await asyncio.sleep(0.01)
+    first.release()
+    await asyncio.sleep(0.01)
+    second.release()
+
+    assert await asyncio.wait_for(task, 3) == [2, 1]
+    assert third.granted
+
+
+@pytest.mark.asyncio
+async def test_wait_timeout_gives_up_the_place():
+    scheduler = _scheduler(max_concurrency=1, per_user=1)
+    running = scheduler.submit("a")
+    queued = scheduler.submit("b")
+
+    with pytest.raises(TimeoutError):
+        await queued.wait(timeout=0.01)
+    assert scheduler.queued == 0
+
+    running.release()
+    assert scheduler.active == 0
+
+
+@pytest.mark.asyncio
+async def test_cancelled_waiter_leaves_the_queue():
+    scheduler = _scheduler(max_concurrency=1, per_user=1)
+    running = scheduler.submit("a")
+    queued = scheduler.submit("b")
+    behind = scheduler.submit("c")
+
+    task = asyncio.create_task(queued.wait())
+    await asyncio.sleep(0)
+    task.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await task
+
+    running.release()
+    assert behind.granted
@@ -0,0 +1,158 @@
+"""
+Tests for the MarkItDown process pool.
+"""
+
+import os
+import uuid
+from unittest.mock import AsyncMock, MagicMock, Mock, patch
+
+import pytest
+from sqlmodel import Session
+
+from app.models.content import ContentItem
+from app.utils.content_processors import (
+    MarkItDownProcessor,
+    ProcessingContext,
+    ProcessingResult,
+)
+from app.utils.markitdown_pool import ConversionOutput, MarkItDownPool
+
+
+@pytest.mark.slow
+def test_pool_converts_html_file(tmp_path):
+    """A real worker process converts a file with its warm MarkItDown instance."""
+    html_file = tmp_path / "page.html"
+    html_file.write_text(
+        "<html><head><title>Pool Page</title></head>"
+        "<body><h1>Heading</h1><p>Body text.</p></body></html>"
+    )
+
+    pool = MarkItDownPool(max_workers=1, task_timeout=120, memory_limit_mb=0)
+    try:
+        output = pool.convert(str(html_file))
+        # A second task reuses the same worker process
+        second = pool.convert(str(html_file))
+    finally:
+        pool.shutdown()
+
+    assert isinstance(output, ConversionOutput)
+    assert output.title == "Pool Page"
+    assert "Heading" in output.text_content
+    assert second.text_content == output.text_content
+
+
+def test_processor_disables_pool_with_llm_client():
+    """An LLM client cannot be pickled into workers, so the pool is bypassed."""
+    processor = MarkItDownProcessor(llm_client=MagicMock(), use_process_pool=True)
+    assert processor.use_process_pool is False
+
+
+@patch("app.utils.content_processors.get_markitdown_pool")
+@patch("app.utils.content_processors.fetch")
+def test_processor_url_conversion_uses_pool(mock_fetch, mock_get_pool):
+    """URL conversion goes through the pool when the pool mode is enabled."""
+    mock_fetch.return_value.text = "<html><body><p>Hello</p></body></html>"
+    mock_fetch.return_value.raise_for_status = Mock()
+    mock_get_pool.return_value.convert.return_value = ConversionOutput(
+        title="From Pool", text_content="# From Pool\n\nHello"
+    )
+
+    processor = MarkItDownProcessor(use_process_pool=True)
+    processor.markitdown = MagicMock()
+    content_item = ContentItem(
+        id=uuid.uuid4(),
+        user_id=uuid.uuid4(),
+        type="url",
+        source_uri="https://example.com/article",
+    )
+    context = ProcessingContext(
+        content_item=content_item,
+        session=Mock(spec=Session),
+        user_id=content_item.user_id,
+        storage_service=Mock(),
+    )
+
+    result = processor.process(context, ProcessingResult(success=False))
+
+    assert result.success is True
+    assert result.markdown_content == "# From Pool\n\nHello"
+    assert content_item.title == "From Pool"
+    mock_get_pool.return_value.convert.assert_called_once()
+    processor.markitdown.convert.assert_not_called()
+
+
+def _file_context(storage: Mock) -> ProcessingContext:
+    content_item = ContentItem(id=uuid.uuid4(), user_id=uuid.uuid4(), type="pdf")
+    session = Mock(spec=Session)
+    session.exec.return_value.first.return_value = Mock(
+        file_path=f"raw/{content_item.id}/report.pdf"
+    )
+    return ProcessingContext(
+        content_item=content_item,
+        session=session,
+        user_id=content_item.user_id,
+        storage_service=storage,
+    )
+
+
+@patch("app.utils.content_processors.get_markitdown_pool")
+def test_processor_file_conversion_uses_pool(mock_get_pool):
+    """Uploaded files are downloaded and converted in the pool."""
+    converted_paths = []
+
+    def convert(path):
+        converted_paths.append(path)
+        with open(path, "rb") as f:
+            assert f.read() == b"%PDF-1.7"
+        return ConversionOutput(title="Report", text_content="# Report")
+
+    mock_get_pool.return_value.convert.side_effect = convert
+    storage = Mock()
+    storage.download_file.return_value = b"%PDF-1.7"
+    context = _file_context(storage)
+
+    processor = MarkItDownProcessor(use_process_pool=True)
+    processor.markitdown = MagicMock()
+    result = processor.process(context, ProcessingResult(success=False))
+
+    assert result.success is True
+    assert result.markdown_content == "# Report"
+    assert result.metadata["content_type"] == "pdf"
+    assert context.content_item.title == "Report"
+    storage.download_file.assert_called_once_with(
+        f"raw/{context.content_item.id}/report.pdf"
+    )
+    # MarkItDown picks the converter from the extension; the copy is removed
+    assert converted_paths[0].endswith(".pdf")
+    assert not os.path.exists(converted_paths[0])
+    processor.markitdown.convert.assert_not_called()
+
+
+@pytest.mark.asyncio
+@patch("app.utils.content_processors.get_markitdown_pool")
+async def test_processor_file_conversion_is_awaited_in_pool(mock_get_pool):
+    """The async path awaits the pool instead of blocking a thread on it."""
+    mock_get_pool.return_value.convert_async = AsyncMock(
+        return_value=ConversionOutput(title=None, text_content="# Slides")
+    )
+    storage = Mock()
+    storage.download_file.return_value = b"PK"
+    context = _file_context(storage)
+
+    processor = MarkItDownProcessor(use_process_pool=True)
+    result = await processor.aprocess(context, ProcessingResult(success=False))
+
+    assert result.success is True
+    assert result.markdown_content == "# Slides"
+    mock_get_pool.return_value.convert_async.assert_awaited_once()
+    mock_get_pool.return_value.convert.assert_not_called()
+
+
+def test_processor_file_without_upload_fails():
+    context = _file_context(Mock())
+    context.session.exec.return_value.first.return_value = None
+
+    result = MarkItDownProcessor().process(context, ProcessingResult(success=False))
+
+    assert result.success is False
+    assert "No uploaded file" in result.error_message
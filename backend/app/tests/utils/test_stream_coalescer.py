@@ -0,0 +1,110 @@
+"""
+Tests for singleflight coalescing of identical streams.
+"""
+
+import asyncio
+from collections.abc import AsyncIterator
+
+import pytest
+
+from app.utils.stream_coalescer import StreamCoalescer
+
+
+class Upstream:
+    """A controllable upstream stream that counts how often it is opened."""
+
+    def __init__(self, chunks: list[str], fail: bool = False) -> None:
+        self.chunks = chunks
+        self.fail = fail
+        self.opened = 0
+        self.closed = False
+        self.release = asyncio.Event()
+
+    async def stream(self) -> AsyncIterator[str]:
+        self.opened += 1
+        try:
+            for i, chunk in enumerate(self.chunks):
+                if i == 1:
+                    # Hold after the first chunk so others can join mid-stream
+                    await self.release.wait()
+                yield chunk
+            if self.fail:
+                raise RuntimeError("upstream broke")
+        finally:
+            self.closed = True
+
+
+async def collect(stream: AsyncIterator[str]) -> list[str]:
+    return [chunk async for chunk in stream]
+
+
+@pytest.mark.asyncio
+async def test_concurrent_subscribers_share_one_upstream():
+    coalescer = StreamCoalescer()
+    upstream = Upstream(["a", "b", "c"])
+
+    first = asyncio.create_task(collect(coalescer.subscribe("k", upstream.stream)))
+    await asyncio.sleep(0.01)  # "a" has been emitted
+    late = asyncio.create_task(collect(coalescer.subscribe("k", upstream.stream)))
+    await asyncio.sleep(0.01)
+    upstream.release.set()
+
+    assert await first == ["a", "b", "c"]
+    assert await late == ["a", "b", "c"]  # includes chunks emitted before joining
+    assert upstream.opened == 1
+    assert not coalescer.in_flight("k")
+
+
+@pytest.mark.asyncio
+async def test_finished_flight_is_not_reused():
+    coalescer = StreamCoalescer()
+    upstream = Upstream(["a", "b"])
+    upstream.release.set()
+
+    await collect(coalescer.subscribe("k", upstream.stream))
+    await collect(coalescer.subscribe("k", upstream.stream))
+
+    assert upstream.opened == 2
+
+
+@pytest.mark.asyncio
+async def test_subscriber_leaving_does_not_cut_others_short():
+    coalescer = StreamCoalescer()
+    upstream = Upstream(["a", "b", "c"])
+
+    leaver = coalescer.subscribe("k", upstream.stream)
+    assert await leaver.__anext__() == "a"
+    stayer = asyncio.create_task(collect(coalescer.subscribe("k", upstream.stream)))
+    await asyncio.sleep(0.01)
+    await leaver.aclose()
+    upstream.release.set()
+
+    assert await stayer == ["a", "b", "c"]
+
+
+@pytest.mark.asyncio
+async def test_upstream_cancelled_when_last_subscriber_leaves():
+    coalescer = StreamCoalescer()
+    upstream = Upstream(["a", "b"])
+
+    stream = coalescer.subscribe("k", upstream.stream)
+    assert await stream.__anext__() == "a"
+    await stream.aclose()
+    await asyncio.sleep(0.01)
+
+    assert upstream.closed
+    assert not coalescer.in_flight("k")
+
+
+@pytest.mark.asyncio
+async def test_upstream_error_reaches_every_subscriber():
+    coalescer = StreamCoalescer()
+    upstream = Upstream(["a", "b"], fail=True)
+    upstream.release.set()
+
+    received: list[str] = []
+    with pytest.raises(RuntimeError, match="upstream broke"):
+        async for chunk in coalescer.subscribe("k", upstream.stream):
+            received.append(chunk)
+
+    assert received == ["a", "b"]
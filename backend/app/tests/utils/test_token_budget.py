@@ -0,0 +1,88 @@
+"""
+Tests for token counting and context budgeting.
+"""
+
+from unittest.mock import patch
+
+import pytest
+
+from app.utils import token_budget
+from app.utils.token_budget import (
+    ContextBudgetError,
+    chars_per_token,
+    check_context_budget,
+    context_window,
+    count_message_tokens,
+    count_tokens,
+    trim_to_tokens,
+)
+
+
+@pytest.fixture(autouse=True)
+def estimated_counts():
+    """Use the built-in estimate so results do not depend on tiktoken."""
+    with patch.object(token_budget, "_get_encoding", return_value=None):
+        yield
+
+
+def test_estimate_counts_cjk_characters_individually():
+    assert count_tokens("") == 0
+    assert count_tokens("abcdefgh") == 2
+    assert count_tokens("abcde") == 2
+    assert count_tokens("内容分析") == 4
+    assert count_tokens("内容 abcd") == 2 + 2
+
+
+def test_message_tokens_include_overhead():
+    messages = [
+        {"role": "system", "content": "abcd"},
+        {"role": "user", "content": "abcdefgh"},
+    ]
+    assert count_message_tokens(messages) == (
+        token_budget.REPLY_PRIMING_TOKENS
+        + 2 * token_budget.MESSAGE_OVERHEAD_TOKENS
+        + 1
+        + 2
+    )
+
+
+@patch("app.utils.token_budget.settings")
+def test_context_window_lookup(mock_settings):
+    mock_settings.LLM_CONTEXT_WINDOWS = {"small": 100}
+    mock_settings.LLM_DEFAULT_CONTEXT_WINDOW = None
+    assert context_window("small") == 100
+    assert context_window("unknown") is None
+
+    mock_settings.LLM_DEFAULT_CONTEXT_WINDOW = 4096
+    assert context_window("unknown") == 4096
+
+
+@patch("app.utils.token_budget.settings")
+def test_check_context_budget(mock_settings):
+    mock_settings.LLM_CONTEXT_WINDOWS = {"small": 100}
+    mock_settings.LLM_DEFAULT_CONTEXT_WINDOW = None
+    mock_settings.LLM_CONTEXT_SAFETY_MARGIN = 10
+    fits = [{"role": "user", "content": "a" * 200}]  # 50 + 7 tokens
+
+    assert check_context_budget("small", fits, max_tokens=30) == 57
+    with pytest.raises(ContextBudgetError) as exc_info:
+        check_context_budget("small", fits, max_tokens=40)
+    assert exc_info.value.context_window == 100
+    # Unknown windows are not checked
+    assert check_context_budget("unknown", fits * 100, max_tokens=10**6) > 0
+
+
+def test_trim_to_tokens_keeps_the_start():
+    text = "abcd" * 10 + "内容" * 10
+    trimmed = trim_to_tokens(text, 12)
+
+    assert text.startswith(trimmed)
+    assert count_tokens(trimmed) <= 12
+    assert count_tokens(text[: len(trimmed) + 1]) > 12
+    assert trim_to_tokens(text, 1000) == text
+    assert trim_to_tokens(text, 0) == ""
+
+
+def test_chars_per_token():
+    assert chars_per_token(400, [50, 50]) == 4.0
+    assert chars_per_token(400, [None, None]) == token_budget.FALLBACK_CHARS_PER_TOKEN
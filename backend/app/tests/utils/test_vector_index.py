@@ -0,0 +1,97 @@
+"""
+Tests for the memory-mapped per-user vector index.
+"""
+
+import uuid
+
+import numpy as np
+import pytest
+
+from app.utils.vector_index import VectorIndex, pack_vector, unpack_vectors
+
+
+@pytest.fixture
+def index(tmp_path):
+    return VectorIndex(str(tmp_path / "user"))
+
+
+def test_pack_roundtrip():
+    blobs = [pack_vector([1.0, 2.0, 3.0]), pack_vector([0.5, 0.25, 0.0])]
+
+    assert len(blobs[0]) == 12
+    assert unpack_vectors(blobs).tolist() == [[1.0, 2.0, 3.0], [0.5, 0.25, 0.0]]
+    assert unpack_vectors([]).shape == (0, 0)
+
+
+def test_empty_index(index):
+    assert not index.exists()
+    assert len(index) == 0
+    assert index.search([1.0, 0.0], k=5) == []
+
+
+def test_search_ranks_by_cosine_similarity(index):
+    ids = [uuid.uuid4() for _ in range(3)]
+    index.append("m", ids, [[1.0, 0.0], [0.0, 2.0], [3.0, 3.0]])
+
+    hits = index.search([1.0, 0.1], k=2)
+
+    assert [hit.chunk_id for hit in hits] == [ids[0], ids[2]]
+    assert hits[0].score == pytest.approx(0.995, abs=1e-3)
+    assert index.matches("m", 2)
+    assert not index.matches("other", 2)
+
+
+def test_append_is_seen_by_open_reader(tmp_path):
+    writer = VectorIndex(str(tmp_path / "user"))
+    reader = VectorIndex(str(tmp_path / "user"))
+    first, second = uuid.uuid4(), uuid.uuid4()
+
+    writer.append("m", [first], [[1.0, 0.0]])
+    assert [hit.chunk_id for hit in reader.search([0.0, 1.0], k=1)] == [first]
+
+    writer.append("m", [second], [[0.0, 1.0]])
+    assert len(reader) == 2
+    assert [hit.chunk_id for hit in reader.search([0.0, 1.0], k=1)] == [second]
+
+
+def test_append_rejects_other_model(index):
+    index.append("m", [uuid.uuid4()], [[1.0, 0.0]])
+
+    with pytest.raises(ValueError):
+        index.append("other", [uuid.uuid4()], [[1.0, 0.0]])
+    with pytest.raises(ValueError):
+        index.append("m", [uuid.uuid4()], [[1.0, 0.0, 0.0]])
+
+
+def test_rebuild_replaces_contents(index):
+    old = uuid.uuid4()
+    index.append("m", [old], [[1.0, 0.0]])
+    new = uuid.uuid4()
+
+    index.rebuild("m2", [new], np.array([[0.0, 1.0, 0.0]]), dimensions=3)
+
+    assert index.matches("m2", 3)
+    assert [hit.chunk_id for hit in index.search([0.0, 1.0, 0.0], k=5)] == [new]
+
+
+def test_duplicate_ids_take_one_slot(index):
+    repeated, other = uuid.uuid4(), uuid.uuid4()
+    index.append("m", [repeated], [[1.0, 0.0]])
+    index.append("m", [repeated, other], [[1.0, 0.0], [0.5, 0.5]])
+
+    hits = index.search([1.0, 0.0], k=2)
+
+    assert [hit.chunk_id for hit in hits] == [repeated, other]
+
+
+def test_torn_append_is_ignored(index):
+    ids = [uuid.uuid4(), uuid.uuid4()]
+    index.append("m", ids[:1], [[1.0, 0.0]])
+    # A writer died after writing its vector but before its id
+    with open(index._vectors_path(0), "ab") as f:
+        f.write(pack_vector([0.0, 1.0]))
+
+    assert len(index) == 1
+    index.append("m", ids[1:], [[0.0, 1.0]])
+    assert len(index) == 2
+    assert [hit.chunk_id for hit in index.search([0.0, 1.0], k=1)] == [ids[1]]
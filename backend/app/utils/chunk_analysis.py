@@ -0,0 +1,164 @@
+"""
+Map-reduce analysis of long content over its stored chunks.
+
+Sending a whole document in one completion overflows the model's context on
+long PDFs and makes the user wait for one very long prompt to be read. For
+large items the analyze endpoint instead:
+
+1. groups the item's ContentChunk rows, in reading order, into parts of at
+   most ``ANALYSIS_MAP_GROUP_CHARS`` characters;
+2. *maps*: asks the model for notes on each part, several parts at a time
+   (bounded by ``ANALYSIS_MAP_CONCURRENCY`` and by the scheduler slots the
+   analysis holds), at temperature 0 so the notes are cacheable;
+3. collapses the notes the same way while they are still too long to send
+   together, so documents of any size end in a single prompt;
+4. *reduces*: streams the final answer to the user's prompt from the notes.
+
+This module only builds payloads and schedules calls; sending a completion is
+left to the caller (``complete``), which owns the HTTP client and caching.
+"""
+
+import asyncio
+from collections.abc import AsyncIterator, Awaitable, Callable, Iterable
+from typing import Any
+
+MAP_INSTRUCTIONS = (
+    "You are reading part {index} of {total} of a longer document. The user's "
+    "task for the whole document is given below. Extract the facts, arguments "
+    "and quotes from this part that the task needs, as concise notes. Do not "
+    "answer the task yet.\n\nTask:\n{system_prompt}"
+)
+
+COLLAPSE_INSTRUCTIONS = (
+    "Below are notes taken from consecutive parts of a longer document for the "
+    "task given here. Merge them into one shorter set of notes, keeping every "
+    "detail the task needs.\n\nTask:\n{system_prompt}"
+)
+
+REDUCE_PREFIX = (
+    "The document was too long to read at once, so it was read in parts. "
+    "These are the notes taken from each part, in order:\n\n"
+)
+
+# Completes a non-streamed chat payload and returns the message content
+CompleteFn = Callable[[dict[str, Any]], Awaitable[str]]
+
+
+def group_texts(texts: Iterable[str], max_chars: int) -> list[str]:
+    """
+    Join consecutive texts into groups of at most ``max_chars`` characters.
+
+    A single text longer than ``max_chars`` forms a group on its own.
+    """
+    groups: list[str] = []
+    current: list[str] = []
+    size = 0
+    for text in texts:
+        if current and size + len(text) > max_chars:
+            groups.append("\n\n".join(current))
+            current, size = [], 0
+        current.append(text)
+        size += len(text) + 2
+    if current:
+        groups.append("\n\n".join(current))
+    return groups
+
+
+class MapReduceAnalysis:
+    """One map-reduce run over the chunk texts of a content item."""
+
+    def __init__(
+        self,
+        *,
+        model: str,
+        system_prompt: str,
+        chunk_texts: Iterable[str],
+        group_chars: int,
+        concurrency: int,
+        map_max_tokens: int,
+    ) -> None:
+        self.model = model
+        self.system_prompt = system_prompt
+        self.group_chars = group_chars
+        self.concurrency = max(1, concurrency)
+        self.map_max_tokens = map_max_tokens
+        self.groups = group_texts(chunk_texts, group_chars)
+        self.notes: list[str] = []
+
+    def _payload(self, instructions: str, text: str) -> dict[str, Any]:
+        return {
+            "model": self.model,
+            "messages": [
+                {"role": "system", "content": instructions},
+                {"role": "user", "content": text},
+            ],
+            "temperature": 0,
+            "max_tokens": self.map_max_tokens,
+        }
+
+    def map_payloads(self) -> list[dict[str, Any]]:
+        total = len(self.groups)
+        return [
+            self._payload(
+                MAP_INSTRUCTIONS.format(
+                    index=i + 1, total=total, system_prompt=self.system_prompt
+                ),
+                group,
+            )
+            for i, group in enumerate(self.groups)
+        ]
+
+    async def run(self, complete: CompleteFn) -> AsyncIterator[tuple[int, int]]:
+        """
+        Run the map (and collapse) rounds, yielding ``(done, total)`` progress.
+
+        The notes are in ``self.notes`` once the iterator is exhausted.
+        """
+        payloads = self.map_payloads()
+        while True:
+            results: list[str] = [""] * len(payloads)
+            async for done in self._run_round(payloads, results, complete):
+                yield done, len(payloads)
+            self.notes = results
+
+            groups = group_texts(self.notes, self.group_chars)
+            if len(groups) <= 1 or len(groups) >= len(self.notes):
+                # Fits in one prompt, or cannot be merged any further
+                return
+            instructions = COLLAPSE_INSTRUCTIONS.format(
+                system_prompt=self.system_prompt
+            )
+            payloads = [self._payload(instructions, group) for group in groups]
+
+    async def _run_round(
+        self,
+        payloads: list[dict[str, Any]],
+        results: list[str],
+        complete: CompleteFn,
+    ) -> AsyncIterator[int]:
+        semaphore = asyncio.Semaphore(self.concurrency)
+
+        async def run_one(i: int) -> None:
+            async with semaphore:
+                results[i] = await complete(payloads[i])
+
+        tasks = [asyncio.create_task(run_one(i)) for i in range(len(payloads))]
+        try:
+            for done, finished in enumerate(asyncio.as_completed(tasks), start=1):
+                await finished
+                yield done
+        finally:
+            # The client went away or a part failed: stop the remaining calls
+            for task in tasks:
+                task.cancel()
+
+    def reduce_payload(self, base_payload: dict[str, Any]) -> dict[str, Any]:
+        """The user's own request, with the document replaced by the notes."""
+        notes = "\n\n".join(
+            f"[Part {i + 1}]\n{note}" for i, note in enumerate(self.notes)
+        )
+        messages = [
+            message for message in base_payload["messages"] if message["role"] != "user"
+        ]
+        messages.append({"role": "user", "content": REDUCE_PREFIX + notes})
+        return {**base_payload, "messages": messages}
@@ -3,14 +3,28 @@ Content chunking utilities for efficient storage and rendering.
 
 This module provides algorithms to split markdown content into manageable chunks
 while preserving the structure and readability of the content.
+
+Chunk boundaries are found in a single sweep over the document's lines, with
+precompiled patterns, and chunks are yielded as soon as each heading section
+is complete, so documents can be streamed through ``iter_chunks`` in blocks.
+Only sections larger than ``max_chunk_size`` are tokenized further for
+sub-heading and paragraph splitting, and each final chunk is scanned exactly
+once for its type, counts and metadata.
 """
 
 import re
 import uuid
+from collections.abc import Iterable, Iterator
 from dataclasses import dataclass
 from typing import Any
 
 from app.models.content import ContentChunk
+from app.utils.token_budget import count_tokens
+
+HEADING_PATTERN = re.compile(r"(#{1,6})\s+")
+LIST_ITEM_PATTERN = re.compile(r"\s*(?:[-*+]|\d+\.)\s+")
+PIPE_PAIR_PATTERN = re.compile(r"\|.*\|")
+CODE_FENCE = "```"
 
 
 @dataclass
@@ -23,6 +37,59 @@ class ChunkInfo:
     word_count: int
     char_count: int
     meta_info: dict[str, Any] | None = None
+    token_count: int | None = None
+
+
+class _Line:
+    """A line of an oversized section, with what sub-splitting needs to know."""
+
+    __slots__ = (
+        "start",
+        "end",
+        "lead",
+        "rstrip_len",
+        "heading_level",
+        "is_empty",
+        "is_blank",
+        "has_pipe",
+        "has_code",
+    )
+
+    def __init__(self, text: str, start: int) -> None:
+        rstripped = text.rstrip()
+        heading = HEADING_PATTERN.match(text) if text[:1] == "#" else None
+
+        self.start = start
+        self.end = start + len(text)
+        self.lead = len(rstripped) - len(rstripped.lstrip())
+        self.rstrip_len = len(rstripped)
+        self.heading_level = len(heading.group(1)) if heading else 0
+        self.is_empty = not text
+        self.is_blank = not rstripped
+        self.has_pipe = "|" in text
+        self.has_code = CODE_FENCE in text
+
+
+def _is_blank(text: str) -> bool:
+    return not text or text.isspace()
+
+
+def _iter_lines(blocks: Iterable[str]) -> Iterator[str]:
+    """Yield the lines of ``"".join(blocks).split("\\n")`` without joining."""
+    carry: list[str] = []
+    for block in blocks:
+        position = 0
+        while (newline := block.find("\n", position)) >= 0:
+            if carry:
+                carry.append(block[position:newline])
+                yield "".join(carry)
+                carry = []
+            else:
+                yield block[position:newline]
+            position = newline + 1
+        if position < len(block):
+            carry.append(block[position:])
+    yield "".join(carry)
 
 
 class ContentChunker:
@@ -43,241 +110,307 @@ class ContentChunker:
         """
         Split markdown content into chunks based on structure and size.
 
+        The document is split at headings (outside code blocks and tables);
+        sections larger than ``max_chunk_size`` are split again at sub-headings
+        and then at paragraph breaks, never inside a code block.
+
         Args:
             content: The markdown content to chunk
 
         Returns:
             List of ChunkInfo objects
         """
-        if not content or not content.strip():
+        if not content or content.isspace():
             return []
+        return list(self.iter_chunks([content]))
 
-        chunks = []
-        current_index = 0
-
-        # First, try to split by headings
-        heading_chunks = self._split_by_headings(content)
-
-        for heading_chunk in heading_chunks:
-            # If a heading chunk is too large, split it further
-            if len(heading_chunk) > self.max_chunk_size:
-                sub_chunks = self._split_large_chunk(heading_chunk)
-                for sub_chunk in sub_chunks:
-                    chunk_info = self._create_chunk_info(
-                        sub_chunk, current_index, self._detect_chunk_type(sub_chunk)
-                    )
-                    chunks.append(chunk_info)
-                    current_index += 1
-            else:
-                chunk_info = self._create_chunk_info(
-                    heading_chunk, current_index, self._detect_chunk_type(heading_chunk)
-                )
-                chunks.append(chunk_info)
-                current_index += 1
-
-        return chunks
-
-    def _split_by_headings(self, content: str) -> list[str]:
-        """Split content by markdown headings while preserving structure."""
-        lines = content.split("\n")
-        chunks = []
-        current_chunk: list[str] = []
+    def iter_chunks(self, blocks: Iterable[str]) -> Iterator[ChunkInfo]:
+        """
+        Chunk markdown that arrives as text blocks, yielding chunks as it goes.
+
+        Blocks may break lines anywhere. Only the current heading section is
+        held in memory, so peak memory is bounded by the largest section rather
+        than by the document. The chunks are the same as those returned by
+        ``chunk_markdown_content("".join(blocks))``.
+
+        Args:
+            blocks: Iterable of markdown text fragments, in document order
+
+        Yields:
+            ChunkInfo objects, in order
+        """
+        index = 0
+        section: list[str] = []
         in_code_block = False
         in_table = False
         code_block_delimiter = None
 
-        for i, line in enumerate(lines):
+        lines = _iter_lines(blocks)
+        text: str | None = next(lines)
+        while text is not None:
+            next_text = next(lines, None)
+
             # Track code block state
-            if line.strip().startswith("```"):
-                if not in_code_block:
-                    in_code_block = True
-                    code_block_delimiter = line.strip()
-                elif line.strip() == code_block_delimiter or line.strip() == "```":
-                    in_code_block = False
-                    code_block_delimiter = None
-
-            # Track table state (simple heuristic)
-            if "|" in line and not in_code_block:
+            if CODE_FENCE in text:
+                stripped = text.strip()
+                if stripped.startswith(CODE_FENCE):
+                    if not in_code_block:
+                        in_code_block = True
+                        code_block_delimiter = stripped
+                    elif stripped == code_block_delimiter or stripped == CODE_FENCE:
+                        in_code_block = False
+                        code_block_delimiter = None
+
+            # Track table state; a blank line ends a table unless the table
+            # continues on the next line
+            if "|" in text and not in_code_block:
                 in_table = True
-            elif in_table and line.strip() == "":
-                # Empty line might end table
-                next_line_has_table = False
-                if i + 1 < len(lines) and "|" in lines[i + 1]:
-                    next_line_has_table = True
-                if not next_line_has_table:
+            elif in_table and _is_blank(text):
+                if next_text is None or "|" not in next_text:
                     in_table = False
 
-            # Check for heading
-            is_heading = re.match(r"^#{1,6}\s+", line) and not in_code_block
-
-            # Start new chunk on heading, but only if we're not in a special block
-            if is_heading and current_chunk and not in_code_block and not in_table:
-                chunk_content = "\n".join(current_chunk).strip()
-                if chunk_content:
-                    chunks.append(chunk_content)
-                current_chunk = [line]
+            # Start a new section on a heading outside special blocks
+            if (
+                section
+                and text[:1] == "#"
+                and not in_code_block
+                and not in_table
+                and HEADING_PATTERN.match(text)
+            ):
+                for piece in self._split_section(section):
+                    yield self._create_chunk_info(piece, index)
+                    index += 1
+                section = [text]
             else:
-                current_chunk.append(line)
-
-        # Add the last chunk
-        if current_chunk:
-            chunk_content = "\n".join(current_chunk).strip()
-            if chunk_content:
-                chunks.append(chunk_content)
-
-        return chunks
+                section.append(text)
+
+            text = next_text
+
+        for piece in self._split_section(section):
+            yield self._create_chunk_info(piece, index)
+            index += 1
+
+    def _split_section(self, section: list[str]) -> list[str]:
+        """Return the chunk texts for one heading section's lines."""
+        # Strip the section: drop blank lines at both ends, then trim the
+        # remaining outer lines
+        first, last = 0, len(section) - 1
+        while first <= last and _is_blank(section[first]):
+            first += 1
+        if first > last:
+            return []
+        while _is_blank(section[last]):
+            last -= 1
+
+        texts = section[first : last + 1]
+        content = "\n".join(texts)
+        start = len(texts[0]) - len(texts[0].lstrip())
+        end = len(content) - (len(texts[-1]) - len(texts[-1].rstrip()))
+
+        if end - start <= self.max_chunk_size:
+            return [content[start:end]]
+
+        lines = []
+        offset = 0
+        for text in texts:
+            lines.append(_Line(text, offset))
+            offset += len(text) + 1
+        return [
+            content[piece[0].start : piece[-1].end]
+            for piece in self._split_large_section(content, self._trim(content, lines))
+        ]
+
+    def _trim(self, content: str, lines: list[_Line]) -> list[_Line]:
+        """Return the lines of ``"\\n".join(lines).strip()``."""
+        first = 0
+        while first < len(lines) and lines[first].is_blank:
+            first += 1
+        if first == len(lines):
+            return []
+        last = len(lines) - 1
+        while lines[last].is_blank:
+            last -= 1
+
+        trimmed = lines[first : last + 1]
+        head, tail = trimmed[0], trimmed[-1]
+        if head is tail:
+            trimmed[0] = _Line(
+                content[head.start + head.lead : head.start + head.rstrip_len],
+                head.start + head.lead,
+            )
+            return trimmed
+        if head.lead:
+            trimmed[0] = _Line(
+                content[head.start + head.lead : head.end], head.start + head.lead
+            )
+        if tail.rstrip_len != tail.end - tail.start:
+            trimmed[-1] = _Line(
+                content[tail.start : tail.start + tail.rstrip_len], tail.start
+            )
+        return trimmed
 
-    def _split_large_chunk(self, content: str) -> list[str]:
-        """Split a large chunk into smaller pieces while preserving markdown structure."""
+    def _split_large_section(
+        self, content: str, lines: list[_Line]
+    ) -> list[list[_Line]]:
+        """Split an oversized section while preserving markdown structure."""
         # Don't split if it's a code block or table
-        if self._is_special_block(content):
-            return [content]
-
-        # First try to split by sub-headings within the chunk
-        sub_chunks = self._split_by_subheadings(content)
-        if len(sub_chunks) > 1:
-            final_chunks = []
-            for sub_chunk in sub_chunks:
-                if len(sub_chunk) > self.max_chunk_size:
-                    final_chunks.extend(self._split_by_paragraphs_safe(sub_chunk))
+        if self._is_special_block(content, lines):
+            return [lines]
+
+        # First try to split by sub-headings within the section
+        sub_sections = self._split_by_subheadings(content, lines)
+        if len(sub_sections) > 1:
+            pieces = []
+            for sub_section in sub_sections:
+                if sub_section[-1].end - sub_section[0].start > self.max_chunk_size:
+                    pieces.extend(self._split_by_paragraphs(sub_section))
                 else:
-                    final_chunks.append(sub_chunk)
-            return final_chunks
+                    pieces.append(sub_section)
+            return pieces
 
-        # If no sub-headings, split by paragraphs safely
-        return self._split_by_paragraphs_safe(content)
+        # If no sub-headings, split by paragraphs
+        return self._split_by_paragraphs(lines)
 
-    def _is_special_block(self, content: str) -> bool:
-        """Check if content is a special block that shouldn't be split."""
-        content_stripped = content.strip()
+    def _is_special_block(self, content: str, lines: list[_Line]) -> bool:
+        """Check if trimmed lines form a block that shouldn't be split."""
+        start, end = lines[0].start, lines[-1].end
 
         # Code block
-        if content_stripped.startswith("```") and content_stripped.endswith("```"):
-            return True
-
-        # Table (simple check)
-        lines = content_stripped.split("\n")
-        table_lines = [line for line in lines if "|" in line]
-        if len(table_lines) > len(lines) * 0.5:  # More than half lines are table
+        if content.startswith(CODE_FENCE, start, end) and content.endswith(
+            CODE_FENCE, start, end
+        ):
             return True
 
-        return False
-
-    def _split_by_subheadings(self, content: str) -> list[str]:
-        """Split content by sub-headings (lower level headings)."""
-        lines = content.split("\n")
-        chunks = []
-        current_chunk: list[str] = []
-        first_heading_level = None
+        # Table: more than half of the lines contain a pipe
+        table_lines = sum(1 for line in lines if line.has_pipe)
+        return table_lines * 2 > len(lines)
 
-        for line in lines:
-            heading_match = re.match(r"^(#{1,6})\s+", line)
+    def _split_by_subheadings(
+        self, content: str, lines: list[_Line]
+    ) -> list[list[_Line]]:
+        """Split at headings of the same or higher level than the first one."""
+        sub_sections = []
+        current_start = 0
+        first_heading_level = 0
 
-            if heading_match:
-                heading_level = len(heading_match.group(1))
-
-                if first_heading_level is None:
-                    first_heading_level = heading_level
-                    current_chunk.append(line)
-                elif heading_level <= first_heading_level and current_chunk:
-                    # Same or higher level heading, start new chunk
-                    chunks.append("\n".join(current_chunk).strip())
-                    current_chunk = [line]
-                else:
-                    # Lower level heading, continue current chunk
-                    current_chunk.append(line)
-            else:
-                current_chunk.append(line)
-
-        # Add the last chunk
-        if current_chunk:
-            chunks.append("\n".join(current_chunk).strip())
-
-        # If we only got one chunk, return empty list to indicate no splitting
-        return chunks if len(chunks) > 1 else []
-
-    def _split_by_paragraphs_safe(self, content: str) -> list[str]:
-        """Split content by paragraphs while avoiding breaking special structures."""
-        paragraphs = content.split("\n\n")
-        chunks = []
-        current_chunk: list[str] = []
+        for i, line in enumerate(lines):
+            if not line.heading_level:
+                continue
+            if not first_heading_level:
+                first_heading_level = line.heading_level
+            elif line.heading_level <= first_heading_level:
+                sub_sections.append(self._trim(content, lines[current_start:i]))
+                current_start = i
+        sub_sections.append(self._trim(content, lines[current_start:]))
+
+        # A single sub-section means there is nothing to split
+        return sub_sections if len(sub_sections) > 1 else []
+
+    def _split_by_paragraphs(self, lines: list[_Line]) -> list[list[_Line]]:
+        """Group paragraphs up to max_chunk_size without breaking code blocks.
+
+        Paragraphs are the pieces of ``text.split("\\n\\n")``: a separator is an
+        empty line that is neither the first line of a paragraph nor the last
+        line of the text.
+        """
+        pieces = []
+        chunk_start: int | None = None
+        chunk_end = 0
         current_size = 0
         in_special_block = False
 
-        for paragraph in paragraphs:
-            # Check if this paragraph starts or ends a special block
-            if "```" in paragraph:
-                in_special_block = not in_special_block
+        paragraph_start = 0
+        last = len(lines) - 1
+        for i in range(len(lines) + 1):
+            if i <= last and not (
+                i > paragraph_start and i < last and lines[i].is_empty
+            ):
+                continue
 
-            paragraph_size = len(paragraph)
+            paragraph_size = lines[i - 1].end - lines[paragraph_start].start
+            if any(line.has_code for line in lines[paragraph_start:i]):
+                in_special_block = not in_special_block
 
-            # If we're in a special block, don't split
-            if in_special_block:
-                current_chunk.append(paragraph)
-                current_size += paragraph_size + 2
-            elif current_size + paragraph_size > self.max_chunk_size and current_chunk:
-                # Save current chunk and start new one
-                chunks.append("\n\n".join(current_chunk))
-                current_chunk = [paragraph]
+            if (
+                not in_special_block
+                and chunk_start is not None
+                and current_size + paragraph_size > self.max_chunk_size
+            ):
+                pieces.append(lines[chunk_start:chunk_end])
+                chunk_start = paragraph_start
                 current_size = paragraph_size
             else:
-                current_chunk.append(paragraph)
+                if chunk_start is None:
+                    chunk_start = paragraph_start
                 current_size += paragraph_size + 2  # +2 for the \n\n
+            chunk_end = i
+            paragraph_start = i + 1
 
-        # Add the last chunk
-        if current_chunk:
-            chunks.append("\n\n".join(current_chunk))
+        if chunk_start is not None:
+            pieces.append(lines[chunk_start:chunk_end])
 
-        return chunks
+        return pieces
 
-    def _detect_chunk_type(self, content: str) -> str:
-        """Detect the type of content chunk."""
-        content_stripped = content.strip()
-
-        # Check for headings
-        if re.match(r"^#{1,6}\s+", content_stripped):
-            return "heading"
-
-        # Check for code blocks
-        if content_stripped.startswith("```") or "```" in content_stripped:
-            return "code_block"
-
-        # Check for tables
-        if "|" in content_stripped and re.search(r"\|.*\|", content_stripped):
-            return "table"
-
-        # Check for lists
-        if re.match(r"^[\s]*[-*+]\s+", content_stripped, re.MULTILINE) or re.match(
-            r"^[\s]*\d+\.\s+", content_stripped, re.MULTILINE
-        ):
-            return "list"
-
-        # Default to paragraph
-        return "paragraph"
-
-    def _create_chunk_info(
-        self, content: str, index: int, chunk_type: str
-    ) -> ChunkInfo:
+    def _create_chunk_info(self, content: str, index: int) -> ChunkInfo:
         """Create a ChunkInfo object from content."""
-        word_count = len(content.split())
-        char_count = len(content)
-
-        meta_info = {
-            "has_code": "```" in content,
-            "has_links": "[" in content and "](" in content,
-            "has_images": "![" in content,
-            "has_tables": "|" in content and re.search(r"\|.*\|", content) is not None,
-        }
+        stripped = content
+        if content[:1].isspace() or content[-1:].isspace():
+            stripped = content.strip()
+
+        has_code = CODE_FENCE in content
+        has_tables = "|" in content and PIPE_PAIR_PATTERN.search(content) is not None
+
+        if HEADING_PATTERN.match(stripped):
+            chunk_type = "heading"
+        elif has_code:
+            chunk_type = "code_block"
+        elif has_tables:
+            chunk_type = "table"
+        elif LIST_ITEM_PATTERN.match(stripped):
+            chunk_type = "list"
+        else:
+            chunk_type = "paragraph"
 
         return ChunkInfo(
             content=content,
             chunk_type=chunk_type,
             index=index,
-            word_count=word_count,
-            char_count=char_count,
-            meta_info=meta_info,
+            word_count=len(content.split()),
+            char_count=len(content),
+            token_count=count_tokens(content),
+            meta_info={
+                "has_code": has_code,
+                "has_links": "[" in content and "](" in content,
+                "has_images": "![" in content,
+                "has_tables": has_tables,
+            },
         )
 
+    def iter_content_chunks(
+        self, content_item_id: uuid.UUID, blocks: Iterable[str]
+    ) -> Iterator[ContentChunk]:
+        """
+        Yield ContentChunk objects for markdown streamed in as text blocks.
+
+        Args:
+            content_item_id: The ID of the parent content item
+            blocks: Iterable of markdown text fragments, in document order
+
+        Yields:
+            ContentChunk objects ready for database insertion
+        """
+        for chunk_info in self.iter_chunks(blocks):
+            yield ContentChunk(
+                content_item_id=content_item_id,
+                chunk_index=chunk_info.index,
+                chunk_content=chunk_info.content,
+                chunk_type=chunk_info.chunk_type,
+                word_count=chunk_info.word_count,
+                char_count=chunk_info.char_count,
+                token_count=chunk_info.token_count,
+                meta_info=chunk_info.meta_info,
+            )
+
     def create_content_chunks(
         self, content_item_id: uuid.UUID, content: str
     ) -> list[ContentChunk]:
@@ -302,6 +435,7 @@ class ContentChunker:
                 chunk_type=chunk_info.chunk_type,
                 word_count=chunk_info.word_count,
                 char_count=chunk_info.char_count,
+                token_count=chunk_info.token_count,
                 meta_info=chunk_info.meta_info,
             )
             content_chunks.append(content_chunk)
@@ -325,3 +459,21 @@ def chunk_content_for_item(
     """
     chunker = ContentChunker(max_chunk_size=max_chunk_size)
     return chunker.create_content_chunks(content_item_id, content)
+
+
+def iter_content_chunks_for_item(
+    content_item_id: uuid.UUID, blocks: Iterable[str], max_chunk_size: int = 3000
+) -> Iterator[ContentChunk]:
+    """
+    Streaming variant of chunk_content_for_item.
+
+    Args:
+        content_item_id: The ID of the content item
+        blocks: Iterable of markdown text fragments, in document order
+        max_chunk_size: Maximum size per chunk
+
+    Returns:
+        Iterator of ContentChunk objects
+    """
+    chunker = ContentChunker(max_chunk_size=max_chunk_size)
+    return chunker.iter_content_chunks(content_item_id, blocks)
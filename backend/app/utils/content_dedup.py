@@ -0,0 +1,68 @@
+"""
+Helpers for recognising content that has already been ingested.
+
+Two keys are kept on ContentItem:
+
+* ``canonical_url`` - the source URL normalised so that trivially different
+  links to the same page (tracking parameters, fragments, host case, default
+  ports, parameter order) compare equal.
+* ``content_hash`` - SHA-256 of the raw uploaded bytes.
+"""
+
+import hashlib
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+# Query parameters that never change the page being served
+TRACKING_PARAMS = frozenset(
+    {
+        "fbclid",
+        "gclid",
+        "dclid",
+        "msclkid",
+        "mc_cid",
+        "mc_eid",
+        "igshid",
+        "spm",
+        "ref_src",
+        "_hsenc",
+        "_hsmi",
+    }
+)
+TRACKING_PREFIXES = ("utm_",)
+
+DEFAULT_PORTS = {"http": 80, "https": 443}
+
+
+def canonicalize_url(url: str) -> str:
+    """Return a normalised form of ``url`` suitable for equality lookups."""
+    parts = urlsplit(url.strip())
+    scheme = parts.scheme.lower()
+
+    hostname = (parts.hostname or "").lower()
+    if hostname.startswith("www."):
+        hostname = hostname[4:]
+    netloc = hostname
+    if parts.port and DEFAULT_PORTS.get(scheme) != parts.port:
+        netloc = f"{hostname}:{parts.port}"
+
+    path = parts.path or "/"
+    if len(path) > 1 and path.endswith("/"):
+        path = path.rstrip("/")
+
+    query = [
+        (key, value)
+        for key, value in parse_qsl(parts.query, keep_blank_values=True)
+        if key.lower() not in TRACKING_PARAMS
+        and not key.lower().startswith(TRACKING_PREFIXES)
+    ]
+    query.sort()
+
+    # Fragments are client-side only and dropped
+    return urlunsplit((scheme, netloc, path, urlencode(query), ""))
+
+
+def compute_content_hash(data: bytes | str) -> str:
+    """Return the hex SHA-256 digest of raw content."""
+    if isinstance(data, str):
+        data = data.encode("utf-8")
+    return hashlib.sha256(data).hexdigest()
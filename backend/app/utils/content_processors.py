@@ -8,24 +8,52 @@ This module provides a modern, extensible content processing system that:
 4. Provides extensibility for tools like jina.ai, TAVILY, etc.
 """
 
+import asyncio
 import json
 import os
 import tempfile
 import uuid
 from abc import ABC, abstractmethod
+from collections.abc import Iterable
 from dataclasses import dataclass
-from datetime import datetime
+from datetime import datetime, timedelta
 from io import BytesIO
 from typing import Any
 
-import requests
+import httpx
 from markitdown import MarkItDown
-from sqlmodel import Session
+from sqlmodel import Session, select
 
 from app.core.config import settings
-from app.models.content import ContentAsset, ContentItem, ProcessingJob
-from app.utils.content_chunker import chunk_content_for_item
+from app.crud.crud_content import (
+    SUMMARY_JOB_NAME,
+    bulk_create_content_chunks,
+    copy_processed_content,
+    create_chunk_embeddings,
+    enqueue_processing_job,
+    find_processed_duplicate,
+    get_chunk_embeddings,
+    get_chunks_without_embedding,
+    set_content_chunk_stats,
+)
+from app.models.content import (
+    ContentAsset,
+    ContentChunk,
+    ContentChunkEmbedding,
+    ContentItem,
+    ProcessingJob,
+)
+from app.utils.content_chunker import iter_content_chunks_for_item
+from app.utils.content_dedup import canonicalize_url, compute_content_hash
+from app.utils.http_client import fetch, fetch_async
+from app.utils.markitdown_pool import get_markitdown_pool
 from app.utils.storage import get_storage_service
+from app.utils.vector_index import (
+    get_user_vector_index,
+    pack_vector,
+    rebuild_user_vector_index,
+    unpack_vectors,
+)
 
 
 @dataclass
@@ -50,6 +78,47 @@ class ProcessingContext:
     temp_dir: str | None = None
 
 
+def store_content_chunks(
+    session: Session, content_item_id: uuid.UUID, blocks: Iterable[str]
+) -> int:
+    """Chunk streamed markdown and write the chunks to the database in batches.
+
+    Chunks are produced lazily and bulk-inserted every CONTENT_CHUNK_BATCH_SIZE
+    rows, so memory use does not grow with the size of the document. Word and
+    character totals are accumulated on the way and stored on the item, so
+    summaries never aggregate ContentChunk. The caller commits. Returns the
+    number of chunks written.
+    """
+    batch_size = max(1, settings.CONTENT_CHUNK_BATCH_SIZE)
+    batch: list[ContentChunk] = []
+    total = 0
+    word_count = 0
+    char_count = 0
+    token_count = 0
+
+    for chunk in iter_content_chunks_for_item(content_item_id, blocks):
+        batch.append(chunk)
+        word_count += chunk.word_count
+        char_count += chunk.char_count
+        token_count += chunk.token_count or 0
+        if len(batch) >= batch_size:
+            total += bulk_create_content_chunks(session, batch)
+            batch = []
+
+    if batch:
+        total += bulk_create_content_chunks(session, batch)
+
+    set_content_chunk_stats(
+        session,
+        content_item_id,
+        chunk_count=total,
+        word_count=word_count,
+        char_count=char_count,
+        token_count=token_count,
+    )
+    return total
+
+
 class ProcessingStep(ABC):
     """Abstract base class for processing steps in the pipeline."""
 
@@ -65,6 +134,86 @@ class ProcessingStep(ABC):
         """Check if this step can handle the given content type."""
         pass
 
+    async def aprocess(
+        self, context: ProcessingContext, result: ProcessingResult
+    ) -> ProcessingResult:
+        """Async variant of process().
+
+        The default runs process() in a worker thread. Steps that spend their
+        time on network I/O override this with a natively async version.
+        """
+        return await asyncio.to_thread(self.process, context, result)
+
+
+class DeduplicationStep(ProcessingStep):
+    """Reuse the output of an already-processed item with the same source.
+
+    URL items are matched on their canonical URL, as long as the earlier
+    fetch is no older than ``settings.CONTENT_DEDUP_MAX_AGE``; uploaded files
+    on the SHA-256 of their raw asset. Text items are not matched because their
+    markdown embeds per-item metadata (title, creation time).
+    """
+
+    def can_handle(self, content_type: str) -> bool:
+        return True
+
+    def process(
+        self, context: ProcessingContext, result: ProcessingResult
+    ) -> ProcessingResult:
+        content_item = context.content_item
+        self._assign_keys(context)
+
+        source = find_processed_duplicate(
+            context.session,
+            content_item,
+            url_max_age=timedelta(seconds=settings.CONTENT_DEDUP_MAX_AGE),
+        )
+        if source is None:
+            return result
+
+        print(f"♻️ 复用已处理内容: {source.id} -> {content_item.id}")
+        assets = copy_processed_content(
+            context.session, source=source, target=content_item
+        )
+
+        metadata = source.meta_info
+        if isinstance(metadata, str):
+            metadata = json.loads(metadata)
+        result.success = True
+        result.markdown_content = source.content_text
+        result.metadata = {**(metadata or {}), "deduplicated_from": str(source.id)}
+        result.assets_created = assets
+        return result
+
+    def _assign_keys(self, context: ProcessingContext) -> None:
+        """Fill in canonical_url / content_hash if they are not set yet."""
+        content_item = context.content_item
+
+        if (
+            content_item.type == "url"
+            and content_item.source_uri
+            and not content_item.canonical_url
+        ):
+            content_item.canonical_url = canonicalize_url(content_item.source_uri)
+
+        if content_item.type not in ("url", "text") and not content_item.content_hash:
+            raw_asset = context.session.exec(
+                select(ContentAsset).where(
+                    ContentAsset.content_item_id == content_item.id,
+                    ContentAsset.type == "raw",
+                )
+            ).first()
+            if raw_asset and raw_asset.file_path:
+                try:
+                    raw_bytes = context.storage_service.download_file(
+                        raw_asset.file_path
+                    )
+                    content_item.content_hash = compute_content_hash(raw_bytes)
+                except Exception as e:
+                    print(f"⚠️ 无法计算原始文件哈希: {str(e)}")
+
+        context.session.add(content_item)
+
 
 class JinaProcessor(ProcessingStep):
     """Processor using Jina AI for URL content extraction."""
@@ -78,6 +227,17 @@ class JinaProcessor(ProcessingStep):
         """Jina can handle URL content when API key is available."""
         return content_type == "url" and bool(self.api_key)
 
+    def _request_kwargs(self, content_item: ContentItem) -> dict[str, Any]:
+        """Build the Jina AI request for a content item."""
+        return {
+            "headers": {
+                "Authorization": f"Bearer {self.api_key}",
+                "Content-Type": "application/json",
+            },
+            "json": {"url": content_item.source_uri},
+            "timeout": 60,  # Jina might take longer than regular requests
+        }
+
     def process(
         self, context: ProcessingContext, result: ProcessingResult
     ) -> ProcessingResult:
@@ -87,67 +247,45 @@ class JinaProcessor(ProcessingStep):
             result.error_message = "Jina API key not configured"
             return result
 
-        content_item = context.content_item
-
         try:
-            # Prepare request to Jina AI
-            headers = {
-                "Authorization": f"Bearer {self.api_key}",
-                "Content-Type": "application/json",
-            }
-
-            payload = {"url": content_item.source_uri}
-
-            # Make request to Jina AI
-            response = requests.post(
-                self.api_url,
-                headers=headers,
-                json=payload,
-                timeout=60,  # Jina might take longer than regular requests
+            response = fetch(
+                "POST", self.api_url, **self._request_kwargs(context.content_item)
             )
             response.raise_for_status()
 
             # Jina returns markdown content directly
-            markdown_content = response.text
+            return self._handle_markdown(context, result, response.text)
 
-            # Extract title from markdown if not set
-            if not content_item.title:
-                lines = markdown_content.split("\n")
-                for line in lines:
-                    if line.startswith("# "):
-                        content_item.title = line[2:].strip()
-                        break
+        except httpx.HTTPError as e:
+            result.success = False
+            result.error_message = f"Jina API request failed: {str(e)}"
+        except Exception as e:
+            result.success = False
+            result.error_message = f"Jina processing failed: {str(e)}"
 
-                # Fallback to URL hostname if no title found
-                if not content_item.title:
-                    from urllib.parse import urlparse
+        return result
 
-                    parsed_url = urlparse(content_item.source_uri)
-                    hostname = parsed_url.hostname
-                    if hostname:
-                        # Ensure hostname is a string, not bytes
-                        if isinstance(hostname, bytes):
-                            hostname = hostname.decode("utf-8", errors="ignore")
-                        content_item.title = f"网页内容 - {hostname}"
-                    else:
-                        content_item.title = "网页内容 - 未知网站"
+    async def aprocess(
+        self, context: ProcessingContext, result: ProcessingResult
+    ) -> ProcessingResult:
+        """Process URL content using Jina AI without blocking on the request."""
+        if not self.api_key:
+            result.success = False
+            result.error_message = "Jina API key not configured"
+            return result
 
-            result.success = True
-            result.markdown_content = markdown_content
-            result.metadata = {
-                "source_url": content_item.source_uri,
-                "processed_at": datetime.utcnow().isoformat(),
-                "processor": "jina",
-                "content_type": "url",
-            }
+        try:
+            response = await fetch_async(
+                "POST", self.api_url, **self._request_kwargs(context.content_item)
+            )
+            response.raise_for_status()
 
-            # Store processed markdown to R2
-            markdown_path = self._store_markdown_to_r2(
-                context, result.markdown_content, result.metadata
+            # Storage and chunking are blocking; keep them off the event loop
+            return await asyncio.to_thread(
+                self._handle_markdown, context, result, response.text
             )
-            result.assets_created = [markdown_path]
 
-        except requests.exceptions.RequestException as e:
+        except httpx.HTTPError as e:
             result.success = False
             result.error_message = f"Jina API request failed: {str(e)}"
         except Exception as e:
@@ -156,6 +294,54 @@ class JinaProcessor(ProcessingStep):
 
         return result
 
+    def _handle_markdown(
+        self,
+        context: ProcessingContext,
+        result: ProcessingResult,
+        markdown_content: str,
+    ) -> ProcessingResult:
+        """Fill in the title and result from Jina's markdown and store it."""
+        content_item = context.content_item
+
+        # Extract title from markdown if not set
+        if not content_item.title:
+            lines = markdown_content.split("\n")
+            for line in lines:
+                if line.startswith("# "):
+                    content_item.title = line[2:].strip()
+                    break
+
+            # Fallback to URL hostname if no title found
+            if not content_item.title:
+                from urllib.parse import urlparse
+
+                parsed_url = urlparse(content_item.source_uri)
+                hostname = parsed_url.hostname
+                if hostname:
+                    # Ensure hostname is a string, not bytes
+                    if isinstance(hostname, bytes):
+                        hostname = hostname.decode("utf-8", errors="ignore")
+                    content_item.title = f"网页内容 - {hostname}"
+                else:
+                    content_item.title = "网页内容 - 未知网站"
+
+        result.success = True
+        result.markdown_content = markdown_content
+        result.metadata = {
+            "source_url": content_item.source_uri,
+            "processed_at": datetime.utcnow().isoformat(),
+            "processor": "jina",
+            "content_type": "url",
+        }
+
+        # Store processed markdown to R2
+        markdown_path = self._store_markdown_to_r2(
+            context, result.markdown_content, result.metadata
+        )
+        result.assets_created = [markdown_path]
+
+        return result
+
     def _store_markdown_to_r2(
         self,
         context: ProcessingContext,
@@ -215,12 +401,10 @@ class JinaProcessor(ProcessingStep):
 
             # Store content chunks in database for efficient rendering
             print("🔄 正在创建内容分段...")
-            content_chunks = chunk_content_for_item(content_item.id, markdown_content)
-            print(f"✅ 创建了 {len(content_chunks)} 个内容分段")
-
-            # Add chunks to session
-            for chunk in content_chunks:
-                context.session.add(chunk)
+            chunk_count = store_content_chunks(
+                context.session, content_item.id, [markdown_content]
+            )
+            print(f"✅ 创建了 {chunk_count} 个内容分段")
 
             # Store the full markdown content in content_text for backward compatibility
             content_item.content_text = markdown_content
@@ -242,13 +426,40 @@ class JinaProcessor(ProcessingStep):
 class MarkItDownProcessor(ProcessingStep):
     """Core processor using Microsoft MarkItDown for file conversion."""
 
-    def __init__(self, llm_client: Any = None, llm_model: str = "gpt-4o") -> None:
-        """Initialize with optional LLM client for image processing."""
+    def __init__(
+        self,
+        llm_client: Any = None,
+        llm_model: str = "gpt-4o",
+        use_process_pool: bool | None = None,
+    ) -> None:
+        """Initialize with optional LLM client for image processing.
+
+        With ``use_process_pool`` (default: ``settings.MARKITDOWN_POOL_ENABLED``)
+        conversions run in the shared MarkItDown process pool. An LLM client
+        cannot be sent to worker processes, so it always forces in-process
+        conversion.
+        """
         if llm_client:
             self.markitdown = MarkItDown(llm_client=llm_client, llm_model=llm_model)
         else:
             self.markitdown = MarkItDown()
 
+        if use_process_pool is None:
+            use_process_pool = settings.MARKITDOWN_POOL_ENABLED
+        self.use_process_pool = bool(use_process_pool) and not llm_client
+
+    def _convert(self, source: str) -> Any:
+        """Convert a file path or URL, returning an object with title/text_content."""
+        if self.use_process_pool:
+            return get_markitdown_pool().convert(source)
+        return self.markitdown.convert(source)
+
+    async def _aconvert(self, source: str) -> Any:
+        """_convert() without holding a thread while a pool worker converts."""
+        if self.use_process_pool:
+            return await get_markitdown_pool().convert_async(source)
+        return await asyncio.to_thread(self.markitdown.convert, source)
+
     def can_handle(self, content_type: str) -> bool:
         """MarkItDown can handle most content types."""
         return content_type in [
@@ -281,6 +492,23 @@ class MarkItDownProcessor(ProcessingStep):
             result.error_message = f"MarkItDown processing failed: {str(e)}"
             return result
 
+    async def aprocess(
+        self, context: ProcessingContext, result: ProcessingResult
+    ) -> ProcessingResult:
+        """Process content using MarkItDown, fetching URLs asynchronously."""
+        content_type = context.content_item.type
+        if content_type == "text":
+            return await super().aprocess(context, result)
+
+        try:
+            if content_type == "url":
+                return await self._aprocess_url(context, result)
+            return await self._aprocess_file(context, result)
+        except Exception as e:
+            result.success = False
+            result.error_message = f"MarkItDown processing failed: {str(e)}"
+            return result
+
     def _process_url(
         self, context: ProcessingContext, result: ProcessingResult
     ) -> ProcessingResult:
@@ -295,42 +523,36 @@ class MarkItDownProcessor(ProcessingStep):
                 result.error_message = "No source URI provided for URL processing"
                 return result
 
-            response = requests.get(content_item.source_uri, timeout=30)
+            response = fetch("GET", content_item.source_uri, timeout=30)
             response.raise_for_status()
 
-            # Create temporary file for MarkItDown
-            with tempfile.NamedTemporaryFile(
-                mode="w", suffix=".html", delete=False
-            ) as temp_file:
-                temp_file.write(response.text)
-                temp_path = temp_file.name
+            return self._convert_html(context, result, response.text)
 
-            try:
-                # Process with MarkItDown
-                markitdown_result = self.markitdown.convert(temp_path)
-
-                # Extract title from URL if not set
-                if not content_item.title and markitdown_result.title:
-                    content_item.title = markitdown_result.title
-
-                result.success = True
-                result.markdown_content = markitdown_result.text_content
-                result.metadata = {
-                    "source_url": content_item.source_uri,
-                    "processed_at": datetime.utcnow().isoformat(),
-                    "processor": "markitdown",
-                    "content_type": "url",
-                }
+        except Exception as e:
+            result.success = False
+            result.error_message = f"URL processing failed: {str(e)}"
 
-                # Store processed markdown to R2
-                markdown_path = self._store_markdown_to_r2(
-                    context, result.markdown_content, result.metadata
-                )
-                result.assets_created = [markdown_path]
+        return result
 
-            finally:
-                # Clean up temp file
-                os.unlink(temp_path)
+    async def _aprocess_url(
+        self, context: ProcessingContext, result: ProcessingResult
+    ) -> ProcessingResult:
+        """Process URL content without holding a thread during the fetch."""
+        content_item = context.content_item
+
+        try:
+            if not content_item.source_uri:
+                result.success = False
+                result.error_message = "No source URI provided for URL processing"
+                return result
+
+            response = await fetch_async("GET", content_item.source_uri, timeout=30)
+            response.raise_for_status()
+
+            # Conversion, storage and chunking are blocking work
+            return await asyncio.to_thread(
+                self._convert_html, context, result, response.text
+            )
 
         except Exception as e:
             result.success = False
@@ -338,6 +560,48 @@ class MarkItDownProcessor(ProcessingStep):
 
         return result
 
+    def _convert_html(
+        self, context: ProcessingContext, result: ProcessingResult, html: str
+    ) -> ProcessingResult:
+        """Convert fetched HTML to markdown and store it."""
+        content_item = context.content_item
+
+        # Create temporary file for MarkItDown
+        with tempfile.NamedTemporaryFile(
+            mode="w", suffix=".html", delete=False
+        ) as temp_file:
+            temp_file.write(html)
+            temp_path = temp_file.name
+
+        try:
+            # Process with MarkItDown
+            markitdown_result = self._convert(temp_path)
+
+            # Extract title from URL if not set
+            if not content_item.title and markitdown_result.title:
+                content_item.title = markitdown_result.title
+
+            result.success = True
+            result.markdown_content = markitdown_result.text_content
+            result.metadata = {
+                "source_url": content_item.source_uri,
+                "processed_at": datetime.utcnow().isoformat(),
+                "processor": "markitdown",
+                "content_type": "url",
+            }
+
+            # Store processed markdown to R2
+            markdown_path = self._store_markdown_to_r2(
+                context, result.markdown_content, result.metadata
+            )
+            result.assets_created = [markdown_path]
+
+        finally:
+            # Clean up temp file
+            os.unlink(temp_path)
+
+        return result
+
     def _process_text(
         self, context: ProcessingContext, result: ProcessingResult
     ) -> ProcessingResult:
@@ -374,11 +638,86 @@ class MarkItDownProcessor(ProcessingStep):
     def _process_file(
         self, context: ProcessingContext, result: ProcessingResult
     ) -> ProcessingResult:
-        """Process uploaded file content."""
-        # This would be implemented when we have file upload functionality
-        # For now, return a placeholder
-        result.success = False
-        result.error_message = "File processing not yet implemented"
+        """Convert the item's uploaded file (PDF, DOCX, PPTX, ...) to markdown."""
+        try:
+            source_path, temp_path = self._download_raw_file(context)
+            try:
+                converted = self._convert(temp_path)
+            finally:
+                os.unlink(temp_path)
+            return self._store_file_conversion(context, result, converted, source_path)
+        except Exception as e:
+            result.success = False
+            result.error_message = f"File processing failed: {str(e)}"
+            return result
+
+    async def _aprocess_file(
+        self, context: ProcessingContext, result: ProcessingResult
+    ) -> ProcessingResult:
+        """Process an uploaded file; the conversion is awaited in the pool."""
+        try:
+            source_path, temp_path = await asyncio.to_thread(
+                self._download_raw_file, context
+            )
+            try:
+                converted = await self._aconvert(temp_path)
+            finally:
+                os.unlink(temp_path)
+            return await asyncio.to_thread(
+                self._store_file_conversion, context, result, converted, source_path
+            )
+        except Exception as e:
+            result.success = False
+            result.error_message = f"File processing failed: {str(e)}"
+            return result
+
+    def _download_raw_file(self, context: ProcessingContext) -> tuple[str, str]:
+        """Copy the item's raw asset to a temporary file.
+
+        Returns the asset's storage path and the temporary file's path, which
+        the caller must delete.
+        """
+        content_item = context.content_item
+        raw_asset = context.session.exec(
+            select(ContentAsset).where(
+                ContentAsset.content_item_id == content_item.id,
+                ContentAsset.type == "raw",
+            )
+        ).first()
+        if raw_asset is None or not raw_asset.file_path:
+            raise ValueError("No uploaded file found for this content item")
+
+        data = context.storage_service.download_file(raw_asset.file_path)
+        # MarkItDown picks its converter from the file extension
+        suffix = os.path.splitext(raw_asset.file_path)[1] or f".{content_item.type}"
+        with tempfile.NamedTemporaryFile(suffix=suffix, delete=False) as temp_file:
+            temp_file.write(data)
+        return raw_asset.file_path, temp_file.name
+
+    def _store_file_conversion(
+        self,
+        context: ProcessingContext,
+        result: ProcessingResult,
+        converted: Any,
+        source_path: str,
+    ) -> ProcessingResult:
+        """Record a converted file as the item's markdown and store it."""
+        content_item = context.content_item
+        if not content_item.title and converted.title:
+            content_item.title = converted.title
+
+        result.success = True
+        result.markdown_content = converted.text_content
+        result.metadata = {
+            "source_file": source_path,
+            "processed_at": datetime.utcnow().isoformat(),
+            "processor": "markitdown",
+            "content_type": content_item.type,
+        }
+        markdown_path = self._store_markdown_to_r2(
+            context, result.markdown_content, result.metadata
+        )
+        result.assets_created = [markdown_path]
         return result
 
     def _create_text_markdown(self, content_item: ContentItem) -> str:
@@ -477,12 +816,10 @@ class MarkItDownProcessor(ProcessingStep):
 
             # Store content chunks in database for efficient rendering
             print("🔄 正在创建内容分段...")
-            content_chunks = chunk_content_for_item(content_item.id, markdown_content)
-            print(f"✅ 创建了 {len(content_chunks)} 个内容分段")
-
-            # Add chunks to session
-            for chunk in content_chunks:
-                context.session.add(chunk)
+            chunk_count = store_content_chunks(
+                context.session, content_item.id, [markdown_content]
+            )
+            print(f"✅ 创建了 {chunk_count} 个内容分段")
 
             # Store the full markdown content in content_text for backward compatibility
             content_item.content_text = markdown_content
@@ -501,15 +838,121 @@ class MarkItDownProcessor(ProcessingStep):
         return r2_path
 
 
+class ChunkEmbeddingStep(ProcessingStep):
+    """Embed the item's chunks and add them to the owner's vector index.
+
+    Runs as a post step, after a successful extraction has written the
+    chunks. Chunks that already have an embedding for the model (e.g. copied
+    by DeduplicationStep) are not sent to the embedding endpoint again.
+    """
+
+    def __init__(self, model: str | None = None):
+        self.model = model or settings.CHUNK_EMBEDDING_MODEL
+        self.batch_size = max(1, settings.EMBEDDING_BATCH_MAX_INPUTS)
+        self.timeout = 60.0
+
+    def can_handle(self, content_type: str) -> bool:
+        return True
+
+    def process(
+        self, context: ProcessingContext, result: ProcessingResult
+    ) -> ProcessingResult:
+        session = context.session
+        content_item = context.content_item
+
+        pending = get_chunks_without_embedding(session, content_item.id, self.model)
+        embeddings: list[ContentChunkEmbedding] = []
+        for start in range(0, len(pending), self.batch_size):
+            batch = pending[start : start + self.batch_size]
+            vectors = self._embed([chunk_content for _, chunk_content in batch])
+            for (chunk_id, _), vector in zip(batch, vectors, strict=True):
+                embeddings.append(
+                    ContentChunkEmbedding(
+                        chunk_id=chunk_id,
+                        content_item_id=content_item.id,
+                        model=self.model,
+                        dimensions=len(vector),
+                        vector=pack_vector(vector),
+                    )
+                )
+        if embeddings:
+            create_chunk_embeddings(session, embeddings)
+            session.commit()
+            print(f"🧭 已生成 {len(embeddings)} 个分段向量")
+
+        self._update_index(context)
+        return result
+
+    def _embed(self, texts: list[str]) -> list[list[float]]:
+        headers = {"Content-Type": "application/json"}
+        if settings.LITELLM_MASTER_KEY:
+            headers["Authorization"] = f"Bearer {settings.LITELLM_MASTER_KEY}"
+        response = fetch(
+            "POST",
+            f"{str(settings.LITELLM_PROXY_URL).rstrip('/')}/embeddings",
+            json={"model": self.model, "input": texts},
+            headers=headers,
+            timeout=self.timeout,
+        )
+        response.raise_for_status()
+        data = sorted(response.json()["data"], key=lambda item: item["index"])
+        return [item["embedding"] for item in data]
+
+    def _update_index(self, context: ProcessingContext) -> None:
+        rows = get_chunk_embeddings(
+            context.session, self.model, content_item_id=context.content_item.id
+        )
+        if not rows:
+            return
+        vectors = unpack_vectors([vector for _, vector in rows])
+        index = get_user_vector_index(context.user_id)
+        if index.matches(self.model, vectors.shape[1]):
+            index.append(self.model, [chunk_id for chunk_id, _ in rows], vectors)
+        else:
+            # First item on this host, or the model changed: start from the DB
+            rebuild_user_vector_index(context.session, context.user_id, self.model)
+
+
+class SummaryStep(ProcessingStep):
+    """Queue a low-priority summarizer job for the item.
+
+    Summaries take several LLM calls, so they are not generated inline: the
+    worker runs the job once no processing job is waiting (see
+    app/utils/content_summarizer.py). Items that already have a summary, e.g.
+    copied by DeduplicationStep, are skipped.
+    """
+
+    def can_handle(self, content_type: str) -> bool:
+        return True
+
+    def process(
+        self, context: ProcessingContext, result: ProcessingResult
+    ) -> ProcessingResult:
+        if context.content_item.summary:
+            return result
+        enqueue_processing_job(
+            context.session, context.content_item.id, SUMMARY_JOB_NAME
+        )
+        print("📝 已加入摘要队列")
+        return result
+
+
 class ProcessingPipeline:
     """Extensible processing pipeline for content processing."""
 
     def __init__(self):
         self.steps: list[ProcessingStep] = []
+        # Run in order after the first successful step; failures are logged
+        # and do not fail the item
+        self.post_steps: list[ProcessingStep] = []
         self._register_default_steps()
 
     def _register_default_steps(self):
         """Register default processing steps."""
+        # Reuse identical, already-processed content before doing any work
+        if settings.CONTENT_DEDUP_ENABLED:
+            self.add_step(DeduplicationStep())
+
         # Add Jina processor first for URL processing (if API key is configured)
         if settings.JINA_API_KEY:
             self.add_step(JinaProcessor())
@@ -521,34 +964,36 @@ class ProcessingPipeline:
         # self.add_step(LLMScoringStep())
         # self.add_step(TAVILYStep())
 
+        # Enrichment of the extracted content
+        if settings.CHUNK_EMBEDDING_MODEL:
+            self.add_post_step(ChunkEmbeddingStep())
+        if settings.CONTENT_SUMMARY_MODEL:
+            self.add_post_step(SummaryStep())
+
     def add_step(self, step: ProcessingStep):
         """Add a processing step to the pipeline."""
         self.steps.append(step)
 
-    def process(self, content_item: ContentItem, session: Session) -> ProcessingResult:
-        """Process content through the pipeline."""
-        # Create processing context
-        storage_service = get_storage_service()
-        context = ProcessingContext(
-            content_item=content_item,
-            session=session,
-            user_id=content_item.user_id,
-            storage_service=storage_service,
-        )
+    def add_post_step(self, step: ProcessingStep):
+        """Add a step that runs after the content has been extracted."""
+        self.post_steps.append(step)
+
+    def process(
+        self,
+        content_item: ContentItem,
+        session: Session,
+        job: ProcessingJob | None = None,
+    ) -> ProcessingResult:
+        """Process content through the pipeline.
+
+        When ``job`` is given (a queued job already claimed by a worker), its
+        status is updated in place instead of creating a new ProcessingJob row.
+        """
+        context, job = self._start(content_item, session, job)
 
         # Initialize result
         result = ProcessingResult(success=False)
 
-        # Create processing job
-        job = ProcessingJob(
-            content_item_id=content_item.id,
-            processor_name="processing_pipeline",
-            status="in_progress",
-            started_at=datetime.utcnow(),
-        )
-        session.add(job)
-        session.commit()
-
         try:
             # Update content item status
             content_item.processing_status = "processing"
@@ -564,50 +1009,159 @@ class ProcessingPipeline:
                         break
                     # If this step failed, continue to next step
 
-            # Update content item with results
-            if result.success:
-                content_item.processing_status = "completed"
-                content_item.content_text = result.markdown_content
-                if result.metadata:
-                    content_item.meta_info = json.dumps(result.metadata)
-
-                job.status = "completed"
-                job.result = json.dumps(
-                    {
-                        "success": True,
-                        "assets_created": result.assets_created or [],
-                        "metadata": result.metadata,
-                    }
-                )
-            else:
-                content_item.processing_status = "failed"
-                content_item.error_message = result.error_message
+            self._finish(content_item, session, job, result)
 
-                job.status = "failed"
-                job.error_message = result.error_message
+        except Exception as e:
+            self._fail(content_item, session, job, result, e)
+            return result
+
+        if result.success:
+            for step in self.post_steps:
+                if step.can_handle(content_item.type):
+                    try:
+                        result = step.process(context, result)
+                    except Exception as e:
+                        self._post_step_failed(session, step, e)
+
+        return result
 
-            job.completed_at = datetime.utcnow()
+    async def aprocess(
+        self,
+        content_item: ContentItem,
+        session: Session,
+        job: ProcessingJob | None = None,
+    ) -> ProcessingResult:
+        """Async variant of process() that awaits each step's aprocess().
+
+        This is what the worker runs: URL fetches are awaited, while database
+        writes and the steps without an async version run in worker threads,
+        so the event loop stays free for the other jobs.
+        """
+        context, job = await asyncio.to_thread(self._start, content_item, session, job)
+
+        result = ProcessingResult(success=False)
+
+        try:
+            content_item.processing_status = "processing"
             session.add(content_item)
+            await asyncio.to_thread(session.commit)
+
+            for step in self.steps:
+                if step.can_handle(content_item.type):
+                    result = await step.aprocess(context, result)
+                    if result.success:
+                        break
+
+            await asyncio.to_thread(self._finish, content_item, session, job, result)
+
+        except Exception as e:
+            await asyncio.to_thread(self._fail, content_item, session, job, result, e)
+            return result
+
+        if result.success:
+            for step in self.post_steps:
+                if step.can_handle(content_item.type):
+                    try:
+                        result = await step.aprocess(context, result)
+                    except Exception as e:
+                        await asyncio.to_thread(
+                            self._post_step_failed, session, step, e
+                        )
+
+        return result
+
+    def _post_step_failed(
+        self, session: Session, step: ProcessingStep, error: Exception
+    ) -> None:
+        """The content itself is fine; drop the step's partial work and move on."""
+        session.rollback()
+        print(f"⚠️ 后处理步骤 {type(step).__name__} 失败: {str(error)}")
+
+    def _start(
+        self,
+        content_item: ContentItem,
+        session: Session,
+        job: ProcessingJob | None,
+    ) -> tuple[ProcessingContext, ProcessingJob]:
+        """Create the processing context and, if needed, the processing job."""
+        # Create processing context
+        storage_service = get_storage_service()
+        context = ProcessingContext(
+            content_item=content_item,
+            session=session,
+            user_id=content_item.user_id,
+            storage_service=storage_service,
+        )
+
+        # Create processing job unless the caller already claimed one
+        if job is None:
+            job = ProcessingJob(
+                content_item_id=content_item.id,
+                processor_name="processing_pipeline",
+                status="in_progress",
+                started_at=datetime.utcnow(),
+            )
             session.add(job)
             session.commit()
 
-        except Exception as e:
-            # Handle unexpected errors
+        return context, job
+
+    def _finish(
+        self,
+        content_item: ContentItem,
+        session: Session,
+        job: ProcessingJob,
+        result: ProcessingResult,
+    ) -> None:
+        """Update content item and job with the pipeline results."""
+        if result.success:
+            content_item.processing_status = "completed"
+            content_item.content_text = result.markdown_content
+            if result.metadata:
+                content_item.meta_info = json.dumps(result.metadata)
+
+            job.status = "completed"
+            job.result = json.dumps(
+                {
+                    "success": True,
+                    "assets_created": result.assets_created or [],
+                    "metadata": result.metadata,
+                }
+            )
+        else:
             content_item.processing_status = "failed"
-            content_item.error_message = f"Pipeline error: {str(e)}"
+            content_item.error_message = result.error_message
 
             job.status = "failed"
-            job.error_message = str(e)
-            job.completed_at = datetime.utcnow()
+            job.error_message = result.error_message
 
-            session.add(content_item)
-            session.add(job)
-            session.commit()
+        job.completed_at = datetime.utcnow()
+        session.add(content_item)
+        session.add(job)
+        session.commit()
 
-            result.success = False
-            result.error_message = str(e)
+    def _fail(
+        self,
+        content_item: ContentItem,
+        session: Session,
+        job: ProcessingJob,
+        result: ProcessingResult,
+        error: Exception,
+    ) -> None:
+        """Handle unexpected errors raised while processing."""
+        content_item.processing_status = "failed"
+        content_item.error_message = f"Pipeline error: {str(error)}"
+
+        job.status = "failed"
+        job.error_message = str(error)
+        job.completed_at = datetime.utcnow()
+
+        session.add(content_item)
+        session.add(job)
+        session.commit()
 
-        return result
+        result.success = False
+        result.error_message = str(error)
 
 
 # Legacy compatibility - maintain existing factory pattern
@@ -0,0 +1,161 @@
+"""
+Precomputed summaries of processed content.
+
+Summaries are generated once per item by a low-priority ``summarizer`` job,
+queued by ``SummaryStep`` after a successful extraction and run by the
+worker only when no processing job is waiting (see app/worker.py). Readers
+then get them straight from ``ContentItem.summary`` and
+``ContentChunk.summary`` without calling the LLM:
+
+1. each chunk of at least ``CONTENT_SUMMARY_MIN_CHUNK_CHARS`` characters
+   that has no summary yet is summarised, a few at a time
+   (``CONTENT_SUMMARY_CONCURRENCY``); shorter chunks stand for themselves;
+2. the item summary is written from those parts, collapsing them in rounds
+   (as in chunk_analysis.py) while they do not fit in one prompt.
+
+Chunks that already carry a summary, e.g. copied from a duplicate by
+DeduplicationStep, are not sent again.
+"""
+
+import logging
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+from sqlmodel import Session
+
+from app.core.config import settings
+from app.crud.crud_content import get_chunks_for_summary, set_content_summaries
+from app.models.content import ContentItem
+from app.utils.chunk_analysis import group_texts
+from app.utils.http_client import fetch
+
+logger = logging.getLogger(__name__)
+
+CHUNK_INSTRUCTIONS = (
+    "Summarise this passage from a longer document in two or three sentences. "
+    "Reply with the summary only."
+)
+
+COLLAPSE_INSTRUCTIONS = (
+    "Below are consecutive parts of a longer document. Merge them into one "
+    "shorter summary that keeps the main points. Reply with the summary only."
+)
+
+ITEM_INSTRUCTIONS = (
+    "Below is a document, or summaries of its parts in order. Summarise the "
+    "whole document in one paragraph of at most five sentences. Reply with the "
+    "summary only."
+)
+
+CHUNK_SUMMARY_MAX_TOKENS = 200
+ITEM_SUMMARY_MAX_TOKENS = 400
+
+
+class ContentSummarizer:
+    """Generate and store the summaries of one content item at a time."""
+
+    def __init__(
+        self,
+        model: str | None = None,
+        *,
+        min_chunk_chars: int | None = None,
+        concurrency: int | None = None,
+        group_chars: int | None = None,
+    ) -> None:
+        self.model = model or settings.CONTENT_SUMMARY_MODEL
+        if not self.model:
+            raise ValueError("CONTENT_SUMMARY_MODEL is not set")
+        self.min_chunk_chars = (
+            min_chunk_chars
+            if min_chunk_chars is not None
+            else settings.CONTENT_SUMMARY_MIN_CHUNK_CHARS
+        )
+        self.concurrency = max(1, concurrency or settings.CONTENT_SUMMARY_CONCURRENCY)
+        self.group_chars = group_chars or settings.ANALYSIS_MAP_GROUP_CHARS
+        self.timeout = 60.0
+
+    def summarize(self, session: Session, content_item: ContentItem) -> int:
+        """
+        Store the summaries of ``content_item`` and commit.
+
+        Returns the number of chunk summaries that had to be generated.
+        """
+        chunks = get_chunks_for_summary(session, content_item.id)
+        to_summarize = [
+            (chunk_id, chunk_content)
+            for chunk_id, chunk_content, summary in chunks
+            if summary is None and len(chunk_content) >= self.min_chunk_chars
+        ]
+
+        generated: dict[uuid.UUID, str] = {}
+        if to_summarize:
+            with ThreadPoolExecutor(max_workers=self.concurrency) as executor:
+                summaries = executor.map(
+                    lambda text: self._complete(
+                        CHUNK_INSTRUCTIONS, text, CHUNK_SUMMARY_MAX_TOKENS
+                    ),
+                    [chunk_content for _, chunk_content in to_summarize],
+                )
+                for (chunk_id, _), summary in zip(to_summarize, summaries, strict=True):
+                    generated[chunk_id] = summary
+
+        parts = [
+            generated.get(chunk_id) or summary or chunk_content
+            for chunk_id, chunk_content, summary in chunks
+        ]
+        if not parts and content_item.content_text:
+            parts = [content_item.content_text]
+        if not parts:
+            logger.info(f"Nothing to summarise for content item {content_item.id}")
+            return 0
+
+        set_content_summaries(
+            session,
+            content_item.id,
+            summary=self._summarize_parts(parts),
+            chunk_summaries=generated,
+        )
+        session.commit()
+        session.refresh(content_item)
+        return len(generated)
+
+    def _summarize_parts(self, parts: list[str]) -> str:
+        groups = group_texts(parts, self.group_chars)
+        while 1 < len(groups) < len(parts):
+            # Too long for one prompt: merge neighbouring parts first
+            with ThreadPoolExecutor(max_workers=self.concurrency) as executor:
+                parts = list(
+                    executor.map(
+                        lambda text: self._complete(
+                            COLLAPSE_INSTRUCTIONS, text, ITEM_SUMMARY_MAX_TOKENS
+                        ),
+                        groups,
+                    )
+                )
+            groups = group_texts(parts, self.group_chars)
+        return self._complete(
+            ITEM_INSTRUCTIONS, "\n\n".join(groups), ITEM_SUMMARY_MAX_TOKENS
+        )
+
+    def _complete(self, instructions: str, text: str, max_tokens: int) -> str:
+        headers = {"Content-Type": "application/json"}
+        if settings.LITELLM_MASTER_KEY:
+            headers["Authorization"] = f"Bearer {settings.LITELLM_MASTER_KEY}"
+        response = fetch(
+            "POST",
+            f"{str(settings.LITELLM_PROXY_URL).rstrip('/')}/chat/completions",
+            json={
+                "model": self.model,
+                "messages": [
+                    {"role": "system", "content": instructions},
+                    {"role": "user", "content": text},
+                ],
+                "temperature": 0,
+                "max_tokens": max_tokens,
+            },
+            headers=headers,
+            timeout=self.timeout,
+        )
+        response.raise_for_status()
+        content = response.json()["choices"][0]["message"]["content"] or ""
+        return content.strip()
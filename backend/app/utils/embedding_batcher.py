@@ -0,0 +1,215 @@
+"""
+Micro-batching and caching in front of the LiteLLM embeddings endpoint.
+
+* ``EmbeddingCache`` keeps vectors keyed by a hash of (model, API key, text),
+  stored as float32 ``array`` buffers (4 bytes per dimension instead of a boxed
+  Python float), so unchanged text is never embedded twice. The API key is
+  part of the key so a caller only gets vectors its own key paid for.
+* ``EmbeddingBatcher`` gathers the cache misses of concurrent requests for the
+  same model (and credentials) for a few milliseconds, sends them upstream as
+  one ``input`` list, and hands each caller its slice of the result.
+"""
+
+import asyncio
+import hashlib
+import json
+import threading
+from array import array
+from collections import OrderedDict
+from collections.abc import Awaitable, Callable, Sequence
+from dataclasses import dataclass, field
+from typing import Any
+
+# (model, api_key, user): requests are only merged when all three match
+BatchKey = tuple[str, str | None, str | None]
+SendFn = Callable[[BatchKey, list[str]], Awaitable[dict[str, Any]]]
+
+
+def embedding_cache_key(model: str, text: str, api_key: str | None = None) -> str:
+    key_digest = (
+        hashlib.sha256(api_key.encode("utf-8")).hexdigest() if api_key else None
+    )
+    canonical = json.dumps([model, key_digest, text], ensure_ascii=False)
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+class EmbeddingCache:
+    """LRU cache of embedding vectors stored as float32 arrays."""
+
+    def __init__(self, max_entries: int) -> None:
+        self.max_entries = max_entries
+        self._entries: OrderedDict[str, array] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(
+        self, model: str, text: str, api_key: str | None = None
+    ) -> list[float] | None:
+        key = embedding_cache_key(model, text, api_key)
+        with self._lock:
+            vector = self._entries.get(key)
+            if vector is None:
+                return None
+            self._entries.move_to_end(key)
+        return vector.tolist()
+
+    def set(
+        self,
+        model: str,
+        text: str,
+        embedding: Sequence[float],
+        api_key: str | None = None,
+    ) -> None:
+        if self.max_entries <= 0:
+            return
+        key = embedding_cache_key(model, text, api_key)
+        vector = array("f", embedding)
+        with self._lock:
+            self._entries[key] = vector
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+@dataclass
+class EmbeddingResult:
+    embeddings: list[list[float]]
+    prompt_tokens: int
+
+
+# Embeddings for the caller's texts, and each text's share of the token usage
+_BatchResult = tuple[list[list[float]], dict[str, int]]
+
+
+@dataclass
+class _Batch:
+    texts: list[str] = field(default_factory=list)
+    positions: dict[str, int] = field(default_factory=dict)
+    waiters: list[tuple[list[str], asyncio.Future[_BatchResult]]] = field(
+        default_factory=list
+    )
+    handle: asyncio.TimerHandle | None = None
+
+
+class EmbeddingBatcher:
+    """Merge concurrent embedding requests into fewer upstream calls."""
+
+    def __init__(
+        self,
+        send: SendFn,
+        cache: EmbeddingCache,
+        window_seconds: float,
+        max_inputs: int,
+    ) -> None:
+        self.send = send
+        self.cache = cache
+        self.window_seconds = window_seconds
+        self.max_inputs = max_inputs
+        self._pending: dict[BatchKey, _Batch] = {}
+        # The event loop only keeps weak references to tasks
+        self._sending: set[asyncio.Task[None]] = set()
+
+    async def embed(
+        self,
+        model: str,
+        texts: Sequence[str],
+        api_key: str | None = None,
+        user: str | None = None,
+    ) -> EmbeddingResult:
+        """
+        Return one embedding per text, in order.
+
+        ``prompt_tokens`` is this request's share of the upstream usage:
+        cached texts cost nothing, batched ones are apportioned by length.
+        """
+        embeddings: list[list[float] | None] = [
+            self.cache.get(model, text, api_key) for text in texts
+        ]
+        missing = [
+            text
+            for text, vector in zip(texts, embeddings, strict=True)
+            if vector is None
+        ]
+        if not missing:
+            return EmbeddingResult(embeddings=embeddings, prompt_tokens=0)  # type: ignore[arg-type]
+
+        vectors, token_share = await self._enqueue((model, api_key, user), missing)
+        fetched = iter(vectors)
+        for i, vector in enumerate(embeddings):
+            if vector is None:
+                embeddings[i] = next(fetched)
+        prompt_tokens = sum(token_share.get(text, 0) for text in missing)
+        return EmbeddingResult(embeddings=embeddings, prompt_tokens=prompt_tokens)  # type: ignore[arg-type]
+
+    def _enqueue(self, key: BatchKey, texts: list[str]) -> asyncio.Future[_BatchResult]:
+        loop = asyncio.get_running_loop()
+        batch = self._pending.get(key)
+        if batch is None:
+            batch = _Batch()
+            self._pending[key] = batch
+            batch.handle = loop.call_later(self.window_seconds, self._flush, key)
+
+        # Identical texts within a batch are embedded once
+        for text in texts:
+            if text not in batch.positions:
+                batch.positions[text] = len(batch.texts)
+                batch.texts.append(text)
+
+        future: asyncio.Future[_BatchResult] = loop.create_future()
+        batch.waiters.append((texts, future))
+
+        if len(batch.texts) >= self.max_inputs:
+            self._flush(key)
+        return future
+
+    def _flush(self, key: BatchKey) -> None:
+        batch = self._pending.pop(key, None)
+        if batch is None:
+            return
+        if batch.handle is not None:
+            batch.handle.cancel()
+        task = asyncio.get_running_loop().create_task(self._send_batch(key, batch))
+        self._sending.add(task)
+        task.add_done_callback(self._sending.discard)
+
+    async def _send_batch(self, key: BatchKey, batch: _Batch) -> None:
+        model, api_key, _user = key
+        try:
+            response = await self.send(key, batch.texts)
+            data = sorted(response["data"], key=lambda item: item["index"])
+            vectors = [item["embedding"] for item in data]
+            if len(vectors) != len(batch.texts):
+                raise ValueError(
+                    f"Expected {len(batch.texts)} embeddings, got {len(vectors)}"
+                )
+        except Exception as e:
+            for _texts, waiter in batch.waiters:
+                if not waiter.done():
+                    waiter.set_exception(e)
+            return
+        except BaseException:
+            # Cancelled mid-flight (e.g. on shutdown): don't leave callers hanging
+            for _texts, waiter in batch.waiters:
+                waiter.cancel()
+            raise
+
+        by_text = dict(zip(batch.texts, vectors, strict=True))
+        for text, vector in by_text.items():
+            self.cache.set(model, text, vector, api_key)
+
+        # Apportion upstream usage across the batch by input length
+        prompt_tokens = int((response.get("usage") or {}).get("prompt_tokens", 0))
+        total_chars = sum(len(text) for text in batch.texts) or 1
+        token_share = {
+            text: round(prompt_tokens * len(text) / total_chars) for text in batch.texts
+        }
+
+        for texts, waiter in batch.waiters:
+            if not waiter.done():  # the caller may have gone away
+                waiter.set_result(([by_text[text] for text in texts], token_share))
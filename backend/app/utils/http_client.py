@@ -0,0 +1,169 @@
+"""
+Shared, pooled HTTP clients for outbound fetches made by content processors.
+
+Every URL ingestion used to open a fresh ``requests`` connection, paying a new
+TCP+TLS handshake to r.jina.ai and to the origin site each time. This module
+keeps long-lived httpx clients with keep-alive pooling (and HTTP/2 when the
+``h2`` package is installed) and caps concurrent requests per host. A host's
+semaphore only exists while requests to it are in flight, so the hosts of
+user-submitted URLs do not pile up for the life of the process.
+
+* ``fetch`` uses a thread-safe sync client, for the processing worker threads.
+* ``fetch_async`` uses an AsyncClient. httpx connections are bound to the
+  event loop that opened them, so one async client is kept per running loop.
+"""
+
+import asyncio
+import threading
+import weakref
+from collections.abc import AsyncIterator, Iterator
+from contextlib import asynccontextmanager, contextmanager
+from importlib.util import find_spec
+from typing import Any
+from urllib.parse import urlsplit
+
+import httpx
+
+from app.core.config import settings
+
+# HTTP/2 needs the optional h2 package (httpx[http2])
+has_http2 = find_spec("h2") is not None
+
+_DEFAULT_TIMEOUT = httpx.Timeout(30.0, connect=10.0)
+
+
+def _client_kwargs() -> dict[str, Any]:
+    return {
+        "http2": has_http2,
+        "follow_redirects": True,
+        "timeout": _DEFAULT_TIMEOUT,
+        "limits": httpx.Limits(
+            max_connections=settings.HTTP_MAX_CONNECTIONS,
+            max_keepalive_connections=settings.HTTP_MAX_KEEPALIVE_CONNECTIONS,
+            keepalive_expiry=settings.HTTP_KEEPALIVE_EXPIRY,
+        ),
+    }
+
+
+def _host_key(url: str) -> str:
+    parts = urlsplit(url)
+    return f"{parts.scheme}://{parts.netloc}".lower()
+
+
+class _HostSlot:
+    """A host's semaphore and the number of requests using or waiting for it."""
+
+    def __init__(self, semaphore: Any) -> None:
+        self.semaphore = semaphore
+        self.users = 0
+
+
+# --- Sync client -------------------------------------------------------------
+
+_sync_client: httpx.Client | None = None
+_sync_lock = threading.Lock()
+_sync_host_slots: dict[str, _HostSlot] = {}
+
+
+def get_http_client() -> httpx.Client:
+    """Return the process-wide pooled sync client."""
+    global _sync_client
+    with _sync_lock:
+        if _sync_client is None or _sync_client.is_closed:
+            _sync_client = httpx.Client(**_client_kwargs())
+        return _sync_client
+
+
+@contextmanager
+def _sync_host_slot(url: str) -> Iterator[None]:
+    key = _host_key(url)
+    with _sync_lock:
+        slot = _sync_host_slots.get(key)
+        if slot is None:
+            slot = _HostSlot(
+                threading.BoundedSemaphore(settings.HTTP_MAX_CONNECTIONS_PER_HOST)
+            )
+            _sync_host_slots[key] = slot
+        slot.users += 1
+    try:
+        with slot.semaphore:
+            yield
+    finally:
+        with _sync_lock:
+            slot.users -= 1
+            if not slot.users:
+                del _sync_host_slots[key]
+
+
+def fetch(method: str, url: str, **kwargs: Any) -> httpx.Response:
+    """Send a request through the shared sync client, bounded per host."""
+    with _sync_host_slot(url):
+        return get_http_client().request(method, url, **kwargs)
+
+
+# --- Async client ------------------------------------------------------------
+
+
+class _LoopState:
+    def __init__(self) -> None:
+        self.client = httpx.AsyncClient(**_client_kwargs())
+        self.host_slots: dict[str, _HostSlot] = {}
+
+
+_loop_states: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, _LoopState]" = (
+    weakref.WeakKeyDictionary()
+)
+
+
+def _get_loop_state() -> _LoopState:
+    loop = asyncio.get_running_loop()
+    state = _loop_states.get(loop)
+    if state is None or state.client.is_closed:
+        state = _LoopState()
+        _loop_states[loop] = state
+    return state
+
+
+def get_async_http_client() -> httpx.AsyncClient:
+    """Return the pooled AsyncClient for the running event loop."""
+    return _get_loop_state().client
+
+
+@asynccontextmanager
+async def _async_host_slot(state: _LoopState, url: str) -> AsyncIterator[None]:
+    key = _host_key(url)
+    slot = state.host_slots.get(key)
+    if slot is None:
+        slot = _HostSlot(asyncio.Semaphore(settings.HTTP_MAX_CONNECTIONS_PER_HOST))
+        state.host_slots[key] = slot
+    slot.users += 1
+    try:
+        async with slot.semaphore:
+            yield
+    finally:
+        slot.users -= 1
+        if not slot.users:
+            del state.host_slots[key]
+
+
+async def fetch_async(method: str, url: str, **kwargs: Any) -> httpx.Response:
+    """Send a request through the loop's shared AsyncClient, bounded per host."""
+    state = _get_loop_state()
+    async with _async_host_slot(state, url):
+        return await state.client.request(method, url, **kwargs)
+
+
+async def close_async_http_client() -> None:
+    """Close the running loop's client (call from the owning loop on shutdown)."""
+    state = _loop_states.pop(asyncio.get_running_loop(), None)
+    if state is not None:
+        await state.client.aclose()
+
+
+def close_http_client() -> None:
+    """Close the shared sync client."""
+    global _sync_client
+    with _sync_lock:
+        client, _sync_client = _sync_client, None
+    if client is not None:
+        client.close()
@@ -0,0 +1,277 @@
+"""
+Exact-match cache for LLM chat completions.
+
+Requests are keyed on a SHA-256 of the canonical JSON of the model, messages
+and sampling parameters; transport-only fields (``stream``, ``user``,
+``metadata``) do not take part, so a streamed and a non-streamed call with
+the same prompt share an entry. The caller's ``api_key`` does take part (as a
+digest): a hit is only served to callers presenting the key the response was
+paid for with, since the cache is checked before the key reaches LiteLLM.
+
+Entries live in an in-process LRU with a TTL. When ``LLM_CACHE_DIR`` is set,
+they are also written to disk so that they survive restarts and are shared
+between worker processes on the same host.
+
+Streamed responses are recorded from the SSE chunks as they are forwarded
+(``StreamRecorder``) and replayed on a hit as SSE (``iter_sse_replay``).
+"""
+
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from collections.abc import Iterator
+from typing import Any
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+# Fields that change how a completion is delivered, not what it contains;
+# api_key is keyed separately, as a digest
+NON_KEY_FIELDS = frozenset({"stream", "api_key", "user", "metadata"})
+
+# Characters per content delta when a cached response is replayed as SSE
+REPLAY_CHUNK_CHARS = 64
+
+
+def build_cache_key(payload: dict[str, Any]) -> str:
+    """Return the cache key of a chat completion payload."""
+    keyed = {
+        key: value
+        for key, value in payload.items()
+        if key not in NON_KEY_FIELDS and value is not None
+    }
+    if payload.get("api_key"):
+        keyed["api_key_digest"] = hashlib.sha256(
+            payload["api_key"].encode("utf-8")
+        ).hexdigest()
+    canonical = json.dumps(
+        keyed, sort_keys=True, separators=(",", ":"), ensure_ascii=False
+    )
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+def should_cache(payload: dict[str, Any], cache: bool | None = None) -> bool:
+    """
+    Decide whether a completion may be served from / stored in the cache.
+
+    ``cache`` is the caller's explicit choice; when it is None only
+    deterministic (temperature 0) requests are cached.
+    """
+    if not settings.LLM_CACHE_ENABLED or cache is False:
+        return False
+    if cache:
+        return True
+    return payload.get("temperature") == 0
+
+
+class LLMResponseCache:
+    """In-memory LRU/TTL cache of completion responses with an optional disk tier."""
+
+    def __init__(
+        self, max_entries: int, ttl_seconds: float, directory: str | None = None
+    ) -> None:
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.directory = directory
+        self._entries: OrderedDict[str, tuple[float, dict[str, Any]]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    async def get(self, key: str) -> dict[str, Any] | None:
+        """Return the cached response for ``key``, or None."""
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                expires_at, response = entry
+                if expires_at > now:
+                    self._entries.move_to_end(key)
+                    return response
+                del self._entries[key]
+
+        if self.directory is None:
+            return None
+        entry = await asyncio.to_thread(self._read_file, key)
+        if entry is None or entry[0] <= now:
+            return None
+        self._remember(key, *entry)
+        return entry[1]
+
+    async def set(self, key: str, response: dict[str, Any]) -> None:
+        """Store ``response`` under ``key``."""
+        expires_at = time.time() + self.ttl_seconds
+        self._remember(key, expires_at, response)
+        if self.directory is not None:
+            await asyncio.to_thread(self._write_file, key, expires_at, response)
+
+    def clear(self) -> None:
+        """Drop all in-memory entries."""
+        with self._lock:
+            self._entries.clear()
+
+    def _remember(self, key: str, expires_at: float, response: dict[str, Any]) -> None:
+        with self._lock:
+            self._entries[key] = (expires_at, response)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def _path(self, key: str) -> str:
+        assert self.directory is not None
+        return os.path.join(self.directory, key[:2], f"{key}.json")
+
+    def _read_file(self, key: str) -> tuple[float, dict[str, Any]] | None:
+        path = self._path(key)
+        try:
+            with open(path, encoding="utf-8") as f:
+                stored = json.load(f)
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError) as e:
+            logger.warning(f"Unreadable LLM cache entry {path}: {e}")
+            return None
+        if stored["expires_at"] <= time.time():
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+            return None
+        return stored["expires_at"], stored["response"]
+
+    def _write_file(
+        self, key: str, expires_at: float, response: dict[str, Any]
+    ) -> None:
+        path = self._path(key)
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            # Write to a temp file and rename so readers never see partial JSON
+            fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                json.dump({"expires_at": expires_at, "response": response}, f)
+            os.replace(tmp_path, path)
+        except OSError as e:
+            logger.warning(f"Failed to write LLM cache entry {path}: {e}")
+
+
+_cache: LLMResponseCache | None = None
+_cache_lock = threading.Lock()
+
+
+def get_llm_cache() -> LLMResponseCache:
+    """Return the process-wide completion cache."""
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            _cache = LLMResponseCache(
+                max_entries=settings.LLM_CACHE_MAX_ENTRIES,
+                ttl_seconds=settings.LLM_CACHE_TTL_SECONDS,
+                directory=settings.LLM_CACHE_DIR or None,
+            )
+        return _cache
+
+
+class StreamRecorder:
+    """
+    Rebuild a chat completion from the SSE chunks of a streamed response.
+
+    Feed it the raw text as it is forwarded to the client; once the stream has
+    finished, ``response()`` returns the equivalent ``chat.completion`` body.
+    """
+
+    def __init__(self) -> None:
+        self._buffer = ""
+        self._parts: list[str] = []
+        self._meta: dict[str, Any] = {}
+        self._finish_reason: str | None = None
+        self._usage: dict[str, Any] | None = None
+        self.done = False
+        self.failed = False
+
+    def feed(self, text: str) -> None:
+        self._buffer += text
+        *lines, self._buffer = self._buffer.split("\n")
+        for line in lines:
+            self._feed_line(line.strip())
+
+    def _feed_line(self, line: str) -> None:
+        if not line.startswith("data:"):
+            return
+        data = line[5:].strip()
+        if data == "[DONE]":
+            self.done = True
+            return
+        try:
+            chunk = json.loads(data)
+        except ValueError:
+            self.failed = True
+            return
+        if "error" in chunk:
+            self.failed = True
+            return
+
+        for field in ("id", "created", "model", "system_fingerprint"):
+            if chunk.get(field) is not None:
+                self._meta.setdefault(field, chunk[field])
+        if chunk.get("usage"):
+            self._usage = chunk["usage"]
+        for choice in chunk.get("choices") or []:
+            if choice.get("index", 0) != 0:
+                continue
+            content = (choice.get("delta") or {}).get("content")
+            if content:
+                self._parts.append(content)
+            if choice.get("finish_reason"):
+                self._finish_reason = choice["finish_reason"]
+
+    def response(self) -> dict[str, Any] | None:
+        """The recorded completion, or None if the stream did not finish cleanly."""
+        if not self.done or self.failed or "id" not in self._meta:
+            return None
+        return {
+            "id": self._meta["id"],
+            "object": "chat.completion",
+            "created": self._meta.get("created", int(time.time())),
+            "model": self._meta.get("model", ""),
+            "system_fingerprint": self._meta.get("system_fingerprint"),
+            "choices": [
+                {
+                    "index": 0,
+                    "message": {"role": "assistant", "content": "".join(self._parts)},
+                    "finish_reason": self._finish_reason or "stop",
+                }
+            ],
+            # Streams only carry usage when the provider is asked to include it
+            "usage": self._usage
+            or {"prompt_tokens": 0, "completion_tokens": 0, "total_tokens": 0},
+        }
+
+
+def iter_sse_replay(response: dict[str, Any]) -> Iterator[str]:
+    """Replay a cached ``chat.completion`` body as OpenAI-style SSE chunks."""
+    choice = response["choices"][0]
+    content = choice["message"]["content"] or ""
+    base = {
+        "id": response["id"],
+        "object": "chat.completion.chunk",
+        "created": response["created"],
+        "model": response["model"],
+    }
+
+    def event(delta: dict[str, Any], finish_reason: str | None = None) -> str:
+        chunk = {
+            **base,
+            "choices": [{"index": 0, "delta": delta, "finish_reason": finish_reason}],
+        }
+        return f"data: {json.dumps(chunk, ensure_ascii=False)}\n\n"
+
+    yield event({"role": "assistant"})
+    for start in range(0, len(content), REPLAY_CHUNK_CHARS):
+        yield event({"content": content[start : start + REPLAY_CHUNK_CHARS]})
+    yield event({}, choice.get("finish_reason") or "stop")
+    yield "data: [DONE]\n\n"
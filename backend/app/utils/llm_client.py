@@ -0,0 +1,54 @@
+"""
+Application-scoped HTTP client for the LiteLLM proxy.
+
+The LLM routes used to open a new httpx/aiohttp client per request, redoing
+the TCP (and TLS) handshake to the proxy before every completion. One pooled
+AsyncClient with keep-alive (and HTTP/2 when ``h2`` is installed) is opened
+with the application lifespan and shared by all of them.
+
+httpx connections are bound to the event loop that opened them, so the client
+is keyed by running loop; in the server that is a single client per process.
+"""
+
+import asyncio
+import weakref
+
+import httpx
+
+from app.core.config import settings
+from app.utils.http_client import has_http2
+
+_clients: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, httpx.AsyncClient]" = (
+    weakref.WeakKeyDictionary()
+)
+
+
+def _create_client() -> httpx.AsyncClient:
+    return httpx.AsyncClient(
+        http2=has_http2,
+        timeout=httpx.Timeout(
+            settings.LLM_HTTP_TIMEOUT, connect=settings.LLM_HTTP_CONNECT_TIMEOUT
+        ),
+        limits=httpx.Limits(
+            max_connections=settings.LLM_HTTP_MAX_CONNECTIONS,
+            max_keepalive_connections=settings.LLM_HTTP_MAX_KEEPALIVE_CONNECTIONS,
+            keepalive_expiry=settings.LLM_HTTP_KEEPALIVE_EXPIRY,
+        ),
+    )
+
+
+def get_llm_client() -> httpx.AsyncClient:
+    """Return the shared LiteLLM proxy client for the running event loop."""
+    loop = asyncio.get_running_loop()
+    client = _clients.get(loop)
+    if client is None or client.is_closed:
+        client = _create_client()
+        _clients[loop] = client
+    return client
+
+
+async def close_llm_client() -> None:
+    """Close the running loop's client (call from the lifespan on shutdown)."""
+    client = _clients.pop(asyncio.get_running_loop(), None)
+    if client is not None:
+        await client.aclose()
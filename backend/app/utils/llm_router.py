@@ -0,0 +1,261 @@
+"""
+Latency-aware routing and hedging of streamed completions across models.
+
+``/content/{id}/analyze`` can be answered by any of the LiteLLM model groups
+in ``ANALYSIS_FALLBACK_MODELS`` (names from litellm/config.yaml) when its own
+model is slow or down. ``ModelRouter.stream`` sends the request to the first
+healthy model and:
+
+* records each model's time to first token (TTFT) over a sliding window;
+* if the first token has not arrived after the ``LLM_HEDGE_QUANTILE`` of that
+  model's recent TTFTs (``LLM_HEDGE_DELAY_MS`` until it has enough samples),
+  sends a hedged duplicate to the fastest other model; the first stream to
+  produce a chunk wins and the other request is cancelled;
+* if a model fails before its first chunk, moves on to the next one at once
+  and skips the failed model for ``LLM_MODEL_COOLDOWN_SECONDS``.
+
+A slow tail on one provider then costs at most the hedge delay plus the
+other model's TTFT instead of a full timeout. At most two requests are in
+flight for one stream, and only until the first chunk arrives. Failures after
+the first chunk are passed on to the caller: the answer cannot be switched
+to another model halfway through.
+"""
+
+import asyncio
+import logging
+import math
+from collections import deque
+from collections.abc import AsyncIterator, Callable, Sequence
+
+import httpx
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+# Opens a streamed completion of the given model, yielding its chunks
+OpenStreamFn = Callable[[str], AsyncIterator[str]]
+
+# Samples needed before a model's own TTFT quantile is trusted for hedging
+MIN_SAMPLES = 5
+TTFT_WINDOW = 64
+
+
+class ModelRouter:
+    """Per-model TTFT statistics and hedged streaming over a list of models."""
+
+    def __init__(
+        self,
+        *,
+        hedge_enabled: bool = True,
+        hedge_quantile: float = 0.9,
+        default_hedge_delay: float = 2.0,
+        min_hedge_delay: float = 0.25,
+        failure_cooldown: float = 30.0,
+    ) -> None:
+        self.hedge_enabled = hedge_enabled
+        self.hedge_quantile = min(max(hedge_quantile, 0.0), 1.0)
+        self.default_hedge_delay = default_hedge_delay
+        self.min_hedge_delay = min_hedge_delay
+        self.failure_cooldown = failure_cooldown
+        self._ttft: dict[str, deque[float]] = {}
+        self._cooldown_until: dict[str, float] = {}
+
+    # --- statistics ----------------------------------------------------------
+
+    def record_first_token(self, model: str, seconds: float) -> None:
+        self._ttft.setdefault(model, deque(maxlen=TTFT_WINDOW)).append(seconds)
+        self._cooldown_until.pop(model, None)
+
+    def record_failure(self, model: str) -> None:
+        self._cooldown_until[model] = (
+            asyncio.get_running_loop().time() + self.failure_cooldown
+        )
+
+    def ttft_quantile(self, model: str, quantile: float) -> float | None:
+        """Quantile of the model's recent TTFTs in seconds, None without samples."""
+        samples = sorted(self._ttft.get(model, ()))
+        if not samples:
+            return None
+        return samples[min(len(samples) - 1, math.ceil(quantile * len(samples)) - 1)]
+
+    def hedge_delay(self, model: str) -> float:
+        """How long to wait for the first token of ``model`` before hedging."""
+        if len(self._ttft.get(model, ())) < MIN_SAMPLES:
+            return self.default_hedge_delay
+        delay = self.ttft_quantile(model, self.hedge_quantile) or 0.0
+        return max(self.min_hedge_delay, delay)
+
+    def cooling_down(self, model: str) -> bool:
+        until = self._cooldown_until.get(model)
+        return until is not None and asyncio.get_running_loop().time() < until
+
+    def order(self, models: Sequence[str]) -> list[str]:
+        """
+        The order in which ``models`` are tried.
+
+        The first healthy model keeps its place (the list is in order of
+        preference); the others follow fastest median TTFT first, models
+        without samples in list order after them. Models that failed recently
+        come last, so they are still tried when everything else fails.
+        """
+        unique = list(dict.fromkeys(models))
+        healthy = [model for model in unique if not self.cooling_down(model)]
+        failed = [model for model in unique if self.cooling_down(model)]
+        if not healthy:
+            return failed
+        rest = sorted(
+            healthy[1:],
+            key=lambda model: self.ttft_quantile(model, 0.5) or math.inf,
+        )
+        return [healthy[0], *rest, *failed]
+
+    # --- streaming -----------------------------------------------------------
+
+    async def _first_chunk(
+        self, model: str, open_stream: OpenStreamFn
+    ) -> tuple[str, AsyncIterator[str], str]:
+        loop = asyncio.get_running_loop()
+        started = loop.time()
+        stream = open_stream(model)
+        try:
+            first = await anext(stream)
+        except StopAsyncIteration:
+            raise RuntimeError(f"{model} returned an empty stream") from None
+        except BaseException:
+            await stream.aclose()
+            raise
+        self.record_first_token(model, loop.time() - started)
+        return model, stream, first
+
+    async def stream(
+        self, models: Sequence[str], open_stream: OpenStreamFn, *, hedge: bool = True
+    ) -> AsyncIterator[str]:
+        """
+        Stream a completion from the first of ``models`` to answer.
+
+        With ``hedge=False`` (e.g. the caller holds a single scheduler slot) at
+        most one request is in flight. Raises the last model's error if none
+        of them produces a first chunk.
+        """
+        candidates = self.order(models)
+        if not candidates:
+            raise ValueError("No model to route the request to")
+
+        loop = asyncio.get_running_loop()
+        pending: dict[asyncio.Task, str] = {}
+        next_index = 0
+        hedge_at = math.inf
+        last_error: BaseException | None = None
+        winner: tuple[str, AsyncIterator[str], str] | None = None
+
+        def launch() -> None:
+            nonlocal next_index, hedge_at
+            model = candidates[next_index]
+            next_index += 1
+            pending[asyncio.create_task(self._first_chunk(model, open_stream))] = model
+            if len(pending) == 1:
+                hedge_at = loop.time() + self.hedge_delay(model)
+
+        try:
+            launch()
+            while winner is None:
+                if not pending:
+                    if next_index >= len(candidates):
+                        assert last_error is not None
+                        raise last_error
+                    launch()
+                    continue
+
+                can_hedge = (
+                    self.hedge_enabled
+                    and hedge
+                    and len(pending) == 1
+                    and next_index < len(candidates)
+                )
+                done, _ = await asyncio.wait(
+                    pending,
+                    timeout=max(0.0, hedge_at - loop.time()) if can_hedge else None,
+                    return_when=asyncio.FIRST_COMPLETED,
+                )
+                if not done:
+                    logger.info(
+                        f"No first token from {next(iter(pending.values()))} "
+                        f"yet, hedging with {candidates[next_index]}"
+                    )
+                    launch()
+                    continue
+
+                for task in done:
+                    model = pending.pop(task)
+                    error = task.exception()
+                    if error is not None:
+                        logger.warning(f"Streaming from {model} failed: {error}")
+                        self.record_failure(model)
+                        last_error = error
+                    elif winner is None:
+                        winner = task.result()
+                    else:
+                        # Both answered at once: keep the first one
+                        await task.result()[1].aclose()
+        finally:
+            # Cancel the losing request (or all of them if the caller went away)
+            for task in pending:
+                task.cancel()
+            for result in await asyncio.gather(*pending, return_exceptions=True):
+                if isinstance(result, tuple):
+                    await result[1].aclose()
+
+        model, stream, first = winner
+        logger.debug(f"Streaming answer from {model}")
+        try:
+            yield first
+            async for chunk in stream:
+                yield chunk
+        finally:
+            await stream.aclose()
+
+
+_router: ModelRouter | None = None
+
+
+def get_model_router() -> ModelRouter:
+    """Return the process-wide model router."""
+    global _router
+    if _router is None:
+        _router = ModelRouter(
+            hedge_enabled=settings.LLM_HEDGE_ENABLED,
+            hedge_quantile=settings.LLM_HEDGE_QUANTILE,
+            default_hedge_delay=settings.LLM_HEDGE_DELAY_MS / 1000,
+            min_hedge_delay=settings.LLM_HEDGE_MIN_DELAY_MS / 1000,
+            failure_cooldown=settings.LLM_MODEL_COOLDOWN_SECONDS,
+        )
+    return _router
+
+
+async def log_missing_models(client: httpx.AsyncClient, models: Sequence[str]) -> None:
+    """
+    Warn about ``models`` the LiteLLM proxy does not serve.
+
+    The fallback list lives in settings while the model groups live in
+    litellm/config.yaml; a renamed group would otherwise only show up as a
+    failed fallback in the middle of an outage. Run once at startup.
+    """
+    headers = {}
+    if settings.LITELLM_MASTER_KEY:
+        headers["Authorization"] = f"Bearer {settings.LITELLM_MASTER_KEY}"
+    try:
+        response = await client.get(
+            f"{str(settings.LITELLM_PROXY_URL).rstrip('/')}/v1/models",
+            headers=headers,
+        )
+        response.raise_for_status()
+        served = {model["id"] for model in response.json().get("data", [])}
+    except (httpx.HTTPError, ValueError, KeyError, TypeError) as e:
+        logger.warning(f"Could not list LiteLLM proxy models: {e}")
+        return
+    missing = [model for model in dict.fromkeys(models) if model not in served]
+    if missing:
+        logger.warning(
+            f"Analysis models not served by the LiteLLM proxy: {', '.join(missing)}"
+        )
@@ -0,0 +1,254 @@
+"""
+Fair scheduling of LLM calls between users.
+
+Every call forwarded to LiteLLM for ``/llm/completions`` and
+``/content/{id}/analyze`` first takes a slot from the process-wide
+``FairScheduler``:
+
+* at most ``LLM_MAX_CONCURRENT_REQUESTS`` calls run at once, and at most
+  ``LLM_MAX_CONCURRENT_REQUESTS_PER_USER`` of them for any one user. A request
+  that keeps several upstream calls in flight (the map calls of a map-reduce
+  analysis, a hedged stream) reserves that many slots and must not exceed them;
+* callers beyond that wait in a per-user FIFO. Free slots go to the waiting
+  request with the smallest virtual finish tag (start-time fair queuing): a
+  user's tag advances by the cost of each request it submits, so a user with
+  fifty queued requests does not delay a user sending their first one;
+* a user may not have more than ``LLM_MAX_QUEUED_REQUESTS_PER_USER`` requests
+  waiting (``QueueFullError``), and nobody waits longer than
+  ``LLM_QUEUE_TIMEOUT_SECONDS`` (``TimeoutError``).
+
+``Ticket.positions()`` reports the place in the queue while waiting, which
+the streaming endpoints forward as SSE comments. Limits are per process; with
+several API workers the global cap applies to each of them.
+"""
+
+import asyncio
+import itertools
+import json
+import logging
+from collections import deque
+from collections.abc import AsyncIterator
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+class QueueFullError(Exception):
+    """The user already has the maximum number of requests waiting."""
+
+
+class Ticket:
+    """A request's place in the scheduler; release it when the call is done."""
+
+    def __init__(
+        self,
+        scheduler: "FairScheduler",
+        tenant: str,
+        tag: float,
+        seq: int,
+        slots: int = 1,
+    ) -> None:
+        self.scheduler = scheduler
+        self.tenant = tenant
+        # Upstream calls the holder may have in flight at once
+        self.slots = slots
+        self.tag = tag
+        self.seq = seq
+        self._granted = asyncio.get_running_loop().create_future()
+        # Resolved when a request ahead of this one leaves the queue
+        self._moved: asyncio.Future[None] | None = None
+        self._released = False
+
+    @property
+    def granted(self) -> bool:
+        return self._granted.done() and not self._granted.cancelled()
+
+    def position(self) -> int:
+        """1-based place in the queue (0 once the ticket holds a slot)."""
+        return self.scheduler._position(self)
+
+    async def positions(self, timeout: float | None = None) -> AsyncIterator[int]:
+        """
+        Wait for a slot, yielding the queue position whenever it changes.
+
+        Raises TimeoutError (and gives up the place) after ``timeout`` seconds.
+        """
+        if timeout is None:
+            timeout = self.scheduler.queue_timeout
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + timeout
+        last = None
+        try:
+            while not self.granted:
+                position = self.position()
+                if position != last:
+                    last = position
+                    yield position
+                remaining = deadline - loop.time()
+                if remaining <= 0:
+                    raise TimeoutError(f"Waited more than {timeout:g}s for an LLM slot")
+                self._moved = loop.create_future()
+                await asyncio.wait(
+                    {self._granted, self._moved},
+                    timeout=remaining,
+                    return_when=asyncio.FIRST_COMPLETED,
+                )
+        except BaseException:
+            # Timed out, or the client went away while queued
+            self.release()
+            raise
+
+    async def wait(self, timeout: float | None = None) -> None:
+        async for _ in self.positions(timeout):
+            pass
+
+    def release(self) -> None:
+        """Give the slot (or the place in the queue) back. Idempotent."""
+        if not self._released:
+            self._released = True
+            self.scheduler._release(self)
+
+
+class FairScheduler:
+    """Global and per-user concurrency caps with fair queuing between users."""
+
+    def __init__(
+        self,
+        max_concurrency: int,
+        per_user_concurrency: int,
+        max_queued_per_user: int,
+        queue_timeout: float,
+    ) -> None:
+        self.max_concurrency = max(1, max_concurrency)
+        self.per_user_concurrency = max(1, per_user_concurrency)
+        self.max_queued_per_user = max_queued_per_user
+        self.queue_timeout = queue_timeout
+        self._active: dict[str, int] = {}
+        self._waiting: dict[str, deque[Ticket]] = {}
+        self._last_tag: dict[str, float] = {}
+        self._virtual_time = 0.0
+        self._seq = itertools.count()
+
+    @property
+    def active(self) -> int:
+        return sum(self._active.values())
+
+    @property
+    def queued(self) -> int:
+        return sum(len(queue) for queue in self._waiting.values())
+
+    def submit(self, tenant: str, cost: float = 1.0, slots: int = 1) -> Ticket:
+        """
+        Queue a request of ``tenant``; the ticket is granted at once if possible.
+
+        ``cost`` weights the request against others of the same user (e.g. a
+        map-reduce analysis that issues several upstream calls). ``slots`` is
+        how many calls it keeps in flight at once; it is capped at the
+        per-user limit, and the granted ``ticket.slots`` is what the caller
+        may use.
+        """
+        slots = max(1, min(slots, self.per_user_concurrency, self.max_concurrency))
+        queue = self._waiting.setdefault(tenant, deque())
+        tag = max(self._virtual_time, self._last_tag.get(tenant, 0.0)) + cost
+        self._last_tag[tenant] = tag
+        ticket = Ticket(self, tenant, tag, next(self._seq), slots)
+        queue.append(ticket)
+        self._dispatch()
+        if not ticket.granted:
+            if len(queue) > self.max_queued_per_user:
+                ticket.release()
+                raise QueueFullError(f"Too many queued LLM requests for {tenant}")
+            logger.info(
+                f"Queued LLM request of {tenant} at position {ticket.position()}"
+            )
+        return ticket
+
+    def _dispatch(self) -> None:
+        while True:
+            eligible = [
+                queue[0]
+                for tenant, queue in self._waiting.items()
+                if queue
+                and self._active.get(tenant, 0) + queue[0].slots
+                <= self.per_user_concurrency
+            ]
+            if not eligible:
+                return
+            ticket = min(eligible, key=lambda t: (t.tag, t.seq))
+            if self.active + ticket.slots > self.max_concurrency:
+                # Hold the slots for it rather than let smaller requests
+                # overtake a multi-slot request indefinitely
+                return
+            self._waiting[ticket.tenant].popleft()
+            self._active[ticket.tenant] = (
+                self._active.get(ticket.tenant, 0) + ticket.slots
+            )
+            self._virtual_time = max(self._virtual_time, ticket.tag)
+            ticket._granted.set_result(None)
+            self._notify_waiting()
+
+    def _release(self, ticket: Ticket) -> None:
+        if ticket.granted:
+            remaining = self._active[ticket.tenant] - ticket.slots
+            if remaining:
+                self._active[ticket.tenant] = remaining
+            else:
+                del self._active[ticket.tenant]
+        else:
+            ticket._granted.cancel()
+            queue = self._waiting.get(ticket.tenant)
+            if queue is not None and ticket in queue:
+                queue.remove(ticket)
+                self._notify_waiting()
+
+        if not self._waiting.get(ticket.tenant):
+            self._waiting.pop(ticket.tenant, None)
+            if ticket.tenant not in self._active:
+                # Idle users start again from the current virtual time
+                self._last_tag.pop(ticket.tenant, None)
+        self._dispatch()
+
+    def _notify_waiting(self) -> None:
+        for queue in self._waiting.values():
+            for waiting in queue:
+                if waiting._moved is not None and not waiting._moved.done():
+                    waiting._moved.set_result(None)
+
+    def _position(self, ticket: Ticket) -> int:
+        if ticket.granted:
+            return 0
+        key = (ticket.tag, ticket.seq)
+        return 1 + sum(
+            1
+            for queue in self._waiting.values()
+            for other in queue
+            if (other.tag, other.seq) < key
+        )
+
+
+_scheduler: FairScheduler | None = None
+
+
+def get_llm_scheduler() -> FairScheduler:
+    """Return the process-wide LLM call scheduler."""
+    global _scheduler
+    if _scheduler is None:
+        _scheduler = FairScheduler(
+            max_concurrency=settings.LLM_MAX_CONCURRENT_REQUESTS,
+            per_user_concurrency=settings.LLM_MAX_CONCURRENT_REQUESTS_PER_USER,
+            max_queued_per_user=settings.LLM_MAX_QUEUED_REQUESTS_PER_USER,
+            queue_timeout=settings.LLM_QUEUE_TIMEOUT_SECONDS,
+        )
+    return _scheduler
+
+
+def sse_queue_event(position: int) -> str:
+    """An SSE comment with the queue position; clients ignore it."""
+    return f": queued {position}\n\n"
+
+
+def sse_error_event(status_code: int, message: str) -> str:
+    """An SSE error event for failures after the stream has started."""
+    error = {"error": {"message": message, "code": status_code}, "message": message}
+    return f"data: {json.dumps(error, ensure_ascii=False)}\n\n"
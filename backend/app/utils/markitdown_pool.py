@@ -0,0 +1,188 @@
+"""
+Process-pool execution for MarkItDown conversions.
+
+PDF, DOCX and PPTX conversion is CPU-bound and holds the GIL for seconds at a
+time. Running it in worker processes lets several large documents convert in
+parallel on multi-core hosts without stalling the calling thread or event loop.
+
+Each worker process builds one MarkItDown instance at start-up and reuses it
+for every task it runs. Tasks are bounded by a per-task timeout, and workers
+by an optional address-space cap. A worker that hangs, crashes or runs out of
+memory takes the pool down with it; the pool is then rebuilt for the next task.
+"""
+
+import asyncio
+import logging
+import multiprocessing
+import threading
+from concurrent.futures import Future, ProcessPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from concurrent.futures.process import BrokenProcessPool
+from dataclasses import dataclass
+from typing import Any
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+# Warm converter owned by the current worker process (set by _init_worker)
+_worker_markitdown: Any = None
+
+
+@dataclass
+class ConversionOutput:
+    """Picklable subset of MarkItDown's DocumentConverterResult."""
+
+    title: str | None
+    text_content: str
+
+
+class ConversionTimeoutError(Exception):
+    """Raised when a conversion exceeds the configured per-task timeout."""
+
+
+class ConversionWorkerError(Exception):
+    """Raised when the worker process died (crash, memory cap) mid-conversion."""
+
+
+def _init_worker(memory_limit_mb: int | None) -> None:
+    """Initializer run once in every worker process."""
+    global _worker_markitdown
+
+    if memory_limit_mb:
+        try:
+            import resource
+
+            limit = memory_limit_mb * 1024 * 1024
+            resource.setrlimit(resource.RLIMIT_AS, (limit, limit))
+        except (ImportError, ValueError, OSError) as e:
+            # Not supported on this platform; run without a cap
+            logger.warning(f"Could not apply MarkItDown worker memory cap: {e}")
+
+    from markitdown import MarkItDown
+
+    _worker_markitdown = MarkItDown()
+
+
+def _convert_in_worker(source: str) -> ConversionOutput:
+    """Convert a local file path or URL using the worker's warm converter."""
+    result = _worker_markitdown.convert(source)
+    return ConversionOutput(title=result.title, text_content=result.text_content)
+
+
+class MarkItDownPool:
+    """A restartable process pool dedicated to MarkItDown conversions."""
+
+    def __init__(
+        self,
+        max_workers: int | None = None,
+        task_timeout: float | None = None,
+        memory_limit_mb: int | None = None,
+    ) -> None:
+        self.max_workers = max_workers or settings.MARKITDOWN_POOL_SIZE
+        self.task_timeout = (
+            task_timeout
+            if task_timeout is not None
+            else settings.MARKITDOWN_TASK_TIMEOUT
+        )
+        self.memory_limit_mb = (
+            memory_limit_mb
+            if memory_limit_mb is not None
+            else settings.MARKITDOWN_WORKER_MEMORY_MB
+        )
+        self._executor: ProcessPoolExecutor | None = None
+        self._lock = threading.Lock()
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        with self._lock:
+            if self._executor is None:
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.max_workers,
+                    # spawn keeps workers free of the parent's threads and DB pools
+                    mp_context=multiprocessing.get_context("spawn"),
+                    initializer=_init_worker,
+                    initargs=(self.memory_limit_mb,),
+                )
+            return self._executor
+
+    def _reset(self, executor: ProcessPoolExecutor) -> None:
+        """Tear down a pool with a stuck or dead worker so the next task gets a fresh one."""
+        with self._lock:
+            if self._executor is not executor:
+                return  # Another thread already replaced it
+            self._executor = None
+
+        # A timed-out task keeps running in its worker; terminate the processes
+        # because shutdown() alone would wait for it.
+        processes = getattr(executor, "_processes", None) or {}
+        for process in list(processes.values()):
+            if process.is_alive():
+                process.terminate()
+        executor.shutdown(wait=False, cancel_futures=True)
+
+    def submit(self, source: str) -> tuple[ProcessPoolExecutor, Future]:
+        executor = self._get_executor()
+        try:
+            return executor, executor.submit(_convert_in_worker, source)
+        except BrokenProcessPool:
+            self._reset(executor)
+            executor = self._get_executor()
+            return executor, executor.submit(_convert_in_worker, source)
+
+    def convert(self, source: str) -> ConversionOutput:
+        """Convert ``source`` in a worker process, blocking the calling thread."""
+        executor, future = self.submit(source)
+        try:
+            return future.result(timeout=self.task_timeout)
+        except FutureTimeoutError:
+            self._reset(executor)
+            raise ConversionTimeoutError(
+                f"MarkItDown conversion timed out after {self.task_timeout}s"
+            )
+        except BrokenProcessPool as e:
+            self._reset(executor)
+            raise ConversionWorkerError(f"MarkItDown worker process died: {e}")
+
+    async def convert_async(self, source: str) -> ConversionOutput:
+        """Convert ``source`` in a worker process without blocking the event loop."""
+        executor, future = self.submit(source)
+        try:
+            return await asyncio.wait_for(
+                asyncio.wrap_future(future), timeout=self.task_timeout
+            )
+        except asyncio.TimeoutError:
+            self._reset(executor)
+            raise ConversionTimeoutError(
+                f"MarkItDown conversion timed out after {self.task_timeout}s"
+            )
+        except BrokenProcessPool as e:
+            self._reset(executor)
+            raise ConversionWorkerError(f"MarkItDown worker process died: {e}")
+
+    def shutdown(self) -> None:
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=True, cancel_futures=True)
+
+
+_pool: MarkItDownPool | None = None
+_pool_lock = threading.Lock()
+
+
+def get_markitdown_pool() -> MarkItDownPool:
+    """Return the process-wide MarkItDown pool, creating it on first use."""
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = MarkItDownPool()
+        return _pool
+
+
+def shutdown_markitdown_pool() -> None:
+    """Stop the process-wide pool if it was ever started."""
+    global _pool
+    with _pool_lock:
+        pool, _pool = _pool, None
+    if pool is not None:
+        pool.shutdown()
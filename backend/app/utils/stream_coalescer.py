@@ -0,0 +1,109 @@
+"""
+Singleflight coalescing of identical concurrent streams.
+
+When many clients ask for the same stream at once (e.g. the same analysis of
+a popular article), only the first one starts the upstream call. The chunks
+are buffered as they arrive and fanned out to every subscriber; callers that
+join late first receive what has already been emitted, then follow live.
+
+The upstream stream runs in its own task, so one subscriber disconnecting
+does not cut it short for the others. It is cancelled once the last
+subscriber has gone. Finished flights are dropped immediately; replaying a
+completed response is the job of the response cache (app/utils/llm_cache.py).
+"""
+
+import asyncio
+import logging
+from collections.abc import AsyncIterator, Callable
+
+logger = logging.getLogger(__name__)
+
+
+class _Flight:
+    def __init__(self) -> None:
+        self.chunks: list[str] = []
+        self.done = False
+        self.error: BaseException | None = None
+        self.subscribers = 0
+        self.changed = asyncio.Event()
+        self.task: asyncio.Task[None] | None = None
+
+    def notify(self) -> None:
+        changed, self.changed = self.changed, asyncio.Event()
+        changed.set()
+
+
+class StreamCoalescer:
+    """Share one upstream text stream between concurrent identical requests."""
+
+    def __init__(self) -> None:
+        self._flights: dict[str, _Flight] = {}
+
+    def in_flight(self, key: str) -> bool:
+        return key in self._flights
+
+    async def subscribe(
+        self, key: str, factory: Callable[[], AsyncIterator[str]]
+    ) -> AsyncIterator[str]:
+        """
+        Yield the chunks of the stream identified by ``key``.
+
+        ``factory`` is only called if no stream for ``key`` is in flight.
+        """
+        flight = self._flights.get(key)
+        if flight is None:
+            flight = _Flight()
+            self._flights[key] = flight
+            flight.task = asyncio.create_task(self._run(key, flight, factory))
+        else:
+            logger.info(f"Joining in-flight stream {key[:12]}")
+
+        flight.subscribers += 1
+        position = 0
+        try:
+            while True:
+                if position < len(flight.chunks):
+                    yield flight.chunks[position]
+                    position += 1
+                    continue
+                if flight.done:
+                    break
+                await flight.changed.wait()
+            if flight.error is not None:
+                raise flight.error
+        finally:
+            flight.subscribers -= 1
+            if flight.subscribers == 0 and not flight.done and flight.task:
+                # Nobody is listening any more; stop paying for the upstream call
+                if self._flights.get(key) is flight:
+                    del self._flights[key]
+                flight.task.cancel()
+
+    async def _run(
+        self, key: str, flight: _Flight, factory: Callable[[], AsyncIterator[str]]
+    ) -> None:
+        try:
+            async for chunk in factory():
+                flight.chunks.append(chunk)
+                flight.notify()
+        except asyncio.CancelledError:
+            flight.error = ConnectionAbortedError("Upstream stream was cancelled")
+            raise
+        except Exception as e:
+            flight.error = e
+        finally:
+            flight.done = True
+            if self._flights.get(key) is flight:
+                del self._flights[key]
+            flight.notify()
+
+
+_coalescer: StreamCoalescer | None = None
+
+
+def get_stream_coalescer() -> StreamCoalescer:
+    """Return the process-wide stream coalescer."""
+    global _coalescer
+    if _coalescer is None:
+        _coalescer = StreamCoalescer()
+    return _coalescer
@@ -0,0 +1,164 @@
+"""
+Token counting and context-window budgeting for LLM requests.
+
+Requests are measured locally before they are sent, so a prompt that cannot
+fit the model's context window is rejected (or trimmed, or analysed in
+parts) without a round trip to LiteLLM:
+
+* ``count_tokens`` uses tiktoken's ``LLM_TOKENIZER_ENCODING``. tiktoken
+  downloads the encoding on first use, so offline hosts must have it in
+  ``TIKTOKEN_CACHE_DIR`` already (the backend image does). When it cannot be
+  loaded, counting falls back to a conservative estimate: one token per CJK
+  character and one per four other characters. Counts are
+  an approximation for models with other tokenizers, which is why
+  ``LLM_CONTEXT_SAFETY_MARGIN`` is kept free.
+* Each ContentChunk stores its ``token_count`` when it is created, so long
+  documents are budgeted from the database without re-tokenizing them.
+* ``context_window`` reads the window of a model from
+  ``LLM_CONTEXT_WINDOWS``; models not listed there are only checked when
+  ``LLM_DEFAULT_CONTEXT_WINDOW`` is set.
+"""
+
+import logging
+import math
+import re
+from collections.abc import Iterable, Sequence
+from functools import lru_cache
+from typing import Any
+
+from app.core.config import settings
+
+try:
+    import tiktoken
+
+    TIKTOKEN_AVAILABLE = True
+except ImportError:
+    TIKTOKEN_AVAILABLE = False
+
+logger = logging.getLogger(__name__)
+
+# Tokens a chat message costs beyond its content (role and separators), and
+# the tokens that prime the assistant's reply
+MESSAGE_OVERHEAD_TOKENS = 4
+REPLY_PRIMING_TOKENS = 3
+
+# Characters per token for non-CJK text when no tokenizer is available
+FALLBACK_CHARS_PER_TOKEN = 4
+
+CJK_PATTERN = re.compile(r"[\u3040-\u30ff\u3400-\u4dbf\u4e00-\u9fff\uac00-\ud7af]")
+
+
+class ContextBudgetError(ValueError):
+    """The request cannot fit the model's context window."""
+
+    def __init__(self, model: str, prompt_tokens: int, context_window: int) -> None:
+        super().__init__(
+            f"Request needs {prompt_tokens} tokens but {model} has a context "
+            f"window of {context_window}"
+        )
+        self.model = model
+        self.prompt_tokens = prompt_tokens
+        self.context_window = context_window
+
+
+@lru_cache(maxsize=1)
+def _get_encoding() -> Any | None:
+    if not TIKTOKEN_AVAILABLE:
+        return None
+    try:
+        return tiktoken.get_encoding(settings.LLM_TOKENIZER_ENCODING)
+    except Exception as e:
+        # The encoding files are downloaded on first use; stay usable offline
+        logger.warning(f"Tokenizer unavailable, estimating token counts: {e}")
+        return None
+
+
+def count_tokens(text: str) -> int:
+    """Number of tokens in ``text`` (exact with tiktoken, estimated otherwise)."""
+    if not text:
+        return 0
+    encoding = _get_encoding()
+    if encoding is not None:
+        return len(encoding.encode(text, disallowed_special=()))
+    cjk = len(CJK_PATTERN.findall(text))
+    return cjk + math.ceil((len(text) - cjk) / FALLBACK_CHARS_PER_TOKEN)
+
+
+def count_message_tokens(messages: Iterable[dict[str, Any]]) -> int:
+    """Prompt tokens of a list of chat messages."""
+    total = REPLY_PRIMING_TOKENS
+    for message in messages:
+        content = message.get("content")
+        total += MESSAGE_OVERHEAD_TOKENS + count_tokens(
+            content if isinstance(content, str) else ""
+        )
+    return total
+
+
+def context_window(model: str | None) -> int | None:
+    """Context window of ``model`` in tokens, or None if it is not known."""
+    if model and model in settings.LLM_CONTEXT_WINDOWS:
+        return settings.LLM_CONTEXT_WINDOWS[model]
+    return settings.LLM_DEFAULT_CONTEXT_WINDOW
+
+
+def prompt_budget(model: str | None, max_tokens: int | None) -> int | None:
+    """Tokens left for the prompt once the reply and safety margin are reserved."""
+    window = context_window(model)
+    if window is None:
+        return None
+    return window - (max_tokens or 0) - settings.LLM_CONTEXT_SAFETY_MARGIN
+
+
+def check_context_budget(
+    model: str | None,
+    messages: Iterable[dict[str, Any]],
+    max_tokens: int | None = None,
+) -> int:
+    """
+    Count the prompt tokens of a chat request and check that it fits.
+
+    Raises ContextBudgetError if the prompt plus ``max_tokens`` exceeds the
+    model's window. Returns the prompt token count.
+    """
+    prompt_tokens = count_message_tokens(messages)
+    budget = prompt_budget(model, max_tokens)
+    if budget is not None and prompt_tokens > budget:
+        raise ContextBudgetError(
+            model or "the model",
+            prompt_tokens + (max_tokens or 0),
+            context_window(model) or 0,
+        )
+    return prompt_tokens
+
+
+def trim_to_tokens(text: str, max_tokens: int) -> str:
+    """Cut ``text`` down to at most ``max_tokens`` tokens, keeping its start."""
+    if max_tokens <= 0:
+        return ""
+    encoding = _get_encoding()
+    if encoding is not None:
+        tokens = encoding.encode(text, disallowed_special=())
+        if len(tokens) <= max_tokens:
+            return text
+        return encoding.decode(tokens[:max_tokens])
+
+    if count_tokens(text) <= max_tokens:
+        return text
+    # Binary search on the prefix length under the estimate
+    low, high = 0, len(text)
+    while low < high:
+        middle = (low + high + 1) // 2
+        if count_tokens(text[:middle]) <= max_tokens:
+            low = middle
+        else:
+            high = middle - 1
+    return text[:low]
+
+
+def chars_per_token(char_count: int, token_counts: Sequence[int | None]) -> float:
+    """Average characters per token of a document, from its chunks' counts."""
+    tokens = sum(count or 0 for count in token_counts)
+    if not tokens or not char_count:
+        return float(FALLBACK_CHARS_PER_TOKEN)
+    return char_count / tokens
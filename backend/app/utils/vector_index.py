@@ -0,0 +1,328 @@
+"""
+Per-user vector index over chunk embeddings, backed by memory-mapped files.
+
+Each user's index is a directory holding a float32 matrix (one L2-normalised
+row per chunk) and a parallel array of 16-byte chunk ids:
+
+    <VECTOR_INDEX_DIR>/<user_id>/
+        meta.json               model, dimensions, generation
+        vectors-<gen>.f32       row-major float32, appended in place
+        ids-<gen>.bin           raw UUID bytes, appended after the vectors
+
+Readers map the files with ``numpy.memmap`` and answer top-k cosine queries
+with one matrix-vector product, so a library of ~100k chunks is searched in a
+few milliseconds without an external vector database. New chunks are
+appended under an exclusive ``flock``; since the ids are written after the
+vectors, a reader only ever sees rows whose id has landed. ``rebuild``
+writes a fresh generation and switches ``meta.json`` atomically, so open
+readers keep working on the old files until they reload.
+
+The database (``ContentChunkEmbedding``) stays the source of truth; the
+index can always be rebuilt from it.
+"""
+
+import fcntl
+import json
+import logging
+import os
+import tempfile
+import threading
+import uuid
+from collections.abc import Iterator, Sequence
+from contextlib import contextmanager
+from dataclasses import dataclass
+
+import numpy as np
+from sqlmodel import Session
+
+from app.core.config import settings
+from app.crud.crud_content import get_chunk_embeddings
+
+logger = logging.getLogger(__name__)
+
+_ID_BYTES = 16
+_FLOAT_BYTES = 4
+
+
+@dataclass
+class VectorHit:
+    chunk_id: uuid.UUID
+    score: float
+
+
+def pack_vector(vector: Sequence[float]) -> bytes:
+    """Serialise an embedding as little-endian float32 (4 bytes per dimension)."""
+    return np.asarray(vector, dtype="<f4").tobytes()
+
+
+def unpack_vectors(blobs: Sequence[bytes]) -> np.ndarray:
+    """Stack packed embeddings into an (n, dimensions) float32 matrix."""
+    if not blobs:
+        return np.empty((0, 0), dtype=np.float32)
+    return np.frombuffer(b"".join(blobs), dtype="<f4").reshape(len(blobs), -1)
+
+
+def _normalise(vectors: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(vectors, axis=-1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return (vectors / norms).astype(np.float32, copy=False)
+
+
+class VectorIndex:
+    """Append-only cosine-similarity index of one user's chunk embeddings."""
+
+    def __init__(self, directory: str) -> None:
+        self.directory = directory
+        self._lock = threading.Lock()
+        self._meta: dict | None = None
+        self._sizes: tuple[int, int] | None = None
+        self._vectors: np.ndarray | None = None
+        self._ids: np.ndarray | None = None
+
+    # --- paths ---------------------------------------------------------------
+
+    @property
+    def _meta_path(self) -> str:
+        return os.path.join(self.directory, "meta.json")
+
+    def _vectors_path(self, generation: int) -> str:
+        return os.path.join(self.directory, f"vectors-{generation}.f32")
+
+    def _ids_path(self, generation: int) -> str:
+        return os.path.join(self.directory, f"ids-{generation}.bin")
+
+    @contextmanager
+    def _write_lock(self) -> Iterator[None]:
+        """Serialise writers across threads and processes."""
+        os.makedirs(self.directory, exist_ok=True)
+        with open(os.path.join(self.directory, "lock"), "w") as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def _read_meta(self) -> dict | None:
+        try:
+            with open(self._meta_path, encoding="utf-8") as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return None
+
+    def _write_meta(self, meta: dict) -> None:
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump(meta, f)
+        os.replace(tmp_path, self._meta_path)
+
+    # --- metadata ------------------------------------------------------------
+
+    def exists(self) -> bool:
+        return os.path.exists(self._meta_path)
+
+    def matches(self, model: str, dimensions: int) -> bool:
+        """True if the index holds vectors of this model and size."""
+        meta = self._read_meta()
+        return (
+            meta is not None
+            and meta["model"] == model
+            and meta["dimensions"] == dimensions
+        )
+
+    def __len__(self) -> int:
+        with self._lock:
+            self._refresh()
+            return 0 if self._ids is None else len(self._ids)
+
+    # --- writes --------------------------------------------------------------
+
+    def append(
+        self,
+        model: str,
+        chunk_ids: Sequence[uuid.UUID],
+        vectors: Sequence[Sequence[float]] | np.ndarray,
+    ) -> None:
+        """
+        Add vectors to the index.
+
+        Raises ValueError if the index was built for another model or size;
+        ``rebuild`` it from the database in that case.
+        """
+        if len(chunk_ids) == 0:
+            return
+        matrix = _normalise(np.asarray(vectors, dtype=np.float32))
+        if matrix.ndim != 2 or len(matrix) != len(chunk_ids):
+            raise ValueError("Expected one vector per chunk id")
+
+        with self._write_lock():
+            meta = self._read_meta()
+            if meta is None:
+                self._write_generation(model, chunk_ids, matrix, generation=0)
+                return
+            if meta["model"] != model or meta["dimensions"] != matrix.shape[1]:
+                raise ValueError(
+                    f"Index holds {meta['model']} ({meta['dimensions']}d) vectors"
+                )
+
+            generation = meta["generation"]
+            vectors_path = self._vectors_path(generation)
+            ids_path = self._ids_path(generation)
+            # Drop a torn tail left by a crashed writer before appending
+            rows = min(
+                os.path.getsize(vectors_path) // (matrix.shape[1] * _FLOAT_BYTES),
+                os.path.getsize(ids_path) // _ID_BYTES,
+            )
+            with open(vectors_path, "r+b") as f:
+                f.truncate(rows * matrix.shape[1] * _FLOAT_BYTES)
+                f.seek(0, os.SEEK_END)
+                f.write(matrix.tobytes())
+                f.flush()
+                os.fsync(f.fileno())
+            with open(ids_path, "r+b") as f:
+                f.truncate(rows * _ID_BYTES)
+                f.seek(0, os.SEEK_END)
+                f.write(b"".join(chunk_id.bytes for chunk_id in chunk_ids))
+
+    def rebuild(
+        self,
+        model: str,
+        chunk_ids: Sequence[uuid.UUID],
+        vectors: Sequence[Sequence[float]] | np.ndarray,
+        dimensions: int,
+    ) -> None:
+        """Replace the whole index (e.g. after the embedding model changed)."""
+        matrix = (
+            _normalise(np.asarray(vectors, dtype=np.float32))
+            if len(chunk_ids)
+            else np.empty((0, dimensions), dtype=np.float32)
+        )
+        with self._write_lock():
+            meta = self._read_meta()
+            generation = 0 if meta is None else meta["generation"] + 1
+            self._write_generation(model, chunk_ids, matrix, generation)
+            if meta is not None:
+                for path in (
+                    self._vectors_path(meta["generation"]),
+                    self._ids_path(meta["generation"]),
+                ):
+                    try:
+                        os.remove(path)
+                    except OSError:
+                        pass
+
+    def _write_generation(
+        self,
+        model: str,
+        chunk_ids: Sequence[uuid.UUID],
+        matrix: np.ndarray,
+        generation: int,
+    ) -> None:
+        with open(self._vectors_path(generation), "wb") as f:
+            f.write(matrix.tobytes())
+        with open(self._ids_path(generation), "wb") as f:
+            f.write(b"".join(chunk_id.bytes for chunk_id in chunk_ids))
+        self._write_meta(
+            {"model": model, "dimensions": matrix.shape[1], "generation": generation}
+        )
+
+    # --- reads ---------------------------------------------------------------
+
+    def _refresh(self) -> None:
+        """(Re)map the files if another writer has changed them."""
+        meta = self._read_meta()
+        if meta is None:
+            self._meta = self._sizes = self._vectors = self._ids = None
+            return
+        generation, dimensions = meta["generation"], meta["dimensions"]
+        try:
+            sizes = (
+                os.path.getsize(self._vectors_path(generation)),
+                os.path.getsize(self._ids_path(generation)),
+            )
+        except FileNotFoundError:
+            # Replaced by a rebuild between reading meta and the files
+            return
+        if meta == self._meta and sizes == self._sizes:
+            return
+
+        rows = (
+            min(sizes[0] // (dimensions * _FLOAT_BYTES), sizes[1] // _ID_BYTES)
+            if dimensions
+            else 0
+        )
+        if rows == 0:
+            self._vectors = np.empty((0, dimensions), dtype=np.float32)
+            self._ids = np.empty((0, _ID_BYTES), dtype=np.uint8)
+        else:
+            self._vectors = np.memmap(
+                self._vectors_path(generation),
+                dtype=np.float32,
+                mode="r",
+                shape=(rows, dimensions),
+            )
+            self._ids = np.memmap(
+                self._ids_path(generation),
+                dtype=np.uint8,
+                mode="r",
+                shape=(rows, _ID_BYTES),
+            )
+        self._meta, self._sizes = meta, sizes
+
+    def search(self, query: Sequence[float], k: int = 10) -> list[VectorHit]:
+        """Return up to ``k`` chunks most similar to ``query``, best first."""
+        with self._lock:
+            self._refresh()
+            vectors, ids = self._vectors, self._ids
+        if vectors is None or ids is None or len(vectors) == 0 or k <= 0:
+            return []
+
+        q = _normalise(np.asarray(query, dtype=np.float32))
+        if q.shape != (vectors.shape[1],):
+            raise ValueError(
+                f"Query has {q.shape[-1]} dimensions, index has {vectors.shape[1]}"
+            )
+        scores = vectors @ q
+
+        # A chunk appended twice (e.g. a retried job) must not take two slots
+        candidates = min(len(scores), k * 2)
+        top = np.argpartition(-scores, candidates - 1)[:candidates]
+        top = top[np.argsort(-scores[top])]
+
+        hits: list[VectorHit] = []
+        seen: set[uuid.UUID] = set()
+        for row in top:
+            chunk_id = uuid.UUID(bytes=ids[row].tobytes())
+            if chunk_id in seen:
+                continue
+            seen.add(chunk_id)
+            hits.append(VectorHit(chunk_id=chunk_id, score=float(scores[row])))
+            if len(hits) == k:
+                break
+        return hits
+
+
+_indexes: dict[uuid.UUID, VectorIndex] = {}
+_indexes_lock = threading.Lock()
+
+
+def get_user_vector_index(user_id: uuid.UUID) -> VectorIndex:
+    """Return the (process-wide, cached) vector index of a user."""
+    with _indexes_lock:
+        index = _indexes.get(user_id)
+        if index is None:
+            index = VectorIndex(os.path.join(settings.VECTOR_INDEX_DIR, str(user_id)))
+            _indexes[user_id] = index
+        return index
+
+
+def rebuild_user_vector_index(session: Session, user_id: uuid.UUID, model: str) -> int:
+    """Rebuild a user's index from the stored embeddings. Returns the row count."""
+    rows = get_chunk_embeddings(session, model, user_id=user_id)
+    vectors = unpack_vectors([vector for _, vector in rows])
+    get_user_vector_index(user_id).rebuild(
+        model,
+        [chunk_id for chunk_id, _ in rows],
+        vectors,
+        dimensions=vectors.shape[1] if rows else 0,
+    )
+    return len(rows)
@@ -0,0 +1,311 @@
+"""
+Content processing worker.
+
+Drains the ProcessingJob queue filled by ``POST /content/process/{id}`` and runs
+each job through ``ProcessingPipeline``. It runs as its own process so ingestion
+can be scaled independently of the API tier:
+
+    python -m app.worker
+
+Each process runs ``PROCESSING_WORKER_CONCURRENCY`` jobs at once as tasks on
+one event loop. Jobs go through ``ProcessingPipeline.aprocess``: URL fetches
+are awaited on the shared async HTTP client instead of holding a thread, and
+database work and conversions run on a thread pool of the same size. Jobs are
+claimed with ``SELECT ... FOR UPDATE SKIP LOCKED``, so several worker
+processes can share the same database safely. While a job runs, a heartbeat thread renews its lease
+every ``PROCESSING_JOB_HEARTBEAT_SECONDS``; jobs left ``in_progress`` by a
+crashed worker are picked up again once their last heartbeat is older than
+``PROCESSING_JOB_STALE_SECONDS``, and jobs that are merely slow are not.
+
+Summarizer jobs (queued by ``SummaryStep``) are low priority: they are only
+claimed when no processing job is waiting, and by at most
+``CONTENT_SUMMARY_WORKER_SLOTS`` job slots at a time, so new content is never
+stuck behind summaries.
+
+The worker also runs periodic maintenance on its own thread: expired entries
+are purged from the token blacklist every
+``TOKEN_BLACKLIST_PURGE_INTERVAL_SECONDS``.
+"""
+
+import asyncio
+import logging
+import signal
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from typing import Any
+
+from sqlalchemy import Engine
+from sqlmodel import Session
+
+from app.core.config import settings
+from app.core.db import engine
+from app.crud import clean_expired_tokens
+from app.crud.crud_content import (
+    PIPELINE_JOB_NAME,
+    SUMMARY_JOB_NAME,
+    claim_next_processing_job,
+    renew_processing_job_lease,
+)
+from app.models.content import ContentItem, ProcessingJob
+from app.utils.content_processors import ProcessingPipeline
+from app.utils.content_summarizer import ContentSummarizer
+from app.utils.http_client import close_async_http_client
+from app.utils.markitdown_pool import shutdown_markitdown_pool
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+class JobHeartbeat:
+    """Renews the lease of a claimed job from a background thread while it runs."""
+
+    def __init__(self, db_engine: Engine, job: ProcessingJob, interval: float) -> None:
+        self.db_engine = db_engine
+        self.job_id = job.id
+        self.started_at = job.started_at
+        self.interval = interval
+        self._stop = threading.Event()
+        self._thread = threading.Thread(
+            target=self._run, name=f"job-heartbeat-{job.id}", daemon=True
+        )
+
+    def __enter__(self) -> "JobHeartbeat":
+        self._thread.start()
+        return self
+
+    def __exit__(self, *_exc: Any) -> None:
+        self._stop.set()
+        self._thread.join()
+
+    def beat(self) -> bool:
+        """Renew the lease once. Returns False if another worker took the job."""
+        with Session(self.db_engine) as session:
+            return renew_processing_job_lease(session, self.job_id, self.started_at)
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            try:
+                if not self.beat():
+                    logger.warning(
+                        f"Job {self.job_id} was claimed by another worker "
+                        "after its lease expired"
+                    )
+                    return
+            except Exception:
+                logger.exception(f"Could not renew the lease of job {self.job_id}")
+
+
+class ProcessingWorker:
+    """Polls the processing queue and runs a fixed number of jobs at once."""
+
+    def __init__(
+        self,
+        db_engine: Engine | None = None,
+        concurrency: int | None = None,
+        poll_interval: float | None = None,
+        stale_after: timedelta | None = None,
+        heartbeat_interval: float | None = None,
+    ) -> None:
+        self.db_engine = db_engine or engine
+        self.concurrency = max(1, concurrency or settings.PROCESSING_WORKER_CONCURRENCY)
+        self.poll_interval = (
+            poll_interval
+            if poll_interval is not None
+            else settings.PROCESSING_WORKER_POLL_INTERVAL
+        )
+        self.stale_after = stale_after or timedelta(
+            seconds=settings.PROCESSING_JOB_STALE_SECONDS
+        )
+        self.heartbeat_interval = (
+            heartbeat_interval
+            if heartbeat_interval is not None
+            else settings.PROCESSING_JOB_HEARTBEAT_SECONDS
+        )
+        self.stop_event = threading.Event()
+        self._threads: list[threading.Thread] = []
+        self._summary_slots = threading.BoundedSemaphore(
+            max(1, settings.CONTENT_SUMMARY_WORKER_SLOTS)
+        )
+
+    async def run_once(self, pipeline: ProcessingPipeline) -> bool:
+        """Claim and process a single job. Returns False when the queue is empty."""
+        summary_slot = self._summary_slots.acquire(blocking=False)
+        job_names = (
+            (PIPELINE_JOB_NAME, SUMMARY_JOB_NAME)
+            if summary_slot
+            else (PIPELINE_JOB_NAME,)
+        )
+        try:
+            with Session(self.db_engine) as session:
+                return await self._run_claimed(session, pipeline, job_names)
+        finally:
+            if summary_slot:
+                self._summary_slots.release()
+
+    async def _run_claimed(
+        self,
+        session: Session,
+        pipeline: ProcessingPipeline,
+        job_names: tuple[str, ...],
+    ) -> bool:
+        job = await asyncio.to_thread(
+            claim_next_processing_job,
+            session,
+            stale_after=self.stale_after,
+            job_names=job_names,
+        )
+        if job is None:
+            return False
+
+        with JobHeartbeat(self.db_engine, job, self.heartbeat_interval):
+            await self._run_job(session, pipeline, job)
+        return True
+
+    async def _run_job(
+        self, session: Session, pipeline: ProcessingPipeline, job: ProcessingJob
+    ) -> None:
+        logger.info(
+            f"Claimed {job.processor_name} job {job.id} for {job.content_item_id}"
+        )
+        content_item = await asyncio.to_thread(
+            session.get, ContentItem, job.content_item_id
+        )
+        if content_item is None:
+            await asyncio.to_thread(
+                self._fail_job, session, job, "ContentItem not found"
+            )
+            return
+
+        if job.processor_name == SUMMARY_JOB_NAME:
+            await asyncio.to_thread(self._run_summary_job, session, job, content_item)
+            return
+
+        try:
+            result = await pipeline.aprocess(content_item, session, job=job)
+            logger.info(
+                f"Processing job {job.id} finished: "
+                f"{'completed' if result.success else 'failed'}"
+            )
+        except Exception as e:
+            # The pipeline records its own failures; this only guards
+            # against errors raised while it was persisting them.
+            logger.exception(f"Processing job {job.id} crashed")
+            await asyncio.to_thread(self._abort_job, session, job, str(e))
+
+    def _abort_job(self, session: Session, job: ProcessingJob, message: str) -> None:
+        session.rollback()
+        self._fail_job(session, job, message)
+
+    def _run_summary_job(
+        self, session: Session, job: ProcessingJob, content_item: ContentItem
+    ) -> None:
+        try:
+            generated = ContentSummarizer().summarize(session, content_item)
+        except Exception as e:
+            logger.exception(f"Summarizer job {job.id} failed")
+            session.rollback()
+            self._fail_job(session, job, str(e))
+            return
+
+        job.status = "completed"
+        job.completed_at = datetime.utcnow()
+        session.add(job)
+        session.commit()
+        logger.info(
+            f"Summarizer job {job.id} finished: {generated} chunk summaries generated"
+        )
+
+    def _fail_job(self, session: Session, job: ProcessingJob, message: str) -> None:
+        job.status = "failed"
+        job.error_message = message
+        job.completed_at = datetime.utcnow()
+        session.add(job)
+        session.commit()
+
+    def purge_expired_tokens(self) -> int:
+        """Delete expired blacklist entries. Returns the number removed."""
+        with Session(self.db_engine) as session:
+            return clean_expired_tokens(session=session)
+
+    def _maintenance_loop(self) -> None:
+        while not self.stop_event.is_set():
+            try:
+                removed = self.purge_expired_tokens()
+                if removed:
+                    logger.info(f"Purged {removed} expired blacklisted tokens")
+            except Exception:
+                logger.exception("Error while purging expired blacklisted tokens")
+            self.stop_event.wait(settings.TOKEN_BLACKLIST_PURGE_INTERVAL_SECONDS)
+
+    async def _job_slot(self) -> None:
+        # Each slot keeps its own pipeline so processor state (e.g. the
+        # MarkItDown converter) stays warm and is never used by two jobs at once.
+        pipeline = ProcessingPipeline()
+        while not self.stop_event.is_set():
+            try:
+                found = await self.run_once(pipeline)
+            except Exception:
+                logger.exception("Error while polling the processing queue")
+                found = False
+            if not found:
+                await asyncio.sleep(self.poll_interval)
+
+    async def run_jobs(self) -> None:
+        """Run the job slots until ``stop_event`` is set."""
+        # One thread per slot: a slot never has more than one blocking call
+        # in flight, and awaiting a fetch holds none
+        asyncio.get_running_loop().set_default_executor(
+            ThreadPoolExecutor(
+                max_workers=self.concurrency, thread_name_prefix="processing-worker"
+            )
+        )
+        try:
+            await asyncio.gather(*(self._job_slot() for _ in range(self.concurrency)))
+        finally:
+            await close_async_http_client()
+
+    def start(self) -> None:
+        """Start the event loop running the jobs and the maintenance thread."""
+        thread = threading.Thread(
+            target=asyncio.run,
+            args=(self.run_jobs(),),
+            name="processing-jobs",
+            daemon=True,
+        )
+        thread.start()
+        self._threads.append(thread)
+        thread = threading.Thread(
+            target=self._maintenance_loop, name="processing-maintenance", daemon=True
+        )
+        thread.start()
+        self._threads.append(thread)
+        logger.info(f"Processing worker started with {self.concurrency} job slots")
+
+    def stop(self, timeout: float | None = None) -> None:
+        """Signal all threads to stop after their current job and wait for them."""
+        self.stop_event.set()
+        for thread in self._threads:
+            thread.join(timeout)
+        self._threads = []
+
+
+def main() -> None:
+    worker = ProcessingWorker()
+
+    def _handle_signal(signum: int, _frame: Any) -> None:
+        logger.info(f"Received signal {signum}, finishing in-flight jobs...")
+        worker.stop_event.set()
+
+    signal.signal(signal.SIGTERM, _handle_signal)
+    signal.signal(signal.SIGINT, _handle_signal)
+
+    worker.start()
+    worker.stop_event.wait()
+    worker.stop()
+    shutdown_markitdown_pool()
+    logger.info("Processing worker stopped")
+
+
+if __name__ == "__main__":
+    main()
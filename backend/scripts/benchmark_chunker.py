@@ -0,0 +1,82 @@
+#!/usr/bin/env python3
+"""
+Benchmark ContentChunker on multi-megabyte markdown.
+
+Generates a synthetic document (headings, prose, lists, tables, code blocks,
+and some oversized sections that need paragraph splitting) at doubling sizes
+and reports throughput. Time per MB should stay flat as the size grows.
+
+Usage:
+    PYTHONPATH=. python scripts/benchmark_chunker.py [--sizes 1 2 4 8 16] [--repeat 3]
+"""
+
+import argparse
+import random
+import time
+
+from app.utils.content_chunker import ContentChunker
+
+SECTION_TEMPLATES = [
+    "## Section {n}\n\n{prose}\n\n{prose}",
+    "### Notes {n}\n\n- {words}\n- {words}\n- {words}",
+    "## Data {n}\n\n| Key | Value |\n|-----|-------|\n| a | {words} |\n| b | {words} |",
+    "## Code {n}\n\n```python\n# comment {n}\ndef f_{n}():\n    return {n}\n```\n\n{prose}",
+    # Oversized section without sub-headings: split by paragraphs
+    "## Long read {n}\n\n" + "\n\n".join(["{prose} {prose} {prose}"] * 12),
+]
+
+WORDS = (
+    "content chunk markdown render storage section paragraph table list code "
+    "the of and to in is that for with as on by this from"
+).split()
+
+
+def build_document(size_bytes: int, seed: int = 0) -> str:
+    rng = random.Random(seed)
+    parts = ["# Benchmark Document"]
+    length = len(parts[0])
+    n = 0
+    while length < size_bytes:
+        template = rng.choice(SECTION_TEMPLATES)
+        section = template.format(
+            n=n,
+            prose=" ".join(rng.choices(WORDS, k=60)) + ".",
+            words=" ".join(rng.choices(WORDS, k=4)),
+        )
+        parts.append(section)
+        length += len(section) + 2
+        n += 1
+    return "\n\n".join(parts)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--sizes", type=float, nargs="+", default=[1, 2, 4, 8, 16])
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--max-chunk-size", type=int, default=3000)
+    args = parser.parse_args()
+
+    chunker = ContentChunker(max_chunk_size=args.max_chunk_size)
+    baseline = None
+
+    print(f"{'size':>8} {'chunks':>8} {'best':>9} {'ms/MB':>8} {'vs first':>9}")
+    for size_mb in args.sizes:
+        document = build_document(int(size_mb * 1024 * 1024))
+        timings = []
+        chunks = []
+        for _ in range(args.repeat):
+            started = time.perf_counter()
+            chunks = chunker.chunk_markdown_content(document)
+            timings.append(time.perf_counter() - started)
+
+        best = min(timings)
+        per_mb = best * 1000 / size_mb
+        baseline = baseline or per_mb
+        print(
+            f"{size_mb:>6.1f}MB {len(chunks):>8} {best:>8.3f}s "
+            f"{per_mb:>8.1f} {per_mb / baseline:>8.2f}x"
+        )
+
+
+if __name__ == "__main__":
+    main()